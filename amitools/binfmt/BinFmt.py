@@ -30,8 +30,12 @@ class BinFmt:
 
     def load_image(self, path):
         """load a binary file and return a BinImage. unknown format returns None"""
-        with open(path, "rb") as f:
-            return self.load_image_fobj(f)
+        # let the format read the file itself, e.g. hunk files are mapped
+        f = self.get_format(path)
+        if f is not None:
+            return f.load_image(path)
+        else:
+            return None
 
     def load_image_fobj(self, fobj):
         """load a binary file and return a BinImage. unknown format returns None"""
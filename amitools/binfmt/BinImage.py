@@ -1,3 +1,5 @@
+import bisect
+
 SEGMENT_TYPE_CODE = 0
 SEGMENT_TYPE_DATA = 1
 SEGMENT_TYPE_BSS = 2
@@ -140,6 +142,10 @@ class Segment:
         self.id = None
         self.file_data = None
         self.debug_line = None
+        # lazily built lookup indexes: (stamp, offsets, entries)
+        self._symbol_index = None
+        self._reloc_index = None
+        self._debug_line_index = None
 
     def __str__(self):
         # relocs
@@ -219,35 +225,116 @@ class Segment:
         return self.file_data
 
     def find_symbol(self, offset):
-        symtab = self.get_symtab()
-        if symtab is None:
-            return None
-        for symbol in symtab.get_symbols():
-            off = symbol.get_offset()
-            if off == offset:
-                return symbol.get_name()
+        """return name of the first symbol at offset or None"""
+        offsets, entries = self._get_symbol_index()
+        i = bisect.bisect_left(offsets, offset)
+        if i < len(offsets) and offsets[i] == offset:
+            return entries[i][2].get_name()
         return None
 
+    def find_symbols(self, start, end):
+        """return all symbols with start <= offset < end sorted by offset"""
+        offsets, entries = self._get_symbol_index()
+        lo = bisect.bisect_left(offsets, start)
+        hi = bisect.bisect_left(offsets, end)
+        return [e[2] for e in entries[lo:hi]]
+
+    def find_nearest_symbol(self, offset):
+        """return (symbol, delta) of the last symbol at or before offset or None"""
+        offsets, entries = self._get_symbol_index()
+        i = bisect.bisect_right(offsets, offset)
+        if i == 0:
+            return None
+        # prefer first symbol of the table if several share the offset
+        i = bisect.bisect_left(offsets, offsets[i - 1])
+        return entries[i][2], offset - offsets[i]
+
     def find_reloc(self, offset, size):
-        to_segs = self.get_reloc_to_segs()
-        for to_seg in to_segs:
-            reloc = self.get_reloc(to_seg)
-            for r in reloc.get_relocs():
-                off = r.get_offset()
-                if off >= offset and off <= (offset + size):
-                    return r, to_seg, off
-        return None
+        """return (reloc, to_seg, offset) for the first relocation found
+        within [offset, offset + size] or None"""
+        relocs = self._find_reloc_entries(offset, offset + size + 1)
+        if not relocs:
+            return None
+        # keep the search order of target segments and their entries
+        _, _, _, r, to_seg = min(relocs, key=lambda e: (e[1], e[2]))
+        return r, to_seg, r.get_offset()
+
+    def find_relocs(self, start, end):
+        """return (reloc, to_seg, offset) of all relocations with
+        start <= offset < end sorted by offset"""
+        return [
+            (r, to_seg, off)
+            for off, _, _, r, to_seg in self._find_reloc_entries(start, end)
+        ]
 
     def find_debug_line(self, offset):
-        debug_line = self.debug_line
-        if debug_line is None:
-            return None
-        for df in debug_line.get_files():
-            for e in df.get_entries():
-                if e.get_offset() == offset:
-                    return e
+        """return the first debug line entry at offset or None"""
+        offsets, entries = self._get_debug_line_index()
+        i = bisect.bisect_left(offsets, offset)
+        if i < len(offsets) and offsets[i] == offset:
+            return entries[i][3]
         return None
 
+    def find_nearest_debug_line(self, offset):
+        """return the last debug line entry at or before offset or None"""
+        offsets, entries = self._get_debug_line_index()
+        i = bisect.bisect_right(offsets, offset)
+        if i == 0:
+            return None
+        i = bisect.bisect_left(offsets, offsets[i - 1])
+        return entries[i][3]
+
+    def _find_reloc_entries(self, start, end):
+        offsets, entries = self._get_reloc_index()
+        lo = bisect.bisect_left(offsets, start)
+        hi = bisect.bisect_left(offsets, end)
+        return entries[lo:hi]
+
+    def _get_symbol_index(self):
+        symtab = self.symtab
+        symbols = symtab.get_symbols() if symtab is not None else ()
+        stamp = (id(symtab), len(symbols))
+        index = self._symbol_index
+        if index is None or index[0] != stamp:
+            entries = sorted(
+                ((s.get_offset(), i, s) for i, s in enumerate(symbols)),
+                key=lambda e: e[:2],
+            )
+            index = (stamp, [e[0] for e in entries], entries)
+            self._symbol_index = index
+        return index[1:]
+
+    def _get_reloc_index(self):
+        to_segs = self.get_reloc_to_segs()
+        stamp = tuple(
+            (id(self.relocs[s]), len(self.relocs[s].entries)) for s in to_segs
+        )
+        index = self._reloc_index
+        if index is None or index[0] != stamp:
+            entries = []
+            for seg_num, to_seg in enumerate(to_segs):
+                for i, r in enumerate(self.relocs[to_seg].get_relocs()):
+                    entries.append((r.get_offset(), seg_num, i, r, to_seg))
+            entries.sort(key=lambda e: e[:3])
+            index = (stamp, [e[0] for e in entries], entries)
+            self._reloc_index = index
+        return index[1:]
+
+    def _get_debug_line_index(self):
+        debug_line = self.debug_line
+        files = debug_line.get_files() if debug_line is not None else ()
+        stamp = (id(debug_line), tuple(len(f.entries) for f in files))
+        index = self._debug_line_index
+        if index is None or index[0] != stamp:
+            entries = []
+            for file_num, df in enumerate(files):
+                for i, e in enumerate(df.get_entries()):
+                    entries.append((e.get_offset(), file_num, i, e))
+            entries.sort(key=lambda e: e[:3])
+            index = (stamp, [e[0] for e in entries], entries)
+            self._debug_line_index = index
+        return index[1:]
+
 
 class BinImage:
     """A binary image contains all the segments of a program's binary image."""
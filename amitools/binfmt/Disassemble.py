@@ -1,11 +1,19 @@
+import multiprocessing
+
 from amitools.vamos.machine import DisAsm
 from .BinImage import *
 
 
 class Disassemble:
-    """allows to disassemble code segments of a BinImage"""
+    """allows to disassemble code segments of a BinImage.
+
+    Lines are generated one by one, so even large segments can be written
+    without keeping the whole listing in memory. Disassembly can be
+    restricted to offset ranges or to the functions of given symbols.
+    """
 
     def __init__(self, cpu="68000"):
+        self.cpu = cpu
         self.disasm = DisAsm.create(cpu)
 
     def _get_line_info(self, segment, addr, size):
@@ -26,26 +34,26 @@ class Disassemble:
         return infos
 
     def disassemble(self, segment, bin_img):
+        """return the lines of a code segment or None if its not code"""
         # make sure its a code segment
         if segment.seg_type != SEGMENT_TYPE_CODE:
             return None
+        return list(self.iter_lines(segment))
 
-        # generate raw assembly
+    def iter_lines(self, segment, start=0, end=None):
+        """yield the lines of the disassembled code in [start, end)"""
         data = segment.data
-        lines = self.disasm.disassemble_block(data)
-
-        # process lines
-        result = []
-        for l in lines:
-            addr = l[0]
-            word = l[1]
-            code = l[2]
+        if end is None or end > len(data):
+            end = len(data)
+        if start >= end:
+            return
+        block = memoryview(data)[start:end]
 
+        for addr, word, code in self.disasm.iter_block(block, start):
             # try to find a symbol for this addr
             symbol = segment.find_symbol(addr)
             if symbol is not None:
-                line = "\t\t\t\t%s:" % symbol
-                result.append(line)
+                yield "\t\t\t\t%s:" % symbol
 
             # create final line
             line = "%08x\t%-20s\t%-30s  " % (
@@ -58,14 +66,118 @@ class Disassemble:
             size = len(word) * 2
             info = self._get_line_info(segment, addr, size)
             if info is None or len(info) == 0:
-                result.append(line)
+                yield line
             else:
-                result.append(line + "; " + info[0])
+                yield line + "; " + info[0]
                 spc = " " * len(line)
                 for i in info[1:]:
-                    result.append(spc + "; " + i)
+                    yield spc + "; " + i
+
+    def iter_ranges(self, segment, ranges):
+        """yield the lines of all (start, end) offset ranges of a segment"""
+        for start, end in ranges:
+            yield from self.iter_lines(segment, start, end)
+
+
+def parse_range(text):
+    """parse a range 'start:end' or 'start+size' given in hex.
+
+    return (start, end) or raise ValueError
+    """
+    if "+" in text:
+        start, size = text.split("+", 1)
+        start = int(start, 16)
+        return start, start + int(size, 16)
+    start, end = text.split(":", 1)
+    return int(start, 16), int(end, 16)
+
+
+def get_symbol_ranges(segment, names):
+    """return the sorted (start, end) ranges of the given symbols.
+
+    A function ends at the next symbol with a higher offset or at the end
+    of the segment. Symbol names are matched as str or bytes.
+    """
+    symtab = segment.get_symtab()
+    if symtab is None:
+        return []
+    names = set(names)
+    names |= set(n.encode("latin-1") for n in names if isinstance(n, str))
+    ranges = []
+    for sym in symtab.get_symbols():
+        if sym.get_name() in names:
+            start = sym.get_offset()
+            follow = segment.find_symbols(start + 1, segment.size)
+            end = follow[0].get_offset() if follow else segment.size
+            ranges.append((start, end))
+    return sorted(set(ranges))
+
+
+def get_segment_ranges(segment, ranges=None, symbols=None):
+    """return the offset ranges to disassemble in a code segment.
+
+    Without ranges and symbols the whole segment is returned. Otherwise
+    the given ranges are clipped to the segment and the ranges of the
+    selected symbols are added.
+    """
+    size = segment.size
+    if not ranges and not symbols:
+        return [(0, size)]
+    result = []
+    if ranges:
+        for start, end in ranges:
+            start = max(start, 0)
+            end = min(end, size)
+            if start < end:
+                result.append((start, end))
+    if symbols:
+        result += get_symbol_ranges(segment, symbols)
+    return sorted(set(result))
+
+
+# worker state for disassembling segments in separate processes
+_worker = None
+
+
+def _worker_init(bin_img, cpu):
+    global _worker
+    _worker = (bin_img, Disassemble(cpu))
+
+
+def _worker_lines(job):
+    seg_num, ranges = job
+    bin_img, disasm = _worker
+    segment = bin_img.get_segments()[seg_num]
+    return list(disasm.iter_ranges(segment, ranges))
+
+
+def iter_image(bin_img, cpu="68000", ranges=None, symbols=None, workers=1):
+    """yield (segment, lines) for all code segments of a BinImage.
+
+    lines is an iterable of the disassembled lines in the selected ranges
+    (see get_segment_ranges()). With more than one worker the segments
+    are disassembled in parallel worker processes and each segment is
+    returned as a list of lines. The segments are always returned in
+    image order.
+    """
+    segments = bin_img.get_segments()
+    jobs = []
+    for seg_num, seg in enumerate(segments):
+        if seg.seg_type == SEGMENT_TYPE_CODE:
+            seg_ranges = get_segment_ranges(seg, ranges, symbols)
+            if seg_ranges:
+                jobs.append((seg_num, seg_ranges))
 
-        return result
+    if workers <= 1 or len(jobs) <= 1:
+        disasm = Disassemble(cpu)
+        for seg_num, seg_ranges in jobs:
+            seg = segments[seg_num]
+            yield seg, disasm.iter_ranges(seg, seg_ranges)
+    else:
+        num = min(workers, len(jobs))
+        with multiprocessing.Pool(num, _worker_init, (bin_img, cpu)) as pool:
+            for (seg_num, _), lines in zip(jobs, pool.imap(_worker_lines, jobs)):
+                yield segments[seg_num], lines
 
 
 # mini test
@@ -78,9 +190,6 @@ if __name__ == "__main__":
         bi = bf.load_image(a)
         if bi is not None:
             print(a)
-            d = Disassemble()
-            for seg in bi.get_segments():
-                if seg.seg_type == SEGMENT_TYPE_CODE:
-                    lines = d.disassemble(seg, bi)
-                    for l in lines:
-                        print(l)
+            for seg, lines in iter_image(bi):
+                for l in lines:
+                    print(l)
@@ -1,13 +1,22 @@
+import array
+import operator
 import struct
+import sys
 from .BinImage import BIN_IMAGE_RELOC_32, BIN_IMAGE_RELOC_PC32
 
+# the batched path works on 32 bit words of the segment data
+_WORD_TYPE = "I" if array.array("I").itemsize == 4 else "L"
+_SWAP_WORDS = sys.byteorder == "little"
+
 
 class Relocate:
     """Relocate a BinImage to given addresses"""
 
-    def __init__(self, bin_img, verbose=False):
+    def __init__(self, bin_img, verbose=False, batch=True):
         self.bin_img = bin_img
         self.verbose = verbose
+        # apply all relocs of a segment to a target at once
+        self.batch = batch and not verbose
 
     def get_sizes(self):
         """return a list of the required sizes for all sections"""
@@ -81,10 +90,97 @@ class Relocate:
             to_id = to_seg.id
             to_addr = addrs[to_id]
             # get relocations
-            reloc = segment.get_reloc(to_seg)
-            for r in reloc.get_relocs():
+            relocs = segment.get_reloc(to_seg).get_relocs()
+            if self.batch and self._reloc_batch(
+                data, segment, relocs, my_addr, to_addr, offset
+            ):
+                continue
+            for r in relocs:
                 self._reloc(segment.id, data, r, my_addr, to_addr, to_id, offset)
 
+    def _reloc_batch(self, data, segment, relocs, my_addr, to_addr, extra_offset):
+        """relocate all entries to one target segment at once.
+
+        The relocated longs are read into a big endian uint32 array per
+        long word alignment and patched in a single pass. Returns False if
+        the entries can't be batched and need the scalar path.
+        """
+        if not relocs:
+            return True
+        offsets = [r.offset for r in relocs]
+        # validate all offsets before touching the data
+        lo = min(offsets)
+        hi = max(offsets)
+        if lo < 0 or hi + 4 > segment.size:
+            raise ValueError(
+                "#%02d: reloc offset out of range: %06x..%06x size=%06x"
+                % (segment.id, lo, hi, segment.size)
+            )
+        # value to add for each entry: a single one for plain RELOC_32
+        kinds = {(r.type, r.addend) for r in relocs}
+        if kinds == {(BIN_IMAGE_RELOC_32, 0)}:
+            adds = None
+        else:
+            adds = []
+            for r in relocs:
+                if r.type == BIN_IMAGE_RELOC_32:
+                    adds.append(to_addr + r.addend)
+                elif r.type == BIN_IMAGE_RELOC_PC32:
+                    pos = r.offset + extra_offset
+                    adds.append(r.addend + to_addr - my_addr - pos)
+                else:
+                    return False
+        if extra_offset:
+            offsets = [off + extra_offset for off in offsets]
+        if adds is None:
+            entries = sorted(offsets)
+            positions = entries
+        else:
+            entries = sorted(zip(offsets, adds))
+            positions = [pos for pos, _ in entries]
+        # overlapping longs depend on the order of patching
+        if len(positions) > 1 and min(map(operator.sub, positions[1:], positions)) < 4:
+            return False
+        # patch all longs with the same alignment in one array
+        phases = {pos & 3 for pos in positions}
+        for phase in phases:
+            if len(phases) == 1:
+                group = entries
+            else:
+                group = [e for e, pos in zip(entries, positions) if pos & 3 == phase]
+            if adds is None:
+                self._patch_longs(data, group, to_addr)
+            else:
+                self._patch_longs_add(data, group)
+        return True
+
+    def _patch_longs(self, data, positions, value):
+        """add value to the longs at the sorted positions of same alignment"""
+        start = positions[0]
+        end = positions[-1] + 4
+        words = array.array(_WORD_TYPE, data[start:end])
+        if _SWAP_WORDS:
+            words.byteswap()
+        for idx in [(pos - start) >> 2 for pos in positions]:
+            words[idx] = (words[idx] + value) & 0xFFFFFFFF
+        if _SWAP_WORDS:
+            words.byteswap()
+        data[start:end] = words.tobytes()
+
+    def _patch_longs_add(self, data, entries):
+        """add values to the longs of sorted (pos, value) entries of same alignment"""
+        start = entries[0][0]
+        end = entries[-1][0] + 4
+        words = array.array(_WORD_TYPE, data[start:end])
+        if _SWAP_WORDS:
+            words.byteswap()
+        for pos, value in entries:
+            idx = (pos - start) >> 2
+            words[idx] = (words[idx] + value) & 0xFFFFFFFF
+        if _SWAP_WORDS:
+            words.byteswap()
+        data[start:end] = words.tobytes()
+
     def _reloc(self, my_id, data, reloc, my_addr, to_addr, to_id, extra_offset):
         """relocate one entry"""
         offset = reloc.get_offset() + extra_offset
@@ -107,7 +203,8 @@ class Relocate:
         return struct.unpack(">i", d)[0]
 
     def _write_long(self, data, offset, value):
-        d = struct.pack(">i", value)
+        # addresses wrap around like on the 32 bit bus
+        d = struct.pack(">I", value & 0xFFFFFFFF)
         data[offset : offset + 4] = d
 
 
@@ -68,7 +68,10 @@ class BinFmtELF:
         """load a BinImage from an ELF file given via file object"""
         # read elf file
         reader = ELFReader()
-        elf = reader.load(fobj)
+        with reader.load(fobj) as elf:
+            return self._create_image(elf)
+
+    def _create_image(self, elf):
         # create bin image and assign elf file
         bi = BinImage(BIN_IMAGE_TYPE_ELF)
         bi.set_file_data(elf)
@@ -1,4 +1,3 @@
-import io
 import struct
 
 
@@ -14,15 +13,8 @@ class LineState:
         self.section = None
 
     def clone(self):
-        state = LineState()
-        state.address = self.address
-        state.file = self.file
-        state.line = self.line
-        state.column = self.column
-        state.is_stmt = self.is_stmt
-        state.basic_block = self.basic_block
-        state.end_sequence = self.end_sequence
-        state.section = self.section
+        state = LineState.__new__(LineState)
+        state.__dict__.update(self.__dict__)
         return state
 
     def __str__(self):
@@ -41,13 +33,21 @@ class LineState:
 
 
 class DwarfDebugLine:
-    """decode .debug_line Dwarf line debug sections"""
+    """decode .debug_line Dwarf line debug sections
+
+    The line programs are decoded from the section data with a position
+    cursor. All compilation units of the section are decoded and their
+    file tables are merged into one table. Rows refer to it by index.
+    """
 
     def __init__(self, verbose=False):
-        self.input = None
+        self.data = None
+        self.pos = 0
         self.error = None
         self.verbose = verbose
         self.matrix = None
+        self.inc_dirs = []
+        self.files = []
 
     def _log(self, *args):
         if self.verbose:
@@ -61,117 +61,152 @@ class DwarfDebugLine:
             return False
         # get (optional) relocations
         rela = elf_file.get_section_by_name(".rela.debug_line")
+        self.relas = self._get_rela_map(rela)
         # start parsing
-        self.input = io.StringIO(debug_line.data)
+        self.data = debug_line.data
+        self.pos = 0
+        self.matrix = []
+        self.inc_dirs = []
+        self.files = []
+        try:
+            while self.pos < len(self.data):
+                if not self.decode_unit():
+                    return False
+        except (IndexError, struct.error):
+            self.error = "Truncated line program at %d" % self.pos
+            return False
+        return True
+
+    def decode_unit(self):
+        """decode header and line program of the next compilation unit"""
+        unit_start = self.pos
+        dir_base = len(self.inc_dirs)
+        file_base = len(self.files)
         # decode header
         if not self.decode_header():
             return False
         if self.verbose:
             self.dump_header()
+        unit_end = unit_start + 4 + self.unit_length
+        # rebase file and dir indices of this unit
+        for i in range(file_base, len(self.files)):
+            self.files[i] = self._rebase_file(self.files[i], dir_base)
         # decode line program
-        matrix = []
-        state = LineState(self.default_is_stmt)
+        matrix = self.matrix
+        data = self.data
+        opc_base = self.opc_base
+        line_base = self.line_base
+        line_range = self.line_range
+        min_instr_len = self.min_instr_len
+        default_is_stmt = self.default_is_stmt
+        state = LineState(default_is_stmt)
+        state.file = file_base + 1
         log = self._log
-        while True:
+        verbose = self.verbose
+        pos = self.pos
+        while pos < unit_end:
             # read opcode
-            opc_ch = self.input.read(1)
-            if len(opc_ch) == 0:
-                break
-            opc = ord(opc_ch)
-            log("opcode=", opc)
+            opc = data[pos]
+            pos += 1
+            # special opcodes: most common, so handle first
+            if opc >= opc_base:
+                adj_opc = opc - opc_base
+                state.address += (adj_opc // line_range) * min_instr_len
+                state.line += line_base + (adj_opc % line_range)
+                state.basic_block = False
+                line = state.clone()
+                matrix.append(line)
+                if verbose:
+                    log("special", adj_opc, line)
+                continue
+            # all other opcodes use the cursor
+            self.pos = pos
+            if verbose:
+                log("opcode=", opc)
             # 0 = extended opcode
             if opc == 0:
                 opc_size = self.read_leb128()
-                sub_opc = ord(self.input.read(1))
+                opc_end = self.pos + opc_size
+                sub_opc = self.read_byte()
                 log("  sub_opcode=", sub_opc)
                 # 1: DW_LNE_end_sequence
                 if sub_opc == 1:
                     state.end_sequence = True
                     line = state.clone()
                     matrix.append(line)
-                    state.__init__()
+                    state = LineState(default_is_stmt)
+                    state.file = file_base + 1
                     log("DW_LNE_end_sequence:", line)
                 # 2: DW_LNE_set_address
                 elif sub_opc == 2:
-                    pos = self.input.tell()
+                    addr_pos = self.pos
                     addr = self.read_long()
-                    addend, sect = self.find_rela(rela, pos)
+                    addend, sect = self.relas.get(addr_pos, (0, None))
                     state.address = addr + addend
                     state.section = sect
                     log("DW_LNE_set_address: %08x  sect=%s" % (state.address, sect))
-                # 3: DW_LNE_set_file
+                # 3: DW_LNE_define_file
                 elif sub_opc == 3:
-                    tup = self.decode_file()
+                    tup = self._rebase_file(self.decode_file(), dir_base)
                     self.files.append(tup)
                     log("DW_LNE_set_file", tup)
                 # other (unknown) ext opc
                 else:
                     log("unknown sub opcode!")
-                    self.input.seek(opc_size - 1, 1)
-            # standard opcodes
-            elif opc < self.opc_base:
-                # 1: DW_LNS_copy
-                if opc == 1:
-                    line = state.clone()
-                    matrix.append(line)
-                    log("DW_LNS_copy:", line)
-                    state.basic_block = False
-                # 2: DW_LNS_advance_pc
-                elif opc == 2:
-                    offset = self.read_leb128() * self.min_instr_len
-                    state.address += offset
-                    log("DW_LNS_advance_pc: +%d -> %08x" % (offset, state.address))
-                # 3: DW_LNS_advance_line
-                elif opc == 3:
-                    offset = self.read_sleb128()
-                    state.line += offset
-                    log("DW_LNS_advance_line: +%d -> %d" % (offset, state.line))
-                # 4: DW_LNS_set_file
-                elif opc == 4:
-                    state.file = self.read_leb128()
-                    log("DW_LNS_set_file", state.file)
-                # 5: DW_LNS_set_column
-                elif opc == 5:
-                    state.column = self.read_leb128()
-                    log("DW_LNS_set_column", state.column)
-                # 6: DW_LNS_negate_stmt
-                elif opc == 6:
-                    state.is_stmt = not state.is_stmt
-                    log("DW_LNS_negate_stmt", state.is_stmt)
-                # 7: DW_LNS_set_basic_block
-                elif opc == 7:
-                    state.basic_block = True
-                    log("DW_LNS_set_basic_block")
-                # 8: DW_LNS_const_add_pc
-                elif opc == 8:
-                    (addr_addend, _) = self.decode_special_opcode(255)
-                    state.address += addr_addend
-                    log(
-                        "DW_LNS_const_add_pc: +%d -> %08x"
-                        % (addr_addend, state.address)
-                    )
-                # 9: DW_LNS_fixed_advance_pc
-                elif opc == 9:
-                    offset = self.read_word()
-                    state.address += offset
-                    log("DW_LNS_fixed_advance_pc: %+08x" % offset)
-                # other (unknown) opc
-                else:
-                    num_args = self.std_opc_lens[opc]
-                    log("skip unknown: num_args=", num_args)
-                    for i in range(num_args):
-                        self.read_leb128()
-            # special opcodes:
-            else:
-                (addr_addend, line_addend) = self.decode_special_opcode(opc)
-                state.address += addr_addend
-                state.line += line_addend
-                state.basic_block = False
+                self.pos = opc_end
+            # 1: DW_LNS_copy
+            elif opc == 1:
                 line = state.clone()
                 matrix.append(line)
-                log("special", (opc - self.opc_base), line)
-        # done
-        self.matrix = matrix
+                log("DW_LNS_copy:", line)
+                state.basic_block = False
+            # 2: DW_LNS_advance_pc
+            elif opc == 2:
+                offset = self.read_leb128() * min_instr_len
+                state.address += offset
+                log("DW_LNS_advance_pc: +%d -> %08x" % (offset, state.address))
+            # 3: DW_LNS_advance_line
+            elif opc == 3:
+                offset = self.read_sleb128()
+                state.line += offset
+                log("DW_LNS_advance_line: +%d -> %d" % (offset, state.line))
+            # 4: DW_LNS_set_file
+            elif opc == 4:
+                state.file = file_base + self.read_leb128()
+                log("DW_LNS_set_file", state.file)
+            # 5: DW_LNS_set_column
+            elif opc == 5:
+                state.column = self.read_leb128()
+                log("DW_LNS_set_column", state.column)
+            # 6: DW_LNS_negate_stmt
+            elif opc == 6:
+                state.is_stmt = not state.is_stmt
+                log("DW_LNS_negate_stmt", state.is_stmt)
+            # 7: DW_LNS_set_basic_block
+            elif opc == 7:
+                state.basic_block = True
+                log("DW_LNS_set_basic_block")
+            # 8: DW_LNS_const_add_pc
+            elif opc == 8:
+                addr_addend, _ = self.decode_special_opcode(255)
+                state.address += addr_addend
+                log("DW_LNS_const_add_pc: +%d -> %08x" % (addr_addend, state.address))
+            # 9: DW_LNS_fixed_advance_pc
+            elif opc == 9:
+                offset = self.read_word()
+                state.address += offset
+                log("DW_LNS_fixed_advance_pc: %+08x" % offset)
+            # other (unknown) opc
+            else:
+                num_args = self.std_opc_lens[opc - 1]
+                log("skip unknown: num_args=", num_args)
+                for i in range(num_args):
+                    self.read_leb128()
+            pos = self.pos
+        if pos > len(data):
+            raise IndexError("line program exceeds section")
+        # next unit
+        self.pos = unit_end
         return True
 
     def get_matrix(self):
@@ -189,6 +224,20 @@ class DwarfDebugLine:
     def get_file_name(self, idx):
         return self.files[idx - 1][0]
 
+    def _get_rela_map(self, rela_section):
+        """map offsets in the line program to (addend, section) of relocs"""
+        relas = {}
+        if rela_section is not None:
+            for rela in rela_section.rela:
+                relas.setdefault(rela.offset, (rela.addend, rela.section))
+        return relas
+
+    def _rebase_file(self, tup, dir_base):
+        file_name, dir_idx, last_mod, file_size = tup
+        if dir_idx > 0:
+            dir_idx += dir_base
+        return (file_name, dir_idx, last_mod, file_size)
+
     def find_rela(self, rela_section, pos):
         if rela_section is not None:
             for rela in rela_section.rela:
@@ -204,14 +253,21 @@ class DwarfDebugLine:
 
     def decode_header(self):
         # header
+        start = self.pos
         self.unit_length = self.read_long()
+        if self.unit_length >= 0xFFFFFFF0:
+            self.error = "Can't decode 64-bit DWARF debug info"
+            return False
         self.version = self.read_word()
-        if self.version != 2:
-            self.error = "Can only decode DWARF 2 debug info"
+        if self.version not in (2, 3, 4):
+            self.error = "Can only decode DWARF 2-4 debug info"
             return False
         self.header_length = self.read_long()
         self.min_instr_len = self.read_byte()
-        self.default_is_stmt = self.read_byte()
+        # DWARF 4: VLIW ops per instruction are not used on m68k
+        if self.version >= 4:
+            self.max_ops_per_instr = self.read_byte()
+        self.default_is_stmt = bool(self.read_byte())
         self.line_base = self.read_sbyte()
         self.line_range = self.read_byte()
         self.opc_base = self.read_byte()
@@ -223,22 +279,19 @@ class DwarfDebugLine:
                 l = self.read_byte()
                 self.std_opc_lens.append(l)
         # 10 include dirs
-        self.inc_dirs = []
         while True:
             inc_dir = self.read_string()
             if inc_dir == "":
                 break
             self.inc_dirs.append(inc_dir)
         # 11 file names
-        self.files = []
         while True:
             tup = self.decode_file()
             if tup is None:
                 break
             self.files.append(tup)
         # end header: check header size
-        pos = self.input.tell()
-        hdr_len = pos - 10
+        hdr_len = self.pos - start - 10
         if hdr_len != self.header_length:
             self.error = "Error size mismatch: %d != %d" % (hdr_len, self.header_length)
             return False
@@ -277,34 +330,39 @@ class DwarfDebugLine:
             print(f)
 
     def read_string(self):
-        result = []
-        while True:
-            ch = self.input.read(1)
-            if ord(ch) == 0:
-                break
-            result.append(ch)
-        return "".join(result)
+        end = self.data.index(b"\0", self.pos)
+        result = self.data[self.pos : end]
+        self.pos = end + 1
+        return result.decode("latin-1")
 
     def read_leb128(self):
-        result = 0
-        shift = 0
-        while True:
-            byte = self.read_byte()
+        data = self.data
+        pos = self.pos
+        byte = data[pos]
+        pos += 1
+        result = byte & 0x7F
+        shift = 7
+        while byte & 0x80:
+            byte = data[pos]
+            pos += 1
             result |= (byte & 0x7F) << shift
-            if byte & 0x80 == 0:
-                break
             shift += 7
+        self.pos = pos
         return result
 
     def read_sleb128(self):
+        data = self.data
+        pos = self.pos
         result = 0
         shift = 0
         while True:
-            byte = self.read_byte()
+            byte = data[pos]
+            pos += 1
             result |= (byte & 0x7F) << shift
             shift += 7
             if byte & 0x80 == 0:
                 break
+        self.pos = pos
         # negative?
         if byte & 0x40 == 0x40:
             mask = 1 << shift
@@ -312,20 +370,24 @@ class DwarfDebugLine:
         return result
 
     def read_long(self):
-        data = self.input.read(4)
-        return struct.unpack(">I", data)[0]
+        value = struct.unpack_from(">I", self.data, self.pos)[0]
+        self.pos += 4
+        return value
 
     def read_word(self):
-        data = self.input.read(2)
-        return struct.unpack(">H", data)[0]
+        value = struct.unpack_from(">H", self.data, self.pos)[0]
+        self.pos += 2
+        return value
 
     def read_byte(self):
-        data = self.input.read(1)
-        return struct.unpack(">B", data)[0]
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
 
     def read_sbyte(self):
-        data = self.input.read(1)
-        return struct.unpack(">b", data)[0]
+        value = struct.unpack_from(">b", self.data, self.pos)[0]
+        self.pos += 1
+        return value
 
 
 # mini test
@@ -1,3 +1,4 @@
+import bisect
 import struct
 from .ELF import *
 
@@ -24,8 +25,12 @@ class ELFPart:
         decoded = struct.unpack(">" + fmt, data)
         if len(decoded) != nlen:
             raise ELFParseError("data decode error")
-        for i in range(nlen):
-            setattr(self, self._names[i], decoded[i])
+        self.set_values(decoded)
+
+    def set_values(self, values):
+        """assign already decoded values"""
+        for name, value in zip(self._names, values):
+            setattr(self, name, value)
 
     def _decode_flags(self, value, names):
         result = []
@@ -146,45 +151,65 @@ class ELFSection:
 
 
 class ELFSectionWithData(ELFSection):
-    def __init__(self, header, index, data):
+    """a section with data.
+
+    The data is either given directly or read on first access from the
+    source buffer of the whole file, e.g. an mmap.
+    """
+
+    def __init__(self, header, index, data, source=None):
         ELFSection.__init__(self, header, index)
-        self.data = data
+        self._data = data
+        self.source = source
+
+    @property
+    def data(self):
+        if self._data is None and self.source is not None:
+            offset = self.header.offset
+            self._data = bytes(self.source[offset : offset + self.header.size])
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
 
 
 class ELFSectionStringTable(ELFSectionWithData):
-    def __init__(self, header, index, data):
-        ELFSectionWithData.__init__(self, header, index, data)
+    def __init__(self, header, index, data, source=None):
+        ELFSectionWithData.__init__(self, header, index, data, source)
         self.strtab = None
+        self.offsets = None
 
     def decode(self):
-        l = len(self.data)
+        parts = self.data.split(b"\0")
+        # last string must be terminated
+        if parts.pop() != b"":
+            raise ELFParseError("Invalid strtab!")
         o = 0
         strtab = []
-        while o < l:
-            n = self.data.find(b"\0", o)
-            if n == -1:
-                raise ELFParseError("Invalid strtab!")
-            if n > 0:
-                s = self.data[o:n]
-            else:
+        offsets = []
+        for s in parts:
+            if o == 0 and s == b"":
                 s = ""
             strtab.append((o, s))
-            o = n + 1
+            offsets.append(o)
+            o += len(s) + 1
         self.strtab = strtab
+        self.offsets = offsets
 
     def get_string(self, off):
-        old = (0, "")
-        for e in self.strtab:
-            if off < e[0]:
-                delta = off - old[0]
-                return old[1][delta:]
-            old = e
-        delta = off - self.strtab[-1][0]
-        return self.strtab[-1][1][delta:]
+        # find string containing offset (names may share a suffix)
+        i = bisect.bisect_right(self.offsets, off) - 1
+        if i < 0:
+            o, s = 0, ""
+        else:
+            o, s = self.strtab[i]
+        return s[off - o :]
 
 
 class ELFSymbol(ELFPart):
     _names = ["name", "value", "size", "info", "other", "shndx"]
+    _struct = struct.Struct(">IIIBBH")
 
     def __init__(self, idx):
         ELFPart.__init__(self)
@@ -199,20 +224,39 @@ class ELFSymbol(ELFPart):
     def parse(self, data):
         fmt = "IIIBBH"
         self._parse_data(fmt, data)
+
+    def set_values(self, values):
+        (
+            self.name,
+            self.value,
+            self.size,
+            self.info,
+            self.other,
+            self.shndx,
+        ) = values
         # decode sub values
         self.bind = self.info >> 4
         self.type_ = self.info & 0xF
         self.visibility = self.other & 3
         # string values
-        self.bind_str = self._decode_value(self.bind, STB_values)
-        self.type_str = self._decode_value(self.type_, STT_values)
-        self.visibility_str = self._decode_value(self.visibility, STV_values)
-        self.shndx_str = self._decode_value(self.shndx, SHN_values)
+        self.bind_str = STB_values.get(self.bind)
+        self.type_str = STT_values.get(self.type_)
+        self.visibility_str = STV_values.get(self.visibility)
+        self.shndx_str = SHN_values.get(self.shndx)
+
+
+def _iter_entries(data, entsize, num, entry_struct):
+    """decode num table entries of entsize bytes with the given struct"""
+    if entsize == entry_struct.size:
+        return entry_struct.iter_unpack(data[: num * entsize])
+    if entsize < entry_struct.size:
+        raise ELFParseError("Invalid table entry size: %d" % entsize)
+    return (entry_struct.unpack_from(data, n * entsize) for n in range(num))
 
 
 class ELFSectionSymbolTable(ELFSectionWithData):
-    def __init__(self, header, index, data):
-        ELFSectionWithData.__init__(self, header, index, data)
+    def __init__(self, header, index, data, source=None):
+        ELFSectionWithData.__init__(self, header, index, data, source)
         self.symtab = []
 
     def decode(self):
@@ -220,15 +264,11 @@ class ELFSectionSymbolTable(ELFSectionWithData):
         num = self.header.size // entsize
         symtab = []
         self.symtab = symtab
-        off = 0
-        idx = 0
-        for n in range(num):
+        entries = _iter_entries(self.data, entsize, num, ELFSymbol._struct)
+        for idx, values in enumerate(entries):
             entry = ELFSymbol(idx)
-            entry_data = self.data[off : off + entsize]
-            entry.parse(entry_data)
+            entry.set_values(values)
             symtab.append(entry)
-            off += entsize
-            idx += 1
         return True
 
     def get_symbol(self, idx):
@@ -240,6 +280,7 @@ class ELFSectionSymbolTable(ELFSectionWithData):
 
 class ELFRelocationWithAddend(ELFPart):
     _names = ["offset", "info", "addend"]
+    _struct = struct.Struct(">IIi")
 
     def __init__(self):
         ELFPart.__init__(self)
@@ -251,15 +292,18 @@ class ELFRelocationWithAddend(ELFPart):
     def parse(self, data):
         fmt = "IIi"
         self._parse_data(fmt, data)
+
+    def set_values(self, values):
+        self.offset, self.info, self.addend = values
         # decode sym and type
         self.sym = self.info >> 8
         self.type_ = self.info & 0xFF
-        self.type_str = self._decode_value(self.type_, R_68K_values)
+        self.type_str = R_68K_values.get(self.type_)
 
 
 class ELFSectionRelocationsWithAddend(ELFSectionWithData):
-    def __init__(self, header, index, data):
-        ELFSectionWithData.__init__(self, header, index, data)
+    def __init__(self, header, index, data, source=None):
+        ELFSectionWithData.__init__(self, header, index, data, source)
         self.rela = []
         self.symtab = None
         self.reloc_section = None
@@ -269,13 +313,13 @@ class ELFSectionRelocationsWithAddend(ELFSectionWithData):
         num = self.header.size // entsize
         rela = []
         self.rela = rela
-        off = 0
-        for n in range(num):
+        entries = _iter_entries(
+            self.data, entsize, num, ELFRelocationWithAddend._struct
+        )
+        for values in entries:
             entry = ELFRelocationWithAddend()
-            entry_data = self.data[off : off + entsize]
-            entry.parse(entry_data)
+            entry.set_values(values)
             rela.append(entry)
-            off += entsize
 
     def get_relocations(self):
         return self.rela
@@ -289,8 +333,29 @@ class ELFFile:
         self.sections = []
         self.symtabs = []
         self.relas = []
+        # buffer of the whole file the section data is read from
+        self.source = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def close(self):
+        """release the file buffer, i.e. unmap the file.
+
+        Sections whose data was not accessed before can't be read anymore.
+        """
+        source = self.source
+        self.source = None
+        if source is not None and hasattr(source, "close"):
+            source.close()
 
     def get_section_by_name(self, name):
+        # section names are bytes
+        if isinstance(name, str):
+            name = name.encode("latin-1")
         for sect in self.sections:
             if sect.name_str == name:
                 return sect
@@ -1,54 +1,66 @@
 """A class for reading and writing ELF format binaries (esp. Amiga m68k ones)"""
 
+import io
+import mmap
 import os
 from .ELF import *
 from .ELFFile import *
 
 
 class ELFReader:
-    def _load_section_headers(self, f, ef):
+    def _get_buffer(self, f):
+        """return the whole file as a buffer.
+
+        Files on disk are mapped with mmap, so section data is only read
+        when it is accessed. Other file objects are read completely.
+        """
+        try:
+            fileno = f.fileno()
+            if os.fstat(fileno).st_size > 0:
+                return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            pass
+        f.seek(0, os.SEEK_SET)
+        return f.read()
+
+    def _load_section_headers(self, buf, ef):
         shoff = ef.header.shoff
         shentsize = ef.header.shentsize
-        f.seek(shoff, os.SEEK_SET)
         shnum = ef.header.shnum
         for i in range(shnum):
             sh = ELFSectionHeader()
-            sh_data = f.read(shentsize)
-            sh.parse(sh_data)
+            off = shoff + i * shentsize
+            sh.parse(buf[off : off + shentsize])
             ef.section_hdrs.append(sh)
 
-    def _load_sections(self, f, ef):
+    def _load_sections(self, buf, ef):
         sect_hdrs = ef.section_hdrs
         idx = 0
         for sect_hdr in sect_hdrs:
             idx += 1
-            sect = self._load_section(f, sect_hdr, idx)
+            sect = self._load_section(buf, sect_hdr, idx)
             ef.sections.append(sect)
             if sect_hdr.type_ == SHT_NOBITS:
                 ef.bss = sect
 
-    def _load_section(self, f, sect_hdr, idx):
+    def _load_section(self, buf, sect_hdr, idx):
         t = sect_hdr.type_
         size = sect_hdr.size
         if t == SHT_NOBITS or size == 0:
             sect = ELFSection(sect_hdr, idx)
+        # tables are decoded right away
+        elif t == SHT_STRTAB:
+            sect = ELFSectionStringTable(sect_hdr, idx, None, buf)
+            sect.decode()
+        elif t == SHT_SYMTAB:
+            sect = ELFSectionSymbolTable(sect_hdr, idx, None, buf)
+            sect.decode()
+        elif t == SHT_RELA:
+            sect = ELFSectionRelocationsWithAddend(sect_hdr, idx, None, buf)
+            sect.decode()
+        # all other data is read on first access
         else:
-            # read data
-            offset = sect_hdr.offset
-            f.seek(offset, os.SEEK_SET)
-            data = f.read(size)
-            # decode?
-            if t == SHT_STRTAB:
-                sect = ELFSectionStringTable(sect_hdr, idx, data)
-                sect.decode()
-            elif t == SHT_SYMTAB:
-                sect = ELFSectionSymbolTable(sect_hdr, idx, data)
-                sect.decode()
-            elif t == SHT_RELA:
-                sect = ELFSectionRelocationsWithAddend(sect_hdr, idx, data)
-                sect.decode()
-            else:
-                sect = ELFSectionWithData(sect_hdr, idx, data)
+            sect = ELFSectionWithData(sect_hdr, idx, None, buf)
 
         return sect
 
@@ -82,7 +94,8 @@ class ELFReader:
 
     def _assign_symbols_to_sections(self, sect):
         src_file_sym = None
-        all_symbols = []
+        # sections with assigned symbols
+        sym_sects = {}
         for sym in sect.symtab:
             sym_type = sym.type_str
             if sym_type == "FILE":
@@ -98,11 +111,10 @@ class ELFReader:
                 sym_sect = sym.section
                 if sym_sect is not None:
                     sym_sect.symbols.append(sym)
-                    # list of all symbols assigned
-                    all_symbols.append(sym_sect.symbols)
-        # now sort all symbol lists
-        for symbols in all_symbols:
-            symbols.sort(key=lambda x: x.value)
+                    sym_sects[sym_sect.idx] = sym_sect
+        # now sort all symbol lists once
+        for sym_sect in sym_sects.values():
+            sym_sect.symbols.sort(key=lambda x: x.value)
 
     def _resolve_rela_links(self, sect, sections):
         link = sect.header.link
@@ -159,19 +171,31 @@ class ELFReader:
 
     def load(self, f):
         """load an ELF file from the given file object f
-        and return an ELFFile instance or None if loading failed"""
+        and return an ELFFile instance or None if loading failed.
+
+        The ELFFile keeps the file mapped for section data that is read
+        later. close() it when it is no longer needed.
+        """
 
         ef = ELFFile()
+        ef.source = self._get_buffer(f)
+        try:
+            self._load(ef.source, ef)
+        except BaseException:
+            ef.close()
+            raise
+        return ef
 
+    def _load(self, buf, ef):
         # read identifier
         ident = ELFIdentifier()
-        ident_data = f.read(16)
+        ident_data = buf[0:16]
         ident.parse(ident_data)
         ef.identifier = ident
 
         # read header
         hdr = ELFHeader()
-        hdr_data = f.read(36)
+        hdr_data = buf[16:52]
         hdr.parse(hdr_data)
         ef.header = hdr
 
@@ -180,10 +204,10 @@ class ELFReader:
             raise ELFParseError("No segment header defined!")
 
         # load all section headers
-        self._load_section_headers(f, ef)
+        self._load_section_headers(buf, ef)
 
         # load and decode sections
-        self._load_sections(f, ef)
+        self._load_sections(buf, ef)
 
         # get string table with segment names
         strtab_idx = ef.header.shstrndx
@@ -212,8 +236,6 @@ class ELFReader:
                 self._resolve_rela_links(sect, ef.sections)
                 ef.relas.append(sect)
 
-        return ef
-
 
 # mini test
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
 from amitools.binfmt.BinImage import *
 from .HunkBlockFile import HunkBlockFile, HunkParseError
+from .HunkBuffer import HunkBuffer
 from .HunkLoadSegFile import HunkLoadSegFile, HunkSegment
 from .HunkDebug import *
 from . import Hunk
@@ -21,8 +22,8 @@ class BinFmtHunk:
 
     def load_image(self, path):
         """load a BinImage from a hunk file given via path"""
-        with open(path, "rb") as f:
-            return self.load_image_fobj(f)
+        with HunkBuffer.from_path(path) as buf:
+            return self.load_image_fobj(buf)
 
     def load_image_fobj(self, fobj):
         """load a BinImage from a hunk file given via file obj"""
@@ -119,6 +120,11 @@ class BinFmtHunk:
             blk_id = seg.seg_blk.blk_id
             size = seg.size_longs * 4
             data = seg.seg_blk.data
+            # segments of a BinImage always hold bytes. the block keeps
+            # them, too, so it does not refer to the file buffer anymore
+            if isinstance(data, memoryview):
+                data = data.tobytes()
+                seg.seg_blk.data = data
             if blk_id == Hunk.HUNK_CODE:
                 seg_type = SEGMENT_TYPE_CODE
             elif blk_id == Hunk.HUNK_DATA:
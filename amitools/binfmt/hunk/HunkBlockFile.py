@@ -1,8 +1,8 @@
 """The hunk block types defined as data classes"""
 
-
 import struct
 from .Hunk import *
+from .HunkBuffer import HunkBuffer
 
 
 class HunkParseError(Exception):
@@ -33,6 +33,20 @@ class HunkBlock:
             raise HunkParseError("read_word failed")
         return struct.unpack(">H", data)[0]
 
+    def _read_longs(self, f, num):
+        """read an array of num longs in one go"""
+        data = f.read(num * 4)
+        if len(data) != num * 4:
+            raise HunkParseError("read_longs failed")
+        return list(struct.unpack(">%dI" % num, data))
+
+    def _read_words(self, f, num):
+        """read an array of num words in one go"""
+        data = f.read(num * 2)
+        if len(data) != num * 2:
+            raise HunkParseError("read_words failed")
+        return list(struct.unpack(">%dH" % num, data))
+
     def _read_name(self, f):
         """read name stored in longs
         return size, string
@@ -118,13 +132,10 @@ class HunkHeaderBlock(HunkBlock):
             )
 
         # determine number of hunks in size table
-        num_hunks = self.last_hunk - self.first_hunk + 1
-        for a in range(num_hunks):
-            hunk_size = self._read_long(f)
-            if hunk_size < 0:
-                raise HunkParseError("HUNK_HEADER contains invalid hunk_size")
-            # note that the upper bits are the target memory type. We only have FAST,
-            # so let's forget about them for a moment.
+        num_hunks = max(self.last_hunk - self.first_hunk + 1, 0)
+        # note that the upper bits are the target memory type. We only have FAST,
+        # so let's forget about them for a moment.
+        for hunk_size in self._read_longs(f, num_hunks):
             self.hunk_table.append(hunk_size & 0x3FFFFFFF)
 
     def write(self, f):
@@ -155,11 +166,16 @@ class HunkSegmentBlock(HunkBlock):
         self.size_longs = size
         if self.blk_id != HUNK_BSS:
             size *= 4
-            self.data = f.read(size)
+            # buffers keep the data as a view without copying it
+            if hasattr(f, "read_view"):
+                self.data = f.read_view(size)
+            else:
+                self.data = f.read(size)
 
     def write(self, f):
         self._write_long(f, self.size_longs)
-        f.write(self.data)
+        if self.blk_id != HUNK_BSS:
+            f.write(self.data)
 
 
 class HunkRelocLongBlock(HunkBlock):
@@ -180,10 +196,7 @@ class HunkRelocLongBlock(HunkBlock):
             if num == 0:
                 break
             hunk_num = self._read_long(f)
-            offsets = []
-            for i in range(num):
-                off = self._read_long(f)
-                offsets.append(off)
+            offsets = self._read_longs(f, num)
             self.relocs.append((hunk_num, offsets))
 
     def write(self, f):
@@ -217,10 +230,7 @@ class HunkRelocWordBlock(HunkBlock):
                 break
             hunk_num = self._read_word(f)
             num_words += num_offs + 1
-            offsets = []
-            for i in range(num_offs):
-                off = self._read_word(f)
-                offsets.append(off)
+            offsets = self._read_words(f, num_offs)
             self.relocs.append((hunk_num, offsets))
         # pad to long
         if num_words % 2 == 1:
@@ -396,10 +406,7 @@ class HunkExtBlock(HunkBlock):
             # is a reference
             elif ext_type >= 0x80:
                 num_refs = self._read_long(f)
-                offsets = []
-                for i in range(num_refs):
-                    off = self._read_long(f)
-                    offsets.append(off)
+                offsets = self._read_longs(f, num_refs)
             # is a definition
             else:
                 value = self._read_long(f)
@@ -663,6 +670,13 @@ class HunkBlockFile:
         self.read(f, isLoadSeg, verbose)
         f.close()
 
+    def read_buffer(self, data, isLoadSeg=False, verbose=False):
+        """read a hunk file from a bytes-like buffer and fill block list.
+
+        Segment data is kept as memoryview slices of the buffer.
+        """
+        self.read(HunkBuffer(data), isLoadSeg, verbose)
+
     def read(self, f, isLoadSeg=False, verbose=False):
         """read a hunk file and fill block list"""
         while True:
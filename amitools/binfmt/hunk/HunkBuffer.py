@@ -0,0 +1,83 @@
+"""A file-like reader on an in-memory buffer for the hunk parsers"""
+
+import os
+import mmap
+
+
+class HunkBuffer:
+    """read a hunk file from a bytes-like buffer, e.g. bytes or an mmap.
+
+    The buffer offers the file calls the hunk parsers need (read, tell and
+    seek). Additionally read_view() returns large blocks like segment data
+    as memoryview slices of the buffer without copying them.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.view = memoryview(data)
+        self.size = len(data)
+        self.pos = 0
+
+    @classmethod
+    def from_path(cls, path):
+        """map the whole file into a buffer. close() the buffer to unmap it.
+
+        All views returned by read_view() must be released before.
+        """
+        with open(path, "rb") as f:
+            fileno = f.fileno()
+            # empty files can't be mapped
+            if os.fstat(fileno).st_size == 0:
+                return cls(b"")
+            return cls(mmap.mmap(fileno, 0, access=mmap.ACCESS_READ))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # the parser failed and the traceback may still hold views:
+            # don't hide the error and let the mmap be unmapped when the
+            # last view is gone
+            self.view.release()
+
+    def read(self, size=-1):
+        """read up to size bytes and return them as bytes"""
+        pos = self.pos
+        end = self._end(pos, size)
+        self.pos = end
+        # slicing bytes is cheaper than going through the view for small reads
+        return bytes(self.data[pos:end])
+
+    def read_view(self, size=-1):
+        """read up to size bytes and return them as a memoryview slice"""
+        pos = self.pos
+        end = self._end(pos, size)
+        self.pos = end
+        return self.view[pos:end]
+
+    def _end(self, pos, size):
+        end = self.size
+        if size >= 0 and pos + size < end:
+            end = pos + size
+        return end
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, pos, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            pos += self.pos
+        elif whence == os.SEEK_END:
+            pos += self.size
+        if pos < 0:
+            raise ValueError("negative seek position %d" % pos)
+        self.pos = pos
+        return pos
+
+    def close(self):
+        self.view.release()
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
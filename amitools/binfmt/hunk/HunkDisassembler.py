@@ -1,68 +1,117 @@
+import bisect
 from amitools.vamos.machine import DisAsm
 from . import Hunk
 
 
+class HunkIndex:
+    """sorted offset indexes of the symbols, debug lines, relocations and
+    ext refs of a hunk for fast lookups during disassembly"""
+
+    # map reloc type to number of words to be relocated
+    map_reloc_to_num_words = {
+        Hunk.HUNK_ABSRELOC32: 2,
+        Hunk.HUNK_DREL16: 1,
+        Hunk.HUNK_DREL32: 2,
+    }
+
+    map_ext_ref_to_num_words = {
+        Hunk.EXT_ABSREF32: 2,
+        Hunk.EXT_RELREF16: 1,
+        Hunk.EXT_DEXT16: 1,
+    }
+
+    def __init__(self, hunk):
+        self.hunk = hunk
+        self.symtab = None
+        self.symbols = {}
+        self.src_lines = {}
+        self.ext_defs = {}
+        self.index_defs = {}
+        # sorted (offset, order, ...) entries and their offsets for bisect
+        self.relocs = []
+        self.reloc_offsets = []
+        self.ext_refs = []
+        self.ext_ref_offsets = []
+        self._build()
+
+    def _build(self):
+        for h in self.hunk[1:]:
+            hunk_type = h["type"]
+            if hunk_type == Hunk.HUNK_SYMBOL:
+                if self.symtab is None:
+                    self.symtab = h["symbols"]
+            elif hunk_type == Hunk.HUNK_DEBUG and h["debug_type"] == "LINE":
+                for src_line, src_addr in h["src_map"]:
+                    src_addr += h["debug_offset"]
+                    self.src_lines.setdefault(src_addr, (h["src_file"], src_line))
+            elif hunk_type in self.map_reloc_to_num_words:
+                num_words = self.map_reloc_to_num_words[hunk_type]
+                type_name = h["type_name"].replace("HUNK_", "").lower()
+                reloc = h["reloc"]
+                for hunk_num in reloc:
+                    for off in reloc[hunk_num]:
+                        order = len(self.relocs)
+                        self.relocs.append((off, order, num_words, hunk_num, type_name))
+            elif hunk_type == Hunk.HUNK_EXT:
+                for ext in h["ext_def"]:
+                    self.ext_defs.setdefault(ext["def"], ext["name"])
+                for ext in h["ext_ref"]:
+                    if ext["type"] not in self.map_ext_ref_to_num_words:
+                        continue
+                    num_words = self.map_ext_ref_to_num_words[ext["type"]]
+                    type_name = ext["type_name"].replace("EXT_", "").lower()
+                    for ref in ext["refs"]:
+                        order = len(self.ext_refs)
+                        self.ext_refs.append(
+                            (ref, order, num_words, ext["name"], type_name)
+                        )
+        # symbols: later entries with the same offset win
+        if self.symtab is not None:
+            for name, offset in self.symtab:
+                self.symbols[offset] = name
+        # index defs of a lib
+        main = self.hunk[0]
+        if "index_hunk" in main:
+            info = main["index_hunk"]
+            if "defs" in info:
+                for d in info["defs"]:
+                    self.index_defs.setdefault(d["value"], d["name"])
+        self.relocs.sort()
+        self.reloc_offsets = [e[0] for e in self.relocs]
+        self.ext_refs.sort()
+        self.ext_ref_offsets = [e[0] for e in self.ext_refs]
+
+    def find_range(self, offsets, entries, start, end):
+        """return entries with start <= offset < end"""
+        lo = bisect.bisect_left(offsets, start)
+        hi = bisect.bisect_left(offsets, end)
+        return entries[lo:hi]
+
+
 class HunkDisassembler:
     def __init__(self, cpu="68000"):
         self.disasm = DisAsm.create(cpu)
+        self.indexes = {}
+
+    def get_index(self, hunk):
+        """return the (cached) HunkIndex of a hunk"""
+        index = self.indexes.get(id(hunk))
+        if index is None or index.hunk is not hunk:
+            index = HunkIndex(hunk)
+            self.indexes[id(hunk)] = index
+        return index
 
     def get_symtab(self, hunk):
-        for h in hunk[1:]:
-            if h["type"] == Hunk.HUNK_SYMBOL:
-                return h["symbols"]
-        return None
-
-    def find_symbol(self, hunk, offset, always):
-        symtab = self.get_symtab(hunk)
-        if symtab == None:
-            if always:
-                return "%08x" % offset
-            else:
-                return None
-
-        symmap = {}
-        for s in symtab:
-            symmap[s[1]] = s[0]
-
-        offs = sorted(symmap.keys())
-        last = None
-        last_offset = 0
-        for o in offs:
-            if o == offset:
-                return symmap[o]
-
-            if always:
-                if o < offset:
-                    # approximate to last symbol
-                    if last != None:
-                        return last + " + %08x" % (o - last_offset)
-                    else:
-                        return "%08x" % offset
-            last = symmap[o]
-            last_offset = o
-
-        if always:
-            return "%08x" % offset
-        else:
-            return None
+        return self.get_index(hunk).symtab
+
+    def find_symbol(self, hunk, offset):
+        return self.get_index(hunk).symbols.get(offset)
 
     def find_src_line(self, hunk, addr):
-        for h in hunk[1:]:
-            if h["type"] == Hunk.HUNK_DEBUG and h["debug_type"] == "LINE":
-                src_map = h["src_map"]
-                for e in src_map:
-                    src_line = e[0]
-                    src_addr = e[1] + h["debug_offset"]
-                    if src_addr == addr:
-                        return (h["src_file"], src_line)
-        return None
+        return self.get_index(hunk).src_lines.get(addr)
 
     # map reloc type to number of words to be relocated
-    map_reloc_to_num_words = {
-        Hunk.HUNK_ABSRELOC32: 2,
-        Hunk.HUNK_DREL16: 1,
-        Hunk.HUNK_DREL32: 2,
-    }
+    map_reloc_to_num_words = HunkIndex.map_reloc_to_num_words
 
     # find_reloc
     # return
@@ -73,39 +122,26 @@ class HunkDisassembler:
     #   4 - reloc hunk
     def find_reloc(self, hunk, addr, word):
         end_addr = addr + len(word) * 2
-        for h in hunk[1:]:
-            valid = h["type"] in self.map_reloc_to_num_words
-            if valid:
-                num_words = self.map_reloc_to_num_words[h["type"]]
-                reloc = h["reloc"]
-                for hunk_num in reloc:
-                    offsets = reloc[hunk_num]
-                    for off in offsets:
-                        if off >= addr and off + num_words * 2 <= end_addr:
-                            word_offset = (off - addr) // 2  # in words
-
-                            # calc offset
-                            addr = 0
-                            for i in range(num_words):
-                                addr = addr * 0x10000 + word[word_offset + i]
-
-                            reloc_type_name = (
-                                h["type_name"].replace("HUNK_", "").lower()
-                            )
-                            return (
-                                word_offset,
-                                num_words,
-                                hunk_num,
-                                addr,
-                                reloc_type_name,
-                            )
-        return None
+        index = self.get_index(hunk)
+        found = None
+        for e in index.find_range(index.reloc_offsets, index.relocs, addr, end_addr):
+            off, order, num_words = e[:3]
+            if off + num_words * 2 <= end_addr:
+                if found is None or order < found[1]:
+                    found = e
+        if found is None:
+            return None
+        off, _, num_words, hunk_num, reloc_type_name = found
+        word_offset = (off - addr) // 2  # in words
 
-    map_ext_ref_to_num_words = {
-        Hunk.EXT_ABSREF32: 2,
-        Hunk.EXT_RELREF16: 1,
-        Hunk.EXT_DEXT16: 1,
-    }
+        # calc offset
+        addr = 0
+        for i in range(num_words):
+            addr = addr * 0x10000 + word[word_offset + i]
+
+        return (word_offset, num_words, hunk_num, addr, reloc_type_name)
+
+    map_ext_ref_to_num_words = HunkIndex.map_ext_ref_to_num_words
 
     # find_ext_ref
     # return
@@ -115,42 +151,24 @@ class HunkDisassembler:
     #   3 - type name of ext ref
     def find_ext_ref(self, hunk, addr, word):
         end_addr = addr + len(word) * 2
-        for h in hunk[1:]:
-            if h["type"] == Hunk.HUNK_EXT:
-                for ext in h["ext_ref"]:
-                    refs = ext["refs"]
-                    valid = ext["type"] in self.map_ext_ref_to_num_words
-                    if valid:
-                        num_words = self.map_ext_ref_to_num_words[ext["type"]]
-                        for ref in refs:
-                            if ref >= addr and ref < end_addr:
-                                word_offset = (ref - addr) // 2
-                                type_name = ext["type_name"].replace("EXT_", "").lower()
-                                return (word_offset, num_words, ext["name"], type_name)
-        return None
+        index = self.get_index(hunk)
+        refs = index.find_range(index.ext_ref_offsets, index.ext_refs, addr, end_addr)
+        if not refs:
+            return None
+        ref, _, num_words, name, type_name = min(refs, key=lambda e: e[1])
+        word_offset = (ref - addr) // 2
+        return (word_offset, num_words, name, type_name)
 
     # search the HUNK_EXT for a defintion
     def find_ext_def(self, hunk, addr):
-        for h in hunk[1:]:
-            if h["type"] == Hunk.HUNK_EXT:
-                for ext in h["ext_def"]:
-                    if addr == ext["def"]:
-                        return ext["name"]
-        return None
+        return self.get_index(hunk).ext_defs.get(addr)
 
     # search the index of a lib for a definition
     def find_index_def(self, hunk, addr):
-        main = hunk[0]
-        if "index_hunk" in main:
-            info = main["index_hunk"]
-            if "defs" in info:
-                for d in info["defs"]:
-                    if d["value"] == addr:
-                        return d["name"]
-        return None
+        return self.get_index(hunk).index_defs.get(addr)
 
     def find_symbol_or_def(self, hunk, addr, always):
-        symbol = self.find_symbol(hunk, addr, False)
+        symbol = self.find_symbol(hunk, addr)
         if symbol == None:
             symbol = self.find_ext_def(hunk, addr)
         if symbol == None:
@@ -163,7 +181,7 @@ class HunkDisassembler:
 
     def show_disassembly(self, hunk, seg_list, start):
         main = hunk[0]
-        lines = self.disasm.disassemble_block(main["data"], start)
+        lines = self.disasm.iter_block(main["data"], start)
         # show line by line
         for l in lines:
             addr = l[0]
@@ -179,7 +197,7 @@ class HunkDisassembler:
             # find source line info
             line = self.find_src_line(hunk, addr)
             if line != None:
-                (src_file, src_line) = line
+                src_file, src_line = line
                 info.append("src: %s:%d" % (src_file, src_line))
 
             # find an extref
@@ -2,8 +2,8 @@
 
 import os
 import struct
-import io
 from .Hunk import *
+from .HunkBuffer import HunkBuffer
 
 
 class HunkReader:
@@ -62,6 +62,20 @@ class HunkReader:
             return -(len(data) + 1)
         return struct.unpack(">H", data)[0]
 
+    def read_longs(self, f, num):
+        """read an array of num longs in one go. return None if too short"""
+        data = f.read(num * 4)
+        if len(data) != num * 4:
+            return None
+        return list(struct.unpack(">%dI" % num, data))
+
+    def read_words(self, f, num):
+        """read an array of num words in one go. return None if too short"""
+        data = f.read(num * 2)
+        if len(data) != num * 2:
+            return None
+        return list(struct.unpack(">%dH" % num, data))
+
     def read_name(self, f):
         num_longs = self.read_long(f)
         if num_longs < 0:
@@ -199,16 +213,13 @@ class HunkReader:
                 self.error_string = "%s has invalid hunk num" % (hunk["type_name"])
                 return RESULT_INVALID_HUNK_FILE
 
-            offsets = []
-            for a in range(num_relocs & 0xFFFF):
-                offset = self.read_long(f)
-                if offset < 0:
-                    self.error_string = (
-                        "%s has invalid relocation #%d offset %d (num_relocs=%d hunk_num=%d, offset=%d)"
-                        % (hunk["type_name"], a, offset, num_relocs, hunk_num, f.tell())
-                    )
-                    return RESULT_INVALID_HUNK_FILE
-                offsets.append(offset)
+            offsets = self.read_longs(f, num_relocs & 0xFFFF)
+            if offsets is None:
+                self.error_string = (
+                    "%s has truncated relocation offsets (num_relocs=%d hunk_num=%d, offset=%d)"
+                    % (hunk["type_name"], num_relocs, hunk_num, f.tell())
+                )
+                return RESULT_INVALID_HUNK_FILE
             reloc[hunk_num] = offsets
         return RESULT_OK
 
@@ -235,18 +246,15 @@ class HunkReader:
                 self.error_string = "%s has invalid hunk num" % (hunk["type_name"])
                 return RESULT_INVALID_HUNK_FILE
 
-            offsets = []
             count = num_relocs & 0xFFFF
             total_words += count + 2
-            for a in range(count):
-                offset = self.read_word(f)
-                if offset < 0:
-                    self.error_string = (
-                        "%s has invalid relocation #%d offset %d (num_relocs=%d hunk_num=%d, offset=%d)"
-                        % (hunk["type_name"], a, offset, num_relocs, hunk_num, f.tell())
-                    )
-                    return RESULT_INVALID_HUNK_FILE
-                offsets.append(offset)
+            offsets = self.read_words(f, count)
+            if offsets is None:
+                self.error_string = (
+                    "%s has truncated relocation offsets (num_relocs=%d hunk_num=%d, offset=%d)"
+                    % (hunk["type_name"], num_relocs, hunk_num, f.tell())
+                )
+                return RESULT_INVALID_HUNK_FILE
             reloc[hunk_num] = offsets
 
         # padding
@@ -259,7 +267,7 @@ class HunkReader:
         symbols = []
         hunk["symbols"] = symbols
         while name_len > 0:
-            (name_len, name) = self.read_name(f)
+            name_len, name = self.read_name(f)
             if name_len < 0:
                 self.error_string = "%s has invalid symbol name" % (hunk["type_name"])
                 return RESULT_INVALID_HUNK_FILE
@@ -294,11 +302,13 @@ class HunkReader:
             src_map = []
             hunk["src_file"] = n
             hunk["src_map"] = src_map
-            while size > 0:
-                line_no = self.read_long(f)
-                offset = self.read_long(f)
-                size -= 8
-                src_map.append([line_no, offset])
+            num_entries = (size + 7) // 8 if size > 0 else 0
+            values = self.read_longs(f, num_entries * 2)
+            if values is None:
+                self.error_string = "%s has truncated line info" % (hunk["type_name"])
+                return RESULT_INVALID_HUNK_FILE
+            for i in range(0, len(values), 2):
+                src_map.append([values[i], values[i + 1]])
         else:
             # read unknown DEBUG hunk
             hunk["data"] = f.read(size)
@@ -506,10 +516,10 @@ class HunkReader:
                 num_refs = self.read_long(f)
                 if num_refs == 0:
                     num_refs = 1
-                refs = []
-                for a in range(num_refs):
-                    ref = self.read_long(f)
-                    refs.append(ref)
+                refs = self.read_longs(f, num_refs)
+                if refs is None:
+                    self.error_string = "%s has truncated refs" % (hunk["type_name"])
+                    return RESULT_INVALID_HUNK_FILE
                 ext["refs"] = refs
                 ext_ref.append(ext)
 
@@ -542,14 +552,43 @@ class HunkReader:
   """
 
     def read_file(self, hfile):
-        with open(hfile, "rb") as f:
-            return self.read_file_obj(hfile, f)
+        with HunkBuffer.from_path(hfile) as buf:
+            return self.read_file_obj(hfile, buf)
 
     """Read a hunk from memory"""
 
     def read_mem(self, name, data):
-        fobj = io.StringIO(data)
-        return self.read_file_obj(name, fobj)
+        return self.read_file_obj(name, HunkBuffer(data))
+
+    """Probe the type of a hunk file by reading only its first hunk"""
+
+    def probe_file_obj(self, hfile, f):
+        self.hunks = []
+        self.error_string = None
+        self.type = TYPE_UNKNOWN
+        hunk_raw_type = self.read_long(f)
+        if hunk_raw_type < 0:
+            self.error_string = "No valid hunk file: '%s' is too short" % (hfile)
+            return RESULT_NO_HUNK_FILE
+        hunk_type = hunk_raw_type & HUNK_TYPE_MASK
+        if not self.is_valid_first_hunk_type(hunk_type):
+            self.error_string = "No hunk file: '%s' first hunk type was %d" % (
+                hfile,
+                hunk_type,
+            )
+            return RESULT_NO_HUNK_FILE
+        hunk = {"type": hunk_type, "hunk_file_offset": 0}
+        hunk["type_name"] = hunk_names[hunk_type]
+        self.hunks.append(hunk)
+        # only the header of an executable tells more without parsing it all
+        if hunk_type == HUNK_HEADER:
+            self.type = TYPE_LOADSEG
+            return self.parse_header(f, hunk)
+        elif hunk_type == HUNK_UNIT:
+            self.type = TYPE_UNIT
+        else:
+            self.type = TYPE_LIB
+        return RESULT_OK
 
     def read_file_obj(self, hfile, f):
         self.hunks = []
@@ -222,21 +222,52 @@ class ADFSBitmap:
             if long_off == self.bitmap_longs:
                 long_off = 0
 
+    def _get_bitmap_longs(self):
+        """return the bitmap as a list of longs"""
+        n = self.bitmap_longs
+        return list(struct.unpack_from(">%dI" % n, self.bitmap_data, 0))
+
     def get_num_free(self):
-        num = 0
-        res = self.blkdev.reserved
-        for i in range(self.bitmap_bits):
-            if self.get_bit(i + res):
-                num += 1
-        return num
+        longs = self._get_bitmap_longs()
+        # mask out unused bits of last long
+        longs[-1] &= (1 << self.bitmap_last_long_bits) - 1
+        return sum(bin(val).count("1") for val in longs)
 
     def get_num_used(self):
-        num = 0
+        return self.bitmap_bits - self.get_num_free()
+
+    def get_used_ranges(self):
+        """return the (first, end) block ranges of all blocks marked as used.
+
+        Long runs of free blocks are skipped in bulk, so the time needed
+        mostly depends on the number of used blocks.
+        """
+        ranges = []
         res = self.blkdev.reserved
-        for i in range(self.bitmap_bits):
-            if not self.get_bit(i + res):
-                num += 1
-        return num
+        data = self.bitmap_data
+        num_bytes = self.bitmap_longs * 4
+        chunk = 64
+        all_free = b"\xff" * chunk
+        for chunk_off in range(0, num_bytes, chunk):
+            chunk_end = min(chunk_off + chunk, num_bytes)
+            if data[chunk_off:chunk_end] == all_free[: chunk_end - chunk_off]:
+                continue
+            for long_off in range(chunk_off, chunk_end, 4):
+                val = struct.unpack_from(">I", data, long_off)[0]
+                if val == 0xFFFFFFFF:
+                    continue
+                base = long_off * 8
+                for bit in range(32):
+                    if val & (1 << bit) == 0:
+                        blk_num = base + bit
+                        if blk_num >= self.bitmap_bits:
+                            break
+                        blk_num += res
+                        if ranges and ranges[-1][1] == blk_num:
+                            ranges[-1][1] += 1
+                        else:
+                            ranges.append([blk_num, blk_num + 1])
+        return [tuple(r) for r in ranges]
 
     def alloc_n(self, num):
         free_blks = self.find_n_free(num)
@@ -105,16 +105,21 @@ class ADFSDir(ADFSNode):
 
         # dircaches available?
         if self.volume.is_dircache:
-            self.dcache_blks = []
-            dcb_num = self.block.extension
-            while dcb_num != 0:
-                dcb = DirCacheBlock(self.blkdev, dcb_num)
-                dcb.read()
-                if not dcb.valid:
-                    self.valid = False
-                    return
-                self.dcache_blks.append(dcb)
-                dcb_num = dcb.next_cache
+            if not self._read_dircache():
+                self.valid = False
+
+    def _read_dircache(self):
+        self.dcache_blks = []
+        dcb_num = self.block.extension
+        while dcb_num != 0:
+            dcb = DirCacheBlock(self.blkdev, dcb_num)
+            dcb.read()
+            if not dcb.valid:
+                self.dcache_blks = None
+                return False
+            self.dcache_blks.append(dcb)
+            dcb_num = dcb.next_cache
+        return True
 
     def flush(self):
         if self.entries:
@@ -208,8 +213,12 @@ class ADFSDir(ADFSNode):
 
         # dircache: create record for this node
         if self.volume.is_dircache:
+            if node.is_dir():
+                sub_type = Block.ST_USERDIR
+            else:
+                sub_type = Block.ST_FILE
             ok = self._dircache_add_entry(
-                name, meta_info, new_blk, node.get_size(), update_myself=False
+                name, meta_info, new_blk, node.get_size(), sub_type, update_myself=False
             )
             if not ok:
                 self.delete()
@@ -339,6 +348,16 @@ class ADFSDir(ADFSNode):
         ADFSNode.list(self, indent, all, detail, encoding)
         if not all and indent > 0:
             return
+        # dircache: only read header blocks of sub dirs
+        records = None if detail else self._get_fast_records()
+        if records is not None:
+            for r in sorted(records, key=self._get_record_key):
+                if r.is_dir() and all:
+                    node = self.get_dircache_node(r)
+                    node.list(indent=indent + 1, all=all, encoding=encoding)
+                else:
+                    print(self._get_record_list_str(r, indent + 1))
+            return
         self.ensure_entries()
         es = self.get_entries_sorted_by_name()
         for e in es:
@@ -416,14 +435,16 @@ class ADFSDir(ADFSNode):
 
     # ----- dir cache -----
 
-    def _dircache_add_entry(self, name, meta_info, entry_blk, size, update_myself=True):
+    def _dircache_add_entry(
+        self, name, meta_info, entry_blk, size, sub_type, update_myself=True
+    ):
         # create a new dircache record
         r = DirCacheRecord(
             entry=entry_blk,
             size=size,
             protect=meta_info.get_protect(),
             mod_ts=meta_info.get_mod_ts(),
-            sub_type=0,
+            sub_type=sub_type,
             name=name,
             comment=meta_info.get_comment(),
         )
@@ -512,6 +533,76 @@ class ADFSDir(ADFSNode):
             dcb.write()
             return None
 
+    def get_dircache_records(self):
+        """return the dircache records of all entries.
+
+        Only the dircache blocks of this dir are read, so name, size, meta
+        info and type of all entries are available without reading their
+        header blocks. Return None if the volume has no (valid) dircache.
+        """
+        if not self.volume.is_dircache:
+            return None
+        if self.dcache_blks is None and not self._read_dircache():
+            return None
+        records = []
+        for dcb in self.dcache_blks:
+            records += dcb.records
+        return records
+
+    def get_dircache_node(self, record):
+        """return the node of a dircache record. its header is read now"""
+        if self.entries is not None:
+            for e in self.entries:
+                if e.block.blk_num == record.entry:
+                    return e
+        blk = Block(self.blkdev, record.entry)
+        blk.read()
+        if blk.valid:
+            _, node = self._read_add_node(blk, False)
+            if node is not None:
+                return node
+        raise FSError(UNSUPPORTED_DIR_BLOCK, block=blk, extra="dircache entry")
+
+    def _get_fast_records(self):
+        """return the dircache records if entries are not read yet.
+
+        Old records without the entry type can not be used.
+        """
+        if self.entries is not None:
+            return None
+        records = self.get_dircache_records()
+        if records is None:
+            return None
+        for r in records:
+            if not r.is_dir() and not r.is_file():
+                return None
+        return records
+
+    def _get_record_key(self, record):
+        fn = FileName(
+            record.name,
+            is_intl=self.volume.is_intl,
+            is_longname=self.volume.is_longname,
+        )
+        return fn.get_upper_ami_str()
+
+    def _get_record_list_str(self, record, indent):
+        name = FileName(
+            record.name,
+            is_intl=self.volume.is_intl,
+            is_longname=self.volume.is_longname,
+        )
+        if record.is_dir():
+            size_str = "DIR"
+        else:
+            size_str = "%8d" % record.size
+        meta_info = record.get_meta_info()
+        return "%-40s       %8s  %s" % (
+            "  " * indent + name.get_unicode_name(),
+            size_str,
+            meta_info.get_str_line(),
+        )
+
     def get_dircache_record(self, name):
         if self.dcache_blks:
             for dcb in self.dcache_blks:
@@ -537,9 +628,25 @@ class ADFSDir(ADFSNode):
     def get_block_usage(self, all=False, first=True):
         num_non_data = 1
         num_data = 0
+        records = None
+        if all or first:
+            records = self._get_fast_records()
         if self.dcache_blks != None:
             num_non_data += len(self.dcache_blks)
-        if all or first:
+        if records is not None:
+            for r in records:
+                if r.is_dir():
+                    node = self.get_dircache_node(r)
+                    bu = node.get_block_usage(all=all, first=False)
+                else:
+                    # header and list blocks follow from the file size
+                    data_blks, ext_blks = ADFSFile.calc_number_of_blks(
+                        self.volume, r.size
+                    )
+                    bu = (data_blks, ext_blks + 1)
+                num_data += bu[0]
+                num_non_data += bu[1]
+        elif all or first:
             self.ensure_entries()
             for e in self.entries:
                 bu = e.get_block_usage(all=all, first=False)
@@ -549,7 +656,17 @@ class ADFSDir(ADFSNode):
 
     def get_file_bytes(self, all=False, first=True):
         size = 0
+        records = None
         if all or first:
+            records = self._get_fast_records()
+        if records is not None:
+            for r in records:
+                if r.is_dir():
+                    node = self.get_dircache_node(r)
+                    size += node.get_file_bytes(all=all, first=False)
+                else:
+                    size += r.size
+        elif all or first:
             self.ensure_entries()
             for e in self.entries:
                 size += e.get_file_bytes(all=all, first=False)
@@ -150,29 +150,37 @@ class ADFSFile(ADFSNode):
 
     def get_data_block_contents_bytes(self):
         """how many bytes of file data can be stored in a block?"""
-        bb = self.volume.blkdev.block_bytes
-        if self.volume.is_ffs:
+        return self._get_data_block_contents_bytes(self.volume)
+
+    @staticmethod
+    def _get_data_block_contents_bytes(volume):
+        bb = volume.blkdev.block_bytes
+        if volume.is_ffs:
             return bb
         else:
             return bb - 24
 
     def calc_number_of_data_blks(self):
         """given the file size: how many data blocks do we need to store the file?"""
-        bb = self.get_data_block_contents_bytes()
-        ds = self.data_size
-        return (ds + bb - 1) // bb
+        return self.calc_number_of_blks(self.volume, self.data_size)[0]
 
     def calc_number_of_list_blks(self):
         """given the file size: how many list blocks do we need to store the data blk ptrs?"""
-        db = self.calc_number_of_data_blks()
+        return self.calc_number_of_blks(self.volume, self.data_size)[1]
+
+    @classmethod
+    def calc_number_of_blks(cls, volume, data_size):
+        """return the number of data and list blocks of a file of data_size"""
+        bb = cls._get_data_block_contents_bytes(volume)
+        db = (data_size + bb - 1) // bb
         # ptr per block
-        ppb = self.volume.blkdev.block_longs - 56
+        ppb = volume.blkdev.block_longs - 56
         # fits in header block?
         if db <= ppb:
-            return 0
+            return db, 0
         else:
-            db -= ppb
-            return (db + ppb - 1) // ppb
+            lb = db - ppb
+            return db, (lb + ppb - 1) // ppb
 
     def blocks_get_create_num(self):
         # determine number of blocks to create
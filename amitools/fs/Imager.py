@@ -1,6 +1,7 @@
 import os
 import os.path
 import sys
+import hashlib
 import unicodedata
 
 from .ADFSDir import ADFSDir
@@ -13,6 +14,9 @@ from amitools.fs.blkdev.BlkDevFactory import BlkDevFactory
 from amitools.fs.blkdev.DiskGeometry import DiskGeometry
 import amitools.util.KeyValue as KeyValue
 from .FSString import FSString
+from .FileName import FileName
+from .MetaInfo import MetaInfo
+from .TimeStamp import TimeStamp
 from .MetaInfoFSUAE import MetaInfoFSUAE
 
 
@@ -243,3 +247,212 @@ class Imager:
             node = parent_node.create_file(FSString(ami_name), data, meta_info, False)
             node.flush()
             self.total_bytes += len(data)
+
+    # ----- sync -----
+
+    def sync(self, in_path, volume, delete=True, use_hash=False, dry_run=False):
+        """update the volume with the changes of the host tree in in_path.
+
+        Only new or changed files are written, changed meta infos are
+        applied and entries missing on the host are deleted (if delete is
+        set). A file is unchanged if size and mod time of the host file
+        match the volume entry. With use_hash a sha1 digest of the data
+        decides and is recorded in the .xdfsync file next to in_path, so
+        touched but unchanged files are not written either.
+
+        Return a list of (action, path) for all changes.
+        """
+        if in_path[-1] == "/":
+            in_path = in_path[:-1]
+        if not os.path.isdir(in_path):
+            raise IOError("Sync directory does not exist: " + in_path)
+        self.sync_delete = delete
+        self.sync_hash = use_hash
+        self.sync_dry_run = dry_run
+        self.sync_actions = []
+        self.pack_begin(in_path)
+        # host infos of last and this sync
+        self.sync_old_db = MetaDB()
+        self.sync_db = MetaDB()
+        sync_path = in_path + ".xdfsync"
+        if use_hash and os.path.exists(sync_path):
+            self.sync_old_db.load_host_infos(sync_path)
+        self.sync_dir(in_path, volume.get_root_dir())
+        if not dry_run:
+            self.sync_boot_code(in_path, volume)
+            if use_hash:
+                self.sync_db.save_host_infos(sync_path)
+        return self.sync_actions
+
+    def sync_boot_code(self, in_path, volume):
+        boot_code_path = in_path + ".bootcode"
+        if os.path.exists(boot_code_path):
+            with open(boot_code_path, "rb") as f:
+                data = f.read()
+            if data != volume.boot.boot_code:
+                self.pack_end(in_path, volume)
+                self._sync_action("boot", "")
+
+    def sync_dir(self, in_path, dir_node):
+        volume = dir_node.volume
+        # volume entries by upper case name
+        entries = {}
+        for node in dir_node.get_entries():
+            entries[node.name.get_upper_ami_str()] = node
+        for name in sorted(os.listdir(in_path)):
+            sub_path = os.path.join(in_path, name)
+            # skip .uaem files
+            if self.meta_fsuae.is_meta_file(sub_path):
+                continue
+            ami_name = FSString(name).get_unicode()
+            fn = FileName(FSString(ami_name), is_intl=volume.is_intl)
+            node = entries.pop(fn.get_upper_ami_str(), None)
+            self.sync_entry(sub_path, ami_name, dir_node, node)
+        # entries missing on host
+        if self.sync_delete:
+            for node in list(entries.values()):
+                self._sync_action("delete", node.get_node_path_name().get_unicode())
+                if not self.sync_dry_run:
+                    node.delete(all=True)
+
+    def sync_entry(self, in_path, ami_name, parent_node, node):
+        ami_path = parent_node.get_node_path_name().get_unicode()
+        if ami_path != "":
+            ami_path += "/" + ami_name
+        else:
+            ami_path = ami_name
+        meta_info = self.sync_get_meta_info(in_path, ami_path)
+        is_dir = os.path.isdir(in_path)
+        # type changed: replace entry
+        if node is not None and node.is_dir() != is_dir:
+            self._sync_action("delete", ami_path)
+            if not self.sync_dry_run:
+                node.delete(all=True)
+            node = None
+        if is_dir:
+            if node is None:
+                self._sync_action("makedir", ami_path)
+                if self.sync_dry_run:
+                    return
+                node = parent_node.create_dir(FSString(ami_name), meta_info, False)
+            elif meta_info is not None:
+                self.sync_meta_info(node, meta_info, ami_path)
+            self.sync_dir(in_path, node)
+            node.flush()
+        elif os.path.isfile(in_path):
+            st = os.stat(in_path)
+            data = None
+            if node is not None:
+                data = self.sync_get_changed_data(in_path, ami_path, st, node)
+                if data is None:
+                    if meta_info is not None:
+                        self.sync_meta_info(node, meta_info, ami_path)
+                    return
+                self._sync_action("update", ami_path)
+            else:
+                self._sync_action("write", ami_path)
+            if self.sync_dry_run:
+                return
+            if data is None:
+                with open(in_path, "rb") as fh:
+                    data = fh.read()
+            self._sync_record(ami_path, st, data)
+            # the data is replaced: keep flags and comment but take host time
+            if meta_info is None:
+                meta_info = MetaInfo()
+                if node is not None:
+                    meta_info.set_protect(node.meta_info.get_protect())
+                    meta_info.set_comment(node.meta_info.get_comment())
+                else:
+                    meta_info.set_default_protect()
+            else:
+                meta_info = MetaInfo(
+                    meta_info.get_protect(), None, meta_info.get_comment()
+                )
+            meta_info.set_mod_ts(self._get_host_ts(st))
+            if node is not None:
+                node.delete()
+            node = parent_node.create_file(FSString(ami_name), data, meta_info, False)
+            node.flush()
+            self.total_bytes += len(data)
+
+    def sync_get_meta_info(self, in_path, ami_path):
+        meta_path = in_path + self.meta_fsuae.get_suffix()
+        if os.path.isfile(meta_path):
+            return self.meta_fsuae.load_meta(meta_path)
+        elif self.meta_db is not None:
+            return self.meta_db.get_meta_info(ami_path)
+        return None
+
+    def sync_get_changed_data(self, in_path, ami_path, st, node):
+        """return the data of a changed host file or None if its unchanged"""
+        size = node.get_size()
+        info = self.sync_old_db.get_host_info(ami_path)
+        if self.sync_hash:
+            # host file not touched since last sync
+            if info is not None and info[:2] == (st.st_size, st.st_mtime_ns):
+                if size == st.st_size:
+                    self.sync_db.set_host_info(ami_path, *info)
+                    return None
+        elif size == st.st_size:
+            # host file not newer than volume entry
+            host_secs = self._get_host_ts(st).get_secs()
+            if host_secs <= node.meta_info.get_mod_ts().get_secs():
+                return None
+        with open(in_path, "rb") as fh:
+            data = fh.read()
+        if self.sync_hash and size == len(data):
+            digest = self._sync_record(ami_path, st, data)
+            if info is not None and info[2] is not None:
+                old_digest = info[2]
+            else:
+                # compare with the volume entry
+                old_digest = hashlib.sha1(node.get_file_data()).hexdigest()
+                node.flush()
+            if digest == old_digest:
+                self.sync_mod_ts(node, st, ami_path)
+                return None
+        return data
+
+    def sync_mod_ts(self, node, st, ami_path):
+        """take the mod time of a touched but unchanged host file"""
+        host_ts = self._get_host_ts(st)
+        if host_ts.get_secs() > node.meta_info.get_mod_ts().get_secs():
+            self._sync_action("time", ami_path)
+            if not self.sync_dry_run:
+                node.change_mod_ts(host_ts)
+
+    def sync_meta_info(self, node, meta_info, ami_path):
+        """apply changed protect flags or comment.
+
+        Mod times follow the host files and are not taken from meta infos.
+        """
+        old = node.get_meta_info()
+        changed = MetaInfo()
+        protect = meta_info.get_protect()
+        if protect is not None and protect != old.get_protect():
+            changed.set_protect(protect)
+        comment = meta_info.get_comment()
+        if comment is not None and comment != old.get_comment():
+            changed.set_comment(comment)
+        if changed.get_protect() is None and changed.get_comment() is None:
+            return
+        self._sync_action("meta", ami_path)
+        if not self.sync_dry_run:
+            node.change_meta_info(changed)
+
+    def _sync_record(self, ami_path, st, data):
+        if not self.sync_hash:
+            return None
+        digest = hashlib.sha1(data).hexdigest()
+        self.sync_db.set_host_info(ami_path, st.st_size, st.st_mtime_ns, digest)
+        return digest
+
+    def _sync_action(self, action, ami_path):
+        self.sync_actions.append((action, ami_path))
+
+    @staticmethod
+    def _get_host_ts(st):
+        ts = TimeStamp()
+        ts.from_secs(st.st_mtime)
+        return ts
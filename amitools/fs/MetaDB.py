@@ -13,6 +13,8 @@ class MetaDB:
         self.vol_name = None
         self.vol_meta = None
         self.dos_type = DosType.DOS0
+        # path -> (size, mtime_ns, digest) of host files
+        self.host_infos = {}
 
     def set_root_meta_info(self, meta):
         self.vol_meta = meta
@@ -45,6 +47,16 @@ class MetaDB:
         else:
             return None
 
+    def set_host_info(self, path, size, mtime_ns, digest=None):
+        """record the size, mtime and optional content digest of the host
+        file of a path"""
+        if type(path) != str:
+            raise ValueError("set_host_info: path must be unicode")
+        self.host_infos[path] = (size, mtime_ns, digest)
+
+    def get_host_info(self, path):
+        return self.host_infos.get(path)
+
     def dump(self):
         print(self.vol_name, self.vol_meta, self.dos_type)
         for m in self.metas:
@@ -124,6 +136,28 @@ class MetaDB:
         mi = MetaInfo(protect_flags=prot, mod_ts=time, comment=comment)
         self.set_meta_info(path, mi)
 
+    def load_host_infos(self, file_path):
+        """load the host file infos of an .xdfsync file"""
+        self.host_infos = {}
+        with open(file_path, "r") as f:
+            for line in f:
+                line = line.rstrip("\n")
+                # path
+                pos = line.rfind(":")
+                if pos == -1:
+                    raise IOError("Invalid xdfsync file! (no colon in line)")
+                path = line[:pos]
+                comp = line[pos + 1 :].split(",")
+                if len(comp) != 3:
+                    raise IOError("Invalid xdfsync file! (wrong number of parameters)")
+                try:
+                    size = int(comp[0])
+                    mtime_ns = int(comp[1])
+                except ValueError:
+                    raise IOError("Invalid xdfsync file! (invalid number found)")
+                digest = comp[2] or None
+                self.host_infos[path] = (size, mtime_ns, digest)
+
     # ----- save -----
 
     def save(self, file_path):
@@ -151,3 +185,10 @@ class MetaDB:
             line = "%s:%s,%s,%s\n" % (path_name, protect, mod_time, comment)
             f.write(line)
         f.close()
+
+    def save_host_infos(self, file_path):
+        """save the host file infos to an .xdfsync file"""
+        with open(file_path, "w") as f:
+            for path in sorted(self.host_infos):
+                size, mtime_ns, digest = self.host_infos[path]
+                f.write("%s:%d,%d,%s\n" % (path, size, mtime_ns, digest or ""))
@@ -1,8 +1,25 @@
+import struct
+
 from .ADFSVolume import ADFSVolume
+from .FSError import *
+from .block.Block import Block
+from .block.DirCacheBlock import DirCacheBlock
 from amitools.fs.blkdev.BlkDevFactory import BlkDevFactory
 
 
 class Repacker:
+    # kinds of blocks copied by the block level repack
+    BLK_RAW = 0
+    BLK_DIR = 1
+    BLK_FILE = 2
+    BLK_LIST = 3
+    BLK_DATA = 4
+    BLK_CACHE = 5
+    BLK_COMMENT = 6
+
+    # max number of blocks read and written at once
+    MAX_RUN_BLKS = 256
+
     def __init__(self, in_image_file, in_options=None):
         self.in_image_file = in_image_file
         self.in_options = in_options
@@ -10,6 +27,8 @@ class Repacker:
         self.out_blkdev = None
         self.in_volume = None
         self.out_volume = None
+        self.blk_map = None
+        self.num_blks = 0
 
     def create_in_blkdev(self):
         f = BlkDevFactory()
@@ -61,10 +80,27 @@ class Repacker:
         )
         return self.out_volume
 
-    def repack(self):
+    def repack(self, fast=True):
+        """repack all files and dirs of the input volume.
+
+        With fast enabled the used blocks are copied directly if both
+        volumes share the same layout. Only the block pointers are remapped
+        to the new locations then. Otherwise or if a block points to a block
+        that is not part of the tree all files are read and created again.
+        Return True if the blocks were copied.
+        """
+        if fast:
+            blks = self.get_repack_blocks()
+            if blks is not None:
+                try:
+                    self.repack_blocks(blks)
+                    return True
+                except FSError:
+                    pass
         self.repack_node_dir(
             self.in_volume.get_root_dir(), self.out_volume.get_root_dir()
         )
+        return False
 
     def repack_node_dir(self, in_root, out_root):
         entries = in_root.get_entries()
@@ -86,3 +122,220 @@ class Repacker:
             out_file = out_dir.create_file(name, data, meta_info, False)
             out_file.flush()
         in_node.flush()
+
+    # ----- block level repack -----
+
+    def can_repack_blocks(self):
+        """check if the volume layouts allow a block level repack"""
+        iv = self.in_volume
+        ov = self.out_volume
+        if iv.blkdev.block_bytes != ov.blkdev.block_bytes:
+            return False
+        # hashing, data blocks and dircaches depend on the dos type
+        if iv.get_dos_type() != ov.get_dos_type():
+            return False
+        # the output volume must be empty
+        return not any(ov.root.hash_table)
+
+    def get_repack_blocks(self):
+        """return the (blk_num, kind) of all used blocks of the input volume.
+
+        The blocks are given in tree order: a dir header is followed by its
+        dircache blocks and its entries. Return None if the blocks can't be
+        copied and a file level repack is needed.
+        """
+        if not self.can_repack_blocks():
+            return None
+        blks = []
+        try:
+            if not self._add_dir_blocks(self.in_volume.get_root_dir(), blks):
+                return None
+        except FSError:
+            return None
+        # cross-linked blocks can't be remapped
+        if len(set(blk_num for blk_num, _ in blks)) != len(blks):
+            return None
+        # the empty dircache of the output root dir is replaced
+        out_dir = self.out_volume.get_root_dir()
+        num_free = self.out_volume.get_free_blocks()
+        if out_dir.dcache_blks:
+            num_free += len(out_dir.dcache_blks)
+        if len(blks) > num_free:
+            return None
+        return blks
+
+    def _add_dir_blocks(self, dir_node, blks):
+        entries = dir_node.get_entries()
+        if not dir_node.valid:
+            return False
+        if self.in_volume.is_dircache:
+            if dir_node.dcache_blks is None:
+                return False
+            for dcb in dir_node.dcache_blks:
+                blks.append((dcb.blk_num, self.BLK_CACHE))
+        for node in entries:
+            blk = node.block
+            if node.is_dir():
+                blks.append((blk.blk_num, self.BLK_DIR))
+            else:
+                blks.append((blk.blk_num, self.BLK_FILE))
+            if blk.comment_block_id != 0:
+                blks.append((blk.comment_block_id, self.BLK_COMMENT))
+            if node.is_dir():
+                if not self._add_dir_blocks(node, blks):
+                    return False
+            else:
+                for blk_num in node.ext_blk_nums:
+                    blks.append((blk_num, self.BLK_LIST))
+                # only OFS data blocks hold pointers
+                if self.in_volume.is_ffs:
+                    kind = self.BLK_RAW
+                else:
+                    kind = self.BLK_DATA
+                for blk_num in node.data_blk_nums:
+                    blks.append((blk_num, kind))
+            node.flush()
+        return True
+
+    def repack_blocks(self, blks):
+        """copy the blocks returned by get_repack_blocks() to the output
+        volume. The blocks are stored in order in free blocks starting at
+        the root block, so files are defragmented, too.
+
+        Raise FSError if a pointer refers to a block that was not copied.
+        The output volume is left unchanged then.
+        """
+        in_root = self.in_volume.root
+        out_root = self.out_volume.root
+        out_dir = self.out_volume.get_root_dir()
+        bitmap = self.out_volume.bitmap
+        # drop the empty dircache of the output root dir
+        if out_dir.dcache_blks:
+            bitmap.dealloc_n([dcb.blk_num for dcb in out_dir.dcache_blks])
+        if blks:
+            new_blks = bitmap.alloc_n(len(blks))
+        else:
+            new_blks = []
+        self.blk_map = {in_root.blk_num: out_root.blk_num}
+        for (old_blk, _), new_blk in zip(blks, new_blks):
+            self.blk_map[old_blk] = new_blk
+        try:
+            # link the entries to the output root block
+            hash_table = [self._map_blk(b) for b in in_root.hash_table]
+            extension = self._map_blk(in_root.extension)
+            self._copy_blocks(blks, new_blks)
+        except FSError:
+            # free the copied blocks and restore the dircache of the root dir
+            self.blk_map = None
+            bitmap.dealloc_n(new_blks)
+            if out_dir.dcache_blks:
+                for dcb in out_dir.dcache_blks:
+                    bitmap.clr_bit(dcb.blk_num)
+                    dcb.write()
+            raise
+        self.num_blks = len(blks)
+        out_root.hash_table = hash_table
+        out_root.extension = extension
+        out_root.write()
+        out_dir.read()
+
+    def _copy_blocks(self, blks, new_blks):
+        bb = self.in_volume.blkdev.block_bytes
+        in_dev = self.in_volume.blkdev
+        out_dev = self.out_volume.blkdev
+        num = len(blks)
+        i = 0
+        while i < num:
+            # find a run of consecutive blocks in input and output
+            j = i + 1
+            while (
+                j < num
+                and j - i < self.MAX_RUN_BLKS
+                and blks[j][0] == blks[j - 1][0] + 1
+                and new_blks[j] == new_blks[j - 1] + 1
+            ):
+                j += 1
+            data = bytearray(in_dev.read_blocks(blks[i][0], j - i))
+            for k in range(i, j):
+                kind = blks[k][1]
+                if kind != self.BLK_RAW:
+                    off = (k - i) * bb
+                    blk = Block(out_dev, new_blks[k])
+                    blk._set_data(data[off : off + bb])
+                    self._remap_block(blk, kind)
+                    data[off : off + bb] = blk.data
+            out_dev.write_blocks(new_blks[i], data)
+            i = j
+
+    def _map_blk(self, blk_num):
+        if blk_num == 0:
+            return 0
+        new_blk = self.blk_map.get(blk_num)
+        if new_blk is None:
+            # clearing the pointer would cut off hash chains or data
+            raise FSError(
+                INTERNAL_ERROR, extra="pointer to block %d was not copied" % blk_num
+            )
+        return new_blk
+
+    def _remap_long(self, blk, loc):
+        blk._put_long(loc, self._map_blk(blk._get_long(loc)))
+
+    def _remap_table(self, blk, loc, num):
+        # remap num consecutive longs at once
+        if loc < 0:
+            loc = blk.block_longs + loc
+        fmt = ">%dI" % num
+        blks = struct.unpack_from(fmt, blk.data, loc * 4)
+        struct.pack_into(fmt, blk.data, loc * 4, *map(self._map_blk, blks))
+
+    def _remap_data_table(self, blk):
+        # the table is stored in reverse order before long -50
+        num = min(blk._get_long(2), blk.block_longs - 56)
+        if num > 0:
+            self._remap_table(blk, -50 - num, num)
+
+    def _remap_block(self, blk, kind):
+        remap = self._remap_long
+        if kind == self.BLK_DATA:
+            # header key and next data block
+            remap(blk, 1)
+            remap(blk, 4)
+        elif kind == self.BLK_COMMENT:
+            # own key and header key
+            remap(blk, 1)
+            remap(blk, 2)
+        elif kind == self.BLK_CACHE:
+            # parse records before the checksum gets invalid
+            dcb = DirCacheBlock(blk.blkdev, blk.blk_num)
+            dcb.set(bytearray(blk.data))
+            for r in dcb.records:
+                entry = self._map_blk(r.entry)
+                struct.pack_into(">I", blk.data, r.offset, entry)
+            # own key, parent and next cache block
+            remap(blk, 1)
+            remap(blk, 2)
+            remap(blk, 4)
+        elif kind == self.BLK_LIST:
+            remap(blk, 1)
+            self._remap_data_table(blk)
+            remap(blk, -3)
+            remap(blk, -2)
+        else:
+            remap(blk, 1)
+            if kind == self.BLK_DIR:
+                # hash table
+                self._remap_table(blk, 6, blk.block_longs - 56)
+            else:
+                # first data block and data block table
+                remap(blk, 4)
+                self._remap_data_table(blk)
+            # hard links are not repacked
+            blk._put_long(-11, 0)
+            # hash chain, parent and extension
+            remap(blk, -4)
+            remap(blk, -3)
+            remap(blk, -2)
+            if self.in_volume.is_longname:
+                remap(blk, -18)
+        blk._put_chksum()
@@ -2,18 +2,24 @@ import os
 import os.path
 import stat
 import gzip
+import shutil
+import tempfile
 from .ADFBlockDevice import ADFBlockDevice
 from .HDFBlockDevice import HDFBlockDevice
 from .RawBlockDevice import RawBlockDevice
+from .OverlayBlockDevice import OverlayBlockDevice
+from .ChunkFile import ChunkFile
 from .DiskGeometry import DiskGeometry
 from amitools.fs.rdb.RDisk import RDisk
 import amitools.util.BlkDevTools as BlkDevTools
+import amitools.util.ByteSize as ByteSize
 
 
 class BlkDevFactory:
     """the block device factory opens or creates image files suitable as a block device for file system access."""
 
     GZIP_MASK = 0x10
+    CHUNK_MASK = 0x20
     TYPE_MASK = 0x0F
 
     TYPE_ADF = 1
@@ -26,6 +32,10 @@ class BlkDevFactory:
     TYPE_RDB_GZ = TYPE_RDB | GZIP_MASK
     TYPE_ADF_HD_GZ = TYPE_ADF_HD | GZIP_MASK
 
+    TYPE_ADF_CHUNK = TYPE_ADF | CHUNK_MASK
+    TYPE_HDF_CHUNK = TYPE_HDF | CHUNK_MASK
+    TYPE_RDB_CHUNK = TYPE_RDB | CHUNK_MASK
+
     TYPE_MAP = {
         "adf": TYPE_ADF,
         "hdf": TYPE_HDF,
@@ -47,8 +57,25 @@ class BlkDevFactory:
         ".rdisk": TYPE_RDB,
         ".rdb.gz": TYPE_RDB_GZ,
         ".rdisk.gz": TYPE_RDB_GZ,
+        ".adc": TYPE_ADF_CHUNK,
+        ".hdc": TYPE_HDF_CHUNK,
+        ".rdc": TYPE_RDB_CHUNK,
+    }
+
+    # image type names stored in chunk files
+    TYPE_NAMES = {
+        TYPE_ADF: "adf",
+        TYPE_HDF: "hdf",
+        TYPE_RDB: "rdb",
+        TYPE_ADF_HD: "adf_hd",
     }
 
+    # gzip'ed images are unpacked once to memory or a temp file if larger
+    GZIP_SPOOL_BYTES = 64 * 1024 * 1024
+    COPY_BUFFER_BYTES = 1024 * 1024
+
+    OVERLAY_PREFIX = "overlay:"
+
     def detect_type(self, img_file, fobj, options=None):
         """try to detect the type of a given img_file name"""
         # 1. take type from options
@@ -88,6 +115,16 @@ class BlkDevFactory:
         # check for 'RDISK':
         if hdr == b"RDSK":
             return self.TYPE_RDB
+        # chunk file: type of image is stored in header
+        if ChunkFile.is_chunk_file(hdr):
+            if fobj is None:
+                name = ChunkFile.get_image_type(img_file)
+            else:
+                name = ChunkFile(img_file, True, fobj=fobj).img_type
+                fobj.seek(0, 0)
+            t = self.TYPE_MAP.get(name)
+            if t is not None:
+                return t | self.CHUNK_MASK
         return None
 
     def type_from_extension(self, img_file):
@@ -111,6 +148,9 @@ class BlkDevFactory:
         self, img_file, read_only=False, options=None, fobj=None, none_if_missing=False
     ):
         """open an existing image file"""
+        # copy-on-write overlay of a base image
+        if self.is_overlay(img_file):
+            return self._open_overlay(img_file, read_only, options)
         # file base check
         if not fobj:
             # make sure image file exists
@@ -135,10 +175,14 @@ class BlkDevFactory:
             # only supported for read access for now
             if not read_only:
                 raise IOError("can't write gzip'ed image files!")
-            # automatically wrap a fobj to unzip
-            fobj = gzip.GzipFile(img_file, "rb", fileobj=fobj)
+            # unpack once: seeking back in a GzipFile restarts unpacking
+            fobj = self._unpack_gzip(img_file, fobj)
             # remove gzip flag from type
             t = t & self.TYPE_MASK
+        # is chunk compressed?
+        elif t & self.CHUNK_MASK:
+            fobj = ChunkFile(img_file, read_only, fobj=fobj)
+            t = t & self.TYPE_MASK
 
         # retrieve size
         if fobj:
@@ -162,13 +206,7 @@ class BlkDevFactory:
 
         # now create blkdev
         if t in (self.TYPE_ADF, self.TYPE_ADF_HD):
-            # check sizes
-            if size in ADFBlockDevice.DD_IMG_SIZES:
-                hd = False
-            elif size in ADFBlockDevice.HD_IMG_SIZES:
-                hd = True
-            else:
-                raise IOError("invalid ADF images size: %d" % size)
+            hd = self._is_adf_hd(size)
             blkdev = ADFBlockDevice(img_file, read_only, fobj=fobj, hd=hd)
             blkdev.open()
         elif t == self.TYPE_HDF:
@@ -191,19 +229,148 @@ class BlkDevFactory:
                 rawdev = RawBlockDevice(img_file, read_only, fobj=fobj, block_bytes=bs)
                 rawdev.open()
                 rdisk = RDisk(rawdev)
-            if not rdisk.open():
-                raise IOError("can't open rdisk of image file")
-            # determine partition
-            p = "0"
-            if options != None and "part" in options:
-                p = str(options["part"])
-            part = rdisk.find_partition_by_string(p)
-            if part == None:
-                raise IOError("can't find partition in image file")
-            blkdev = part.create_blkdev(True)  # auto_close rdisk
-            blkdev.open()
+            blkdev = self._open_rdisk_part(rdisk, options)
+        return blkdev
+
+    def _unpack_gzip(self, img_file, fobj=None):
+        """return a seekable file object with the unpacked gzip'ed image"""
+        tmp = tempfile.SpooledTemporaryFile(self.GZIP_SPOOL_BYTES)
+        with gzip.GzipFile(img_file, "rb", fileobj=fobj) as gz:
+            shutil.copyfileobj(gz, tmp, self.COPY_BUFFER_BYTES)
+        tmp.seek(0, 0)
+        return tmp
+
+    def _get_chunk_options(self, options):
+        codec = "zlib"
+        chunk_size = ChunkFile.DEFAULT_CHUNK_SIZE
+        if options:
+            if "codec" in options:
+                codec = options["codec"]
+            if "chunk" in options:
+                chunk_size = ByteSize.parse_byte_size_str(str(options["chunk"]))
+                if chunk_size is None or chunk_size < 512 or chunk_size % 512 != 0:
+                    raise ValueError("invalid chunk size given: %s" % options["chunk"])
+        return codec, chunk_size
+
+    def _is_adf_hd(self, size):
+        if size in ADFBlockDevice.DD_IMG_SIZES:
+            return False
+        elif size in ADFBlockDevice.HD_IMG_SIZES:
+            return True
+        else:
+            raise IOError("invalid ADF images size: %d" % size)
+
+    def _open_rdisk_part(self, rdisk, options):
+        if not rdisk.open():
+            raise IOError("can't open rdisk of image file")
+        # determine partition
+        p = "0"
+        if options != None and "part" in options:
+            p = str(options["part"])
+        part = rdisk.find_partition_by_string(p)
+        if part == None:
+            raise IOError("can't find partition in image file")
+        blkdev = part.create_blkdev(True)  # auto_close rdisk
+        blkdev.open()
         return blkdev
 
+    # ----- overlays -----
+
+    def is_overlay(self, img_file):
+        """is img_file an overlay path 'overlay:<delta>[?base=<image>]'?"""
+        return img_file.startswith(self.OVERLAY_PREFIX)
+
+    def parse_overlay(self, img_file):
+        """return (delta_file, base_file) of an overlay path.
+
+        base_file is None if the path does not name it. It is then taken
+        from the header of the existing delta file.
+        """
+        path = img_file[len(self.OVERLAY_PREFIX) :]
+        delta_file, sep, query = path.partition("?")
+        base_file = None
+        if sep:
+            key, _, base_file = query.partition("=")
+            if key != "base" or not base_file:
+                raise ValueError("invalid overlay path: %s" % img_file)
+        if not delta_file:
+            raise ValueError("invalid overlay path: %s" % img_file)
+        return delta_file, base_file
+
+    def _create_overlay(self, img_file, read_only, block_bytes, options=None):
+        """return an unopened raw overlay and the type of its base image"""
+        delta_file, base_file = self.parse_overlay(img_file)
+        if base_file is None:
+            if not os.path.exists(delta_file):
+                raise IOError("overlay delta file not found: %s" % delta_file)
+            base_file = OverlayBlockDevice.read_header(delta_file)[2]
+        if not os.path.exists(base_file):
+            raise IOError("overlay base image not found: %s" % base_file)
+        t = self.detect_type(base_file, None, options)
+        if t is None:
+            raise IOError("can't detect type of image file")
+        # the base image is never written
+        fobj = None
+        if t & self.GZIP_MASK:
+            fobj = self._unpack_gzip(base_file)
+        elif t & self.CHUNK_MASK:
+            fobj = ChunkFile(base_file, True)
+        rawdev = RawBlockDevice(base_file, True, fobj=fobj, block_bytes=block_bytes)
+        rawdev.open()
+        base_file = os.path.abspath(base_file)
+        ovl = OverlayBlockDevice(rawdev, delta_file, read_only, base_file)
+        return ovl, t & self.TYPE_MASK
+
+    def open_overlay_raw(self, img_file, read_only=False, block_bytes=512):
+        """open the overlay path img_file as a raw device of all blocks"""
+        ovl, _ = self._create_overlay(img_file, read_only, block_bytes)
+        ovl.open()
+        return ovl
+
+    def _open_overlay(self, img_file, read_only, options):
+        bs = self._get_block_size(options)
+        ovl, t = self._create_overlay(img_file, read_only, bs, options)
+        size = ovl.base.img_file.size
+        if t in (self.TYPE_ADF, self.TYPE_ADF_HD):
+            secs = 22 if self._is_adf_hd(size) else 11
+            ovl.open(DiskGeometry(80, 2, secs))
+            return ovl
+        elif t == self.TYPE_HDF:
+            geo = DiskGeometry(block_bytes=bs)
+            if not geo.detect(size, options):
+                ovl.base.close()
+                raise IOError("can't detect geometry of HDF image file")
+            ovl.open(geo)
+            return ovl
+        # rdb: use block size of rdb
+        ovl.open()
+        rdb_bs = RDisk(ovl).peek_block_size()
+        if rdb_bs != bs:
+            ovl.close()
+            ovl, _ = self._create_overlay(img_file, read_only, rdb_bs, options)
+            ovl.open()
+        return self._open_rdisk_part(RDisk(ovl), options)
+
+    def commit_overlay(self, ovl):
+        """write the modified blocks of an open overlay to its base image.
+
+        return the number of committed blocks
+        """
+        base_file = ovl.base_file
+        t = self.detect_type(base_file, None)
+        if t is not None and t & (self.GZIP_MASK | self.CHUNK_MASK):
+            raise IOError("can't write overlay base image: %s" % base_file)
+        rawdev = RawBlockDevice(base_file, block_bytes=ovl.block_bytes)
+        rawdev.open()
+        try:
+            num = ovl.commit(rawdev)
+        finally:
+            rawdev.close()
+        # drop stale buffered data of the base
+        ovl.base.close()
+        ovl.base.open()
+        return num
+
     def create(self, img_file, force=True, options=None, fobj=None):
         if fobj is None:
             # make sure we are allowed to overwrite existing file
@@ -220,8 +387,15 @@ class BlkDevFactory:
             raise IOError("can't detect type of image file")
         if t & self.GZIP_MASK:
             raise IOError("can't create gzip'ed image files")
-        if t == self.TYPE_RDB:
+        if t & self.TYPE_MASK == self.TYPE_RDB:
             raise IOError("can't create rdisk. use rdbtool first")
+        if t & self.CHUNK_MASK:
+            if fobj is not None:
+                raise IOError("can't create chunk image in a file object")
+            t = t & self.TYPE_MASK
+            codec, chunk_size = self._get_chunk_options(options)
+            name = self.TYPE_NAMES[t]
+            fobj = ChunkFile.create(img_file, name, codec=codec, chunk_size=chunk_size)
 
         # get block size
         bs = self._get_block_size(options)
@@ -242,6 +416,46 @@ class BlkDevFactory:
             blkdev.create(geo)
         return blkdev
 
+    def convert(self, in_file, out_file, options=None):
+        """convert an image file between raw, gzip'ed and chunk files.
+
+        The format of out_file is taken from its extension and the image
+        data is streamed, so images of any size can be converted. Options
+        'codec' and 'chunk' select the compression of chunk files.
+        return the size of the image
+        """
+        in_t = self.detect_type(in_file, None)
+        if in_t is None:
+            raise IOError("can't detect type of image file")
+        out_t = self.type_from_extension(out_file) or 0
+        if in_t & self.GZIP_MASK:
+            src = gzip.GzipFile(in_file, "rb")
+        elif in_t & self.CHUNK_MASK:
+            src = ChunkFile(in_file, True)
+        else:
+            src = open(in_file, "rb")
+        with src:
+            if out_t & self.CHUNK_MASK:
+                codec, chunk_size = self._get_chunk_options(options)
+                name = self.TYPE_NAMES[in_t & self.TYPE_MASK]
+                dst = ChunkFile.create_from(
+                    out_file, name, src, codec=codec, chunk_size=chunk_size
+                )
+                size = dst.size
+                dst.close()
+            elif out_t & self.GZIP_MASK:
+                with gzip.GzipFile(out_file, "wb") as dst:
+                    shutil.copyfileobj(src, dst, self.COPY_BUFFER_BYTES)
+                    size = dst.tell()
+            else:
+                with open(out_file, "wb") as dst:
+                    if isinstance(src, ChunkFile):
+                        size = src.write_raw(dst)
+                    else:
+                        shutil.copyfileobj(src, dst, self.COPY_BUFFER_BYTES)
+                        size = dst.tell()
+        return size
+
 
 # --- mini test ---
 if __name__ == "__main__":
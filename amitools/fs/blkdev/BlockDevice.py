@@ -49,6 +49,24 @@ class BlockDevice:
     def write_block(self, blk_num, data):
         pass
 
+    def read_blocks(self, blk_num, num_blks):
+        """read consecutive blocks. devices may override it with a bulk read"""
+        return b"".join(self.read_block(blk_num + i) for i in range(num_blks))
+
+    def write_blocks(self, blk_num, data):
+        """write consecutive blocks. devices may override it with a bulk write"""
+        bb = self.block_bytes
+        for i in range(len(data) // bb):
+            self.write_block(blk_num + i, data[i * bb : (i + 1) * bb])
+
+    def get_data_ranges(self):
+        """return the (first, end) block ranges that may hold data.
+
+        Blocks outside these ranges are known to read as zeros, e.g. the
+        holes of sparse image files.
+        """
+        return [(0, self.num_blocks)]
+
     def get_geometry(self):
         return DiskGeometry(self.cyls, self.heads, self.sectors)
 
@@ -0,0 +1,391 @@
+import io
+import os
+import struct
+import zlib
+import lzma
+
+
+class ChunkFile(io.RawIOBase):
+    """a seekable file object on a chunk-compressed disk image.
+
+    The image data is split into chunks of a fixed size and each chunk is
+    compressed with zlib or lzma. An index at the end of the file gives the
+    offset and size of every chunk, so each chunk can be read on its own.
+    Chunks of zeros are not stored at all. Decompressed chunks are kept in
+    an LRU cache.
+
+    The file header stores the image type (e.g. 'hdf') so the block device
+    factory can open the image inside. Written chunks are appended to the
+    file together with a new index on flush(). The space of replaced
+    chunks is only reclaimed by converting the image again.
+    """
+
+    MAGIC = b"XDCF"
+    VERSION = 1
+    # magic, version, codec, chunk size, image size, image type, index offset
+    HEADER_FORMAT = ">4sBB2xIQ8sQ"
+    HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+    # offset and size of a chunk
+    INDEX_FORMAT = ">QI"
+    INDEX_SIZE = struct.calcsize(INDEX_FORMAT)
+
+    CODEC_ZLIB = 1
+    CODEC_LZMA = 2
+    CODEC_MAP = {"zlib": CODEC_ZLIB, "lzma": CODEC_LZMA}
+
+    DEFAULT_CHUNK_SIZE = 64 * 1024
+    CACHE_CHUNKS = 64
+
+    def __init__(self, file_name, read_only=False, fobj=None):
+        super().__init__()
+        self.file_name = file_name
+        self.read_only = read_only
+        if fobj is None:
+            fobj = open(file_name, "rb" if read_only else "r+b")
+        self.fh = fobj
+        self.pos = 0
+        # chunk num -> decompressed data
+        self.cache = {}
+        self.dirty = set()
+        self.index_dirty = False
+        self._read_header()
+
+    @classmethod
+    def is_chunk_file(cls, hdr):
+        """check the first bytes of a file for a chunk file"""
+        return hdr[:4] == cls.MAGIC
+
+    @classmethod
+    def get_image_type(cls, file_name):
+        """return the type name of the image stored in a chunk file"""
+        with open(file_name, "rb") as fh:
+            hdr = fh.read(cls.HEADER_SIZE)
+        if len(hdr) != cls.HEADER_SIZE or not cls.is_chunk_file(hdr):
+            return None
+        return cls._unpack_header(hdr)[4]
+
+    @classmethod
+    def _unpack_header(cls, hdr):
+        magic, version, codec, chunk_size, size, img_type, index_off = struct.unpack(
+            cls.HEADER_FORMAT, hdr
+        )
+        img_type = img_type.rstrip(b"\0").decode("ascii")
+        return magic, version, codec, chunk_size, img_type, size, index_off
+
+    @classmethod
+    def _pack_header(cls, codec, chunk_size, size, img_type, index_off):
+        return struct.pack(
+            cls.HEADER_FORMAT,
+            cls.MAGIC,
+            cls.VERSION,
+            codec,
+            chunk_size,
+            size,
+            img_type.encode("ascii"),
+            index_off,
+        )
+
+    @classmethod
+    def _get_codec(cls, codec):
+        if codec not in cls.CODEC_MAP:
+            raise ValueError("invalid chunk codec: %s" % codec)
+        return cls.CODEC_MAP[codec]
+
+    @classmethod
+    def create(
+        cls, file_name, img_type, size=0, codec="zlib", chunk_size=DEFAULT_CHUNK_SIZE
+    ):
+        """create a chunk file of an image with all zeros and open it"""
+        return cls.create_from(file_name, img_type, None, size, codec, chunk_size)
+
+    @classmethod
+    def create_from(
+        cls,
+        file_name,
+        img_type,
+        src,
+        size=0,
+        codec="zlib",
+        chunk_size=DEFAULT_CHUNK_SIZE,
+    ):
+        """create a chunk file from the raw image data read from file object
+        src and open it.
+
+        The image is converted chunk by chunk. Without a src an image of
+        size zeros is created.
+        """
+        codec = cls._get_codec(codec)
+        compress = cls._get_compress(codec)
+        zero_chunk = bytes(chunk_size)
+        offsets = []
+        sizes = []
+        with open(file_name, "wb") as fh:
+            fh.write(bytes(cls.HEADER_SIZE))
+            if src is None:
+                num = (size + chunk_size - 1) // chunk_size
+                offsets = [0] * num
+                sizes = [0] * num
+            else:
+                size = 0
+                while True:
+                    data = src.read(chunk_size)
+                    if not data:
+                        break
+                    size += len(data)
+                    if data == zero_chunk[: len(data)]:
+                        offsets.append(0)
+                        sizes.append(0)
+                    else:
+                        packed = compress(data)
+                        offsets.append(fh.tell())
+                        sizes.append(len(packed))
+                        fh.write(packed)
+            index_off = fh.tell()
+            fh.write(cls._pack_index(offsets, sizes))
+            fh.seek(0)
+            fh.write(cls._pack_header(codec, chunk_size, size, img_type, index_off))
+        return cls(file_name)
+
+    @classmethod
+    def _pack_index(cls, offsets, sizes):
+        fmt = cls.INDEX_FORMAT
+        return b"".join(struct.pack(fmt, o, s) for o, s in zip(offsets, sizes))
+
+    @classmethod
+    def _get_compress(cls, codec):
+        if codec == cls.CODEC_LZMA:
+            return lzma.compress
+        return zlib.compress
+
+    def _read_header(self):
+        fh = self.fh
+        fh.seek(0)
+        hdr = fh.read(self.HEADER_SIZE)
+        if len(hdr) != self.HEADER_SIZE or not self.is_chunk_file(hdr):
+            raise IOError("invalid chunk image file: %s" % self.file_name)
+        _, version, codec, chunk_size, img_type, size, index_off = self._unpack_header(
+            hdr
+        )
+        if version != self.VERSION or codec not in self.CODEC_MAP.values():
+            raise IOError("unsupported chunk image file: %s" % self.file_name)
+        self.codec = codec
+        self.chunk_size = chunk_size
+        self.img_type = img_type
+        self.size = size
+        self.zero_chunk = bytes(chunk_size)
+        if codec == self.CODEC_LZMA:
+            self.decompress = lzma.decompress
+        else:
+            self.decompress = zlib.decompress
+        self.compress = self._get_compress(codec)
+        # load index
+        num = self._get_num_chunks(size)
+        fh.seek(index_off)
+        data = fh.read(num * self.INDEX_SIZE)
+        if len(data) != num * self.INDEX_SIZE:
+            raise IOError("truncated chunk image file: %s" % self.file_name)
+        self.offsets = []
+        self.sizes = []
+        for off, packed_size in struct.iter_unpack(self.INDEX_FORMAT, data):
+            self.offsets.append(off)
+            self.sizes.append(packed_size)
+        # new chunks are appended after the index
+        self.end_off = index_off + len(data)
+
+    def _get_num_chunks(self, size):
+        return (size + self.chunk_size - 1) // self.chunk_size
+
+    # ----- io API -----
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return not self.read_only
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, pos, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            pos += self.pos
+        elif whence == os.SEEK_END:
+            pos += self.size
+        if pos < 0:
+            raise ValueError("negative seek position %d" % pos)
+        self.pos = pos
+        return pos
+
+    def readinto(self, buf):
+        out = memoryview(buf).cast("B")
+        num = max(min(len(out), self.size - self.pos), 0)
+        cs = self.chunk_size
+        done = 0
+        while done < num:
+            chunk_num, off = divmod(self.pos, cs)
+            chunk = self._get_chunk(chunk_num)
+            n = min(cs - off, num - done)
+            out[done : done + n] = chunk[off : off + n]
+            done += n
+            self.pos += n
+        return num
+
+    def write(self, buf):
+        if self.read_only:
+            raise IOError("Can't write: chunk image file is read-only")
+        data = memoryview(buf).cast("B")
+        num = len(data)
+        if self.pos + num > self.size:
+            self.truncate(self.pos + num)
+        cs = self.chunk_size
+        done = 0
+        while done < num:
+            chunk_num, off = divmod(self.pos, cs)
+            chunk = self._get_chunk(chunk_num, modify=True)
+            n = min(cs - off, num - done)
+            chunk[off : off + n] = data[done : done + n]
+            done += n
+            self.pos += n
+        return num
+
+    def truncate(self, size=None):
+        if self.read_only:
+            raise IOError("Can't resize: chunk image file is read-only")
+        if size is None:
+            size = self.pos
+        cs = self.chunk_size
+        old_num = len(self.offsets)
+        new_num = self._get_num_chunks(size)
+        if size > self.size:
+            # pad a partial last chunk
+            if self.size % cs:
+                last = old_num - 1
+                chunk = self._get_chunk(last, modify=True)
+                chunk.extend(bytes(min(cs, size - last * cs) - len(chunk)))
+            self.offsets.extend([0] * (new_num - old_num))
+            self.sizes.extend([0] * (new_num - old_num))
+        elif size < self.size:
+            for num in range(new_num, old_num):
+                self.cache.pop(num, None)
+                self.dirty.discard(num)
+            del self.offsets[new_num:]
+            del self.sizes[new_num:]
+            # cut a partial last chunk
+            if size % cs:
+                chunk = self._get_chunk(new_num - 1, modify=True)
+                del chunk[size % cs :]
+        self.size = size
+        self.index_dirty = True
+        return size
+
+    def flush(self):
+        if self.closed or self.read_only:
+            return
+        for num in sorted(self.dirty):
+            self._store_chunk(num, self.cache[num])
+        self.dirty.clear()
+        if self.index_dirty:
+            # the old index stays valid until the header is written
+            fh = self.fh
+            index_off = self.end_off
+            fh.seek(index_off)
+            fh.write(self._pack_index(self.offsets, self.sizes))
+            self.end_off = fh.tell()
+            fh.seek(0)
+            fh.write(
+                self._pack_header(
+                    self.codec, self.chunk_size, self.size, self.img_type, index_off
+                )
+            )
+            self.index_dirty = False
+        self.fh.flush()
+
+    def close(self):
+        if not self.closed:
+            try:
+                super().close()
+            finally:
+                self.fh.close()
+
+    # ----- chunks -----
+
+    def _get_chunk_len(self, num):
+        return min(self.chunk_size, self.size - num * self.chunk_size)
+
+    def _load_chunk(self, num):
+        packed_size = self.sizes[num]
+        if packed_size == 0:
+            return self.zero_chunk[: self._get_chunk_len(num)]
+        self.fh.seek(self.offsets[num])
+        return self.decompress(self.fh.read(packed_size))
+
+    def _get_chunk(self, num, modify=False):
+        cache = self.cache
+        chunk = cache.pop(num, None)
+        if chunk is None:
+            chunk = self._load_chunk(num)
+            # drop least recently used chunk
+            if len(cache) >= self.CACHE_CHUNKS:
+                old_num = next(iter(cache))
+                old_chunk = cache.pop(old_num)
+                if old_num in self.dirty:
+                    self.dirty.discard(old_num)
+                    self._store_chunk(old_num, old_chunk)
+        if modify:
+            if not isinstance(chunk, bytearray):
+                chunk = bytearray(chunk)
+            self.dirty.add(num)
+        cache[num] = chunk
+        return chunk
+
+    def _store_chunk(self, num, chunk):
+        if chunk == self.zero_chunk[: len(chunk)]:
+            self.offsets[num] = 0
+            self.sizes[num] = 0
+        else:
+            packed = self.compress(chunk)
+            self.fh.seek(self.end_off)
+            self.fh.write(packed)
+            self.offsets[num] = self.end_off
+            self.sizes[num] = len(packed)
+            self.end_off += len(packed)
+        self.index_dirty = True
+
+    # ----- image -----
+
+    def get_data_ranges(self):
+        """return the (start, end) byte ranges of chunks that are not zero"""
+        cs = self.chunk_size
+        ranges = []
+        for num, packed_size in enumerate(self.sizes):
+            if packed_size or num in self.dirty:
+                start = num * cs
+                end = start + self._get_chunk_len(num)
+                if ranges and ranges[-1][1] == start:
+                    ranges[-1] = (ranges[-1][0], end)
+                else:
+                    ranges.append((start, end))
+        return ranges
+
+    def write_raw(self, dst):
+        """write the raw image data to the file object dst chunk by chunk.
+
+        Zero chunks are skipped in a seekable dst, so file systems with
+        sparse files create holes.
+        """
+        self.flush()
+        sparse = dst.seekable()
+        last = len(self.sizes) - 1
+        for num in range(len(self.sizes)):
+            # the last chunk is always written to set the file size
+            if sparse and self.sizes[num] == 0 and num < last:
+                dst.seek(self._get_chunk_len(num), os.SEEK_CUR)
+                continue
+            chunk = self.cache.get(num)
+            if chunk is None:
+                chunk = self._load_chunk(num)
+            dst.write(chunk)
+        return self.size
@@ -38,3 +38,13 @@ class HDFBlockDevice(BlockDevice):
 
     def write_block(self, blk_num, data):
         return self.img_file.write_blk(blk_num, data)
+
+    def read_blocks(self, blk_num, num_blks):
+        return self.img_file.read_blk(blk_num, num_blks)
+
+    def write_blocks(self, blk_num, data):
+        num_blks = len(data) // self.block_bytes
+        return self.img_file.write_blk(blk_num, data, num_blks)
+
+    def get_data_ranges(self):
+        return self.img_file.get_data_blk_ranges()
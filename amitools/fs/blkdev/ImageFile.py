@@ -1,5 +1,7 @@
 import os
+import io
 import stat
+import errno
 import amitools.util.BlkDevTools as BlkDevTools
 
 
@@ -82,6 +84,65 @@ class ImageFile:
             self.fobj.seek(off, os.SEEK_SET)
         self.fobj.write(data)
 
+    def get_data_ranges(self):
+        """return the (start, end) byte ranges of the image that hold data.
+
+        Holes of sparse image files are found with SEEK_DATA/SEEK_HOLE. If
+        this is not supported then the whole image is returned.
+        A file object may also provide its own get_data_ranges().
+        """
+        whole = [(0, self.size)]
+        # e.g. chunk files know their zero chunks
+        if hasattr(self.fobj, "get_data_ranges"):
+            return self.fobj.get_data_ranges()
+        if not hasattr(os, "SEEK_DATA"):
+            return whole
+        # only plain files: e.g. a GzipFile reports the fd of packed data
+        if not isinstance(getattr(self.fobj, "raw", self.fobj), io.FileIO):
+            return whole
+        try:
+            fd = self.fobj.fileno()
+        except (OSError, io.UnsupportedOperation):
+            return whole
+        # lseek on the fd: restore its position for the file object
+        if not self.read_only:
+            self.fobj.flush()
+        old_pos = os.lseek(fd, 0, os.SEEK_CUR)
+        ranges = []
+        pos = 0
+        try:
+            while pos < self.size:
+                try:
+                    start = os.lseek(fd, pos, os.SEEK_DATA)
+                except OSError as e:
+                    # no more data after pos
+                    if e.errno == errno.ENXIO:
+                        break
+                    raise
+                if start >= self.size:
+                    break
+                end = min(os.lseek(fd, start, os.SEEK_HOLE), self.size)
+                ranges.append((start, end))
+                pos = end
+        except OSError:
+            ranges = whole
+        finally:
+            os.lseek(fd, old_pos, os.SEEK_SET)
+        return ranges
+
+    def get_data_blk_ranges(self):
+        """return the (first, end) block ranges of the image that hold data"""
+        bb = self.block_bytes
+        ranges = []
+        for start, end in self.get_data_ranges():
+            first = start // bb
+            last = min((end + bb - 1) // bb, self.num_blocks)
+            if ranges and ranges[-1][1] >= first:
+                ranges[-1] = (ranges[-1][0], max(last, ranges[-1][1]))
+            elif first < last:
+                ranges.append((first, last))
+        return ranges
+
     def flush(self):
         self.fobj.flush()
 
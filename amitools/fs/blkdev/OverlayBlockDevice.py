@@ -0,0 +1,242 @@
+import os
+import struct
+
+from .BlockDevice import BlockDevice
+
+
+class OverlayBlockDevice(BlockDevice):
+    """a copy-on-write overlay on top of a read-only base block device.
+
+    Written blocks are stored in a delta file and all other blocks are read
+    from the base device, so a shared base image is never modified. The
+    delta file starts with a header describing the base image followed by
+    (block number, block data) records. The block index of the records is
+    rebuilt on open.
+
+    commit() writes the modified blocks to a writable device and discard()
+    drops them.
+    """
+
+    MAGIC = b"AOVL"
+    VERSION = 1
+    # magic, version, block bytes, base blocks, base file name length
+    HEADER_FORMAT = ">4sB3xIQH"
+    HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+    REC_FORMAT = ">Q"
+    REC_SIZE = struct.calcsize(REC_FORMAT)
+
+    def __init__(self, base_blkdev, delta_file, read_only=False, base_file=None):
+        self.base = base_blkdev
+        self.delta_file = delta_file
+        self.read_only = read_only
+        self.base_file = base_file
+        self.fobj = None
+        # blk_num -> offset of block data in delta file
+        self.index = {}
+        self.data_off = 0
+        self.end_off = 0
+
+    @classmethod
+    def read_header(cls, delta_file):
+        """return (block_bytes, num_blocks, base_file) of a delta file"""
+        with open(delta_file, "rb") as fh:
+            return cls._read_header(fh)
+
+    @classmethod
+    def _read_header(cls, fh):
+        hdr = fh.read(cls.HEADER_SIZE)
+        if len(hdr) == cls.HEADER_SIZE:
+            magic, version, bb, num_blks, name_len = struct.unpack(
+                cls.HEADER_FORMAT, hdr
+            )
+            if magic == cls.MAGIC and version == cls.VERSION:
+                base_file = fh.read(name_len).decode("utf-8")
+                return bb, num_blks, base_file
+        raise IOError("invalid overlay delta file: %s" % fh.name)
+
+    def _write_header(self):
+        base_file = (self.base_file or "").encode("utf-8")
+        hdr = struct.pack(
+            self.HEADER_FORMAT,
+            self.MAGIC,
+            self.VERSION,
+            self.block_bytes,
+            self.base.num_blocks,
+            len(base_file),
+        )
+        self.fobj.seek(0)
+        self.fobj.truncate()
+        self.fobj.write(hdr + base_file)
+        self.data_off = self.end_off = self.fobj.tell()
+        self.index = {}
+
+    def open(self, geo=None, reserved=2):
+        """open the overlay and create its delta file if its missing.
+
+        Without a geometry the overlay is a raw device of the size of the
+        base device.
+        """
+        base = self.base
+        if geo is not None:
+            self._set_geometry(
+                geo.cyls, geo.heads, geo.secs, base.block_bytes, reserved
+            )
+            if self.num_blocks > base.num_blocks:
+                raise IOError(
+                    "overlay geometry too large: %d blocks but base has %d"
+                    % (self.num_blocks, base.num_blocks)
+                )
+        else:
+            self.block_bytes = base.block_bytes
+            self.block_longs = self.block_bytes // 4
+            self.num_blocks = base.num_blocks
+        if os.path.exists(self.delta_file):
+            self.fobj = open(self.delta_file, "rb" if self.read_only else "r+b")
+            bb, num_blks, base_file = self._read_header(self.fobj)
+            if not self.base_file:
+                self.base_file = base_file
+            self.data_off = self.fobj.tell()
+            self._load_index()
+            if bb != self.block_bytes or num_blks != base.num_blocks:
+                # an empty delta simply follows the base device
+                if self.index or self.read_only:
+                    raise IOError(
+                        "overlay delta file does not match base: "
+                        "%d blocks of %d bytes but base has %d of %d"
+                        % (num_blks, bb, base.num_blocks, self.block_bytes)
+                    )
+                self._write_header()
+        else:
+            if self.read_only:
+                raise IOError("overlay delta file not found: %s" % self.delta_file)
+            self.fobj = open(self.delta_file, "w+b")
+            self._write_header()
+
+    def _load_index(self):
+        fobj = self.fobj
+        rec_size = self.REC_SIZE + self.block_bytes
+        size = os.fstat(fobj.fileno()).st_size
+        off = self.data_off
+        while off + rec_size <= size:
+            fobj.seek(off)
+            (blk_num,) = struct.unpack(self.REC_FORMAT, fobj.read(self.REC_SIZE))
+            self.index[blk_num] = off + self.REC_SIZE
+            off += rec_size
+        # drop a partially written record
+        if off != size and not self.read_only:
+            fobj.truncate(off)
+        self.end_off = off
+
+    def flush(self):
+        if self.fobj and not self.read_only:
+            self.fobj.flush()
+
+    def close(self):
+        if self.fobj:
+            self.flush()
+            self.fobj.close()
+            self.fobj = None
+        self.base.close()
+
+    def _check_range(self, blk_num, num_blks):
+        if blk_num < 0 or blk_num + num_blks > self.num_blocks:
+            raise ValueError(
+                "Invalid Overlay block range: got %d+%d but max is %d"
+                % (blk_num, num_blks, self.num_blocks)
+            )
+
+    def read_block(self, blk_num, num_blks=1):
+        self._check_range(blk_num, num_blks)
+        index = self.index
+        bb = self.block_bytes
+        data = None
+        for i in range(num_blks):
+            off = index.get(blk_num + i)
+            if off is not None:
+                if data is None:
+                    data = bytearray(self.base.read_blocks(blk_num, num_blks))
+                self.fobj.seek(off)
+                data[i * bb : (i + 1) * bb] = self.fobj.read(bb)
+        if data is None:
+            return self.base.read_blocks(blk_num, num_blks)
+        return bytes(data)
+
+    def write_block(self, blk_num, data, num_blks=1):
+        if self.read_only:
+            raise IOError("Can't write block: overlay is read-only")
+        self._check_range(blk_num, num_blks)
+        bb = self.block_bytes
+        if len(data) != bb * num_blks:
+            raise ValueError(
+                "Invalid Overlay block size written: got %d but size is %d"
+                % (len(data), bb)
+            )
+        fobj = self.fobj
+        index = self.index
+        for i in range(num_blks):
+            blk = blk_num + i
+            chunk = bytes(data[i * bb : (i + 1) * bb])
+            off = index.get(blk)
+            if off is None:
+                # append a new record
+                fobj.seek(self.end_off)
+                fobj.write(struct.pack(self.REC_FORMAT, blk) + chunk)
+                index[blk] = self.end_off + self.REC_SIZE
+                self.end_off += self.REC_SIZE + bb
+            else:
+                fobj.seek(off)
+                fobj.write(chunk)
+
+    def read_blocks(self, blk_num, num_blks):
+        return self.read_block(blk_num, num_blks)
+
+    def write_blocks(self, blk_num, data):
+        self.write_block(blk_num, data, len(data) // self.block_bytes)
+
+    def get_num_delta_blocks(self):
+        """return the number of blocks stored in the delta file"""
+        return len(self.index)
+
+    def get_delta_blocks(self):
+        """return the sorted numbers of all modified blocks"""
+        return sorted(self.index)
+
+    def commit(self, blkdev=None):
+        """write the modified blocks to blkdev and clear the delta.
+
+        blkdev defaults to the base device, which must be writable then.
+        Return the number of committed blocks.
+        """
+        if self.read_only:
+            raise IOError("Can't commit blocks: overlay is read-only")
+        if blkdev is None:
+            blkdev = self.base
+        blks = self.get_delta_blocks()
+        for blk_num in blks:
+            self.fobj.seek(self.index[blk_num])
+            blkdev.write_blocks(blk_num, self.fobj.read(self.block_bytes))
+        blkdev.flush()
+        self.discard()
+        return len(blks)
+
+    def discard(self):
+        """drop all modified blocks. return the number of dropped blocks"""
+        if self.read_only:
+            raise IOError("Can't discard blocks: overlay is read-only")
+        num = len(self.index)
+        self.fobj.truncate(self.data_off)
+        self.index = {}
+        self.end_off = self.data_off
+        return num
+
+    def get_data_ranges(self):
+        ranges = self.base.get_data_ranges()
+        ranges += [(blk, blk + 1) for blk in self.index]
+        result = []
+        for first, last in sorted(ranges):
+            last = min(last, self.num_blocks)
+            if result and result[-1][1] >= first:
+                result[-1] = (result[-1][0], max(last, result[-1][1]))
+            elif first < last:
+                result.append((first, last))
+        return result
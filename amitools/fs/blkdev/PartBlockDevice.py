@@ -66,3 +66,41 @@ class PartBlockDevice(BlockDevice):
         num_blks = self.sec_per_blk
         off = self.blk_off + (blk_num * num_blks)
         self.raw_blkdev.write_block(off, data, num_blks=num_blks)
+
+    def get_data_ranges(self):
+        # map raw block ranges to the blocks of this partition
+        spb = self.sec_per_blk
+        begin = self.blk_off
+        end = begin + self.num_blocks * spb
+        ranges = []
+        for first, last in self.raw_blkdev.get_data_ranges():
+            first = max(first, begin)
+            last = min(last, end)
+            if first < last:
+                ranges.append(((first - begin) // spb, (last - begin + spb - 1) // spb))
+        return ranges
+
+    def _check_range(self, blk_num, num_blks):
+        if blk_num + num_blks > self.num_blocks:
+            raise ValueError(
+                "Invalid Part block range: got %d+%d but max is %d"
+                % (blk_num, num_blks, self.num_blocks)
+            )
+
+    def read_blocks(self, blk_num, num_blks):
+        self._check_range(blk_num, num_blks)
+        n = self.sec_per_blk
+        off = self.blk_off + (blk_num * n)
+        return self.raw_blkdev.read_block(off, num_blks=num_blks * n)
+
+    def write_blocks(self, blk_num, data):
+        if len(data) % self.block_bytes != 0:
+            raise ValueError(
+                "Invalid Part blocks size written: got %d but block size is %d"
+                % (len(data), self.block_bytes)
+            )
+        num_blks = len(data) // self.block_bytes
+        self._check_range(blk_num, num_blks)
+        n = self.sec_per_blk
+        off = self.blk_off + (blk_num * n)
+        self.raw_blkdev.write_block(off, data, num_blks=num_blks * n)
@@ -32,3 +32,12 @@ class RawBlockDevice(BlockDevice):
 
     def write_block(self, blk_num, data, num_blks=1):
         self.img_file.write_blk(blk_num, data, num_blks)
+
+    def read_blocks(self, blk_num, num_blks):
+        return self.img_file.read_blk(blk_num, num_blks)
+
+    def write_blocks(self, blk_num, data):
+        self.img_file.write_blk(blk_num, data, len(data) // self.block_bytes)
+
+    def get_data_ranges(self):
+        return self.img_file.get_data_blk_ranges()
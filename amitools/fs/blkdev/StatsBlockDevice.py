@@ -0,0 +1,265 @@
+import time
+import collections
+
+from .BlockDevice import BlockDevice
+
+
+class _OpStats:
+    """counters of one kind of block operation"""
+
+    def __init__(self):
+        self.num_ops = 0
+        self.num_blks = 0
+        self.num_seq = 0
+        self.time = 0.0
+        # number of ops with a latency below 2^i us
+        self.hist = []
+
+    def count(self, num_blks, seq, delta):
+        self.num_ops += 1
+        self.num_blks += num_blks
+        if seq:
+            self.num_seq += 1
+        self.time += delta
+        slot = int(delta * 1000000).bit_length()
+        hist = self.hist
+        if slot >= len(hist):
+            hist.extend([0] * (slot + 1 - len(hist)))
+        hist[slot] += 1
+
+
+class StatsBlockDevice(BlockDevice):
+    """record the I/O of a block device.
+
+    All calls are passed on to the wrapped block device. The number of
+    operations, blocks, sequential accesses and the time spent are counted
+    for reads and writes. An access is sequential if it starts at the block
+    right after the last one. Otherwise the device has to seek. The latency
+    of each operation is sorted into a histogram with power of two slots.
+    With heatmap enabled the accesses of each block are counted, too.
+
+    All other attributes (e.g. the geometry) are taken from the wrapped
+    device.
+    """
+
+    def __init__(self, blkdev, heatmap=False):
+        self.blkdev = blkdev
+        self.heatmap = heatmap
+        self.reset_stats()
+
+    def __getattr__(self, name):
+        # only called for attributes not found in the wrapper
+        if name == "blkdev":
+            raise AttributeError(name)
+        return getattr(self.blkdev, name)
+
+    def _count(self, stats, heat_map, blk_num, num_blks, delta):
+        seq = blk_num == self.next_blk
+        self.next_blk = blk_num + num_blks
+        stats.count(num_blks, seq, delta)
+        if heat_map is not None:
+            heat_map.update(range(blk_num, blk_num + num_blks))
+
+    # ----- API -----
+
+    def create(self, *args, **kw_args):
+        return self.blkdev.create(*args, **kw_args)
+
+    def open(self, *args, **kw_args):
+        return self.blkdev.open(*args, **kw_args)
+
+    def close(self):
+        self.blkdev.close()
+
+    def flush(self):
+        start = time.perf_counter()
+        self.blkdev.flush()
+        self.flush_time += time.perf_counter() - start
+        self.num_flushes += 1
+
+    def read_block(self, blk_num, num_blks=1):
+        start = time.perf_counter()
+        # not all devices read more than one block at once
+        if num_blks == 1:
+            data = self.blkdev.read_block(blk_num)
+        else:
+            data = self.blkdev.read_block(blk_num, num_blks=num_blks)
+        delta = time.perf_counter() - start
+        self._count(self.reads, self.read_map, blk_num, num_blks, delta)
+        return data
+
+    def write_block(self, blk_num, data, num_blks=1):
+        start = time.perf_counter()
+        if num_blks == 1:
+            self.blkdev.write_block(blk_num, data)
+        else:
+            self.blkdev.write_block(blk_num, data, num_blks=num_blks)
+        delta = time.perf_counter() - start
+        self._count(self.writes, self.write_map, blk_num, num_blks, delta)
+
+    def read_blocks(self, blk_num, num_blks):
+        start = time.perf_counter()
+        data = self.blkdev.read_blocks(blk_num, num_blks)
+        delta = time.perf_counter() - start
+        self._count(self.reads, self.read_map, blk_num, num_blks, delta)
+        return data
+
+    def write_blocks(self, blk_num, data):
+        start = time.perf_counter()
+        self.blkdev.write_blocks(blk_num, data)
+        delta = time.perf_counter() - start
+        num_blks = len(data) // self.blkdev.block_bytes
+        self._count(self.writes, self.write_map, blk_num, num_blks, delta)
+
+    def get_data_ranges(self):
+        return self.blkdev.get_data_ranges()
+
+    def get_geometry(self):
+        return self.blkdev.get_geometry()
+
+    def get_chs_str(self):
+        return self.blkdev.get_chs_str()
+
+    def get_options(self):
+        return self.blkdev.get_options()
+
+    def get_block_size_str(self):
+        return self.blkdev.get_block_size_str()
+
+    def dump(self):
+        self.blkdev.dump()
+
+    # ----- stats -----
+
+    def reset_stats(self):
+        """clear all counters"""
+        self.reads = _OpStats()
+        self.writes = _OpStats()
+        self.num_flushes = 0
+        self.flush_time = 0.0
+        self.next_blk = None
+        if self.heatmap:
+            self.read_map = collections.Counter()
+            self.write_map = collections.Counter()
+        else:
+            self.read_map = None
+            self.write_map = None
+
+    def get_stats(self):
+        """return a dict with the counters of reads, writes and flushes"""
+        bb = self.blkdev.block_bytes
+        r = self.reads
+        w = self.writes
+        num_ops = r.num_ops + w.num_ops
+        num_seq = r.num_seq + w.num_seq
+        return {
+            "reads": r.num_ops,
+            "read_blocks": r.num_blks,
+            "read_bytes": r.num_blks * bb,
+            "read_seq": r.num_seq,
+            "read_time": r.time,
+            "writes": w.num_ops,
+            "write_blocks": w.num_blks,
+            "write_bytes": w.num_blks * bb,
+            "write_seq": w.num_seq,
+            "write_time": w.time,
+            "flushes": self.num_flushes,
+            "flush_time": self.flush_time,
+            "seeks": num_ops - num_seq,
+            "seq_ratio": num_seq / num_ops if num_ops else 0.0,
+        }
+
+    def get_latency_histogram(self):
+        """return a list of (max_us, num_reads, num_writes).
+
+        The ops of a slot took less than max_us micro seconds and at least
+        the max_us of the slot before. Leading empty slots are dropped.
+        """
+        r = self.reads.hist
+        w = self.writes.hist
+        num = max(len(r), len(w))
+        r = r + [0] * (num - len(r))
+        w = w + [0] * (num - len(w))
+        result = [(1 << i, r[i], w[i]) for i in range(num)]
+        while result and result[0][1:] == (0, 0):
+            result.pop(0)
+        return result
+
+    def get_heatmap(self, num_regions=16):
+        """return a list of (first_blk, end_blk, num_reads, num_writes).
+
+        The device is split into num_regions regions of equal size and the
+        block accesses in each region are summed up. Return None if the
+        heatmap is not enabled.
+        """
+        if not self.heatmap:
+            return None
+        num_blocks = self.blkdev.num_blocks
+        num_regions = max(1, min(num_regions, num_blocks))
+        size = (num_blocks + num_regions - 1) // num_regions
+        reads = [0] * num_regions
+        writes = [0] * num_regions
+        for blk_num, num in self.read_map.items():
+            reads[min(blk_num // size, num_regions - 1)] += num
+        for blk_num, num in self.write_map.items():
+            writes[min(blk_num // size, num_regions - 1)] += num
+        result = []
+        for i in range(num_regions):
+            first = i * size
+            end = min(first + size, num_blocks)
+            if first < end:
+                result.append((first, end, reads[i], writes[i]))
+        return result
+
+    def dump_stats(self, write=print, num_regions=16):
+        """write the stats as text lines"""
+        s = self.get_stats()
+        write("I/O stats:   ops   seq%   blocks        bytes   time ms")
+        for kind in ("read", "write"):
+            num = s[kind + "s"]
+            seq = s[kind + "_seq"] * 100.0 / num if num else 0.0
+            write(
+                "  %-6s %7d %6.1f %8d %12d %9.3f"
+                % (
+                    kind,
+                    num,
+                    seq,
+                    s[kind + "_blocks"],
+                    s[kind + "_bytes"],
+                    s[kind + "_time"] * 1000.0,
+                )
+            )
+        write("  %-6s %7d %38.3f" % ("flush", s["flushes"], s["flush_time"] * 1000.0))
+        write("  seeks: %d, sequential: %.1f%%" % (s["seeks"], s["seq_ratio"] * 100.0))
+        hist = self.get_latency_histogram()
+        if hist:
+            write("latency:         reads   writes")
+            for max_us, num_reads, num_writes in hist:
+                write(
+                    "  < %8s %8d %8d" % (_get_time_str(max_us), num_reads, num_writes)
+                )
+        heatmap = self.get_heatmap(num_regions)
+        if heatmap:
+            max_num = max(r + w for _, _, r, w in heatmap)
+            write("heatmap:      blocks       reads   writes")
+            for first, end, num_reads, num_writes in heatmap:
+                bar = ""
+                if max_num > 0:
+                    bar = "#" * ((num_reads + num_writes) * 32 // max_num)
+                line = "  %9d-%-9d %8d %8d  %s" % (
+                    first,
+                    end - 1,
+                    num_reads,
+                    num_writes,
+                    bar,
+                )
+                write(line.rstrip())
+
+
+def _get_time_str(us):
+    if us < 1000:
+        return "%dus" % us
+    elif us < 1000000:
+        return "%.3gms" % (us / 1000.0)
+    else:
+        return "%.3gs" % (us / 1000000.0)
@@ -152,10 +152,8 @@ class Block:
         self._put_long(self.chk_loc, self.calc_chksum)
 
     def _calc_chksum(self):
-        chksum = 0
-        for i in range(self.block_longs):
-            if i != self.chk_loc:
-                chksum += self._get_long(i)
+        longs = struct.unpack_from(">%dI" % self.block_longs, self.data)
+        chksum = sum(longs) - longs[self.chk_loc]
         return (-chksum) & 0xFFFFFFFF
 
     def _get_timestamp(self, loc):
@@ -5,6 +5,7 @@ from .Block import Block
 from ..ProtectFlags import ProtectFlags
 from ..TimeStamp import TimeStamp
 from ..FSString import FSString
+from ..MetaInfo import MetaInfo
 
 
 class DirCacheRecord:
@@ -36,7 +37,12 @@ class DirCacheRecord:
         self.size = d[1]
         self.protect = d[2]
         self.mod_ts = TimeStamp(d[5], d[6], d[7])
+        # secondary type of the entry as a signed byte
         self.type = data[off + 22]
+        if self.type >= 0x80:
+            self.sub_type = (self.type - 0x100) & 0xFFFFFFFF
+        else:
+            self.sub_type = self.type
         # name
         name_len = data[off + 23]
         name_off = off + 24
@@ -64,6 +70,7 @@ class DirCacheRecord:
             ts.mins,
             ts.ticks,
         )
+        data[off + 22] = self.sub_type & 0xFF
         # name
         name = self.name.get_ami_str()
         name_len = len(name)
@@ -78,6 +85,15 @@ class DirCacheRecord:
         data[comment_off : comment_off + comment_len] = comment
         return off + self.get_size()
 
+    def is_dir(self):
+        return self.sub_type == Block.ST_USERDIR
+
+    def is_file(self):
+        return self.sub_type == Block.ST_FILE
+
+    def get_meta_info(self):
+        return MetaInfo(self.protect, self.mod_ts, self.comment)
+
     def dump(self):
         print("DirCacheRecord(%s)(size=%d)" % (self.offset, self.get_size()))
         print("\tentry:      %s" % self.entry)
@@ -1,11 +1,56 @@
 import os
+import time
 from amitools.fs.block.rdb.PartitionBlock import *
 from amitools.fs.blkdev.PartBlockDevice import PartBlockDevice
 import amitools.util.ByteSize as ByteSize
 import amitools.fs.DosType as DosType
 
 
+class TransferStats:
+    """statistics of a partition export or import"""
+
+    def __init__(self, total_bytes):
+        self.total_bytes = total_bytes
+        self.done_bytes = 0
+        self.zero_bytes = 0
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add(self, num_bytes):
+        self.done_bytes += num_bytes
+        self.elapsed = time.perf_counter() - self.start
+
+    def stop(self):
+        self.elapsed = time.perf_counter() - self.start
+
+    def get_percent(self):
+        if self.total_bytes == 0:
+            return 100.0
+        return 100.0 * self.done_bytes / self.total_bytes
+
+    def get_throughput(self):
+        """return bytes per second"""
+        if self.elapsed <= 0:
+            return 0
+        return int(self.done_bytes / self.elapsed)
+
+    def __str__(self):
+        res = "%s in %.2fs (%s/s)" % (
+            ByteSize.to_byte_size_str(self.done_bytes),
+            self.elapsed,
+            ByteSize.to_byte_size_str(self.get_throughput()),
+        )
+        if self.zero_bytes:
+            res += ", %s sparse" % ByteSize.to_byte_size_str(self.zero_bytes)
+        return res
+
+
 class Partition:
+    # bytes transferred at once in export/import
+    COPY_BUFFER_BYTES = 1024 * 1024
+    # all-zero runs of this size are written as holes on export
+    HOLE_BYTES = 64 * 1024
+
     def __init__(self, blkdev, blk_num, num, cyl_blks, rdisk):
         self.blkdev = blkdev
         self.blk_num = blk_num
@@ -158,19 +203,70 @@ class Partition:
 
     # ----- Import/Export -----
 
-    def export_data(self, file_name):
-        """Export contents of partition to file"""
+    def export_data(self, file_name, sparse=True, progress=None):
+        """Export contents of partition to file.
+
+        The partition is read in large chunks of blocks. If sparse is
+        enabled then all-zero runs are not written and become holes in the
+        file. progress is called with the TransferStats after each chunk.
+        Returns the TransferStats.
+        """
         blkdev = self.create_blkdev()
         blkdev.open()
         num_blks = blkdev.num_blocks
+        blk_size = blkdev.block_bytes
+        chunk_blks = max(self.COPY_BUFFER_BYTES // blk_size, 1)
+        stats = TransferStats(num_blks * blk_size)
         with open(file_name, "wb") as fh:
-            for b in range(num_blks):
-                data = blkdev.read_block(b)
-                fh.write(data)
+            b = 0
+            while b < num_blks:
+                n = min(chunk_blks, num_blks - b)
+                data = blkdev.read_blocks(b, n)
+                if sparse:
+                    self._write_sparse(fh, b * blk_size, data, stats)
+                else:
+                    fh.write(data)
+                b += n
+                stats.add(len(data))
+                if progress:
+                    progress(stats)
+            # make sure trailing holes are part of the file
+            fh.truncate(stats.total_bytes)
         blkdev.close()
+        stats.stop()
+        return stats
+
+    def _write_sparse(self, fh, off, data, stats):
+        """write data at off but skip all-zero runs"""
+        hole = self.HOLE_BYTES
+        zero = bytes(hole)
+        mv = memoryview(data)
+        n = len(data)
+        run = None
+        for o in range(0, n + hole, hole):
+            if o < n:
+                seg = data[o : o + hole]
+                is_zero = seg == zero[: len(seg)]
+            else:
+                is_zero = True
+            if not is_zero:
+                if run is None:
+                    run = o
+            else:
+                if run is not None:
+                    fh.seek(off + run)
+                    fh.write(mv[run:o])
+                    run = None
+                if o < n:
+                    stats.zero_bytes += len(seg)
+
+    def import_data(self, file_name, pad=False, progress=None):
+        """Import contents of partition from file.
 
-    def import_data(self, file_name, pad=False):
-        """Import contents of partition from file"""
+        The file is copied in large chunks of blocks. With pad enabled a
+        trailing partial block is padded with zeros. progress is called
+        with the TransferStats after each chunk. Returns the TransferStats.
+        """
         part_dev = self.create_blkdev()
         part_dev.open()
         part_blks = part_dev.num_blocks
@@ -178,7 +274,6 @@ class Partition:
         total = part_blks * blk_size
         # open image
         file_size = os.path.getsize(file_name)
-        file_blks = file_size // blk_size
         if not pad:
             if file_size % blk_size != 0:
                 raise ValueError("image file not block size aligned!")
@@ -193,11 +288,22 @@ class Partition:
                 "import image too large: partition=%d != file=%d" % (total, file_size)
             )
         # copy image
+        chunk_bytes = max(self.COPY_BUFFER_BYTES // blk_size, 1) * blk_size
+        stats = TransferStats(file_size)
         with open(file_name, "rb") as fh:
-            for b in range(file_blks):
-                data = fh.read(blk_size)
+            b = 0
+            while True:
+                data = fh.read(chunk_bytes)
                 n = len(data)
-                if n < blk_size:
-                    data += bytearray(blk_size - n)
-                part_dev.write_block(b, data)
+                if n == 0:
+                    break
+                stats.add(n)
+                if n % blk_size != 0:
+                    data += bytes(blk_size - n % blk_size)
+                part_dev.write_blocks(b, data)
+                b += len(data) // blk_size
+                if progress:
+                    progress(stats)
         part_dev.close()
+        stats.stop()
+        return stats
@@ -1,4 +1,5 @@
 from amitools.fs.validate.Log import Log
+from amitools.util.HexDump import get_diff_line_offsets
 import struct
 
 
@@ -55,35 +56,36 @@ class BitmapScan:
         """calculate allocation bits and verify with stored ones"""
         # block range
         blkdev = self.block_scan.blkdev
-        # first bitmap data
-        cur_pos = 0
-        bm_blk = 0
-        cur_data = self.bm_blocks[0].bitmap
-        blk_size = len(cur_data)
-        # loop throug all bitmap longwords
-        lw = 0
-        blk_num = blkdev.reserved
+        # all bitmap data
+        blk_size = len(self.bm_blocks[0].bitmap)
+        got_data = b"".join(bi.bitmap for bi in self.bm_blocks)
+        expect_data = self.calc_bitmap()
+        # compare all but the last long word in bulk
         max_lw = self.num_bm_lwords - 1
-        while lw < max_lw:
-            got = struct.unpack_from(">I", cur_data, cur_pos)[0]
-            expect = self.calc_lword(blk_num)
-            if got != expect:
-                self.log.msg(
-                    Log.ERROR,
-                    "Invalid bitmap allocation (@%d: #%d+%d) blks [%d...%d] got=%08x expect=%08x"
-                    % (lw, bm_blk, cur_pos / 4, blk_num, blk_num + 31, got, expect),
-                )
-            lw += 1
-            blk_num += 32
-            # fetch next bitmap data block
-            cur_pos += 4
-            if cur_pos == blk_size:
-                bm_blk += 1
-                cur_data = self.bm_blocks[bm_blk].bitmap
-                cur_pos = 0
+        num_bytes = max_lw * 4
+        diff_offs = get_diff_line_offsets(
+            got_data[:num_bytes], expect_data[:num_bytes], 4
+        )
+        for off in diff_offs:
+            lw = off // 4
+            bm_blk = off // blk_size
+            cur_pos = off % blk_size
+            blk_num = blkdev.reserved + lw * 32
+            got = struct.unpack_from(">I", got_data, off)[0]
+            expect = struct.unpack_from(">I", expect_data, off)[0]
+            self.log.msg(
+                Log.ERROR,
+                "Invalid bitmap allocation (@%d: #%d+%d) blks [%d...%d] got=%08x expect=%08x"
+                % (lw, bm_blk, cur_pos / 4, blk_num, blk_num + 31, got, expect),
+            )
         # the last long word
-        got = struct.unpack_from(">I", cur_data, cur_pos)[0] & self.last_mask
-        expect = self.calc_lword(blk_num) & self.last_mask
+        lw = max_lw
+        off = lw * 4
+        bm_blk = off // blk_size
+        cur_pos = off % blk_size
+        blk_num = blkdev.reserved + lw * 32
+        got = struct.unpack_from(">I", got_data, off)[0] & self.last_mask
+        expect = struct.unpack_from(">I", expect_data, off)[0] & self.last_mask
         if got != expect:
             self.log.msg(
                 Log.ERROR,
@@ -99,6 +101,20 @@ class BitmapScan:
                 ),
             )
 
+    def calc_bitmap(self):
+        """calculate the bitmap data: the bits of all available blocks are
+        cleared. only the available blocks are visited"""
+        reserved = self.block_scan.blkdev.reserved
+        num_bits = self.num_bm_lwords * 32
+        data = bytearray(b"\xff" * (self.num_bm_lwords * 4))
+        for blk_num in self.block_scan.get_available_blocks():
+            bit_num = blk_num - reserved
+            if 0 <= bit_num < num_bits:
+                # bit 0 is the lowest bit of a big endian long
+                lw, bit = divmod(bit_num, 32)
+                data[lw * 4 + 3 - (bit >> 3)] &= ~(1 << (bit & 7)) & 0xFF
+        return data
+
     def calc_lword(self, blk_num):
         """calcuate the bitmap lword"""
         value = 0
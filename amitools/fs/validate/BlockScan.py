@@ -10,6 +10,8 @@ from amitools.fs.block.BitmapBlock import BitmapBlock
 from amitools.fs.block.BitmapExtBlock import BitmapExtBlock
 from amitools.fs.block.CommentBlock import CommentBlock
 from amitools.fs.FSString import FSString
+from amitools.fs.FSError import FSError
+from amitools.fs.ADFSBitmap import ADFSBitmap
 import amitools.fs.DosType as DosType
 
 from amitools.fs.validate.Log import Log
@@ -73,39 +75,95 @@ class BlockScan:
         self.log.msg(
             Log.DEBUG, "block: checking range: +%d num=%d" % (begin_blk, num_blk)
         )
+        self._scan_ranges([(begin_blk, begin_blk + num_blk)])
+        return self.any_chance_of_fs()
 
-        # scan all blocks
-        for n in range(num_blk):
-            blk_num = n + begin_blk
+    def scan_used(self, root, progress=lambda x: x):
+        """Quick scan: only scan the blocks marked as used in the bitmap of
+        the given root block that do not lie in holes of the image.
+        Return True if there is a chance that a file system will be found there
+        """
+        used_ranges = self.get_used_ranges(root)
+        data_ranges = self.blkdev.get_data_ranges()
+        ranges = self._intersect_ranges(used_ranges, data_ranges)
+        num_blk = sum(end - begin for begin, end in ranges)
+        self.log.msg(
+            Log.DEBUG,
+            "block: quick scan: %d ranges num=%d" % (len(ranges), num_blk),
+        )
+        self._scan_ranges(ranges)
+        return self.any_chance_of_fs()
 
-            # read/get block
-            bi = self.get_block(blk_num)
+    def get_used_ranges(self, root):
+        """return the block ranges marked as used in the bitmap.
+        If the bitmap can't be read then all blocks are returned."""
+        bitmap = ADFSBitmap(root)
+        try:
+            bitmap.read()
+        except FSError as e:
+            self.log.msg(Log.WARN, "block: can't read bitmap: %s" % e, root.blk_num)
+            return [(self.blkdev.reserved, self.blkdev.num_blocks)]
+        return bitmap.get_used_ranges()
 
-            # own key ok?
-            if bi != None:
-                if bi.blk_status == self.BS_TYPE:
-                    if bi.own_key != None and bi.own_key != blk_num:
-                        self.log.msg(
-                            Log.ERROR,
-                            "Own key is invalid: %d type: %d"
-                            % (bi.own_key, bi.blk_type),
-                            blk_num,
-                        )
+    @staticmethod
+    def _intersect_ranges(a_ranges, b_ranges):
+        """intersect two sorted lists of (first, end) block ranges"""
+        res = []
+        i = 0
+        j = 0
+        while i < len(a_ranges) and j < len(b_ranges):
+            a_begin, a_end = a_ranges[i]
+            b_begin, b_end = b_ranges[j]
+            begin = max(a_begin, b_begin)
+            end = min(a_end, b_end)
+            if begin < end:
+                res.append((begin, end))
+            if a_end < b_end:
+                i += 1
+            else:
+                j += 1
+        return res
+
+    def _scan_ranges(self, ranges):
+        """read and classify all blocks in the given ranges"""
+        for begin_blk, end_blk in ranges:
+            for blk_num in range(begin_blk, end_blk):
+                # read/get block
+                bi = self.get_block(blk_num)
 
-            # first summary after block scan
-            num_error_blocks = len(self.map_status[self.BS_READ_ERROR])
-            if num_error_blocks > 0:
-                self.log.msg(
-                    Log.ERROR, "%d unreadable error blocks found" % num_error_blocks
-                )
-            num_valid_blocks = len(self.map_status[self.BS_VALID])
-            if num_valid_blocks > 0:
-                self.log.msg(
-                    Log.INFO, "%d valid but unknown blocks found" % num_valid_blocks
-                )
-            num_invalid_blocks = len(self.map_status[self.BS_INVALID])
-            if num_invalid_blocks > 0:
-                self.log.msg(Log.INFO, "%d invalid blocks found" % num_invalid_blocks)
+                # own key ok?
+                if bi != None:
+                    if bi.blk_status == self.BS_TYPE:
+                        if bi.own_key != None and bi.own_key != blk_num:
+                            self.log.msg(
+                                Log.ERROR,
+                                "Own key is invalid: %d type: %d"
+                                % (bi.own_key, bi.blk_type),
+                                blk_num,
+                            )
+
+        # first summary after block scan
+        num_error_blocks = len(self.map_status[self.BS_READ_ERROR])
+        if num_error_blocks > 0:
+            self.log.msg(
+                Log.ERROR, "%d unreadable error blocks found" % num_error_blocks
+            )
+        num_valid_blocks = len(self.map_status[self.BS_VALID])
+        if num_valid_blocks > 0:
+            self.log.msg(
+                Log.INFO, "%d valid but unknown blocks found" % num_valid_blocks
+            )
+        num_invalid_blocks = len(self.map_status[self.BS_INVALID])
+        if num_invalid_blocks > 0:
+            self.log.msg(Log.INFO, "%d invalid blocks found" % num_invalid_blocks)
+
+    def get_available_blocks(self):
+        """return the numbers of all blocks read so far"""
+        res = []
+        for bis in self.map_status:
+            for bi in bis:
+                res.append(bi.blk_num)
+        return res
 
     def read_block(self, blk_num, is_bm=False, is_bm_ext=False):
         """read block from device, decode it, and return block info instance"""
@@ -221,7 +279,7 @@ class BlockScan:
         except IOError as e:
             self.log.msg(Log.ERROR, "Can't read block", blk_num)
             bi = BlockInfo(blk_num)
-            bi.blk_status = BS_READ_ERROR
+            bi.blk_status = self.BS_READ_ERROR
 
         # sort block info into map and arrays assigned by status/type
         self.block_map[blk_num] = bi
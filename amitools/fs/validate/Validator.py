@@ -126,6 +126,25 @@ class Validator:
         self.bitmap_scan = BitmapScan(self.block_scan, self.log)
         self.bitmap_scan.scan_bitmap(self.root)
 
+    def scan_blocks(self, deep=False):
+        """Step 6: read and classify the remaining blocks.
+        The quick scan only reads blocks marked as used in the bitmap that
+        do not lie in holes of the image. A deep scan reads all blocks.
+        Run it after the bitmap scan as it makes all read blocks available.
+        """
+        if deep:
+            self.block_scan.scan_all(progress=self.progress)
+        else:
+            self.block_scan.scan_used(self.root, progress=self.progress)
+        self.log.msg(
+            Log.INFO,
+            "Scanned %d blocks (%s)"
+            % (
+                len(self.block_scan.get_available_blocks()),
+                "deep" if deep else "quick",
+            ),
+        )
+
     def get_summary(self):
         """Return (errors, warnings) of log"""
         num_errors = self.log.get_num_level(Log.ERROR)
@@ -3,6 +3,8 @@ from .kickrom import KickRomAccess, Loader
 from .remusfile import RemusFile, RemusFileSet
 from .residentscan import ResidentScan
 from .romaccess import RomAccess
+from .romcache import RomModuleCache
+from .romindex import RomIndex
 from .rombuilder import RomBuilder, KickRomBuilder, ExtRomBuilder
 from .rompatcher import RomPatcher
 from .romsplitter import RomSplitter
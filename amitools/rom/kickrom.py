@@ -1,9 +1,12 @@
 """work on a Kickstart ROM"""
 
 import os
+import sys
+import array
 import struct
 import logging
 
+from amitools.util.HexDump import get_diff_line_offsets
 from .romaccess import RomAccess
 
 
@@ -16,6 +19,8 @@ class KickRomAccess(RomAccess):
     ROMHDR_256K = 0x11114EF9
     ROMHDR_512K = 0x11144EF9
     ROMHDR_EXT = 0x11144EF9
+    # array type code of an unsigned 32 bit long
+    LONG_TYPECODE = "I" if array.array("I").itemsize == 4 else "L"
 
     def __init__(self, rom_data):
         RomAccess.__init__(self, rom_data)
@@ -87,20 +92,47 @@ class KickRomAccess(RomAccess):
     def check_magic_reset(self):
         return self.read_word(0xD0) == 0x4E70
 
+    def _sum_longs(self, data, start, end, skip_off=None):
+        """return the plain sum of all longs in [start, end)"""
+        longs = array.array(self.LONG_TYPECODE)
+        longs.frombytes(memoryview(data)[start:end])
+        if sys.byteorder == "little":
+            longs.byteswap()
+        total = sum(longs)
+        if skip_off is not None and skip_off % 4 == 0 and start <= skip_off < end:
+            total -= longs[(skip_off - start) // 4]
+        return total
+
     def calc_check_sum(self, skip_off=None):
         """Check internal kickstart checksum and return True if is correct"""
-        chk_sum = 0
         num_longs = self.size // 4
-        off = 0
+        chk_sum = self._sum_longs(self.rom_data, 0, num_longs * 4, skip_off)
+        # fold carries back in: same as adding the carry after every long
         max_u32 = 0xFFFFFFFF
-        for i in range(num_longs):
-            val = struct.unpack_from(">I", self.rom_data, off)[0]
-            if off != skip_off:
-                chk_sum += val
-            off += 4
-            if chk_sum > max_u32:
-                chk_sum = chk_sum & max_u32
-                chk_sum += 1
+        while chk_sum > max_u32:
+            chk_sum = (chk_sum & max_u32) + (chk_sum >> 32)
+        return max_u32 - chk_sum
+
+    def update_check_sum(self, old_rom, block_size=4096):
+        """return the new check sum based on the one of an older ROM image.
+
+        old_rom must have the same size and a valid check sum. Only the
+        blocks that differ between both images are summed up.
+        """
+        sum_off = self.size - 0x18
+        max_u32 = 0xFFFFFFFF
+        # sum of all other longs in old rom (modulo max_u32)
+        chk_sum = max_u32 - struct.unpack_from(">I", old_rom, sum_off)[0]
+        end = self.size // 4 * 4
+        offs = get_diff_line_offsets(old_rom, self.rom_data, block_size, block_size)
+        for off in offs:
+            blk_end = min(off + block_size, end)
+            chk_sum += self._sum_longs(self.rom_data, off, blk_end, sum_off)
+            chk_sum -= self._sum_longs(old_rom, off, blk_end, sum_off)
+        # only an all zero rom sums up to zero
+        chk_sum %= max_u32
+        if chk_sum == 0:
+            chk_sum = max_u32
         return max_u32 - chk_sum
 
     def verify_check_sum(self):
@@ -115,8 +147,13 @@ class KickRomAccess(RomAccess):
         sum_off = self.size - 0x18
         return self.calc_check_sum(sum_off)
 
-    def write_check_sum(self):
-        cs = self.recalc_check_sum()
+    def write_check_sum(self, old_rom=None):
+        """write the check sum. with an old_rom of the same size its
+        check sum is updated with the changed blocks only"""
+        if old_rom is not None and len(old_rom) == self.size:
+            cs = self.update_check_sum(old_rom)
+        else:
+            cs = self.recalc_check_sum()
         sum_off = self.size - 0x18
         self.write_long(sum_off, cs)
         return cs
@@ -145,10 +182,10 @@ class KickRomAccess(RomAccess):
         self.write_word(12, rom_rev[0])
         self.write_word(14, rom_rev[1])
 
-    def write_ext_footer(self):
+    def write_ext_footer(self, old_rom=None):
         self.write_footer()
         self.write_rom_size_field()
-        self.write_check_sum()
+        self.write_check_sum(old_rom)
 
     def write_footer(self):
         off = self.size - 0x10
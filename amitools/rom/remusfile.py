@@ -3,7 +3,17 @@ import struct
 
 
 class RemusRom(object):
-    def __init__(self, sum_off, chk_sum, size, base_addr, name, short_name, flags):
+    def __init__(
+        self,
+        sum_off,
+        chk_sum,
+        size,
+        base_addr,
+        name,
+        short_name,
+        flags,
+        modules_loader=None,
+    ):
         self.sum_off = sum_off
         self.chk_sum = chk_sum
         self.size = size
@@ -11,7 +21,16 @@ class RemusRom(object):
         self.name = name
         self.short_name = short_name
         self.flags = flags
-        self.modules = []
+        # modules are either filled in directly or created on first access
+        self._modules_loader = modules_loader
+        self._modules = None if modules_loader else []
+
+    @property
+    def modules(self):
+        if self._modules is None:
+            self._modules = self._modules_loader()
+            self._modules_loader = None
+        return self._modules
 
     def __repr__(self):
         return (
@@ -1,8 +1,13 @@
-from .romaccess import RomAccess
+import re
+import struct
 
+from .romaccess import RomAccess
 
 RTC_MATCHWORD = 0x4AFC
 
+_matchword_re = re.compile(b"\x4a\xfc")
+_long_struct = struct.Struct(">I")
+
 RTF_AUTOINIT = 1 << 7
 RTF_AFTERDOS = 1 << 2
 RTF_SINGLETASK = 1 << 1
@@ -129,26 +134,22 @@ class ResidentScan:
 
     def get_all_matchwords(self):
         """scan memory for all occurrences of matchwords"""
-        mw = b"\x4a\xfc"
-        res = []
-        off = 0
-        num = self.access.size
         rom = self.access.rom_data
-        while off < num:
-            pos = rom.find(mw, off)
-            if pos == -1:
-                break
-            res.append(pos)
-            off = pos + 2
-        return res
+        return [m.start() for m in _matchword_re.finditer(rom)]
+
+    def get_tag_ptrs(self, offs):
+        """return (off, tag_ptr) for all matchword offsets in one pass"""
+        rom = self.access.rom_data
+        end = self.access.size - 6
+        unpack = _long_struct.unpack_from
+        return [(off, unpack(rom, off + 2)[0]) for off in offs if off <= end]
 
     def guess_base_addr(self):
         offs = self.get_all_matchwords()
         if not offs:
             return None
         base_map = {}
-        for off in offs:
-            tag_ptr = self.access.read_long(off + 2)
+        for off, tag_ptr in self.get_tag_ptrs(offs):
             tag_off = tag_ptr & 0xFFFF
             if tag_off == off:
                 base_addr = tag_ptr & ~0xFFFF
@@ -167,13 +168,13 @@ class ResidentScan:
 
     def get_all_resident_pos(self):
         offs = self.get_all_matchwords()
-        res = []
-        for off in offs:
-            # check tag ptr
-            tag_ptr = self.access.read_long(off + 2)
-            if tag_ptr == self.base_addr + off:
-                res.append(off)
-        return res
+        # tag ptr has to point to the resident itself
+        base_addr = self.base_addr
+        return [
+            off
+            for off, tag_ptr in self.get_tag_ptrs(offs)
+            if tag_ptr == base_addr + off
+        ]
 
     def is_resident_at(self, off):
         mw = self.access.read_word(off)
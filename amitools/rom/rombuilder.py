@@ -42,6 +42,31 @@ class RomEntryBinImg:
         return self.relocator.relocate_one_block(addr)
 
 
+class RomEntryCached:
+    """a module whose relocated data is kept in a RomModuleCache.
+
+    make_entry() is only called to create the real entry if the cache has
+    no data for the load address.
+    """
+
+    def __init__(self, name, cache, digest, size, make_entry):
+        self.name = name
+        self.cache = cache
+        self.digest = digest
+        self.size = size
+        self.make_entry = make_entry
+
+    def get_size(self):
+        return self.size
+
+    def get_data(self, addr):
+        data = self.cache.get_data(self.digest, addr)
+        if data is None:
+            data = self.make_entry().get_data(addr)
+            self.cache.put_data(self.digest, addr, data)
+        return data
+
+
 class RomEntryRomHdr:
     def __init__(self, name, skip, jmp_addr):
         self.name = name
@@ -130,15 +155,32 @@ class RomBuilder:
         e = RomEntryRaw(name, data, relocs)
         return self._add_entry(e)
 
-    def add_bin_img(self, name, bin_img):
+    def add_bin_img(self, name, bin_img, cache=None, digest=None):
         e = RomEntryBinImg(name, bin_img)
+        # store relocated data in a RomModuleCache
+        if cache is not None:
+            img_entry = e
+            e = RomEntryCached(name, cache, digest, e.get_size(), lambda: img_entry)
+        return self._add_entry(e)
+
+    def add_cached_bin_img(self, name, cache, digest, size, load_bin_img):
+        """add a module with data from a RomModuleCache.
+
+        load_bin_img() returns the BinImage of the module and is only called
+        if the module needs to be relocated.
+        """
+
+        def make_entry():
+            return RomEntryBinImg(name, load_bin_img())
+
+        e = RomEntryCached(name, cache, digest, size, make_entry)
         return self._add_entry(e)
 
     def add_padding(self, skip, value=0):
         e = RomEntryPadding(skip, value)
         return self._add_entry(e)
 
-    def build_rom(self):
+    def build_rom(self, old_rom=None):
         rom_data = bytearray(self.size_bytes)
         # fill in modules
         addr = self.base_addr + self.rom_off
@@ -149,10 +191,7 @@ class RomBuilder:
             off += n
             addr += n
         # fill empty space
-        fill = self.fill_byte
-        while off < self.size_bytes:
-            rom_data[off] = fill
-            off += 1
+        rom_data[off:] = bytes([self.fill_byte]) * (self.size_bytes - off)
         return rom_data
 
 
@@ -189,7 +228,12 @@ class KickRomBuilder(RomBuilder):
         e = RomEntryRomHdr("KicketySplit", skip, jump_addr)
         return self._add_entry(e)
 
-    def build_rom(self):
+    def build_rom(self, old_rom=None):
+        """build the ROM image.
+
+        If an old_rom image of a former build is given then its check sum
+        is updated with the changed blocks only.
+        """
         rom_data = RomBuilder.build_rom(self)
         # add kick sum
         kh = KickRomAccess(rom_data)
@@ -201,7 +245,7 @@ class KickRomBuilder(RomBuilder):
         if self.rom_ver is not None:
             kh.write_rom_ver_rev(self.rom_ver)
         # write missing entries in footer
-        kh.write_ext_footer()
+        kh.write_ext_footer(old_rom)
         return rom_data
 
 
@@ -225,12 +269,12 @@ class ExtRomBuilder(RomBuilder):
         self.left_bytes -= KickRomAccess.EXT_HEADER_SIZE
         self.rom_off = KickRomAccess.EXT_HEADER_SIZE
 
-    def build_rom(self):
+    def build_rom(self, old_rom=None):
         rom_data = RomBuilder.build_rom(self)
         # write a header
         kh = KickRomAccess(rom_data)
         kh.write_ext_header(self.kick_addr + 2, self.rom_ver)
         # write footer
         if self.add_footer:
-            kh.write_ext_footer()
+            kh.write_ext_footer(old_rom)
         return rom_data
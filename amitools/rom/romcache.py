@@ -0,0 +1,107 @@
+import os
+import hashlib
+import pickle
+
+import amitools.util.DataDir as DataDir
+
+
+class RomModuleCache(object):
+    """cache the relocated data of ROM modules for incremental builds.
+
+    Entries are keyed by the content hash of the module file and the
+    address the module was relocated to. The size of a module is known
+    from any of its entries, so a ROM layout can be planned without loading
+    the module at all.
+
+    The cache is stored in a single file. Entries used last are kept and
+    the oldest ones are dropped if more than MAX_ENTRIES are stored.
+    """
+
+    MAGIC = b"RMMC"
+    VERSION = 1
+    FILE_NAME = "modules.cache"
+    MAX_ENTRIES = 256
+
+    def __init__(self, path=None):
+        if path is None:
+            path = self.get_default_path()
+        self.path = path
+        # (digest, addr) -> data
+        self.entries = {}
+        # digest -> size
+        self.sizes = {}
+        self.dirty = False
+        self.num_hits = 0
+        self.num_misses = 0
+
+    @classmethod
+    def get_default_path(cls):
+        return os.path.join(DataDir.get_user_cache_dir("romcache"), cls.FILE_NAME)
+
+    @staticmethod
+    def get_digest(data):
+        """return the content hash of module file data"""
+        return hashlib.sha1(data).hexdigest()
+
+    def load(self):
+        """load the cache file. return False if its missing or invalid"""
+        try:
+            with open(self.path, "rb") as fh:
+                data = fh.read()
+        except OSError:
+            return False
+        if data[:4] != self.MAGIC or data[4:5] != bytes([self.VERSION]):
+            return False
+        try:
+            entries = pickle.loads(data[5:])
+        except Exception:
+            return False
+        self.entries = {}
+        self.sizes = {}
+        for digest, addr, mod_data in entries:
+            self._add(digest, addr, mod_data)
+        self.dirty = False
+        return True
+
+    def save(self):
+        """write the cache file if it changed. return True on success"""
+        if not self.dirty:
+            return True
+        entries = [(d, a, data) for (d, a), data in self.entries.items()]
+        data = pickle.dumps(entries[-self.MAX_ENTRIES :], pickle.HIGHEST_PROTOCOL)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + ".%d.tmp" % os.getpid()
+            with open(tmp_path, "wb") as fh:
+                fh.write(self.MAGIC + bytes([self.VERSION]) + data)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            return False
+        self.dirty = False
+        return True
+
+    def get_size(self, digest):
+        """return the size of a cached module or None"""
+        return self.sizes.get(digest)
+
+    def get_data(self, digest, addr):
+        """return the module data relocated to addr or None"""
+        key = (digest, addr)
+        data = self.entries.pop(key, None)
+        if data is None:
+            self.num_misses += 1
+            return None
+        # keep as most recently used
+        self.entries[key] = data
+        self.num_hits += 1
+        return data
+
+    def put_data(self, digest, addr, data):
+        self._add(digest, addr, bytes(data))
+        self.dirty = True
+
+    def _add(self, digest, addr, data):
+        key = (digest, addr)
+        self.entries.pop(key, None)
+        self.entries[key] = data
+        self.sizes[digest] = len(data)
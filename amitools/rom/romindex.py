@@ -0,0 +1,164 @@
+import os
+import hashlib
+import pickle
+import functools
+
+from . import remusfile
+import amitools.util.DataDir as DataDir
+
+
+def _dump_modules(rom):
+    mods = []
+    for m in rom.modules:
+        e = m.extra
+        extra = (e.flags, e.relocs, e.patches, e.chk_sum, e.brelocs, e.fixes)
+        mods.append((m.name, m.offset, m.size, m.extra_off, extra))
+    return pickle.dumps(mods, pickle.HIGHEST_PROTOCOL)
+
+
+def _load_modules(blob):
+    modules = []
+    for name, offset, size, extra_off, extra in pickle.loads(blob):
+        m = remusfile.RemusRomModule(name, offset, size, extra_off)
+        m.extra = remusfile.RemusRomModuleExtra(*extra)
+        modules.append(m)
+    return modules
+
+
+class RomIndex(object):
+    """a compiled index of all ROMs in the Remus split data files.
+
+    ROMs are found by a (size, checksum) lookup. The module tables of each
+    ROM are kept as a separate serialized blob and only decoded when the
+    modules of a ROM are accessed.
+
+    The index is built on first use and cached in the user's cache dir or,
+    if that is not writable, next to the split data. The cache is rebuilt
+    if the index version or the names, sizes or mtimes of the .dat files
+    change. It offers the same ROM lookup calls as RemusFileSet.
+    """
+
+    MAGIC = b"RMIX"
+    VERSION = 1
+    FILE_NAME = "romindex.cache"
+
+    def __init__(self, roms, signature=None, path=None):
+        self.roms = roms
+        self.signature = signature
+        self.path = path
+        self.rom_map = {}
+        for rom in roms:
+            self.rom_map.setdefault((rom.size, rom.chk_sum), rom)
+        self.sizes = frozenset(rom.size for rom in roms)
+
+    @classmethod
+    def get_signature(cls, data_dir):
+        """return the signature of the .dat files in a split data dir"""
+        sig = []
+        for name in sorted(os.listdir(data_dir)):
+            if name.endswith(".dat"):
+                st = os.stat(os.path.join(data_dir, name))
+                sig.append((name, st.st_size, st.st_mtime_ns))
+        return tuple(sig)
+
+    @classmethod
+    def get_cache_paths(cls, data_dir):
+        """return the candidate paths of the cache file for a data dir"""
+        key = hashlib.sha1(os.path.abspath(data_dir).encode("utf-8")).hexdigest()
+        user_dir = DataDir.get_user_cache_dir("romindex")
+        return [
+            os.path.join(user_dir, key[:16] + ".cache"),
+            os.path.join(data_dir, cls.FILE_NAME),
+        ]
+
+    @classmethod
+    def build(cls, data_dir):
+        """parse all .dat files of a split data dir and return an index"""
+        signature = cls.get_signature(data_dir)
+        roms = []
+        for name, _, _ in signature:
+            sf = remusfile.RemusSplitFile()
+            sf.load(os.path.join(data_dir, name))
+            sf.get_roms(roms)
+        return cls(roms, signature)
+
+    @classmethod
+    def open(cls, data_dir=None, cache=True):
+        """return the index for a split data dir.
+
+        With cache enabled a valid cache file is used or a new one is
+        written after building the index.
+        """
+        if data_dir is None:
+            data_dir = DataDir.ensure_data_sub_dir("splitdata")
+        if not cache:
+            return cls.build(data_dir)
+        signature = cls.get_signature(data_dir)
+        paths = cls.get_cache_paths(data_dir)
+        for path in paths:
+            index = cls.load(path, signature)
+            if index is not None:
+                return index
+        index = cls.build(data_dir)
+        for path in paths:
+            if index.save(path):
+                break
+        return index
+
+    @classmethod
+    def load(cls, path, signature=None):
+        """load a cache file. return None if its missing, invalid or stale"""
+        try:
+            with open(path, "rb") as fh:
+                data = fh.read()
+        except OSError:
+            return None
+        if data[:4] != cls.MAGIC or data[4:5] != bytes([cls.VERSION]):
+            return None
+        try:
+            file_sig, rom_tabs = pickle.loads(data[5:])
+        except Exception:
+            return None
+        if signature is not None and file_sig != signature:
+            return None
+        roms = []
+        for values, blob in rom_tabs:
+            loader = functools.partial(_load_modules, blob)
+            roms.append(remusfile.RemusRom(*values, modules_loader=loader))
+        return cls(roms, file_sig, path)
+
+    def save(self, path):
+        """write the index to a cache file. return True on success"""
+        rom_tabs = []
+        for r in self.roms:
+            values = (
+                r.sum_off,
+                r.chk_sum,
+                r.size,
+                r.base_addr,
+                r.name,
+                r.short_name,
+                r.flags,
+            )
+            rom_tabs.append((values, _dump_modules(r)))
+        data = pickle.dumps((self.signature, rom_tabs), pickle.HIGHEST_PROTOCOL)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".%d.tmp" % os.getpid()
+            with open(tmp_path, "wb") as fh:
+                fh.write(self.MAGIC + bytes([self.VERSION]) + data)
+            os.replace(tmp_path, path)
+        except OSError:
+            return False
+        self.path = path
+        return True
+
+    def find_rom(self, rom_data, chk_sum):
+        return self.rom_map.get((len(rom_data), chk_sum))
+
+    def get_sizes(self):
+        """return the set of all ROM sizes in the index"""
+        return self.sizes
+
+    def get_roms(self):
+        return sorted(self.roms, key=lambda x: x.name)
@@ -2,7 +2,7 @@ import fnmatch
 import struct
 
 from . import kickrom
-from . import remusfile
+from . import romindex
 import amitools.util.DataDir as DataDir
 from amitools.binfmt.BinImage import (
     BinImage,
@@ -15,13 +15,15 @@ from amitools.binfmt.BinImage import (
 
 
 class RomSplitter:
-    def __init__(self, split_data_path=None):
+    # size of the header of coded ROMs
+    coded_header_size = 11
+
+    def __init__(self, split_data_path=None, use_cache=True):
         # get data file path
         if split_data_path is None:
             split_data_path = DataDir.ensure_data_sub_dir("splitdata")
-        # setup remus file set
-        self.rfs = remusfile.RemusFileSet()
-        self.rfs.load(split_data_path)
+        # setup (cached) index of the remus files
+        self.rfs = romindex.RomIndex.open(split_data_path, use_cache)
         # state
         self.chk_sum = None
         self.rom_data = None
@@ -48,6 +50,11 @@ class RomSplitter:
         self.remus_rom = self.rfs.find_rom(self.rom_data, self.chk_sum)
         return self.remus_rom
 
+    def is_rom_size(self, size):
+        """can a file with the given size be a ROM of the split data?"""
+        sizes = self.rfs.get_sizes()
+        return size in sizes or (size - self.coded_header_size) in sizes
+
     def print_rom(self, out, show_entries=False):
         rom = self.remus_rom
         out(
@@ -18,10 +18,7 @@ class ADFSScanner:
         return False
 
     def handle(self, scan_file, scanner):
-        if scan_file.is_seekable():
-            sf = scan_file
-        else:
-            sf = scanner.promote_scan_file(scan_file, seekable=True)
+        sf = scanner.promote_scan_file(scan_file, seekable=True)
         # create blkdev
         blkdev = self.factory.open(sf.get_local_path(), fobj=sf.get_fobj())
         # create volume
@@ -33,13 +30,30 @@ class ADFSScanner:
         # done
         volume.close()
         blkdev.close()
+        if sf is not scan_file:
+            sf.close()
         return ok
 
+    def _get_entries(self, scanner, dir_node):
+        """return the nodes of a dir to scan.
+
+        On dircache volumes ignored files are dropped by the names in the
+        dircache and their header blocks are not read at all.
+        """
+        records = dir_node.get_dircache_records()
+        if records is None:
+            return dir_node.get_entries()
+        entries = []
+        for r in records:
+            if r.is_file() and scanner.is_ignored(r.name.get_unicode()):
+                continue
+            entries.append(dir_node.get_dircache_node(r))
+        return entries
+
     def _scan_node(self, scan_file, scanner, node):
         if node.is_dir():
             # recurse into dir
-            entries = node.get_entries()
-            for e in entries:
+            for e in self._get_entries(scanner, node):
                 ok = self._scan_node(scan_file, scanner, e)
                 if not ok:
                     return False
@@ -50,11 +64,11 @@ class ADFSScanner:
             node.flush()
             size = len(data)
             path = node.get_node_path_name().get_unicode()
-            fobj = io.StringIO(data)
+            fobj = io.BytesIO(data)
             sf = scan_file.create_sub_path(path, fobj, size, True, False)
             ok = scanner.scan_obj(sf)
             sf.close()
-            return True
+            return ok
 
 
 # mini test
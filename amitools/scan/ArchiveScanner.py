@@ -27,12 +27,20 @@ class ArchiveScanner:
         return False
 
     def handle(self, scan_file, scanner):
-        """scan a given archive file"""
-        # ensure a seekable fobj
-        if not scan_file.is_seekable():
-            sf = scanner.promote_scan_file(scan_file, seekable=True)
-        else:
-            sf = scan_file
+        """scan a given archive file.
+
+        Members are passed on as streams. Only the archive itself needs to
+        be seekable and is promoted if required.
+        """
+        sf = scanner.promote_scan_file(scan_file, seekable=True)
+        try:
+            return self._scan_archive(sf, scanner)
+        finally:
+            # a promoted clone is not closed by the scanner
+            if sf is not scan_file:
+                sf.close()
+
+    def _scan_archive(self, sf, scanner):
         # create archive obj
         arc = self._create_archive_obj(sf, scanner)
         if arc is None:
@@ -41,9 +49,9 @@ class ArchiveScanner:
         infos = arc.infolist()
         for info in infos:
             if info.file_size > 0:
-                sf = self._create_entry_scan_file(arc, info, scan_file)
-                ok = scanner.scan_obj(sf)
-                sf.close()
+                entry_sf = self._create_entry_scan_file(arc, info, sf)
+                ok = scanner.scan_obj(entry_sf)
+                entry_sf.close()
                 if not ok:
                     return False
         return True
@@ -59,7 +67,7 @@ class ZipScanner(ArchiveScanner):
             fobj = sf.get_fobj()
             return zipfile.ZipFile(fobj, "r")
         except Exception as e:
-            scanner.warning(sf, "error reading archive: %s" % e)
+            scanner.warn(sf, "error reading archive: %s" % e)
 
     def _create_entry_scan_file(self, arc, info, scan_file):
         name = info.filename
@@ -80,13 +88,14 @@ class LhaScanner(ArchiveScanner):
                 fobj = sf.get_fobj()
                 return lhafile.LhaFile(fobj, "r")
             except Exception as e:
-                scanner.warning(sf, "error reading archive: %s" % e)
+                scanner.warn(sf, "error reading archive: %s" % e)
         else:
-            scanner.warning(sf, "can't handle archive. missing 'lhafile' module.")
+            scanner.warn(sf, "can't handle archive. missing 'lhafile' module.")
 
     def _create_entry_scan_file(self, arc, info, scan_file):
+        # lhafile only decodes whole members into memory
         data = arc.read(info.filename)
-        fobj = io.StringIO(data)
+        fobj = io.BytesIO(data)
         size = info.file_size
         name = info.filename
         return scan_file.create_sub_path(name, fobj, size, True, False)
@@ -3,7 +3,6 @@
 
 import os
 import fnmatch
-import tempfile
 
 from .ScanFile import ScanFile
 
@@ -41,8 +40,10 @@ class FileScanner:
 
     def scan_obj(self, scan_file, check_ignore=True):
         """pass a ScanFile to check"""
-        if check_ignore and self._is_ignored(scan_file.get_local_path()):
-            return False
+        if check_ignore and self.is_ignored(scan_file.get_local_path()):
+            # skip file but keep on scanning
+            scan_file.close()
+            return True
         # does a scanner match?
         sf = scan_file
         sc = self.scanners
@@ -58,19 +59,20 @@ class FileScanner:
         return ok
 
     def _scan_dir(self, path):
-        if self._is_ignored(path):
+        if self.is_ignored(path):
             return True
-        for root, dirs, files in os.walk(path):
-            for name in files:
-                if not self._scan_file(os.path.join(root, name)):
-                    return False
-            for name in dirs:
-                if not self._scan_dir(os.path.join(root, name)):
-                    return False
+        for name in sorted(os.listdir(path)):
+            epath = os.path.join(path, name)
+            if os.path.isdir(epath):
+                ok = self._scan_dir(epath)
+            else:
+                ok = self._scan_file(epath)
+            if not ok:
+                return False
         return True
 
     def _scan_file(self, path):
-        if self._is_ignored(path):
+        if self.is_ignored(path):
             return True
         # build a scan file
         try:
@@ -87,7 +89,7 @@ class FileScanner:
                 # ignore error
                 return True
 
-    def _is_ignored(self, path):
+    def is_ignored(self, path):
         if self.ignore_filters is not None:
             base = os.path.basename(path)
             for f in self.ignore_filters:
@@ -108,12 +110,22 @@ class FileScanner:
             return True
 
     def promote_scan_file(self, scan_file, seekable=False, file_based=False):
-        if not seekable and not file_base:
+        """return a scan file that is seekable or file based if required.
+
+        Handlers that only read the data sequentially should use the given
+        (streamed) scan file directly. A seekable copy keeps up to ram_bytes
+        in RAM and spills larger data into a temp file.
+        """
+        if not seekable and not file_based:
+            return scan_file
+        if seekable and not file_based and scan_file.is_seekable():
+            return scan_file
+        if file_based and scan_file.is_file_based():
             return scan_file
         fb = file_based
-        if not fb and seekable and scan_file.size > self.ram_bytes:
+        if not fb and scan_file.size > self.ram_bytes:
             fb = True
-        sf = scan_file.create_clone(seekable, fb)
+        sf = scan_file.create_clone(True, fb, self.ram_bytes)
         scan_file.close()
         return sf
 
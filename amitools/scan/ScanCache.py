@@ -0,0 +1,195 @@
+# a persistent cache of scan results keyed by file contents
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+
+import amitools.util.DataDir as DataDir
+
+
+class ScanCache:
+    """store scan results by the content hash of the scanned files.
+
+    A result is a JSON value stored for a content digest and a kind. The
+    kind names the scan and its options, so different scans can share one
+    cache. Byte-identical files found at different places (e.g. the same
+    disk in two archives) share a result.
+
+    Host files are also stored with path, size and mtime. If these did not
+    change then the digest is known without reading the file again.
+
+    The cache is an SQLite database. prune() drops results that were not
+    used for a while and files that no longer exist.
+    """
+
+    FILE_NAME = "scan.db"
+    COMMIT_UPDATES = 100
+    HASH_BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, path=None):
+        if path is None:
+            path = self.get_default_path()
+        self.path = path
+        self.db = None
+        self.num_updates = 0
+        self.num_hits = 0
+        self.num_misses = 0
+        self.num_file_hits = 0
+        self.num_hashed = 0
+
+    @classmethod
+    def get_default_path(cls):
+        return os.path.join(DataDir.get_user_cache_dir("scan"), cls.FILE_NAME)
+
+    def open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        db = sqlite3.connect(self.path)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS files "
+            "(path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, digest TEXT)"
+        )
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS results "
+            "(digest TEXT, kind TEXT, data TEXT, used INTEGER, "
+            "PRIMARY KEY (digest, kind))"
+        )
+        self.db = db
+
+    def close(self):
+        if self.db:
+            self.db.commit()
+            self.db.close()
+            self.db = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # ----- digests -----
+
+    @classmethod
+    def hash_fobj(cls, fobj):
+        """return the content digest of the data read from fobj"""
+        h = hashlib.sha1()
+        while True:
+            buf = fobj.read(cls.HASH_BLOCK_SIZE)
+            if not buf:
+                break
+            h.update(buf)
+        return h.hexdigest()
+
+    def get_digest(self, scan_file):
+        """return the content digest of a seekable scan file.
+
+        The digest of an unchanged host file is taken from the cache.
+        Otherwise the data is hashed and the file position is restored.
+        """
+        if scan_file.is_host_path():
+            path = scan_file.get_local_path()
+            st = os.stat(path)
+            digest = self._get_file_digest(path, st.st_size, st.st_mtime_ns)
+            if digest is not None:
+                self.num_file_hits += 1
+                return digest
+        fobj = scan_file.get_fobj()
+        pos = fobj.tell()
+        fobj.seek(0)
+        digest = self.hash_fobj(fobj)
+        fobj.seek(pos)
+        self.num_hashed += 1
+        if scan_file.is_host_path():
+            self._set_file_digest(path, st.st_size, st.st_mtime_ns, digest)
+        return digest
+
+    def _get_file_digest(self, path, size, mtime):
+        row = self.db.execute(
+            "SELECT digest FROM files WHERE path = ? AND size = ? AND mtime = ?",
+            (os.path.abspath(path), size, mtime),
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0]
+
+    def _set_file_digest(self, path, size, mtime, digest):
+        self.db.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime, digest) "
+            "VALUES (?, ?, ?, ?)",
+            (os.path.abspath(path), size, mtime, digest),
+        )
+        self._updated()
+
+    # ----- results -----
+
+    def get_result(self, digest, kind):
+        """return the result stored for a digest or None"""
+        row = self.db.execute(
+            "SELECT data FROM results WHERE digest = ? AND kind = ?", (digest, kind)
+        ).fetchone()
+        if row is None:
+            self.num_misses += 1
+            return None
+        self.num_hits += 1
+        self.db.execute(
+            "UPDATE results SET used = ? WHERE digest = ? AND kind = ?",
+            (int(time.time()), digest, kind),
+        )
+        self._updated()
+        return json.loads(row[0])
+
+    def put_result(self, digest, kind, result):
+        self.db.execute(
+            "INSERT OR REPLACE INTO results (digest, kind, data, used) "
+            "VALUES (?, ?, ?, ?)",
+            (digest, kind, json.dumps(result), int(time.time())),
+        )
+        self._updated()
+
+    def _updated(self):
+        # commit regularly to keep results of an interrupted run
+        self.num_updates += 1
+        if self.num_updates >= self.COMMIT_UPDATES:
+            self.db.commit()
+            self.num_updates = 0
+
+    # ----- maintenance -----
+
+    def get_stats(self):
+        """return a dict with the sizes of the cache and the hit rate"""
+        db = self.db
+        num_files = db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        num_results = db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        total = self.num_hits + self.num_misses
+        return {
+            "files": num_files,
+            "results": num_results,
+            "hits": self.num_hits,
+            "misses": self.num_misses,
+            "hit_rate": self.num_hits / total if total else 0.0,
+            "file_hits": self.num_file_hits,
+            "hashed": self.num_hashed,
+        }
+
+    def prune(self, max_age=None):
+        """drop files that no longer exist and results not used for max_age
+        seconds. return the number of dropped files and results"""
+        db = self.db
+        missing = [
+            (path,)
+            for (path,) in db.execute("SELECT path FROM files")
+            if not os.path.exists(path)
+        ]
+        db.executemany("DELETE FROM files WHERE path = ?", missing)
+        num_results = 0
+        if max_age is not None:
+            cur = db.execute(
+                "DELETE FROM results WHERE used < ?", (int(time.time() - max_age),)
+            )
+            num_results = cur.rowcount
+        db.commit()
+        db.execute("VACUUM")
+        return len(missing), num_results
@@ -1,5 +1,7 @@
 import os
 import io
+import shutil
+import tempfile
 
 
 class ScanFile:
@@ -57,22 +59,22 @@ class ScanFile:
         paths.append(sub_path)
         return ScanFile(paths, fobj, size, seekable, file_based)
 
-    def create_clone(self, seekable, file_based):
+    def create_clone(self, seekable, file_based, ram_bytes=None):
+        """copy the data of the scan file into a new seekable scan file.
+
+        A file based clone is a temp file. Otherwise the data is kept in
+        RAM. If ram_bytes is given then data exceeding it spills into a
+        temp file.
+        """
         src_fobj = self.fobj
-        # create a temp file
         if file_based:
             fobj = tempfile.TemporaryFile()
-            # copy original file
-            blk_size = 4096
-            while True:
-                buf = src_fobj.read(blk_size)
-                if len(buf) == 0:
-                    break
-                fobj.write(buf)
-        # create a string buffer
+        elif ram_bytes is not None:
+            fobj = tempfile.SpooledTemporaryFile(max_size=ram_bytes)
         else:
-            data = src_fobj.read()
-            fobj = io.StringIO(data)
+            fobj = io.BytesIO()
+        shutil.copyfileobj(src_fobj, fobj)
+        fobj.seek(0)
         # close old scan file
         src_fobj.close()
         # create promoted file
@@ -0,0 +1,179 @@
+# an index of per file scan results
+
+import os
+import json
+import sqlite3
+
+
+class ScanIndex:
+    """store the results of scanning host files.
+
+    Each host file is stored with its size and mtime and a list of result
+    records (dicts). Re-runs use is_current() to skip host files that did
+    not change.
+
+    The index is either a JSON lines file with one record per line or an
+    SQLite database (file extensions .db, .sqlite or .sqlite3). JSON lines
+    are appended while scanning, so an interrupted run keeps its results.
+    """
+
+    SQLITE_EXTS = (".db", ".sqlite", ".sqlite3")
+    SQLITE_COMMIT_FILES = 100
+
+    def __init__(self, path):
+        self.path = path
+        self.is_sqlite = os.path.splitext(path)[1].lower() in self.SQLITE_EXTS
+        # host file -> (size, mtime, records)
+        self.entries = {}
+        self.db = None
+        self.fobj = None
+        self.num_pending = 0
+
+    def open(self):
+        """load an existing index and prepare adding results"""
+        if self.is_sqlite:
+            self._open_sqlite()
+        else:
+            self._open_jsonl()
+
+    def close(self):
+        """write all results and close the index"""
+        if self.is_sqlite:
+            if self.db:
+                self.db.commit()
+                self.db.close()
+                self.db = None
+        elif self.fobj:
+            self.fobj.close()
+            self.fobj = None
+            self._compact_jsonl()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def is_current(self, host_path, size, mtime):
+        """is the host file already indexed with given size and mtime?"""
+        entry = self.entries.get(host_path)
+        return entry is not None and entry[0] == size and entry[1] == mtime
+
+    def get_records(self, host_path):
+        entry = self.entries.get(host_path)
+        if entry is None:
+            return None
+        return entry[2]
+
+    def get_all_records(self):
+        """return the records of all host files sorted by host path"""
+        result = []
+        for host_path in sorted(self.entries):
+            result += self.entries[host_path][2]
+        return result
+
+    def get_num_files(self):
+        return len(self.entries)
+
+    def set_records(self, host_path, size, mtime, records):
+        """store the result records of a host file.
+
+        Note: a host file needs at least one record to be stored.
+        """
+        self.entries[host_path] = (size, mtime, records)
+        if self.is_sqlite:
+            self._write_sqlite(host_path, size, mtime, records)
+        else:
+            self._write_jsonl(self.fobj, host_path, size, mtime, records)
+
+    # ----- JSON lines -----
+
+    def _open_jsonl(self):
+        if os.path.exists(self.path):
+            last_host_path = None
+            with open(self.path, "r", encoding="utf-8") as fh:
+                for line in fh:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        rec = json.loads(line)
+                        host_path = rec.pop("file")
+                        size = rec.pop("size")
+                        mtime = rec.pop("mtime")
+                    except (ValueError, KeyError, AttributeError):
+                        # skip a partially written line
+                        continue
+                    # records of a host file are written in a row and
+                    # a later row of a host file replaces the former one
+                    if host_path != last_host_path:
+                        self.entries[host_path] = (size, mtime, [])
+                        last_host_path = host_path
+                    self.entries[host_path][2].append(rec)
+        self.fobj = open(self.path, "a", encoding="utf-8")
+
+    def _write_jsonl(self, fobj, host_path, size, mtime, records):
+        for rec in records:
+            line = dict(rec)
+            line["file"] = host_path
+            line["size"] = size
+            line["mtime"] = mtime
+            fobj.write(json.dumps(line, sort_keys=True) + "\n")
+        fobj.flush()
+
+    def _compact_jsonl(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            for host_path in sorted(self.entries):
+                size, mtime, records = self.entries[host_path]
+                self._write_jsonl(fh, host_path, size, mtime, records)
+        os.replace(tmp_path, self.path)
+
+    # ----- SQLite -----
+
+    def _open_sqlite(self):
+        db = sqlite3.connect(self.path)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS files "
+            "(file TEXT PRIMARY KEY, size INTEGER, mtime INTEGER)"
+        )
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS records "
+            "(file TEXT, path TEXT, type TEXT, error TEXT, data TEXT)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS records_file ON records (file)")
+        for host_path, size, mtime in db.execute("SELECT file, size, mtime FROM files"):
+            self.entries[host_path] = (size, mtime, [])
+        for host_path, data in db.execute("SELECT file, data FROM records"):
+            entry = self.entries.get(host_path)
+            if entry is not None:
+                entry[2].append(json.loads(data))
+        self.db = db
+
+    def _write_sqlite(self, host_path, size, mtime, records):
+        db = self.db
+        db.execute("DELETE FROM records WHERE file = ?", (host_path,))
+        db.execute(
+            "INSERT OR REPLACE INTO files (file, size, mtime) VALUES (?, ?, ?)",
+            (host_path, size, mtime),
+        )
+        db.executemany(
+            "INSERT INTO records (file, path, type, error, data) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    host_path,
+                    rec.get("path"),
+                    rec.get("type"),
+                    rec.get("error"),
+                    json.dumps(rec, sort_keys=True),
+                )
+                for rec in records
+            ],
+        )
+        # commit regularly to keep results of an interrupted run
+        self.num_pending += 1
+        if self.num_pending >= self.SQLITE_COMMIT_FILES:
+            db.commit()
+            self.num_pending = 0
@@ -0,0 +1,199 @@
+# process scan files on a pool of worker processes
+
+import os
+import io
+import shutil
+import tempfile
+import multiprocessing
+
+from .ScanFile import ScanFile
+
+# the scan function of a worker process
+_worker_func = None
+
+
+def _init_worker(func):
+    global _worker_func
+    _worker_func = func
+
+
+def _run_job(job):
+    """run the scan function on a job in a worker process"""
+    paths, size, data, file_name = job
+    if data is not None:
+        sf = ScanFile(paths, io.BytesIO(data), size, True, False)
+    else:
+        sf = ScanFile(paths, open(file_name, "rb"), size, True, True)
+    try:
+        return _worker_func(sf)
+    finally:
+        sf.close()
+
+
+class _Result:
+    """a result that is known without a worker"""
+
+    def __init__(self, result):
+        self.result = result
+
+    def get(self):
+        return self.result
+
+
+class ScanPool:
+    """process the scan files found by a FileScanner on worker processes.
+
+    Use submit() as the handler of a FileScanner. The scan function func is
+    called with a seekable scan file in a worker and returns a picklable
+    result. The result_handler is called with the path and the result in
+    the main process in the order the files were submitted. It returns
+    False to stop scanning.
+
+    Host files are opened by the worker itself. Archive members are read
+    and passed to the worker: members up to ram_bytes in RAM and larger
+    ones in a temp file. At most mem_bytes of member data is pending at
+    once. Submitting more waits for the oldest results.
+
+    With a single worker no pool is created and func is called directly
+    on the (possibly streamed) scan file.
+    """
+
+    JOBS_PER_WORKER = 4
+
+    def __init__(
+        self,
+        func,
+        result_handler,
+        num_workers=0,
+        mem_bytes=256 * 1024 * 1024,
+        ram_bytes=10 * 1024 * 1024,
+        error_handler=None,
+    ):
+        if num_workers <= 0:
+            num_workers = os.cpu_count() or 1
+        self.func = func
+        self.result_handler = result_handler
+        self.error_handler = error_handler
+        self.num_workers = num_workers
+        self.mem_bytes = mem_bytes
+        self.ram_bytes = min(ram_bytes, mem_bytes)
+        self.max_jobs = num_workers * self.JOBS_PER_WORKER
+        self.pool = None
+        # (path, async result, mem bytes, temp file name)
+        self.pending = []
+        self.pending_bytes = 0
+        self.ok = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+
+    def submit(self, scan_file):
+        """hand a scan file to a worker. return False if scanning stopped"""
+        if not self.ok:
+            return False
+        path = scan_file.get_path()
+        if self.num_workers == 1:
+            try:
+                result = self.func(scan_file)
+            except Exception as e:
+                return self._handle_error(path, e)
+            return self._handle_result(path, result)
+        job, mem_bytes, tmp_name = self._create_job(scan_file)
+        # keep the budget: wait for the oldest jobs
+        while self.pending and (
+            len(self.pending) >= self.max_jobs
+            or self.pending_bytes + mem_bytes > self.mem_bytes
+        ):
+            self._finish_oldest()
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(
+                self.num_workers, _init_worker, (self.func,)
+            )
+        res = self.pool.apply_async(_run_job, (job,))
+        self.pending.append((path, res, mem_bytes, tmp_name))
+        self.pending_bytes += mem_bytes
+        return self.ok
+
+    def put_result(self, path, result):
+        """report a known result (e.g. from a cache) in scan order"""
+        if not self.ok:
+            return False
+        if not self.pending:
+            return self._handle_result(path, result)
+        self.pending.append((path, _Result(result), 0, None))
+        return self.ok
+
+    def close(self):
+        """wait for all pending results. return False if scanning stopped"""
+        while self.pending:
+            self._finish_oldest()
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        return self.ok
+
+    def terminate(self):
+        """stop all workers and drop pending results"""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        for entry in self.pending:
+            self._remove_tmp(entry[3])
+        self.pending = []
+        self.pending_bytes = 0
+
+    def _create_job(self, scan_file):
+        paths = scan_file.paths
+        size = scan_file.size
+        if scan_file.is_host_path() and scan_file.is_file_based():
+            return (paths, size, None, scan_file.get_local_path()), 0, None
+        fobj = scan_file.get_fobj()
+        if size <= self.ram_bytes:
+            data = fobj.read()
+            return (paths, len(data), data, None), len(data), None
+        # spill large members into a temp file
+        with tempfile.NamedTemporaryFile(prefix="scan", delete=False) as fh:
+            shutil.copyfileobj(fobj, fh)
+            size = fh.tell()
+        return (paths, size, None, fh.name), 0, fh.name
+
+    def _finish_oldest(self):
+        path, res, mem_bytes, tmp_name = self.pending.pop(0)
+        try:
+            result = res.get()
+        except Exception as e:
+            ok = self._handle_error(path, e)
+        else:
+            ok = self._handle_result(path, result)
+        finally:
+            self.pending_bytes -= mem_bytes
+            self._remove_tmp(tmp_name)
+        if not ok:
+            self.ok = False
+
+    def _handle_result(self, path, result):
+        if self.ok and not self.result_handler(path, result):
+            self.ok = False
+        return self.ok
+
+    def _handle_error(self, path, error):
+        if self.error_handler is None:
+            raise error
+        if self.ok and not self.error_handler(path, error):
+            self.ok = False
+        return self.ok
+
+    def _remove_tmp(self, tmp_name):
+        if tmp_name is not None:
+            try:
+                os.remove(tmp_name)
+            except OSError:
+                pass
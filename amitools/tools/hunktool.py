@@ -6,18 +6,25 @@
 #
 # written by Christian Vogelgsang (chris@vogelgsang.org)
 
+import os
+import io
 import sys
 import argparse
+import contextlib
+import multiprocessing
 import pprint
 import time
 
 from amitools.scan.FileScanner import FileScanner
+from amitools.scan.ScanIndex import ScanIndex
+from amitools.scan.ScanPool import ScanPool
 from amitools.scan.ADFSScanner import ADFSScanner
 from amitools.scan.ArchiveScanner import ZipScanner, LhaScanner
 from amitools.binfmt.hunk import Hunk
 from amitools.binfmt.hunk import HunkReader
 from amitools.binfmt.hunk import HunkShow
 from amitools.binfmt.hunk import HunkRelocate
+from amitools.binfmt.BinFmt import BinFmt
 import amitools.binfmt.elf
 from amitools.util.HexDump import *
 
@@ -27,6 +34,13 @@ def print_pretty(data):
     pp.pprint(data)
 
 
+def get_num_workers(args):
+    """return the number of worker processes: 0 selects all cpus"""
+    if args.jobs <= 0:
+        return os.cpu_count() or 1
+    return args.jobs
+
+
 # ----- commands -------------------------------------------------------------
 
 
@@ -105,6 +119,24 @@ class HunkCommand:
             return True
         return self.handle_file(path, hunk_file, result, delta)
 
+    def process_file_output(self, scan_file):
+        """process a scan file in a worker and return its output and results"""
+        self.counts = {}
+        self.failed_files = []
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            ok = self.process_file(scan_file)
+        return out.getvalue(), self.counts, self.failed_files, ok
+
+    def handle_result(self, path, result):
+        # merge the results of a worker in scan order
+        output, counts, failed_files, ok = result
+        sys.stdout.write(output)
+        for code, num in counts.items():
+            self.counts[code] = self.counts.get(code, 0) + num
+        self.failed_files += failed_files
+        return ok
+
     def run(self):
         # setup error handler
         def error_handler(sf, e):
@@ -114,20 +146,42 @@ class HunkCommand:
         def warning_handler(sf, msg):
             print("WARNING", sf.get_path(), msg)
 
+        def pool_error_handler(path, e):
+            print("FAILED", path, e)
+            return not self.args.stop
+
+        # parse files on a pool of workers if more than one is used
+        num_workers = get_num_workers(self.args)
+        pool = None
+        handler = self.process_file
+        if num_workers > 1:
+            pool = ScanPool(
+                self.process_file_output,
+                self.handle_result,
+                num_workers=num_workers,
+                error_handler=pool_error_handler,
+            )
+            handler = pool.submit
+
         # setup scanners
         scanners = [ADFSScanner(), ZipScanner(), LhaScanner()]
         scanner = FileScanner(
-            self.process_file,
+            handler,
             error_handler=error_handler,
             warning_handler=warning_handler,
             scanners=scanners,
         )
-        for path in self.args.files:
-            ok = scanner.scan(path)
-            if not ok:
-                print("ABORTED")
-                return False
-        return True
+        with pool or contextlib.nullcontext():
+            for path in self.args.files:
+                ok = scanner.scan(path)
+                if not ok:
+                    break
+        if pool is not None:
+            ok = ok and pool.ok
+        if not ok:
+            print("ABORTED")
+            return 1
+        return 0
 
 
 # ----- Validator -----
@@ -192,6 +246,163 @@ class Relocate(HunkCommand):
             return True
 
 
+# ----- Index -----
+
+# main hunks that form a segment
+index_seg_hunks = (Hunk.HUNK_CODE, Hunk.HUNK_DATA, Hunk.HUNK_BSS, Hunk.HUNK_PPC_CODE)
+
+
+def index_hunk_file(path, fobj, probe):
+    """classify a hunk file and return its index record or None"""
+    hunk_file = HunkReader.HunkReader()
+    if probe:
+        result = hunk_file.probe_file_obj(path, fobj)
+    else:
+        result = hunk_file.read_file_obj(path, fobj)
+    if result == Hunk.RESULT_NO_HUNK_FILE:
+        return None
+    rec = {
+        "path": path,
+        "type": None,
+        "result": Hunk.result_names[result],
+        "num_hunks": None,
+        "sizes": None,
+        "relocs": None,
+        "error": None,
+    }
+    if result != Hunk.RESULT_OK:
+        rec["error"] = "READ: " + hunk_file.error_string
+        return rec
+    if probe:
+        # only the header of an executable was read
+        rec["type"] = Hunk.type_names[hunk_file.type]
+        header = hunk_file.hunks[0]
+        if "hunks" in header:
+            rec["num_hunks"] = len(header["hunks"])
+            rec["sizes"] = [h["size"] for h in header["hunks"]]
+        return rec
+    ok = hunk_file.build_segments()
+    rec["type"] = Hunk.type_names[hunk_file.type]
+    if not ok:
+        rec["error"] = "BUILD: " + hunk_file.error_string
+        return rec
+    sizes = []
+    relocs = 0
+    for hunk in hunk_file.hunks:
+        if hunk["type"] in index_seg_hunks:
+            sizes.append(hunk.get("alloc_size", hunk.get("size", 0)))
+        if "reloc" in hunk:
+            for offsets in hunk["reloc"].values():
+                relocs += len(offsets)
+    rec["num_hunks"] = len(sizes)
+    rec["sizes"] = sizes
+    rec["relocs"] = relocs
+    return rec
+
+
+def index_host_file(job):
+    """scan a host file incl. archives and return (path, size, mtime, records).
+
+    This is the job of an index worker process.
+    """
+    path, size, mtime, probe = job
+    records = []
+
+    def handler(scan_file):
+        rec = index_hunk_file(scan_file.get_path(), scan_file.get_fobj(), probe)
+        if rec is not None:
+            records.append(rec)
+        return True
+
+    def error_handler(scan_file, e):
+        records.append({"path": scan_file.get_path(), "type": None, "error": str(e)})
+        return True
+
+    scanners = [ADFSScanner(), ZipScanner(), LhaScanner()]
+    scanner = FileScanner(handler, error_handler=error_handler, scanners=scanners)
+    try:
+        scanner.scan(path)
+    except Exception as e:
+        records.append({"path": path, "type": None, "error": "SCAN: %s" % e})
+    # always keep a record to remember the host file
+    if not records:
+        records.append({"path": path, "type": None, "error": None})
+    return path, size, mtime, records
+
+
+class Index:
+    """classify all hunk files in parallel and store results in an index"""
+
+    def __init__(self, args):
+        self.args = args
+
+    def _host_files(self):
+        for path in self.args.files:
+            if os.path.isdir(path):
+                for root, dirs, files in os.walk(path):
+                    dirs.sort()
+                    for name in sorted(files):
+                        yield os.path.join(root, name)
+            elif os.path.isfile(path):
+                yield path
+            else:
+                print("NOT FOUND", path)
+
+    def _jobs(self, index):
+        args = self.args
+        index_path = os.path.abspath(args.index)
+        for path in self._host_files():
+            if os.path.abspath(path) in (index_path, index_path + ".tmp"):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                print("FAILED", path, e)
+                continue
+            self.num_files += 1
+            if not args.force and index.is_current(path, st.st_size, st.st_mtime_ns):
+                self.num_skipped += 1
+                continue
+            yield path, st.st_size, st.st_mtime_ns, args.probe
+
+    def _results(self, index):
+        jobs = self._jobs(index)
+        num_workers = get_num_workers(self.args)
+        if num_workers == 1:
+            for job in jobs:
+                yield index_host_file(job)
+        else:
+            with multiprocessing.Pool(num_workers) as pool:
+                for result in pool.imap_unordered(index_host_file, jobs, chunksize=4):
+                    yield result
+
+    def run(self):
+        self.num_files = 0
+        self.num_skipped = 0
+        counts = {}
+        num_errors = 0
+        start = time.perf_counter()
+        with ScanIndex(self.args.index) as index:
+            for path, size, mtime, records in self._results(index):
+                index.set_records(path, size, mtime, records)
+                for rec in records:
+                    if rec["type"] is not None:
+                        counts[rec["type"]] = counts.get(rec["type"], 0) + 1
+                    if rec["error"]:
+                        num_errors += 1
+                        print(rec["path"], rec["error"])
+                    elif self.args.verbose and rec["type"] is not None:
+                        print(rec["path"], rec["type"], rec["num_hunks"])
+        delta = time.perf_counter() - start
+        print(
+            "files: %d, skipped: %d, errors: %d (%.2fs)"
+            % (self.num_files, self.num_skipped, num_errors, delta)
+        )
+        for type_name in sorted(counts):
+            print(type_name, ":", counts[type_name])
+        return 0
+
+
 # ----- Elf2Hunk -----
 
 
@@ -200,18 +411,58 @@ class ElfInfo:
         self.args = args
 
     def run(self):
-        for f in args.files:
+        for f in self.args.files:
             reader = amitools.binfmt.elf.ELFReader()
-            elf = reader.load(open(f, "rb"))
+            with open(f, "rb") as fh:
+                elf = reader.load(fh)
             if elf is None:
                 print("ERROR loading ELF:", elf.error_string)
                 return 1
-            dumper = amitools.binfmt.elf.ELFDumper(elf)
-            dumper.dump_sections(
-                show_relocs=args.show_relocs, show_debug=args.show_debug
-            )
-            dumper.dump_symbols()
-            dumper.dump_relas()
+            with elf:
+                dumper = amitools.binfmt.elf.ELFDumper(elf)
+                dumper.dump_sections(
+                    show_relocs=self.args.show_relocs, show_debug=self.args.show_debug
+                )
+                dumper.dump_symbols()
+                dumper.dump_relas()
+        return 0
+
+
+# ----- Disasm -----
+
+
+class Disasm:
+    """disassemble the code segments of hunk or ELF files"""
+
+    def __init__(self, args):
+        self.args = args
+
+    def run(self):
+        # needs machine68k
+        from amitools.binfmt import Disassemble
+
+        args = self.args
+        ranges = None
+        if args.range:
+            try:
+                ranges = [Disassemble.parse_range(r) for r in args.range]
+            except ValueError:
+                print("ERROR: invalid range:", " ".join(args.range))
+                return 1
+        bf = BinFmt()
+        write = sys.stdout.write
+        for f in args.files:
+            bi = bf.load_image(f)
+            if bi is None:
+                print("ERROR loading binary:", f)
+                return 1
+            print(f)
+            for seg, lines in Disassemble.iter_image(
+                bi, args.cpu, ranges, args.symbol, get_num_workers(args)
+            ):
+                print("#%03d %s" % (seg.id, seg.get_type_name()))
+                for line in lines:
+                    write(line + "\n")
         return 0
 
 
@@ -223,6 +474,8 @@ def main(args=None):
         "info": Info,
         "elfinfo": ElfInfo,
         "relocate": Relocate,
+        "index": Index,
+        "disasm": Disasm,
     }
 
     parser = argparse.ArgumentParser()
@@ -299,6 +552,47 @@ def main(args=None):
         default="68000",
         help="disassemble for given cpu (objdump only)",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        action="store",
+        type=int,
+        default=0,
+        help="number of worker processes (default 0: all cpus)",
+    )
+    parser.add_argument(
+        "-o",
+        "--index",
+        action="store",
+        default="hunkindex.jsonl",
+        help="index file for results: JSON lines or SQLite (.db)",
+    )
+    parser.add_argument(
+        "-p",
+        "--probe",
+        action="store_true",
+        default=False,
+        help="index: only read the header to classify files",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        default=False,
+        help="index: scan files again even if they did not change",
+    )
+    parser.add_argument(
+        "-r",
+        "--range",
+        action="append",
+        help="disasm: only disassemble offset range start:end or start+size (hex)",
+    )
+    parser.add_argument(
+        "-n",
+        "--symbol",
+        action="append",
+        help="disasm: only disassemble the function of the given symbol",
+    )
     args = parser.parse_args(args=args)
 
     cmd = args.command
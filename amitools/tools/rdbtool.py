@@ -7,6 +7,7 @@ import sys
 import argparse
 import os.path
 import json
+import time
 
 from amitools.util.HexDump import get_hex_line
 from amitools.util.CommandQueue import CommandQueue
@@ -14,8 +15,10 @@ from amitools.fs.FSError import FSError
 from amitools.fs.FSString import FSString
 from amitools.fs.rdb.RDisk import RDisk
 from amitools.fs.blkdev.RawBlockDevice import RawBlockDevice
+from amitools.fs.blkdev.BlkDevFactory import BlkDevFactory
 from amitools.fs.blkdev.DiskGeometry import DiskGeometry
 from amitools.fs.blkdev.ImageFile import ImageFile
+from amitools.fs.blkdev.StatsBlockDevice import StatsBlockDevice
 from amitools.fs.DosType import *
 from amitools.fs.block.rdb.PartitionBlock import PartitionBlock, PartitionDosEnv
 from amitools.fs.block.rdb.FSHeaderBlock import FSHeaderDeviceNode
@@ -44,6 +47,9 @@ class Command:
                 self.blkdev = self.init_blkdev(self.args.image_file)
                 if self.blkdev == None:
                     return 5
+                if self.args.stats:
+                    heatmap = self.args.stats_heatmap > 0
+                    self.blkdev = StatsBlockDevice(self.blkdev, heatmap=heatmap)
                 blkdev = self.blkdev
 
         # optional init rdisk function
@@ -65,6 +71,24 @@ class Command:
         else:
             return 0
 
+    def get_transfer_progress(self):
+        """return a progress function for partition transfers (if verbose)"""
+        if not self.args.verbose:
+            return None
+        last = [0.0]
+
+        def progress(stats):
+            # update display every 250ms
+            clk = time.perf_counter()
+            done = stats.done_bytes >= stats.total_bytes
+            if clk - last[0] > 0.25 or done:
+                last[0] = clk
+                end = "\n" if done else "\r"
+                print("%5.1f%%  %s" % (stats.get_percent(), stats), end=end)
+                sys.stdout.flush()
+
+        return progress
+
     def has_init_blkdev(self):
         return hasattr(self, "init_blkdev")
 
@@ -107,6 +131,8 @@ class FSCommandQueue(CommandQueue):
                 self.blkdev.close()
                 if self.args.verbose:
                     print("closing image:", self.img)
+                if self.args.stats:
+                    self.blkdev.dump_stats(num_regions=self.args.stats_heatmap)
         return exit_code
 
     def create_cmd(self, cclass, name, opts):
@@ -196,7 +222,8 @@ class OpenCommand(Command):
 
     def init_blkdev(self, file_name):
         # make sure image file exists
-        if not os.path.exists(file_name):
+        overlay = BlkDevFactory().is_overlay(file_name)
+        if not overlay and not os.path.exists(file_name):
             raise IOError("Image File not found: '%s'" % file_name)
         # parse opts
         opts = KeyValue.parse_key_value_strings(self.opts)
@@ -206,8 +233,7 @@ class OpenCommand(Command):
         if opts_bs:
             bs = opts_bs
         # setup initial raw block dev with default block size
-        blkdev = RawBlockDevice(file_name, self.args.read_only, block_bytes=bs)
-        blkdev.open()
+        blkdev = self._open_raw(file_name, overlay, bs)
         # if no bs was given in options then try to find out block size
         # from an existing rdb
         if not opts_bs:
@@ -216,10 +242,7 @@ class OpenCommand(Command):
             # real block size differs: re-open dev with correct size
             if peek_bs and peek_bs != blkdev.block_bytes:
                 blkdev.close()
-                blkdev = RawBlockDevice(
-                    file_name, self.args.read_only, block_bytes=peek_bs
-                )
-                blkdev.open()
+                blkdev = self._open_raw(file_name, overlay, peek_bs)
                 bs = peek_bs
         # try to guess geometry
         file_size = blkdev.num_blocks * blkdev.block_bytes
@@ -233,6 +256,14 @@ class OpenCommand(Command):
         blkdev.geo = geo
         return blkdev
 
+    def _open_raw(self, file_name, overlay, bs):
+        read_only = self.args.read_only
+        if overlay:
+            return BlkDevFactory().open_overlay_raw(file_name, read_only, bs)
+        blkdev = RawBlockDevice(file_name, read_only, block_bytes=bs)
+        blkdev.open()
+        return blkdev
+
     def _get_opts_block_size(self, opts):
         if opts and "bs" in opts:
             bs = int(opts["bs"])
@@ -741,7 +772,8 @@ class AddImageCommand(PartEditCommand):
                 fs_block_size=fs_bs,
             )
             # import partition from file
-            p.import_data(file_name)
+            stats = p.import_data(file_name, progress=self.get_transfer_progress())
+            print("imported", stats)
             return 0
 
 
@@ -788,18 +820,25 @@ class ChangeCommand(PartEditCommand):
 class ExportCommand(Command):
     def handle_rdisk(self, rdisk):
         if len(self.opts) < 2:
-            print("Usage: export <partition> <file>")
+            print("Usage: export <partition> <file> [dense]")
             return 1
         else:
             part = self.opts[0]
             file_name = self.opts[1]
+            if len(self.opts) > 2:
+                sparse = "dense" != self.opts[2]
+            else:
+                sparse = True
             p = rdisk.find_partition_by_string(part)
             if p:
                 print(
                     "exporting '%s' (%d blocks) to '%s'"
                     % (p.get_drive_name(), p.get_num_blocks(), file_name)
                 )
-                p.export_data(file_name)
+                stats = p.export_data(
+                    file_name, sparse=sparse, progress=self.get_transfer_progress()
+                )
+                print("exported", stats)
                 return 0
             else:
                 print("Can't find partition: '%s'" % part)
@@ -824,7 +863,10 @@ class ImportCommand(Command):
                     "importing '%s' to '%s' (%d blocks) pad=%r"
                     % (file_name, p.get_drive_name(), p.get_num_blocks(), pad)
                 )
-                p.import_data(file_name, pad=pad)
+                stats = p.import_data(
+                    file_name, pad=pad, progress=self.get_transfer_progress()
+                )
+                print("imported", stats)
                 return 0
             else:
                 print("Can't find partition: '%s'" % part)
@@ -1091,9 +1133,24 @@ def main(args=None, defaults=None):
     parser.add_argument(
         "-t", "--dostype", default="ffs+intl", help="set default dos type"
     )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        default=False,
+        help="show I/O statistics of the image",
+    )
+    parser.add_argument(
+        "--stats-heatmap",
+        type=int,
+        default=0,
+        metavar="REGIONS",
+        help="show I/O statistics with block accesses in REGIONS parts of the image",
+    )
     if defaults:
         parser.set_defaults(defaults)
     args = parser.parse_args(args)
+    if args.stats_heatmap > 0:
+        args.stats = True
 
     cmd_list = args.command_list
     sep = args.seperator
@@ -7,15 +7,15 @@ import sys
 import argparse
 import os
 import logging
+import functools
 
 from amitools.util.Logging import setup_logging, add_logging_options
-from amitools.util.HexDump import print_hex_diff, print_hex
+from amitools.util.HexDump import print_hex_diff, print_hex, get_diff_line_offsets
 import amitools.util.KeyValue as KeyValue
 import amitools.rom as rom
 from amitools.binfmt.hunk.BinFmtHunk import BinFmtHunk
 from amitools.binfmt.BinFmt import BinFmt
 
-
 DESC = """romtool allows you to dissect, inspect, or create Amiga ROM files"""
 
 
@@ -26,8 +26,11 @@ def do_list_cmd(args):
 
 
 def do_query_cmd(args):
-    ri = args.rom_image
     rs = rom.RomSplitter()
+    paths = args.rom_image
+    if len(paths) > 1 or os.path.isdir(paths[0]):
+        return query_rom_files(rs, paths, args.modules)
+    ri = paths[0]
     if not rs.find_rom(ri):
         print(ri, "not found in split database!")
         return 100
@@ -41,6 +44,44 @@ def do_query_cmd(args):
         return 0
 
 
+def iter_rom_files(rs, paths):
+    """yield the given files and all files in given dirs that can be ROMs"""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                try:
+                    size = os.path.getsize(file_path)
+                except OSError:
+                    continue
+                # skip files that can't match by size without reading them
+                if rs.is_rom_size(size):
+                    yield file_path
+
+
+def query_rom_files(rs, paths, modules=None):
+    """identify many ROM files and print a line for each"""
+    num_found = 0
+    for path in iter_rom_files(rs, paths):
+        try:
+            found = rs.find_rom(path)
+        except (IOError, ValueError) as e:
+            print("%s: error: %s" % (path, e))
+            continue
+        if not found:
+            print("%s: not found" % path)
+            continue
+        num_found += 1
+        print("%s: %s" % (path, found.name))
+        if modules is not None:
+            rs.print_entries(print, rs.query_entries(modules))
+    return 0 if num_found > 0 else 100
+
+
 def do_split_cmd(args):
     ri = args.rom_image
     rs = rom.RomSplitter()
@@ -130,27 +171,38 @@ def do_build_cmd(args):
         logging.error("No modules given!")
         return 1
     file_list = rb.build_file_list(args.modules)
+    # incremental build: use module cache and update former output
+    cache = None
+    old_rom = None
+    if args.incremental:
+        cache = rom.RomModuleCache(args.module_cache)
+        if cache.load():
+            logging.info("loaded module cache '%s'", cache.path)
+        old_rom = read_old_rom(args.output, rom_size * 1024)
     # load modules
     bf = BinFmt()
     for f in file_list:
         logging.info("adding file '%s'", f)
         name = os.path.basename(f)
-        # load image
-        if bf.is_image(f):
-            bin_img = bf.load_image(f)
-            # is it a blizkick module?
-            bkm = rom.BlizKickModule(bin_img)
-            if bkm.get_type() == "module":
-                bkm.fix_module()
-            elif bkm.get_type() == "patch":
-                logging.error("BlizKick Patches are not supported, yet: %s", name)
-                return 5
-            # get image params
-            size = bin_img.get_size()
-            data = None
+        bin_img = None
+        data = None
+        digest = None
+        size = None
+        is_image = bf.is_image(f)
+        if is_image:
+            # cached module?
+            if cache is not None:
+                with open(f, "rb") as fh:
+                    digest = cache.get_digest(fh.read())
+                size = cache.get_size(digest)
+            # load image
+            if size is None:
+                bin_img = load_rom_bin_img(bf, f)
+                if bin_img is None:
+                    return 5
+                size = bin_img.get_size()
         else:
             # load raw data
-            bin_img = None
             with open(f, "rb") as fh:
                 data = fh.read()
             size = len(data)
@@ -168,9 +220,13 @@ def do_build_cmd(args):
 
         off = rb.get_rom_offset()
         # add image
-        if bin_img is not None:
+        if is_image:
             logging.info("@%08x: adding module '%s'", off, f)
-            e = rb.add_bin_img(name, bin_img)
+            if bin_img is None:
+                load = functools.partial(load_rom_bin_img, bf, f)
+                e = rb.add_cached_bin_img(name, cache, digest, size, load)
+            else:
+                e = rb.add_bin_img(name, bin_img, cache, digest)
             if e is None:
                 logging.error(
                     "@%08x: can't add module '%s': %s", off, f, rb.get_error()
@@ -200,22 +256,75 @@ def do_build_cmd(args):
     logging.info(
         "@%08x: padding %d bytes with %02x", off, rb.get_bytes_left(), fill_byte
     )
-    rom_data = rb.build_rom()
+    rom_data = rb.build_rom(old_rom)
     if rom_data is None:
         logging.error("building ROM failed: %s", rb.get_error())
         return 4
+    if cache is not None:
+        logging.info(
+            "module cache: %d hits, %d misses", cache.num_hits, cache.num_misses
+        )
+        if not cache.save():
+            logging.warning("can't save module cache '%s'", cache.path)
 
     # save rom
     output = args.output
-    if output is not None:
+    if output is None:
+        logging.warn("No output -o given! ROM not saved!")
+    elif old_rom is not None:
+        num = update_rom_file(output, rom_data, old_rom)
+        logging.info("updated %d blocks of ROM '%s'", num, output)
+    else:
         logging.info("saving ROM to '%s'", output)
         with open(output, "wb") as fh:
             fh.write(rom_data)
-    else:
-        logging.warn("No output -o given! ROM not saved!")
     return 0
 
 
+def load_rom_bin_img(bf, path):
+    """load a module image and fix BlizKick modules. None on error"""
+    bin_img = bf.load_image(path)
+    # is it a blizkick module?
+    bkm = rom.BlizKickModule(bin_img)
+    if bkm.get_type() == "module":
+        bkm.fix_module()
+    elif bkm.get_type() == "patch":
+        logging.error(
+            "BlizKick Patches are not supported, yet: %s", os.path.basename(path)
+        )
+        return None
+    return bin_img
+
+
+def read_old_rom(path, size):
+    """return the ROM image of a former build or None.
+
+    The check sum of the new ROM is derived from the one of the old image
+    and only changed blocks are written back, so a damaged image is not
+    used and the ROM is built and written in full.
+    """
+    if path is None or not os.path.exists(path):
+        return None
+    if os.path.getsize(path) != size:
+        return None
+    with open(path, "rb") as fh:
+        old_rom = fh.read()
+    if not rom.KickRomAccess(old_rom).verify_check_sum():
+        logging.warning("invalid check sum in '%s': doing full build", path)
+        return None
+    return old_rom
+
+
+def update_rom_file(path, rom_data, old_rom, block_size=4096):
+    """only write the blocks that changed. return the number of blocks"""
+    offs = get_diff_line_offsets(old_rom, rom_data, block_size, block_size)
+    with open(path, "r+b") as fh:
+        for off in offs:
+            fh.seek(off)
+            fh.write(rom_data[off : off + block_size])
+    return len(offs)
+
+
 def do_diff_cmd(args):
     # load ROMs
     img_a = args.image_a
@@ -265,6 +374,47 @@ def do_dump_cmd(args):
     return 0
 
 
+def do_disasm_cmd(args):
+    # needs machine68k
+    from amitools.binfmt import Disassemble
+    from amitools.vamos.machine import DisAsm
+
+    img = args.image
+    logging.info("loading ROM from '%s'", img)
+    rom_img = rom.Loader.load(img)
+    if args.rom_addr:
+        base_addr = int(args.rom_addr, 16)
+    else:
+        base_addr = rom.ResidentScan(rom_img).guess_base_addr()
+        if base_addr is None or type(base_addr) is list:
+            logging.warning("can't guess base address of ROM! using offsets")
+            base_addr = 0
+        else:
+            logging.info("guessed base address: %08x", base_addr)
+    end_addr = base_addr + len(rom_img)
+    # address ranges to disassemble
+    if args.range:
+        try:
+            ranges = [Disassemble.parse_range(r) for r in args.range]
+        except ValueError:
+            logging.error("invalid range: %s", " ".join(args.range))
+            return 1
+    else:
+        ranges = [(base_addr, end_addr)]
+    dis = DisAsm.create(args.cpu)
+    data = memoryview(rom_img)
+    for start, end in ranges:
+        if start >= end_addr or end <= base_addr or start >= end:
+            logging.error("range outside of ROM: %08x-%08x", start, end)
+            return 1
+        start = max(start, base_addr)
+        end = min(end, end_addr)
+        # lines are decoded and printed one by one
+        block = data[start - base_addr : end - base_addr]
+        dis.dump_block(dis.iter_block(block, start))
+    return 0
+
+
 def do_copy_cmd(args):
     in_img = args.in_image
     logging.info("loading ROM from '%s'", in_img)
@@ -472,7 +622,11 @@ def setup_list_parser(parser):
 
 
 def setup_query_parser(parser):
-    parser.add_argument("rom_image", help="rom image to be checked")
+    parser.add_argument(
+        "rom_image",
+        nargs="+",
+        help="rom images or dirs to be checked. many files are listed briefly",
+    )
     parser.add_argument(
         "-m", "--modules", default=None, help="query module by wildcard"
     )
@@ -555,6 +709,18 @@ def setup_build_parser(parser):
     parser.add_argument(
         "-b", "--fill-byte", default="ff", help="fill byte in hex for empty ranges"
     )
+    parser.add_argument(
+        "-I",
+        "--incremental",
+        default=False,
+        action="store_true",
+        help="reuse cached relocated modules and only update changed blocks of output",
+    )
+    parser.add_argument(
+        "--module-cache",
+        default=None,
+        help="module cache file for incremental builds",
+    )
     parser.set_defaults(cmd=do_build_cmd)
 
 
@@ -609,6 +775,26 @@ def setup_dump_parser(parser):
     parser.set_defaults(cmd=do_dump_cmd)
 
 
+def setup_disasm_parser(parser):
+    parser.add_argument("image", help="rom image to be disassembled")
+    parser.add_argument(
+        "-b",
+        "--rom-addr",
+        default=None,
+        help="use this base address for ROM. otherwise guess.",
+    )
+    parser.add_argument(
+        "-r",
+        "--range",
+        action="append",
+        help="only disassemble address range start:end or start+size (hex)",
+    )
+    parser.add_argument(
+        "-c", "--cpu", default="68000", help="disassemble for given cpu"
+    )
+    parser.set_defaults(cmd=do_disasm_cmd)
+
+
 def setup_info_parser(parser):
     parser.add_argument("image", help="rom image to be analyzed")
     parser.set_defaults(cmd=do_info_cmd)
@@ -697,6 +883,11 @@ def parse_args(args=None):
         "diff", help="show differences in two ROM images"
     )
     setup_diff_parser(diff_parser)
+    # disasm
+    disasm_parser = sub_parsers.add_parser(
+        "disasm", help="disassemble a ROM image or parts of it"
+    )
+    setup_disasm_parser(disasm_parser)
     # dump
     dump_parser = sub_parsers.add_parser("dump", help="dump a ROM image")
     setup_dump_parser(dump_parser)
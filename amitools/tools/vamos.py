@@ -8,8 +8,6 @@
 
 import os
 import sys
-from amitools.vamos.main import main as vmain
-from amitools.vamos.main import main_profile
 
 
 def main(args=None):
@@ -19,6 +17,18 @@ def main(args=None):
         # then in home dir
         os.path.expanduser("~/.vamosrc"),
     )
+    # run in a vamos daemon?
+    if "VAMOS_DAEMON" in os.environ:
+        # keep client startup fast and only import the client
+        from amitools.vamos.daemon import daemon_client
+
+        ret_code = daemon_client(os.environ["VAMOS_DAEMON"], cfg_files, args)
+        if ret_code is not None:
+            return ret_code
+
+    from amitools.vamos.main import main as vmain
+    from amitools.vamos.main import main_profile
+
     # profile run?
     if "VAMOS_PROFILE" in os.environ:
         vamos_profile = os.environ["VAMOS_PROFILE"]
@@ -5,12 +5,19 @@
 
 import sys
 import argparse
+import contextlib
+import functools
 import os.path
 import time
 
 from amitools.fs.blkdev.BlkDevFactory import BlkDevFactory
+from amitools.fs.blkdev.StatsBlockDevice import StatsBlockDevice
 from amitools.fs.validate.Validator import Validator
 from amitools.fs.validate.Progress import Progress
+from amitools.scan.FileScanner import FileScanner
+from amitools.scan.ArchiveScanner import ZipScanner, LhaScanner
+from amitools.scan.ScanPool import ScanPool
+from amitools.scan.ScanCache import ScanCache
 
 # ----- logging -----
 
@@ -53,49 +60,49 @@ def print_block(percent):
 factory = BlkDevFactory()
 
 
-def scan(path, args):
-    if not os.path.exists(path):
-        log_path(path, "DOES NOT EXIST")
-        return 1
-    if os.path.isdir(path):
-        return scan_dir(path, args)
-    elif os.path.isfile(path):
-        return scan_file(path, args)
-
-
-def scan_dir(path, args):
-    for name in sorted(os.listdir(path)):
-        epath = os.path.join(path, name)
-        result = scan(epath, args)
-        if result != 0:
-            return result
-    return 0
+def format_line(path, msg):
+    return "%20s  %s  " % (msg, path)
 
 
 def check_extension(path, args):
     ext = []
     if not args.skip_disks:
-        ext += [".adf", ".adz", ".adf.gz"]
+        ext += [".adf", ".adz", ".adf.gz", ".adc"]
     if not args.skip_hds:
-        ext += [".hdf"]
+        ext += [".hdf", ".hdz", ".hdf.gz", ".hdc"]
     for a in ext:
         if path.endswith(a):
             return True
     return False
 
 
-def scan_file(path, args):
-    if not check_extension(path, args):
-        return 0
+def scan_image(args, scan_file):
+    """validate the image in a scan file and return the result.
+
+    The result is the summary and the log messages of the image. With
+    stats enabled the I/O statistics lines of the image are added.
+
+    This may run in a worker process, so progress is only shown when
+    scanning inline.
+    """
+    path = scan_file.get_path()
+    inline = args.jobs == 1
     try:
-        pre_log_path(path, "scan")
-        ret_code = 0
+        if inline:
+            pre_log_path(path, "scan")
 
         # create a block device for image file
-        blkdev = factory.open(path, read_only=True)
+        if scan_file.is_host_path():
+            blkdev = factory.open(path, read_only=True)
+        else:
+            blkdev = factory.open(
+                scan_file.get_local_path(), read_only=True, fobj=scan_file.get_fobj()
+            )
+        if args.stats:
+            blkdev = StatsBlockDevice(blkdev, heatmap=args.stats_heatmap > 0)
 
         # create validator
-        progress = MyProgress()
+        progress = MyProgress() if inline else None
         v = Validator(blkdev, min_level=args.level, debug=args.debug, progress=progress)
 
         # 1. check boot block
@@ -119,6 +126,9 @@ def scan_file(path, args):
                 v.scan_files()
                 # 5. scan_bitmap
                 v.scan_bitmap()
+                # 6. scan blocks
+                if args.block_scan != "off":
+                    v.scan_blocks(deep=args.block_scan == "deep")
 
                 # summary
                 e, w = v.get_summary()
@@ -140,27 +150,144 @@ def scan_file(path, args):
         else:
             # boot block is not dos
             res.append("NDOS")
+        blkdev.close()
 
         # report result
         if len(res) == 0:
             res.append("done")
-        log_path(path, " ".join(res))
-        # summary
-        if args.verbose:
-            v.log.dump()
-        return ret_code
+        lines = [str(e) for e in v.log.entries]
+        if args.stats:
+            stats = []
+            blkdev.dump_stats(write=stats.append, num_regions=args.stats_heatmap)
+            return " ".join(res), lines, stats
+        return " ".join(res), lines
     except IOError as e:
-        log_path(path, "BLKDEV?")
+        return "BLKDEV?", [str(e)]
+
+
+def get_cache_kind(args):
+    """the cached result depends on the scan options"""
+    return "xdfscan:%s:%d" % (args.block_scan, args.level)
+
+
+def scan(paths, args):
+    """scan image files, directories and archives on a pool of workers"""
+
+    # path -> digest of images not found in cache
+    digests = {}
+
+    def handle_file(scan_file):
+        if not check_extension(scan_file.get_basename().lower(), args):
+            return True
+        if cache is None:
+            return pool.submit(scan_file)
+        # hashing needs a seekable file
+        scan_file = scanner.promote_scan_file(scan_file, seekable=True)
+        try:
+            digest = cache.get_digest(scan_file)
+            result = cache.get_result(digest, kind)
+            if result is not None:
+                return pool.put_result(scan_file.get_path(), result)
+            digests[scan_file.get_path()] = digest
+            return pool.submit(scan_file)
+        finally:
+            scan_file.close()
+
+    def handle_result(path, result):
+        msg, lines = result[:2]
+        log_path(path, msg)
+        if args.verbose:
+            for line in lines:
+                print(line)
+        # stats are only valid for this scan and are not cached
+        if len(result) > 2:
+            for line in result[2]:
+                print(line)
+        digest = digests.pop(path, None)
+        if digest is not None:
+            cache.put_result(digest, kind, [msg, lines])
+        return True
+
+    def handle_error(scan_file, error):
+        log_path(scan_file.get_path(), "FAILED")
         if args.verbose:
-            print(e)
-        return 0
+            print(error)
+        return True
+
+    def handle_warning(scan_file, msg):
+        log_path(scan_file.get_path(), "WARNING")
+        if args.verbose:
+            print(msg)
+
+    scanners = []
+    if not args.skip_archives:
+        scanners = [ZipScanner(), LhaScanner()]
+    ram_bytes = args.ram_size * 1024 * 1024
+    scanner = FileScanner(
+        handle_file,
+        scanners=scanners,
+        error_handler=handle_error,
+        warning_handler=handle_warning,
+        ram_bytes=ram_bytes,
+    )
+    pool = ScanPool(
+        functools.partial(scan_image, args),
+        handle_result,
+        num_workers=args.jobs,
+        mem_bytes=args.mem_size * 1024 * 1024,
+        ram_bytes=ram_bytes,
+    )
+    kind = get_cache_kind(args)
+    with contextlib.ExitStack() as stack:
+        cache = None
+        if args.cache:
+            cache = stack.enter_context(ScanCache(args.cache))
+        with pool:
+            for path in paths:
+                if not os.path.exists(path):
+                    log_path(path, "DOES NOT EXIST")
+                    return 1
+                if not scanner.scan(path):
+                    break
+        if cache is not None and args.cache_stats:
+            print_cache_stats(cache)
+    return 0
+
+
+def print_cache_stats(cache):
+    stats = cache.get_stats()
+    print(
+        "cache: %d hits, %d misses (%.1f%% hit rate), %d files known, "
+        "%d files hashed, %d files and %d results stored"
+        % (
+            stats["hits"],
+            stats["misses"],
+            stats["hit_rate"] * 100.0,
+            stats["file_hits"],
+            stats["hashed"],
+            stats["files"],
+            stats["results"],
+        )
+    )
+
+
+def prune_cache(args):
+    max_age = None
+    if args.cache_prune >= 0:
+        max_age = args.cache_prune * 24 * 60 * 60
+    with ScanCache(args.cache) as cache:
+        num_files, num_results = cache.prune(max_age)
+        print("cache: pruned %d files and %d results" % (num_files, num_results))
+        if args.cache_stats:
+            print_cache_stats(cache)
+    return 0
 
 
 # ----- main -----
 def main(args=None):
     parser = argparse.ArgumentParser()
     parser.add_argument(
-        "input", nargs="+", help="input image file or directory (to scan tree)"
+        "input", nargs="*", help="input image file or directory (to scan tree)"
     )
     parser.add_argument(
         "-v", "--verbose", action="store_true", default=False, help="be more verbose"
@@ -175,6 +302,13 @@ def main(args=None):
         default=False,
         help="quick mode. faster: skip image if root is invalid",
     )
+    parser.add_argument(
+        "-b",
+        "--block-scan",
+        default="quick",
+        choices=("off", "quick", "deep"),
+        help="scan blocks: quick reads only used blocks with data, deep reads all",
+    )
     parser.add_argument(
         "-l",
         "--level",
@@ -196,15 +330,87 @@ def main(args=None):
         default=False,
         help="do not scan hard disk images",
     )
+    parser.add_argument(
+        "-A",
+        "--skip-archives",
+        action="store_true",
+        default=False,
+        help="do not scan images inside .zip and .lha archives",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        default=0,
+        type=int,
+        help="number of images scanned in parallel (0=number of CPUs)",
+    )
+    parser.add_argument(
+        "-m",
+        "--mem-size",
+        default=256,
+        type=int,
+        help="MiB of archive data kept in RAM for pending scans",
+    )
+    parser.add_argument(
+        "-r",
+        "--ram-size",
+        default=10,
+        type=int,
+        help="MiB up to which an archive member is kept in RAM and not in a temp file",
+    )
+    parser.add_argument(
+        "-c",
+        "--cache",
+        nargs="?",
+        const=ScanCache.get_default_path(),
+        default=None,
+        help="reuse results of unchanged or identical images stored in cache file",
+    )
+    parser.add_argument(
+        "-S",
+        "--cache-stats",
+        action="store_true",
+        default=False,
+        help="show cache statistics",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        default=False,
+        help="show I/O statistics of each scanned image",
+    )
+    parser.add_argument(
+        "--stats-heatmap",
+        type=int,
+        default=0,
+        metavar="REGIONS",
+        help="show I/O statistics with block accesses in REGIONS parts of each image",
+    )
+    parser.add_argument(
+        "-P",
+        "--cache-prune",
+        type=int,
+        default=None,
+        metavar="DAYS",
+        help="prune cache: drop results not used for DAYS days (-1=keep all) "
+        "and files that no longer exist",
+    )
     args = parser.parse_args(args=args)
+    if args.stats_heatmap > 0:
+        args.stats = True
+    if args.jobs <= 0:
+        args.jobs = os.cpu_count() or 1
+    if args.cache_prune is not None:
+        if args.cache is None:
+            args.cache = ScanCache.get_default_path()
+        ret = prune_cache(args)
+        if ret != 0 or not args.input:
+            return ret
+    if not args.input:
+        parser.error("no input given")
 
     # main scan loop
-    ret = 0
-    for i in args.input:
-        ret = scan(i, args)
-        if ret != 0:
-            break
-    return ret
+    return scan(args.input, args)
 
 
 if __name__ == "__main__":
@@ -9,6 +9,9 @@ import os.path
 
 from amitools.fs.ADFSVolume import ADFSVolume
 from amitools.fs.blkdev.BlkDevFactory import BlkDevFactory
+from amitools.fs.blkdev.OverlayBlockDevice import OverlayBlockDevice
+from amitools.fs.blkdev.PartBlockDevice import PartBlockDevice
+from amitools.fs.blkdev.StatsBlockDevice import StatsBlockDevice
 from amitools.fs.FSError import *
 from amitools.fs.Imager import Imager
 from amitools.fs.Repacker import Repacker
@@ -109,9 +112,11 @@ class FSCommandQueue(CommandQueue):
         # close blkdev
         if self.blkdev:
             self.blkdev.close()
-            self.blkdev = None
             if self.args.verbose:
                 print("closing image:", self.img)
+            if self.args.stats:
+                self.blkdev.dump_stats(num_regions=self.args.stats_heatmap)
+            self.blkdev = None
 
     def create_cmd(self, cclass, name, opts):
         return cclass(self.args, opts)
@@ -153,6 +158,9 @@ class FSCommandQueue(CommandQueue):
         # setup blkdev if missing or new one needed
         if not self.blkdev:
             self.blkdev = self.init_blkdev(self.img)
+            if self.args.stats:
+                heatmap = self.args.stats_heatmap > 0
+                self.blkdev = StatsBlockDevice(self.blkdev, heatmap=heatmap)
             if self.args.verbose:
                 print("setup blkdev: %s" % self.img)
 
@@ -299,15 +307,52 @@ class UnpackCmd(Command):
             return 0
 
 
+class SyncCmd(Command):
+    def __init__(self, args, opts):
+        Command.__init__(self, args, opts, edit=True)
+
+    def handle_vol(self, vol):
+        n = len(self.opts)
+        if n == 0:
+            print("Usage: sync <in_path> [keep] [hash] [dry]")
+            return 1
+        in_path = self.opts[0]
+        flags = self.opts[1:]
+        for flag in flags:
+            if flag not in ("keep", "hash", "dry"):
+                print("Invalid sync option:", flag)
+                return 1
+        dry_run = "dry" in flags
+        img = Imager()
+        actions = img.sync(
+            in_path,
+            vol,
+            delete="keep" not in flags,
+            use_hash="hash" in flags,
+            dry_run=dry_run,
+        )
+        if self.args.verbose or dry_run:
+            for action, path in actions:
+                print("%-8s %s" % (action, path))
+        if self.args.verbose:
+            print(
+                "Synced %d changes, wrote %d bytes"
+                % (len(actions), img.get_total_bytes())
+            )
+        return 0
+
+
 class RepackCmd(Command):
     def __init__(self, args, opts):
         Command.__init__(self, args, opts, edit=True)
         n = len(self.opts)
         if n == 0:
-            print("Usage: repack <src_path> [in_size]")
+            print("Usage: repack <src_path> [files] [in_size]")
             self.exit_code = 1
         in_img = self.opts[0]
         in_opts = KeyValue.parse_key_value_strings(self.opts[1:])
+        # force a file level repack
+        self.fast = not in_opts.pop("files", False)
         self.repacker = Repacker(in_img, in_opts)
         if not self.repacker.create_in():
             self.exit_code = 2
@@ -319,7 +364,41 @@ class RepackCmd(Command):
         return self.repacker.create_out_volume(blkdev)
 
     def handle_vol(self, vol):
-        self.repacker.repack()
+        copied = self.repacker.repack(self.fast)
+        if self.args.verbose:
+            if copied:
+                print("Repacked %d blocks" % self.repacker.num_blks)
+            else:
+                print("Repacked all files")
+        return 0
+
+
+class ConvertCmd(Command):
+    def __init__(self, args, opts):
+        Command.__init__(self, args, opts)
+        if len(self.opts) == 0:
+            print("Usage: convert <src_path> [codec=zlib|lzma] [chunk=<size>]")
+            self.exit_code = 1
+            return
+        self.in_img = self.opts[0]
+        self.convert_opts = KeyValue.parse_key_value_strings(self.opts[1:])
+
+    def init_blkdev(self, image_file):
+        if os.path.exists(image_file) and not self.args.force:
+            raise IOError("can't overwrite existing image file")
+        f = BlkDevFactory()
+        f.convert(self.in_img, image_file, self.convert_opts)
+        # gzip'ed images are read-only
+        t = f.type_from_extension(image_file) or 0
+        read_only = self.args.read_only or bool(t & f.GZIP_MASK)
+        return f.open(image_file, read_only=read_only)
+
+    def init_vol(self, blkdev):
+        vol = ADFSVolume(blkdev)
+        vol.open()
+        return vol
+
+    def handle_blkdev(self, blkdev):
         return 0
 
 
@@ -889,6 +968,39 @@ class BlkDevCmd(Command):
         return 0
 
 
+# ----- Overlay Command -----
+
+
+class OverlayCmd(Command):
+    def __init__(self, args, opts):
+        # close the volume first so all its writes are in the delta file
+        Command.__init__(self, args, opts, force_init=True)
+
+    def handle_blkdev(self, blkdev):
+        if len(self.opts) != 1 or self.opts[0] not in ("info", "commit", "discard"):
+            print("Usage: overlay ( info | commit | discard )")
+            return 1
+        if isinstance(blkdev, StatsBlockDevice):
+            blkdev = blkdev.blkdev
+        if isinstance(blkdev, PartBlockDevice):
+            blkdev = blkdev.raw_blkdev
+        if not isinstance(blkdev, OverlayBlockDevice):
+            print("Image is no overlay!")
+            return 2
+        cmd = self.opts[0]
+        if cmd == "info":
+            print("base:  ", blkdev.base_file)
+            print("delta: ", blkdev.delta_file)
+            print("blocks:", blkdev.get_num_delta_blocks())
+        elif cmd == "commit":
+            num = BlkDevFactory().commit_overlay(blkdev)
+            print("committed %d blocks" % num)
+        else:
+            num = blkdev.discard()
+            print("discarded %d blocks" % num)
+        return 0
+
+
 # ----- main -----
 def main(args=None, defaults=None):
     # call scanner and process all files with selected command
@@ -910,11 +1022,14 @@ def main(args=None, defaults=None):
         "block": BlockCmd,
         "pack": PackCmd,
         "unpack": UnpackCmd,
+        "sync": SyncCmd,
         "repack": RepackCmd,
+        "convert": ConvertCmd,
         "boot": BootCmd,
         "root": RootCmd,
         "info": InfoCmd,
         "relabel": RelabelCmd,
+        "overlay": OverlayCmd,
     }
 
     parser = argparse.ArgumentParser()
@@ -942,9 +1057,24 @@ def main(args=None, defaults=None):
         default=False,
         help="force overwrite existing image",
     )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        default=False,
+        help="show I/O statistics of the image",
+    )
+    parser.add_argument(
+        "--stats-heatmap",
+        type=int,
+        default=0,
+        metavar="REGIONS",
+        help="show I/O statistics with block accesses in REGIONS parts of the image",
+    )
     if defaults:
         parser.set_defaults(defaults)
     args = parser.parse_args(args)
+    if args.stats_heatmap > 0:
+        args.stats = True
 
     cmd_list = args.command_list
     sep = args.seperator
@@ -34,7 +34,21 @@ def ensure_data_sub_dir(sub_name):
         return sub_dir
 
 
+def get_user_cache_dir(sub_name=None):
+    """return the amitools dir in the user's cache dir (may not exist yet)"""
+    base_dir = os.environ.get("XDG_CACHE_HOME")
+    if not base_dir:
+        base_dir = os.environ.get("LOCALAPPDATA")
+    if not base_dir:
+        base_dir = os.path.join(os.path.expanduser("~"), ".cache")
+    cache_dir = os.path.join(base_dir, "amitools")
+    if sub_name:
+        cache_dir = os.path.join(cache_dir, sub_name)
+    return cache_dir
+
+
 # ----- mini test -----
 if __name__ == "__main__":
     print("data_dir:", get_data_dir())
     print("sub_dir:", get_data_sub_dir("fd"))
+    print("user_cache_dir:", get_user_cache_dir())
@@ -68,21 +68,43 @@ def get_hex_diff_line(addr, a_line, b_line, indent=0, num=16):
     return out
 
 
-def print_hex_diff(
-    a_data, b_data, indent=0, num=16, out=print, show_same=False, base_addr=0
-):
+def get_diff_line_offsets(a_data, b_data, num=16, block_size=4096):
+    """return the offsets of all lines of num bytes that differ.
+
+    The data is compared in large blocks first and only blocks that
+    differ are split into lines, so equal areas are skipped quickly.
+    """
     na = len(a_data)
     nb = len(b_data)
     n = max(na, nb)
+    # blocks hold a whole number of lines
+    block_size = max(block_size // num, 1) * num
+    res = []
     o = 0
-    addr = base_addr
     while o < n:
+        e = o + block_size
+        a_block = a_data[o:e]
+        b_block = b_data[o:e]
+        if a_block != b_block:
+            for lo in range(0, max(len(a_block), len(b_block)), num):
+                if a_block[lo : lo + num] != b_block[lo : lo + num]:
+                    res.append(o + lo)
+        o = e
+    return res
+
+
+def print_hex_diff(
+    a_data, b_data, indent=0, num=16, out=print, show_same=False, base_addr=0
+):
+    if show_same:
+        n = max(len(a_data), len(b_data))
+        offs = range(0, n, num)
+    else:
+        offs = get_diff_line_offsets(a_data, b_data, num)
+    for o in offs:
         a_line = a_data[o : o + num]
         b_line = b_data[o : o + num]
-        if show_same or a_line != b_line:
-            out(get_hex_diff_line(addr, a_line, b_line, indent, num))
-        o += num
-        addr += num
+        out(get_hex_diff_line(base_addr + o, a_line, b_line, indent, num))
 
 
 # mini test
@@ -0,0 +1,262 @@
+import collections
+import json
+import os
+import signal
+import sys
+import tempfile
+import time
+import traceback
+
+from .cfg import VamosMainParser
+from .log import log_main
+from .session import VamosSession, RET_CODE_CONFIG_ERROR
+
+BATCH_ARGS = ("--batch", "--batch-workers", "--batch-result")
+
+
+def strip_batch_args(args):
+    """remove the batch options from a vamos command line"""
+    result = []
+    skip = False
+    for arg in args:
+        if skip:
+            skip = False
+        elif arg in BATCH_ARGS:
+            skip = True
+        elif arg.split("=", 1)[0] not in BATCH_ARGS:
+            result.append(arg)
+    return result
+
+
+class BatchJob(object):
+    """a single vamos run of a batch.
+
+    args are vamos command line arguments that are appended to the ones of
+    the batch. The job runs in the given cwd with additional env vars and
+    stdin text.
+    """
+
+    def __init__(self, job_id, args, cwd=None, env=None, stdin=None):
+        self.job_id = job_id
+        self.args = args
+        self.cwd = cwd
+        self.env = env
+        self.stdin = stdin
+
+    def __str__(self):
+        return "[BatchJob:%s,%s]" % (self.job_id, self.args)
+
+    @classmethod
+    def from_json(cls, index, obj):
+        """create a job from a JSON value: either an arg list or an object"""
+        if isinstance(obj, list):
+            obj = {"args": obj}
+        if not isinstance(obj, dict):
+            raise ValueError("job #%d: invalid entry" % index)
+        args = obj.get("args")
+        if not isinstance(args, list) or not all(isinstance(a, str) for a in args):
+            raise ValueError("job #%d: 'args' must be a list of strings" % index)
+        env = obj.get("env")
+        if env is not None and not isinstance(env, dict):
+            raise ValueError("job #%d: 'env' must be an object" % index)
+        job_id = obj.get("id", index)
+        return cls(job_id, args, obj.get("cwd"), env, obj.get("stdin"))
+
+
+def read_jobs(path):
+    """read a JSON job file and return a list of BatchJobs.
+
+    The file contains either a list of jobs or an object with a "jobs" list.
+    raise ValueError on invalid jobs.
+    """
+    with open(path) as fh:
+        data = json.load(fh)
+    if isinstance(data, dict):
+        data = data.get("jobs")
+    if not isinstance(data, list):
+        raise ValueError("no job list found")
+    return [BatchJob.from_json(index, obj) for index, obj in enumerate(data)]
+
+
+class BatchRun(object):
+    """a running job: the forked child and its output files"""
+
+    def __init__(self, index, job, pid, out_file, err_file, res_fd):
+        self.index = index
+        self.job = job
+        self.pid = pid
+        self.out_file = out_file
+        self.err_file = err_file
+        self.res_fd = res_fd
+        self.start_time = time.monotonic()
+
+    def get_result(self, status):
+        """collect the result dict of the finished run"""
+        wall_time = time.monotonic() - self.start_time
+        with os.fdopen(self.res_fd, "rb") as fh:
+            data = fh.read()
+        result = {
+            "id": self.job.job_id,
+            "args": self.job.args,
+            "return_code": None,
+            "cycles": None,
+            "wall_time": wall_time,
+            "stdout": self._read_output(self.out_file),
+            "stderr": self._read_output(self.err_file),
+        }
+        if data:
+            result.update(json.loads(data))
+        elif os.WIFSIGNALED(status):
+            result["error"] = "killed by signal %d" % os.WTERMSIG(status)
+        else:
+            result["error"] = "no result"
+        return result
+
+    def _read_output(self, fobj):
+        fobj.seek(0)
+        data = fobj.read()
+        fobj.close()
+        # output of Amiga programs is not necessarily UTF-8
+        return data.decode("latin-1")
+
+
+class VamosBatch(object):
+    """run a list of BatchJobs in parallel.
+
+    A session is set up once with the config of the batch. Each job runs
+    in a forked child of this session, so workers start with the Python
+    interpreter and library manager already initialized. At most
+    'workers' jobs run at the same time.
+
+    The stdout and stderr of each job are captured. run() returns a list
+    with a result dict for each job in job order.
+    """
+
+    def __init__(
+        self, mp, jobs, workers=0, cfg_files=None, base_args=None, cfg_dict=None
+    ):
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        self.mp = mp
+        self.jobs = jobs
+        self.workers = workers
+        self.cfg_files = cfg_files
+        self.base_args = base_args or []
+        self.cfg_dict = cfg_dict
+        self.session = None
+
+    def run(self):
+        """run all jobs and return results or None on session setup error"""
+        self.session = VamosSession(self.mp)
+        try:
+            if not self.session.setup():
+                return None
+            log_main.info(
+                "batch: %d jobs with %d workers", len(self.jobs), self.workers
+            )
+            results = self._run_jobs()
+            self.session.shutdown()
+        finally:
+            self.session.shutdown_paths()
+        self.session.cleanup()
+        return results
+
+    def _run_jobs(self):
+        pending = collections.deque(enumerate(self.jobs))
+        running = {}
+        results = [None] * len(self.jobs)
+        try:
+            while pending or running:
+                while pending and len(running) < self.workers:
+                    index, job = pending.popleft()
+                    run = self._start_job(index, job)
+                    running[run.pid] = run
+                pid, status = os.wait()
+                run = running.pop(pid, None)
+                if run is None:
+                    continue
+                result = run.get_result(status)
+                log_main.info(
+                    "batch: job %s done: rc=%s %.3fs",
+                    run.job.job_id,
+                    result["return_code"],
+                    result["wall_time"],
+                )
+                results[run.index] = result
+        finally:
+            # stop all jobs on error or interrupt
+            for pid in running:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                    os.waitpid(pid, 0)
+                except OSError:
+                    pass
+        return results
+
+    def _start_job(self, index, job):
+        out_file = tempfile.TemporaryFile()
+        err_file = tempfile.TemporaryFile()
+        res_r, res_w = os.pipe()
+        # do not pass pending output to the child
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            # child: never return into the job loop
+            os.close(res_r)
+            result = {"return_code": 1}
+            try:
+                self._setup_child(job, out_file, err_file)
+                result = self._run_child(job)
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                self._exit_child(res_w, result)
+        os.close(res_w)
+        return BatchRun(index, job, pid, out_file, err_file, res_r)
+
+    def _setup_child(self, job, out_file, err_file):
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        if job.stdin is not None:
+            in_file = tempfile.TemporaryFile()
+            in_file.write(job.stdin.encode("latin-1"))
+            in_file.seek(0)
+        else:
+            in_file = open(os.devnull, "rb")
+        os.dup2(in_file.fileno(), 0)
+        os.dup2(out_file.fileno(), 1)
+        os.dup2(err_file.fileno(), 2)
+        if job.cwd:
+            os.chdir(job.cwd)
+        if job.env:
+            os.environ.update(job.env)
+
+    def _run_child(self, job):
+        mp = VamosMainParser()
+        args = self.base_args + job.args
+        if not mp.parse(self.cfg_files, args, self.cfg_dict):
+            return {"return_code": RET_CODE_CONFIG_ERROR}
+        # temp volumes must not clash with the ones of the batch
+        temp_postfix = ".%d" % os.getpid()
+        exit_code, run_state = self.session.run_forked(mp, temp_postfix)
+        cycles = run_state.cycles if run_state else None
+        return {"return_code": exit_code, "cycles": cycles}
+
+    def _exit_child(self, res_fd, result):
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.write(res_fd, json.dumps(result).encode("utf-8"))
+        finally:
+            os._exit(0)
+
+
+def write_results(results, path=None):
+    """write the job results as JSON to a file or stdout"""
+    data = {"jobs": results}
+    if path:
+        with open(path, "w") as fh:
+            json.dump(data, fh, indent=2)
+    else:
+        json.dump(data, sys.stdout, indent=2)
+        sys.stdout.write("\n")
@@ -5,4 +5,7 @@ from .trace import TraceParser
 from .machine import MachineParser
 from .proc import ProcessParser
 from .profile import ProfileParser
+from .loader import LoaderParser
+from .daemon import DaemonParser
+from .batch import BatchParser
 from .vamos import VamosMainParser
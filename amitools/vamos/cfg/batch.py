@@ -0,0 +1,41 @@
+from amitools.vamos.cfgcore import *
+
+
+class BatchParser(Parser):
+    def __init__(self, ini_prefix=None):
+        def_cfg = {"batch": {"file": Value(str), "workers": 0, "result": Value(str)}}
+        arg_cfg = {
+            "batch": {
+                "file": Argument(
+                    "--batch",
+                    action="store",
+                    help="run all jobs given in a JSON job file",
+                ),
+                "workers": Argument(
+                    "--batch-workers",
+                    action="store",
+                    type=int,
+                    help="number of jobs run in parallel (default: CPU count)",
+                ),
+                "result": Argument(
+                    "--batch-result",
+                    action="store",
+                    help="write JSON job results to file (default: stdout)",
+                ),
+            }
+        }
+        ini_trafo = {
+            "batch": {
+                "workers": "batch_workers",
+            }
+        }
+        Parser.__init__(
+            self,
+            "batch",
+            def_cfg,
+            arg_cfg,
+            "batch",
+            "run many vamos jobs in parallel",
+            ini_trafo,
+            ini_prefix,
+        )
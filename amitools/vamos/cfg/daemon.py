@@ -0,0 +1,37 @@
+from amitools.vamos.cfgcore import *
+
+
+class DaemonParser(Parser):
+    def __init__(self, ini_prefix=None):
+        def_cfg = {"daemon": {"socket": Value(str), "max_requests": 0}}
+        arg_cfg = {
+            "daemon": {
+                "socket": Argument(
+                    "--daemon-serve",
+                    action="store",
+                    help="run a vamos daemon listening on the given unix socket",
+                ),
+                "max_requests": Argument(
+                    "--daemon-max-requests",
+                    action="store",
+                    type=int,
+                    help="quit daemon after the given number of requests",
+                ),
+            }
+        }
+        ini_trafo = {
+            "daemon": {
+                "socket": "daemon_socket",
+                "max_requests": "daemon_max_requests",
+            }
+        }
+        Parser.__init__(
+            self,
+            "daemon",
+            def_cfg,
+            arg_cfg,
+            "daemon",
+            "run vamos as a pre-initialized server",
+            ini_trafo,
+            ini_prefix,
+        )
@@ -0,0 +1,50 @@
+from amitools.vamos.cfgcore import *
+
+
+class LoaderParser(Parser):
+    def __init__(self, ini_prefix=None):
+        def_cfg = {
+            "loader": {
+                "cache_entries": 32,
+                "cache_dir": Value(str),
+                "cache_dir_size": 64,
+            }
+        }
+        arg_cfg = {
+            "loader": {
+                "cache_entries": Argument(
+                    "--seg-cache-entries",
+                    action="store",
+                    type=int,
+                    help="number of parsed binaries kept in memory (0=off)",
+                ),
+                "cache_dir": Argument(
+                    "--seg-cache-dir",
+                    action="store",
+                    help="directory to store parsed binaries across runs",
+                ),
+                "cache_dir_size": Argument(
+                    "--seg-cache-dir-size",
+                    action="store",
+                    type=int,
+                    help="maximum size of the cache directory in MiB",
+                ),
+            }
+        }
+        ini_trafo = {
+            "loader": {
+                "cache_entries": "seg_cache_entries",
+                "cache_dir": "seg_cache_dir",
+                "cache_dir_size": "seg_cache_dir_size",
+            }
+        }
+        Parser.__init__(
+            self,
+            "loader",
+            def_cfg,
+            arg_cfg,
+            "loader",
+            "binary loader options",
+            ini_trafo,
+            ini_prefix,
+        )
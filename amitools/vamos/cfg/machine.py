@@ -24,6 +24,7 @@ class MachineParser(Parser):
                 "max_cycles": 0,
                 "cycles_per_run": 1000,
                 "ram_size": 1024,
+                "snapshot": Value(str),
             },
             "memmap": {
                 "hw_access": Value(str, "emu", enum=hw_access),
@@ -57,6 +58,11 @@ class MachineParser(Parser):
                     type=int,
                     help="set RAM size in KiB",
                 ),
+                "snapshot": Argument(
+                    "--snapshot",
+                    action="store",
+                    help="file to restore the bootstrapped session from or store it to",
+                ),
             },
             "memmap": {
                 "hw_access": Argument(
@@ -78,6 +84,7 @@ class MachineParser(Parser):
                 "max_cycles": "max_cycles",
                 "cycles_per_run": "cycles_per_run",
                 "ram_size": "ram_size",
+                "snapshot": "snapshot",
             },
             "memmap": {"hw_access": "hw_access", "old_dos_guard": "old_dos_guard"},
         }
@@ -18,7 +18,9 @@ class ProcessParser(Parser):
         arg_cfg = {
             "process": {
                 "command": {
-                    "binary": Argument("bin", help="AmigaOS binary to run", order=1),
+                    "binary": Argument(
+                        "bin", nargs="?", help="AmigaOS binary to run", order=1
+                    ),
                     "args": Argument(
                         "args", nargs="*", help="AmigaOS binary arguments", order=2
                     ),
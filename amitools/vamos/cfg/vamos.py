@@ -26,6 +26,15 @@ class VamosMainParser(MainParser):
         # profile
         self.profile = ProfileParser()
         self.add_parser(self.profile)
+        # loader
+        self.loader = LoaderParser("vamos")
+        self.add_parser(self.loader)
+        # daemon
+        self.daemon = DaemonParser("vamos")
+        self.add_parser(self.daemon)
+        # batch
+        self.batch = BatchParser("vamos")
+        self.add_parser(self.batch)
 
     def get_log_dict(self):
         return self.log.get_cfg_dict()
@@ -47,3 +56,12 @@ class VamosMainParser(MainParser):
 
     def get_profile_dict(self):
         return self.profile.get_cfg_dict()
+
+    def get_loader_dict(self):
+        return self.loader.get_cfg_dict()
+
+    def get_daemon_dict(self):
+        return self.daemon.get_cfg_dict()
+
+    def get_batch_dict(self):
+        return self.batch.get_cfg_dict()
@@ -0,0 +1,8 @@
+from .proto import (
+    send_request,
+    recv_request,
+    send_result,
+    recv_result,
+    DaemonProtocolError,
+)
+from .client import daemon_client, RET_CODE_DAEMON_ERROR
@@ -0,0 +1,43 @@
+import os
+import socket
+import sys
+
+from .proto import send_request, recv_result, DaemonProtocolError
+
+RET_CODE_DAEMON_ERROR = 1001
+
+
+def daemon_client(socket_path, cfg_files=None, args=None):
+    """run a vamos command line in a vamos daemon.
+
+    The current working dir, the environment and the stdio descriptors
+    are passed to the daemon and the result is the return code of the
+    Amiga process.
+
+    Return None if the daemon is not reachable so the caller can fall
+    back to a local run.
+    """
+    if args is None:
+        args = sys.argv[1:]
+    if cfg_files is not None:
+        cfg_files = list(cfg_files)
+    req = {
+        "args": list(args),
+        "cfg_files": cfg_files,
+        "cwd": os.getcwd(),
+        "env": dict(os.environ),
+    }
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return None
+        try:
+            send_request(sock, req)
+            return recv_result(sock)
+        except (OSError, DaemonProtocolError) as e:
+            print("vamos: daemon '%s' failed: %s" % (socket_path, e), file=sys.stderr)
+            return RET_CODE_DAEMON_ERROR
+    finally:
+        sock.close()
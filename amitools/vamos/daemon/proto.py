@@ -0,0 +1,75 @@
+"""the wire protocol between vamos daemon and its clients.
+
+A request is a length prefixed JSON object that carries the stdio file
+descriptors of the client as SCM_RIGHTS ancillary data. The reply is a
+single signed 32 bit return code.
+"""
+
+import array
+import os
+import json
+import socket
+import struct
+
+STDIO_FDS = (0, 1, 2)
+
+_LEN_FMT = ">I"
+_LEN_SIZE = 4
+_RET_FMT = ">i"
+_RET_SIZE = 4
+_MAX_FDS = 8
+
+
+class DaemonProtocolError(Exception):
+    pass
+
+
+def _recv_exact(sock, size, data=b""):
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise DaemonProtocolError("connection closed")
+        data += chunk
+    return data
+
+
+def send_request(sock, req, fds=STDIO_FDS):
+    """send a request dict and pass the given fds"""
+    payload = json.dumps(req).encode("utf-8")
+    data = struct.pack(_LEN_FMT, len(payload)) + payload
+    anc = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))]
+    num = sock.sendmsg([data], anc)
+    if num < len(data):
+        sock.sendall(data[num:])
+
+
+def recv_request(sock):
+    """receive a request and return (req, fds)"""
+    fds = array.array("i")
+    msg, anc, flags, addr = sock.recvmsg(4096, socket.CMSG_LEN(_MAX_FDS * fds.itemsize))
+    for level, kind, cdata in anc:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            num = len(cdata) - (len(cdata) % fds.itemsize)
+            fds.frombytes(cdata[:num])
+    fds = list(fds)
+    try:
+        if not msg:
+            raise DaemonProtocolError("empty request")
+        msg = _recv_exact(sock, _LEN_SIZE, msg)
+        size = struct.unpack_from(_LEN_FMT, msg)[0]
+        msg = _recv_exact(sock, _LEN_SIZE + size, msg)
+        req = json.loads(msg[_LEN_SIZE:].decode("utf-8"))
+    except (DaemonProtocolError, ValueError):
+        for fd in fds:
+            os.close(fd)
+        raise
+    return req, fds
+
+
+def send_result(sock, ret_code):
+    sock.sendall(struct.pack(_RET_FMT, ret_code))
+
+
+def recv_result(sock):
+    data = _recv_exact(sock, _RET_SIZE)
+    return struct.unpack(_RET_FMT, data)[0]
@@ -0,0 +1,202 @@
+import os
+import errno
+import signal
+import socket
+import stat
+import sys
+import traceback
+
+from amitools.vamos.cfg import VamosMainParser
+from amitools.vamos.log import log_daemon
+from amitools.vamos.session import VamosSession, RET_CODE_CONFIG_ERROR
+from .proto import recv_request, send_result, STDIO_FDS, DaemonProtocolError
+from .client import RET_CODE_DAEMON_ERROR
+
+
+class VamosDaemon(object):
+    """a pre-initialized vamos that runs commands sent by daemon clients.
+
+    The daemon sets up a session with bootstrapped exec and dos libs once.
+    Each request is run in a forked child that starts from this state and
+    uses the cwd, environment and stdio fds of the client. If the config
+    of the request does not match the session then the child performs a
+    regular full vamos run.
+
+    The socket runs commands as the user of the daemon, so it is only
+    accessible by this user.
+    """
+
+    def __init__(self, mp, socket_path, max_requests=0):
+        self.mp = mp
+        self.socket_path = socket_path
+        self.max_requests = max_requests
+        self.session = None
+        self.num_requests = 0
+
+    def serve(self):
+        sock = self._open_socket()
+        if sock is None:
+            return RET_CODE_CONFIG_ERROR
+        self.session = VamosSession(self.mp)
+        try:
+            if not self.session.setup():
+                return RET_CODE_CONFIG_ERROR
+            self._serve_loop(sock)
+            self.session.shutdown()
+        finally:
+            self._close_socket(sock)
+            self.session.shutdown_paths()
+        self.session.cleanup()
+        log_daemon.info("daemon is exiting")
+        return 0
+
+    def _open_socket(self):
+        """bind the listening socket. return None if the path can't be used"""
+        try:
+            self._remove_stale_socket()
+        except OSError as e:
+            log_daemon.error("can't use socket '%s': %s", self.socket_path, e)
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # only the user may connect
+        old_umask = os.umask(0o177)
+        try:
+            sock.bind(self.socket_path)
+        except OSError as e:
+            log_daemon.error("can't bind socket '%s': %s", self.socket_path, e)
+            sock.close()
+            return None
+        finally:
+            os.umask(old_umask)
+        return sock
+
+    def _close_socket(self, sock):
+        # only remove the socket file once: it might belong to a new daemon
+        if sock.fileno() == -1:
+            return
+        sock.close()
+        try:
+            os.remove(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+    def _remove_stale_socket(self):
+        """remove the socket file left by a daemon that is gone.
+
+        raise OSError if the path is no socket or a daemon still listens.
+        """
+        path = self.socket_path
+        try:
+            st = os.lstat(path)
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(st.st_mode):
+            raise OSError(errno.EEXIST, "file exists and is no socket")
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.remove(path)
+            return
+        finally:
+            probe.close()
+        raise OSError(errno.EADDRINUSE, "another daemon is listening")
+
+    def _serve_loop(self, sock):
+        old_term = signal.signal(signal.SIGTERM, self._sig_term)
+        try:
+            sock.listen()
+            log_daemon.info("listening on '%s'", self.socket_path)
+            while self.max_requests == 0 or self.num_requests < self.max_requests:
+                conn, _ = sock.accept()
+                try:
+                    self._handle_conn(sock, conn)
+                finally:
+                    conn.close()
+                self._reap_children()
+        except KeyboardInterrupt:
+            log_daemon.info("daemon stopped")
+        finally:
+            signal.signal(signal.SIGTERM, old_term)
+            self._close_socket(sock)
+            self._reap_children(True)
+
+    def _sig_term(self, signum, frame):
+        raise KeyboardInterrupt()
+
+    def _reap_children(self, wait=False):
+        flags = 0 if wait else os.WNOHANG
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, flags)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+    def _handle_conn(self, sock, conn):
+        try:
+            req, fds = recv_request(conn)
+        except (OSError, DaemonProtocolError) as e:
+            log_daemon.error("invalid request: %s", e)
+            return
+        self.num_requests += 1
+        log_daemon.info("request #%d: %s", self.num_requests, req.get("args"))
+        try:
+            try:
+                pid = os.fork()
+            except OSError as e:
+                # e.g. process limit reached: fail this request only
+                log_daemon.error("request #%d: fork failed: %s", self.num_requests, e)
+                self._fail_request(conn, fds, "can't run command: %s" % e)
+                return
+            if pid == 0:
+                # child: never return into the serve loop
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                sock.close()
+                ret_code = 1
+                try:
+                    self._setup_child(req, fds)
+                    ret_code = self._run_request(req)
+                except BaseException:
+                    traceback.print_exc()
+                finally:
+                    self._exit_child(conn, ret_code)
+            log_daemon.info("request #%d: pid=%d", self.num_requests, pid)
+        finally:
+            for fd in fds:
+                os.close(fd)
+
+    def _fail_request(self, conn, fds, msg):
+        try:
+            if len(fds) > 2:
+                os.write(fds[2], ("vamos daemon: %s\n" % msg).encode("utf-8"))
+            send_result(conn, RET_CODE_DAEMON_ERROR)
+        except OSError as e:
+            log_daemon.error("can't report error to client: %s", e)
+
+    def _setup_child(self, req, fds):
+        # take over stdio of client
+        for fd, std_fd in zip(fds, STDIO_FDS):
+            os.dup2(fd, std_fd)
+        os.chdir(req["cwd"])
+        os.environ.clear()
+        os.environ.update(req["env"])
+
+    def _exit_child(self, conn, ret_code):
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            send_result(conn, ret_code)
+        finally:
+            os._exit(0)
+
+    def _run_request(self, req):
+        mp = VamosMainParser()
+        if not mp.parse(req["cfg_files"], req["args"]):
+            return RET_CODE_CONFIG_ERROR
+        # temp volumes must not clash with the ones of the daemon
+        temp_postfix = ".%d" % os.getpid()
+        exit_code, _ = self.session.run_forked(mp, temp_postfix)
+        return exit_code
@@ -3,3 +3,4 @@ from .range import LabelRange
 from .segment import LabelSegment
 from .struct import LabelStruct
 from .lib import LabelLib
+from .symindex import SymbolIndex, SymbolSegment, AddrInfo
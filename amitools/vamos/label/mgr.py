@@ -56,6 +56,13 @@ class LabelManager:
             r = r.next
         return ranges
 
+    def set_all_labels(self, ranges):
+        """replace all labels with the given list of unlinked ranges"""
+        self.first = None
+        self.last = None
+        for r in ranges:
+            self.add_label(r)
+
     def dump(self):
         r = self.first
         while r != None:
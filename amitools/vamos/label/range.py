@@ -7,6 +7,13 @@ class LabelRange:
         self.next = None
         self.prev = None
 
+    def __getstate__(self):
+        # do not follow the links when pickling, see LabelManager.set_all_labels()
+        state = self.__dict__.copy()
+        state["next"] = None
+        state["prev"] = None
+        return state
+
     def __str__(self):
         return "<@%06x +%06x %06x> [%s]" % (
             self.addr,
@@ -0,0 +1,167 @@
+import bisect
+
+
+class SymbolSegment:
+    """a segment of a loaded seglist registered in the SymbolIndex"""
+
+    def __init__(self, name, seg_num, addr, size, bin_seg, seglist_baddr):
+        self.name = name
+        self.seg_num = seg_num
+        self.addr = addr
+        self.size = size
+        self.end = addr + size
+        self.bin_seg = bin_seg
+        self.seglist_baddr = seglist_baddr
+
+    def __str__(self):
+        return "[SymbolSegment:%s_%d,@%06x,+%06x]" % (
+            self.name,
+            self.seg_num,
+            self.addr,
+            self.size,
+        )
+
+    def is_inside(self, addr):
+        return self.addr <= addr < self.end
+
+
+class AddrInfo:
+    """the result of an address lookup in the SymbolIndex.
+
+    It holds the segment and offset of the address and, if the binary
+    provides them, the nearest symbol before the address and its source
+    line.
+    """
+
+    def __init__(self, segment, offset, symbol=None, sym_delta=0, src_line=None):
+        self.segment = segment
+        self.offset = offset
+        self.symbol = symbol
+        self.sym_delta = sym_delta
+        self.src_line = src_line
+
+    def __str__(self):
+        seg = self.segment
+        res = "%s_%d+%06x" % (seg.name, seg.seg_num, self.offset)
+        name = self.get_symbol_name()
+        if name is not None:
+            res += " %s+%d" % (name, self.sym_delta)
+        src = self.get_src()
+        if src is not None:
+            res += " [%s:%d]" % src
+        return res
+
+    def get_symbol_name(self):
+        if self.symbol is None:
+            return None
+        name = self.symbol.get_name()
+        if isinstance(name, bytes):
+            name = name.decode("latin-1")
+        return name
+
+    def get_src(self):
+        """return (src_file, src_line) or None"""
+        if self.src_line is None:
+            return None
+        src_file = self.src_line.get_file().get_src_file()
+        return src_file, self.src_line.get_src_line()
+
+
+class SymbolIndex:
+    """map runtime addresses of loaded seglists to their segments, symbols
+    and source lines.
+
+    The segment loader adds each seglist it loads and removes it again on
+    unload. The segments are kept sorted by address and symbols and lines
+    are found with the offset indexes of the BinImage segments, so all
+    lookups are O(log n). Other than labels the index is always available.
+    """
+
+    def __init__(self):
+        # sorted segment start addresses and their segments
+        self.starts = []
+        self.segments = []
+        # seglist baddr -> list of segments
+        self.seglists = {}
+
+    def add_seglist(self, baddr, name, addrs, sizes, bin_segs=None):
+        """register the segments of the seglist at baddr.
+
+        addrs and sizes describe the segment data in memory and bin_segs
+        are the matching BinImage segments (if any).
+        """
+        if baddr in self.seglists:
+            self.remove_seglist(baddr)
+        segs = []
+        for seg_num, (addr, size) in enumerate(zip(addrs, sizes)):
+            bin_seg = bin_segs[seg_num] if bin_segs else None
+            seg = SymbolSegment(name, seg_num, addr, size, bin_seg, baddr)
+            i = bisect.bisect_right(self.starts, addr)
+            self.starts.insert(i, addr)
+            self.segments.insert(i, seg)
+            segs.append(seg)
+        self.seglists[baddr] = segs
+
+    def remove_seglist(self, baddr):
+        """unregister the seglist at baddr. return True if it was found"""
+        segs = self.seglists.pop(baddr, None)
+        if segs is None:
+            return False
+        for seg in segs:
+            i = bisect.bisect_left(self.starts, seg.addr)
+            while self.segments[i] is not seg:
+                i += 1
+            del self.starts[i]
+            del self.segments[i]
+        return True
+
+    def clear(self):
+        self.starts = []
+        self.segments = []
+        self.seglists = {}
+
+    def get_num_seglists(self):
+        return len(self.seglists)
+
+    def get_segments(self):
+        """return all segments sorted by address"""
+        return list(self.segments)
+
+    def find_segment(self, addr):
+        """return the SymbolSegment containing addr or None"""
+        i = bisect.bisect_right(self.starts, addr) - 1
+        if i >= 0:
+            seg = self.segments[i]
+            if addr < seg.end:
+                return seg
+        return None
+
+    def find_symbol(self, addr):
+        """return name of the symbol exactly at addr or None"""
+        seg = self.find_segment(addr)
+        if seg is None or seg.bin_seg is None:
+            return None
+        return seg.bin_seg.find_symbol(addr - seg.addr)
+
+    def find_debug_line(self, addr):
+        """return the debug line entry exactly at addr or None"""
+        seg = self.find_segment(addr)
+        if seg is None or seg.bin_seg is None:
+            return None
+        return seg.bin_seg.find_debug_line(addr - seg.addr)
+
+    def lookup(self, addr):
+        """return an AddrInfo with nearest symbol and source line for addr
+        or None if addr is not inside a registered segment"""
+        seg = self.find_segment(addr)
+        if seg is None:
+            return None
+        offset = addr - seg.addr
+        info = AddrInfo(seg, offset)
+        bin_seg = seg.bin_seg
+        if bin_seg is not None:
+            nearest = bin_seg.find_nearest_symbol(offset)
+            if nearest is not None:
+                info.symbol, info.sym_delta = nearest
+            info.src_line = bin_seg.find_nearest_debug_line(offset)
+        return info
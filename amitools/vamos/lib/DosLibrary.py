@@ -622,9 +622,7 @@ class DosLibrary(LibImpl):
         size = ctx.cpu.r_reg(REG_D3)
 
         fh = self.file_mgr.get_by_b_addr(fh_b_addr, False)
-        data = fh.read(size)
-        ctx.mem.w_block(buf_ptr, data)
-        got = len(data)
+        got = fh.read_mem(ctx.mem, buf_ptr, size)
         log_dos.info("Read(%s, %06x, %d) -> %d" % (fh, buf_ptr, size, got))
         return got
 
@@ -634,9 +632,7 @@ class DosLibrary(LibImpl):
         size = ctx.cpu.r_reg(REG_D3)
 
         fh = self.file_mgr.get_by_b_addr(fh_b_addr, True)
-        data = ctx.mem.r_block(buf_ptr, size)
-        fh.write(data)
-        got = len(data)
+        got = fh.write_mem(ctx.mem, buf_ptr, size)
         log_dos.info("Write(%s, %06x, %d) -> %d" % (fh, buf_ptr, size, got))
         return size
 
@@ -648,9 +644,8 @@ class DosLibrary(LibImpl):
         # Actually, this is buffered I/O, not unbuffered IO. For the
         # time being, keep it unbuffered.
         fh = self.file_mgr.get_by_b_addr(fh_b_addr, True)
-        data = ctx.mem.r_block(buf_ptr, size * number)
-        fh.write(data)
-        got = len(data) // size
+        fh.write_mem(ctx.mem, buf_ptr, size * number)
+        got = number
         log_dos.info(
             "FWrite(%s, %06x, %d, %d) -> %d" % (fh, buf_ptr, size, number, got)
         )
@@ -665,12 +660,11 @@ class DosLibrary(LibImpl):
         # go through all the buffer logic. However, for the time
         # being, keep it unbuffered.
         fh = self.file_mgr.get_by_b_addr(fh_b_addr, True)
-        data = fh.read(size * number)
-        if data == -1:
+        got = fh.read_mem(ctx.mem, buf_ptr, size * number)
+        if got == -1:
             got = 0  # simple error handling
         else:
-            got = len(data) // size
-            ctx.mem.w_block(buf_ptr, data)
+            got //= size
         log_dos.info("FRead(%s, %06x, %d, %d) -> %d" % (fh, buf_ptr, size, number, got))
         return got
 
@@ -2,6 +2,10 @@ import os
 import sys
 from amitools.vamos.libstructs import FileHandleStruct
 
+# bulk transfers between files and memory are split into chunks of this size
+XFER_CHUNK_SIZE = 64 * 1024
+_xfer_buf = None
+
 
 class FileHandle:
     """represent an AmigaOS file handle (FH) in vamos"""
@@ -70,6 +74,55 @@ class FileHandle:
         except IOError:
             return -1
 
+    def read_mem(self, mem, addr, size):
+        """read up to size bytes from the file directly into memory.
+
+        The data is passed in bounded chunks through a reused buffer. As with
+        read() the transfer stops after a short read, e.g. at EOF or on an
+        interactive stream. Return the number of bytes read or -1 on error.
+        """
+        buf = self._get_xfer_buf()
+        view = memoryview(buf)
+        total = 0
+        try:
+            while total < size:
+                chunk = min(size - total, XFER_CHUNK_SIZE)
+                n = self.obj.readinto1(view[:chunk])
+                if not n:
+                    break
+                # only the last partial chunk needs a copy
+                data = buf if n == XFER_CHUNK_SIZE else buf[:n]
+                mem.w_block(addr + total, data)
+                total += n
+                if n < chunk:
+                    break
+        except IOError:
+            return -1
+        return total
+
+    def write_mem(self, mem, addr, size):
+        """write size bytes from memory to the file in bounded chunks.
+
+        Return the number of bytes written or -1 on error.
+        """
+        total = 0
+        try:
+            while total < size:
+                chunk = min(size - total, XFER_CHUNK_SIZE)
+                self.obj.write(mem.r_block(addr + total, chunk))
+                total += chunk
+            if self.auto_flush:
+                self.obj.flush()
+        except IOError:
+            return -1
+        return total
+
+    def _get_xfer_buf(self):
+        global _xfer_buf
+        if _xfer_buf is None:
+            _xfer_buf = bytearray(XFER_CHUNK_SIZE)
+        return _xfer_buf
+
     def getc(self):
         if len(self.unch) > 0:
             self.ch = self.unch[0]
@@ -58,6 +58,12 @@ class LibCreator(object):
     def get_profiler(self):
         return self.profiler
 
+    def _create_stub(self, name, fd, scan, ctx, profile):
+        if scan is None:
+            return self.stub_gen.gen_fake_stub(name, fd, ctx, profile)
+        else:
+            return self.stub_gen.gen_stub(scan, ctx, profile)
+
     def create_lib(self, info, ctx, impl=None, lib_cfg=None, check=False):
         name = info.get_name()
         if name.endswith(".device"):
@@ -89,11 +95,10 @@ class LibCreator(object):
         else:
             profile = None
         # create stub
+        stub = self._create_stub(name, fd, scan, ctx, profile)
         if scan is None:
-            stub = self.stub_gen.gen_fake_stub(name, fd, ctx, profile)
             struct = LibraryStruct
         else:
-            stub = self.stub_gen.gen_stub(scan, ctx, profile)
             struct = impl.get_struct_def()
         # adjust info pos/neg size
         if info.pos_size == 0:
@@ -110,6 +115,28 @@ class LibCreator(object):
         library.update_sum()
         # create vamos lib and combine all pieces
         vlib = VLib(
-            library, info, struct, fd, impl, stub, ctx, patcher, profile, is_dev
+            library,
+            info,
+            struct,
+            fd,
+            impl,
+            stub,
+            ctx,
+            patcher,
+            profile,
+            is_dev,
+            scan,
         )
         return vlib
+
+    def restore_lib(self, vlib):
+        """create the stub of a vlib restored from a snapshot and set up its traps.
+
+        The library and its jump table are already in memory.
+        """
+        name = vlib.get_name()
+        fd = vlib.get_fd()
+        scan = vlib.get_scan()
+        stub = self._create_stub(name, fd, scan, vlib.get_ctx(), vlib.get_profile())
+        vlib.stub = stub
+        vlib.get_patcher().restore_traps(self.traps, stub)
@@ -86,6 +86,15 @@ class VLibManager(object):
         self.exec_lib.lib_node.inc_open_cnt()
         return vlib
 
+    def restore_libs(self, main_profiler=None):
+        """set up stubs and traps of all vlibs restored from a snapshot"""
+        if main_profiler:
+            main_profiler.add_profiler(self.lib_profiler)
+        # the stubs use the current log setup
+        self._setup_creator()
+        for vlib in self.addr_vlib.values():
+            self.creator.restore_lib(vlib)
+
     def get_vlib_by_addr(self, addr):
         """return associated vlib for a base lib address"""
         if addr in self.addr_vlib:
@@ -29,10 +29,13 @@ class LibPatcherMultiTrap(object):
         func_table = self.stub.get_func_tab()
         size = len(func_table) * 2
         self.mem_obj = self.alloc.alloc_memory(size, label=name)
-        addr = self.mem_obj.addr
-        self.trap_base = addr
+        self.trap_base = self.mem_obj.addr
+        self._setup_traps()
+
+    def _setup_traps(self):
+        addr = self.trap_base
         mem = self.alloc.mem
-        for func in func_table:
+        for func in self.stub.get_func_tab():
             # setup new patch
             tid = self.traps.setup(func, auto_rts=True)
             if tid < 0:
@@ -46,6 +49,17 @@ class LibPatcherMultiTrap(object):
             # next slot
             addr += 2
 
+    def restore_traps(self, traps, stub):
+        """bind a new stub to the trap block of a restored lib.
+
+        The jump table and trap block are already in memory, only the traps
+        of the given machine are set up and written to the trap block.
+        """
+        self.traps = traps
+        self.stub = stub
+        self.tids = []
+        self._setup_traps()
+
     def cleanup(self):
         """remove traps"""
         for tid in self.tids:
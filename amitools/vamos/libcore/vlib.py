@@ -1,7 +1,8 @@
 class VLib(object):
     """a vamos interal lib.
 
-    A vamos internal lib has a stub, a impl and allocator and patcher
+    A vamos internal lib has a stub, a impl and allocator and patcher.
+    The scan of the impl is kept to create the stub again.
     """
 
     def __init__(
@@ -16,6 +17,7 @@ class VLib(object):
         patcher,
         profile=None,
         is_dev=False,
+        scan=None,
     ):
         self.library = library
         self.info = info
@@ -27,6 +29,7 @@ class VLib(object):
         self.patcher = patcher
         self.profile = profile
         self.is_dev = is_dev
+        self.scan = scan
         self._setup()
 
     def get_library(self):
@@ -56,6 +59,9 @@ class VLib(object):
     def get_profile(self):
         return self.profile
 
+    def get_scan(self):
+        return self.scan
+
     def is_device(self):
         return self.is_dev
 
@@ -86,6 +92,7 @@ class VLib(object):
         self.stub = None
         self.impl = None
         self.patcher = None
+        self.scan = None
 
     def open(self):
         lib = self.library
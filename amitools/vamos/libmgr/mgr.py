@@ -54,6 +54,10 @@ class LibManager(object):
             log_libmgr.info("exec: force version: %s", version)
         return self.vlib_mgr.bootstrap_exec(exec_info, version)
 
+    def restore_libs(self, main_profiler=None):
+        """attach the libs restored from a snapshot to the machine"""
+        self.vlib_mgr.restore_libs(main_profiler)
+
     def shutdown(self, run_sp=None):
         """cleanup libs
 
@@ -9,7 +9,14 @@ from .mgr import LibManager
 
 class SetupLibManager(object):
     def __init__(
-        self, machine, mem_map, scheduler, path_mgr, lib_cfg=None, main_profiler=None
+        self,
+        machine,
+        mem_map,
+        scheduler,
+        path_mgr,
+        lib_cfg=None,
+        main_profiler=None,
+        bin_cache=None,
     ):
         self.machine = machine
         self.mem_map = mem_map
@@ -18,6 +25,7 @@ class SetupLibManager(object):
         self.alloc = mem_map.get_alloc()
         self.lib_mgr_cfg = lib_cfg
         self.main_profiler = main_profiler
+        self.bin_cache = bin_cache
         # state
         self.seg_loader = None
         self.exec_ctx = None
@@ -35,7 +43,12 @@ class SetupLibManager(object):
         if self.lib_mgr_cfg is None:
             self.lib_mgr_cfg = LibMgrCfg()
         # create segment loader
-        self.seg_loader = SegmentLoader(self.alloc, self.path_mgr)
+        self.seg_loader = SegmentLoader(
+            self.alloc,
+            self.path_mgr,
+            self.bin_cache,
+            sym_index=self.machine.get_sym_index(),
+        )
         # setup contexts
         odg_base = self.mem_map.get_old_dos_guard_base()
         # create lib mgr
@@ -70,6 +83,15 @@ class SetupLibManager(object):
         # return lib_mgr
         return self.lib_mgr
 
+    def restore(self):
+        """attach a lib manager restored from a snapshot to the machine.
+
+        Libs are restored with open base libs, so open_base_libs() is not
+        needed.
+        """
+        self.lib_mgr.restore_libs(self.main_profiler)
+        self.scheduler.set_cur_task_callback(self.cur_task_callback)
+
     def cleanup(self):
         # shutdown of libmgr needs temp stack
         sp = self.machine.get_ram_begin() - 4
@@ -0,0 +1,304 @@
+import os
+import stat
+import array
+import hashlib
+import pickle
+import zlib
+import collections
+
+from amitools.binfmt.BinFmt import BinFmt
+from amitools.binfmt.BinImage import (
+    BinImage,
+    Segment,
+    Relocations,
+    Reloc,
+    SymbolTable,
+    Symbol,
+    DebugLine,
+    DebugLineFile,
+    DebugLineEntry,
+)
+from amitools.binfmt.Relocate import Relocate
+from amitools.vamos.log import log_segload
+
+
+class BinImageCacheEntry(object):
+    """a parsed binary and its relocator ready to be placed in memory"""
+
+    def __init__(self, key, bin_img, relocator=None):
+        self.key = key
+        self.bin_img = bin_img
+        if relocator is None:
+            relocator = Relocate(bin_img)
+        self.relocator = relocator
+        self.sizes = relocator.get_sizes()
+        self.names = bin_img.get_segment_names()
+
+    def __str__(self):
+        return "[BinImageCacheEntry:%s,size=%d,mtime=%d]" % self.key
+
+
+class BinImageCache(object):
+    """cache parsed BinImages of binaries loaded via LoadSeg.
+
+    Entries are keyed by (path, size, mtime) and kept in an in-process
+    LRU. Optionally, a cache directory stores a compact serialized form
+    of the images, so that new vamos processes can skip parsing too.
+    The total size of the cache directory is bounded by max_disk_size
+    and the least recently used files are evicted first.
+
+    The cache files are unpickled, so the cache directory is created only
+    accessible by the user and it is not used if another user can write
+    to it.
+    """
+
+    DISK_MAGIC = b"VBIC"
+    DISK_VERSION = 1
+    DISK_EXT = ".bic"
+
+    def __init__(self, max_entries=32, cache_dir=None, max_disk_size=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_size = max_disk_size
+        self.binfmt = BinFmt()
+        self.entries = collections.OrderedDict()
+        self.disk_ok = None
+        # stats
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_cfg(cls, loader_cfg):
+        cache_dir = loader_cfg.cache_dir
+        if cache_dir:
+            cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        max_disk_size = loader_cfg.cache_dir_size * 1024 * 1024
+        return cls(loader_cfg.cache_entries, cache_dir, max_disk_size)
+
+    def get_stats(self):
+        """return (hits, disk_hits, misses)"""
+        return self.hits, self.disk_hits, self.misses
+
+    def clear(self):
+        """drop all in-process entries"""
+        self.entries.clear()
+
+    def get_key(self, sys_path):
+        """return the cache key for a host file or None if it does not exist"""
+        try:
+            st = os.stat(sys_path)
+        except OSError:
+            return None
+        return (os.path.abspath(sys_path), st.st_size, st.st_mtime_ns)
+
+    def load(self, sys_path):
+        """return a BinImageCacheEntry for the given host file or None"""
+        key = self.get_key(sys_path)
+        if key is None:
+            return None
+        # in-process hit?
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            log_segload.debug("bin cache hit: %s", entry)
+            return entry
+        # disk hit?
+        bin_img = self._disk_load(key)
+        if bin_img is not None:
+            self.disk_hits += 1
+        else:
+            # parse binary
+            self.misses += 1
+            bin_img = self.binfmt.load_image(sys_path)
+            if bin_img is None:
+                return None
+            self._disk_store(key, bin_img)
+        entry = BinImageCacheEntry(key, bin_img)
+        self._add_entry(key, entry)
+        return entry
+
+    def _add_entry(self, key, entry):
+        if self.max_entries <= 0:
+            return
+        self.entries[key] = entry
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    # ----- disk cache -----
+
+    def _disk_setup(self):
+        """create and check the cache dir once. return True if it is usable"""
+        if self.disk_ok is None:
+            self.disk_ok = False
+            try:
+                os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+                st = os.stat(self.cache_dir)
+            except OSError as e:
+                log_segload.warning(
+                    "bin cache: can't create '%s': %s", self.cache_dir, e
+                )
+                return False
+            if hasattr(os, "getuid") and st.st_uid != os.getuid():
+                log_segload.warning(
+                    "bin cache: '%s' is owned by another user", self.cache_dir
+                )
+            elif stat.S_IMODE(st.st_mode) & 0o022:
+                log_segload.warning(
+                    "bin cache: '%s' is writable by other users", self.cache_dir
+                )
+            else:
+                self.disk_ok = True
+        return self.disk_ok
+
+    def _disk_path(self, key):
+        name = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, name + self.DISK_EXT)
+
+    def _disk_load(self, key):
+        if not self.cache_dir or not self._disk_setup():
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as fh:
+                data = fh.read()
+        except OSError:
+            return None
+        try:
+            if data[:4] != self.DISK_MAGIC or data[4] != self.DISK_VERSION:
+                raise ValueError("invalid header")
+            file_key, dump = pickle.loads(zlib.decompress(data[5:]))
+            if file_key != key:
+                raise ValueError("key mismatch")
+            bin_img = undump_bin_image(dump)
+        except Exception as e:
+            log_segload.warning("bin cache: dropping '%s': %s", path, e)
+            self._disk_remove(path)
+            return None
+        # mark as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        log_segload.debug("bin cache disk hit: %s", path)
+        return bin_img
+
+    def _disk_store(self, key, bin_img):
+        if not self.cache_dir or not self._disk_setup():
+            return
+        path = self._disk_path(key)
+        data = pickle.dumps((key, dump_bin_image(bin_img)), pickle.HIGHEST_PROTOCOL)
+        blob = self.DISK_MAGIC + bytes([self.DISK_VERSION]) + zlib.compress(data)
+        if len(blob) > self.max_disk_size:
+            return
+        tmp_path = path + ".%d.tmp" % os.getpid()
+        try:
+            with open(tmp_path, "wb") as fh:
+                fh.write(blob)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log_segload.warning("bin cache: can't write '%s': %s", path, e)
+            self._disk_remove(tmp_path)
+            return
+        self._disk_evict()
+
+    def _disk_remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _disk_evict(self):
+        files = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for de in it:
+                if de.name.endswith(self.DISK_EXT):
+                    try:
+                        st = de.stat()
+                    except OSError:
+                        continue
+                    files.append((st.st_mtime_ns, st.st_size, de.path))
+                    total += st.st_size
+        if total <= self.max_disk_size:
+            return
+        # remove least recently used first
+        files.sort()
+        for _, size, path in files:
+            log_segload.debug("bin cache: evict '%s'", path)
+            self._disk_remove(path)
+            total -= size
+            if total <= self.max_disk_size:
+                break
+
+
+def dump_bin_image(bin_img):
+    """convert a BinImage into a compact tuple of plain values and arrays"""
+    segs = []
+    for seg in bin_img.get_segments():
+        data = seg.data
+        if data is not None:
+            data = bytes(data)
+        # relocs
+        relocs = []
+        for to_seg in seg.get_reloc_to_segs():
+            entries = seg.get_reloc(to_seg).get_relocs()
+            relocs.append(
+                (
+                    to_seg.id,
+                    array.array("I", [r.offset for r in entries]),
+                    bytes([r.type for r in entries]),
+                    bytes([r.width for r in entries]),
+                    array.array("q", [r.addend for r in entries]),
+                )
+            )
+        # symbols
+        symtab = seg.get_symtab()
+        if symtab is not None:
+            symbols = [(s.offset, s.name, s.file_name) for s in symtab.get_symbols()]
+        else:
+            symbols = None
+        # debug lines
+        debug_line = seg.get_debug_line()
+        if debug_line is not None:
+            lines = []
+            for df in debug_line.get_files():
+                entries = [(e.offset, e.src_line, e.flags) for e in df.get_entries()]
+                lines.append((df.src_file, df.dir_name, df.base_offset, entries))
+        else:
+            lines = None
+        segs.append((seg.seg_type, seg.size, data, seg.flags, relocs, symbols, lines))
+    return (bin_img.file_type, segs)
+
+
+def undump_bin_image(dump):
+    """rebuild a BinImage from the result of dump_bin_image()"""
+    file_type, segs = dump
+    bin_img = BinImage(file_type)
+    for seg_type, size, data, flags, _, symbols, lines in segs:
+        seg = Segment(seg_type, size, data, flags)
+        bin_img.add_segment(seg)
+        if symbols is not None:
+            symtab = SymbolTable()
+            for offset, name, file_name in symbols:
+                symtab.add_symbol(Symbol(offset, name, file_name))
+            seg.set_symtab(symtab)
+        if lines is not None:
+            debug_line = DebugLine()
+            for src_file, dir_name, base_offset, entries in lines:
+                df = DebugLineFile(src_file, dir_name, base_offset)
+                for offset, src_line, flags in entries:
+                    df.add_entry(DebugLineEntry(offset, src_line, flags))
+                debug_line.add_file(df)
+            seg.set_debug_line(debug_line)
+    # relocs need all segments
+    all_segs = bin_img.get_segments()
+    for seg, seg_dump in zip(all_segs, segs):
+        for to_id, offsets, types, widths, addends in seg_dump[4]:
+            to_seg = all_segs[to_id]
+            rl = Relocations(to_seg)
+            for i in range(len(offsets)):
+                rl.add_reloc(Reloc(offsets[i], types[i], widths[i], addends[i]))
+            seg.add_reloc(to_seg, rl)
+    return bin_img
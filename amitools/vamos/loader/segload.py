@@ -1,9 +1,8 @@
 import os.path
 
-from amitools.binfmt.BinFmt import BinFmt
-from amitools.binfmt.Relocate import Relocate
 from amitools.vamos.log import log_segload
 from .seglist import SegList
+from .bincache import BinImageCache
 
 
 class SegLoadInfo(object):
@@ -22,11 +21,15 @@ class SegLoadInfo(object):
 
 
 class SegmentLoader(object):
-    def __init__(self, alloc, path_mgr=None):
+    def __init__(self, alloc, path_mgr=None, bin_cache=None, sym_index=None):
         self.alloc = alloc
         self.path_mgr = path_mgr
         self.mem = alloc.get_mem()
-        self.binfmt = BinFmt()
+        if bin_cache is None:
+            bin_cache = BinImageCache()
+        self.bin_cache = bin_cache
+        # optional address to symbol index of all loaded seglists
+        self.sym_index = sym_index
         # map seglist baddr to bin_img
         self.infos = {}
 
@@ -36,6 +39,7 @@ class SegmentLoader(object):
         if info:
             baddr = info.seglist.get_baddr()
             self.infos[baddr] = info
+            self._add_sym_index(info)
             log_segload.info("loaded sys seglist: %s", info)
             return baddr
         else:
@@ -48,6 +52,7 @@ class SegmentLoader(object):
         if info:
             baddr = info.seglist.get_baddr()
             self.infos[baddr] = info
+            self._add_sym_index(info)
             log_segload.info("loaded ami seglist: %s", info)
             return baddr
         else:
@@ -63,6 +68,8 @@ class SegmentLoader(object):
         info = self.infos[seglist_baddr]
         log_segload.info("unload seglist: %s", info)
         del self.infos[seglist_baddr]
+        if self.sym_index is not None:
+            self.sym_index.remove_seglist(seglist_baddr)
         info.seglist.free()
         return True
 
@@ -91,8 +98,24 @@ class SegmentLoader(object):
             log_segload.warning("orphaned seglist: %s", info)
             # try to free list
             info.seglist.free()
+        if self.sym_index is not None:
+            for baddr in self.infos:
+                self.sym_index.remove_seglist(baddr)
         return len(self.infos)
 
+    def _add_sym_index(self, info):
+        if self.sym_index is None:
+            return
+        seglist = info.seglist
+        name = os.path.basename(info.sys_file)
+        self.sym_index.add_seglist(
+            seglist.get_baddr(),
+            name,
+            seglist.get_all_addrs(),
+            seglist.get_all_sizes(),
+            info.bin_img.get_segments(),
+        )
+
     def int_load_ami_seglist(self, ami_bin_file, lock=None):
         """load seglist given by ami binary path and return SegLoadInfo"""
         if self.path_mgr is None:
@@ -114,17 +137,17 @@ class SegmentLoader(object):
             return None
 
         # try to load bin image in supported format (e.g. HUNK or ELF)
-        bin_img = self.binfmt.load_image(sys_bin_file)
-        if bin_img is None:
+        # or reuse an already parsed one from the cache
+        entry = self.bin_cache.load(sys_bin_file)
+        if entry is None:
             log_segload.debug("load_image failed: %s", sys_bin_file)
             return None
-
-        # create relocator
-        relocator = Relocate(bin_img)
+        bin_img = entry.bin_img
+        relocator = entry.relocator
 
         # get info about segments to allocate
-        sizes = relocator.get_sizes()
-        names = bin_img.get_segment_names()
+        sizes = entry.sizes
+        names = entry.names
         bin_img_segs = bin_img.get_segments()
 
         # build label names
@@ -33,6 +33,8 @@ log_prof = logging.getLogger("prof")
 log_tp = logging.getLogger("tp")
 log_hw = logging.getLogger("hw")
 
+log_daemon = logging.getLogger("daemon")
+
 loggers = [
     log_main,
     log_mem,
@@ -56,6 +58,7 @@ loggers = [
     log_hw,
     log_math,
     log_machine,
+    log_daemon,
 ]
 
 preset = {log_prof: logging.INFO}
@@ -147,6 +150,13 @@ def log_shutdown():
     logging.shutdown()
 
 
+def log_remove_handlers():
+    """remove all handlers added by log_setup() to allow a new setup"""
+    for l in loggers:
+        for h in list(l.handlers):
+            l.removeHandler(h)
+
+
 def _setup_levels(levels):
     for name in levels:
         # get and parse level
@@ -2,6 +2,10 @@ from .machine import Machine
 
 
 class DisAsm(object):
+    # window passed to the disassembler for a single line. the longest
+    # 680x0 instruction incl. all extension words has 22 bytes
+    max_instr_bytes = 32
+
     def __init__(self, machine):
         self.machine = machine
         self.cpu = machine.get_cpu()
@@ -44,19 +48,28 @@ class DisAsm(object):
 
     def disassemble_block(self, data, start_pc=0):
         """disassemble a block and return a list of (pc, words, code)"""
+        return list(self.iter_block(data, start_pc))
+
+    def iter_block(self, data, start_pc=0):
+        """disassemble a block and yield (pc, words, code) line by line.
+
+        The block can be any bytes-like object, e.g. a memoryview slice of a
+        larger image. Only a window of max_instr_bytes is passed to the
+        disassembler for each line, so the cost does not depend on the
+        size of the block.
+        """
         num = len(data)
         off = 0
         pc = start_pc
-        code = []
+        win = self.max_instr_bytes
         while off < num:
-            pc, words, txt = self.disassemble_line(pc, data[off:])
+            pc, words, txt = self.disassemble_line(pc, data[off : off + win])
             if len(words) == 0:
                 break
-            code.append((pc, words, txt))
+            yield (pc, words, txt)
             num_bytes = len(words) * 2
             off += num_bytes
             pc += num_bytes
-        return code
 
     def dump_block(self, code, func=print):
         """dump a code block"""
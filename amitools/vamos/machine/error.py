@@ -12,6 +12,7 @@ class ErrorReporter:
         self.cpu = machine.get_cpu()
         self.mem = machine.get_mem()
         self.label_mgr = machine.get_label_mgr()
+        self.sym_index = machine.get_sym_index()
 
     def report_error(self, error):
         # get run nesting
@@ -53,6 +54,7 @@ class ErrorReporter:
                 label, offset = None, 0
             if label is not None:
                 log_machine.error("@%08x -> +%06x %s", addr, offset, label)
+            self._log_addr_info("@%08x" % addr, addr)
 
     def _log_cpu_state(self):
         # give CPU state dump
@@ -65,12 +67,19 @@ class ErrorReporter:
             label, offset = None, 0
         if label is not None:
             log_machine.error("PC=%08x -> +%06x %s", pc, offset, label)
+        self._log_addr_info("PC=%08x" % pc, pc)
         for d in cpu_state.dump():
             log_machine.error(d)
         # stack range dump
         sp = cpu_state.ax[7]
         self._log_stack(sp)
 
+    def _log_addr_info(self, prefix, addr):
+        # symbol and source line of loaded binaries
+        info = self.sym_index.lookup(addr)
+        if info is not None:
+            log_machine.error("%s -> %s", prefix, info)
+
     def _log_stack(self, sp):
         ram_total = self.machine.get_ram_total()
         vals = []
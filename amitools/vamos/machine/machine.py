@@ -14,7 +14,7 @@ from .error import ErrorReporter
 from .cpustate import CPUState
 from amitools.vamos.error import *
 from amitools.vamos.log import log_machine
-from amitools.vamos.label import LabelManager
+from amitools.vamos.label import LabelManager, SymbolIndex
 
 
 class RunState(object):
@@ -111,6 +111,7 @@ class Machine(object):
             self.label_mgr = LabelManager()
         else:
             self.label_mgr = None
+        self.sym_index = SymbolIndex()
         self.raise_on_main_run = raise_on_main_run
         self.ram_total = ram_size_kib * 1024
         self.ram_bytes = self.ram_total - self.ram_begin
@@ -273,9 +274,16 @@ class Machine(object):
     def get_traps(self):
         return self.traps
 
+    def get_handler_tids(self):
+        """return the trap ids of the run exit and hw exception handlers"""
+        return (self.run_exit_tid, self.hw_exc_tid)
+
     def get_label_mgr(self):
         return self.label_mgr
 
+    def get_sym_index(self):
+        return self.sym_index
+
     def get_scratch_top(self):
         return self.ram_begin - 4
 
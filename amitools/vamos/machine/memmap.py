@@ -88,3 +88,7 @@ class MemoryMap(object):
 
     def get_alloc(self):
         return self.alloc
+
+    def set_alloc(self, alloc):
+        """replace the ram allocator, e.g. with one restored from a snapshot"""
+        self.alloc = alloc
@@ -1,7 +1,7 @@
 from .mockcpu import MockCPU
 from .mockmem import MockMemory
 from .mocktraps import MockTraps
-from amitools.vamos.label import LabelManager
+from amitools.vamos.label import LabelManager, SymbolIndex
 
 
 class MockMachine(object):
@@ -13,6 +13,7 @@ class MockMachine(object):
             self.label_mgr = LabelManager()
         else:
             self.label_mgr = None
+        self.sym_index = SymbolIndex()
 
     def get_cpu(self):
         return self.cpu
@@ -26,6 +27,9 @@ class MockMachine(object):
     def get_label_mgr(self):
         return self.label_mgr
 
+    def get_sym_index(self):
+        return self.sym_index
+
     def get_ram_begin(self):
         return 0x800
 
@@ -208,6 +208,15 @@ class PathManager:
         # done
         return True
 
+    def renew_temp_volumes(self, postfix):
+        """give temp volumes new and empty dirs, e.g. in a forked vamos.
+
+        assign dirs inside the temp volumes are created again.
+        """
+        if not self.vol_mgr.renew_temp_volumes(postfix):
+            return False
+        return self.assign_mgr.setup()
+
     def shutdown(self):
         log_path.info("shutting down paths")
         self.assign_mgr.shutdown()
@@ -141,6 +141,7 @@ class VolumeManager(object):
         self.is_setup = False
         self.vols_by_name = {}
         self.vols_base_dir = vols_base_dir
+        self.temp_postfix = ""
 
     def get_num_volumes(self):
         return len(self.volumes)
@@ -148,6 +149,10 @@ class VolumeManager(object):
     def set_vols_base_dir(self, dir):
         self.vols_base_dir = dir
 
+    def set_temp_postfix(self, postfix):
+        """add a postfix to the dirs of temp volumes added from now on"""
+        self.temp_postfix = postfix
+
     def parse_config(self, cfg):
         if cfg is None:
             return True
@@ -174,6 +179,17 @@ class VolumeManager(object):
         self.is_setup = True
         return True
 
+    def renew_temp_volumes(self, postfix):
+        """move all temp volumes to new and empty dirs with given postfix"""
+        self.temp_postfix = postfix
+        for volume in self.volumes:
+            if "temp" in volume.cfg and volume.is_setup:
+                volume.path += postfix
+                log_path.info("renew temp volume: %s", volume)
+                if not volume.setup():
+                    return False
+        return True
+
     def shutdown(self):
         # shutdown all volumes
         log_path.debug("shutting down volumes")
@@ -252,6 +268,8 @@ class VolumeManager(object):
         if n > 1:
             log_path.error("only one source in volume spec allowed!")
             return None
+        if "temp" in cfg:
+            path += self.temp_postfix
         log_path.debug("name='%s', path='%s'", name, path)
         # create volume
         return Volume(name, path, cfg)
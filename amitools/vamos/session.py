@@ -0,0 +1,329 @@
+import os
+
+from .machine import Machine, MemoryMap
+from .machine.regs import REG_D0
+from .log import log_main, log_setup, log_remove_handlers
+from .path import VamosPathManager
+from .path.spec import Spec
+from .path.volume import resolve_sys_path
+from .trace import TraceManager
+from .libmgr import SetupLibManager
+from .loader import BinImageCache
+from .schedule import Scheduler
+from .profiler import MainProfiler
+from .lib.dos.Process import Process
+from .snapshot import SessionSnapshot, get_code_stamp
+
+RET_CODE_CONFIG_ERROR = 1000
+
+
+def get_session_key(mp):
+    """return a key describing all session relevant config of a parser.
+
+    Two parsers with equal keys can share a bootstrapped session. Only the
+    process config may differ. Volume paths are resolved on the host as
+    relative paths or env vars may point to different locations.
+    """
+    cfg = mp.get_cfg_dict()
+    key = {}
+    for name in cfg:
+        if name not in ("process", "daemon", "batch", "logging"):
+            key[name] = cfg[name]
+    vols = []
+    for spec in cfg.volumes or ():
+        try:
+            spec = Spec.parse(spec)
+        except ValueError:
+            vols.append(spec)
+            continue
+        srcs = [resolve_sys_path(src) for src in spec.get_src_list()]
+        vols.append((spec.get_name(), srcs))
+    key["volumes"] = vols
+    key["vols_base_dir"] = resolve_sys_path(cfg.path.vols_base_dir)
+    return key
+
+
+class VamosSession(object):
+    """a vamos session holds the emulated machine with bootstrapped
+    exec and dos libraries ready to run processes.
+
+    The session is configured by a parsed VamosMainParser. Call setup()
+    first, then run() a process and finally shutdown() and cleanup().
+    Note: shutdown_paths() must always be called to release external
+    resources even if setup() failed.
+    """
+
+    def __init__(self, mp, bin_cache=None, temp_postfix=None):
+        self.mp = mp
+        self.bin_cache = bin_cache
+        self.temp_postfix = temp_postfix
+        self.machine = None
+        self.mem_map = None
+        self.trace_mgr = None
+        self.path_mgr = None
+        self.scheduler = None
+        self.main_profiler = None
+        self.slm = None
+        self.run_state = None
+        self.ok = False
+        self.key = None
+
+    def setup(self):
+        """setup machine and libs. return False on config error"""
+        mp = self.mp
+
+        # setup main profiler
+        main_profiler = MainProfiler()
+        prof_cfg = mp.get_profile_dict().profile
+        main_profiler.parse_config(prof_cfg)
+        self.main_profiler = main_profiler
+
+        # setup machine
+        machine_cfg = mp.get_machine_dict().machine
+        use_labels = mp.get_trace_dict().trace.labels
+        machine = Machine.from_cfg(machine_cfg, use_labels)
+        if not machine:
+            return False
+        self.machine = machine
+
+        # setup memory map
+        mem_map_cfg = mp.get_machine_dict().memmap
+        mem_map = MemoryMap(machine)
+        if not mem_map.parse_config(mem_map_cfg):
+            log_main.error("memory map setup failed!")
+            return False
+        self.mem_map = mem_map
+
+        # setup trace manager
+        trace_mgr_cfg = mp.get_trace_dict().trace
+        trace_mgr = TraceManager(machine)
+        if not trace_mgr.parse_config(trace_mgr_cfg):
+            log_main.error("tracing setup failed!")
+            return False
+        self.trace_mgr = trace_mgr
+
+        # setup path manager
+        path_mgr = VamosPathManager()
+        self.path_mgr = path_mgr
+        if self.temp_postfix:
+            path_mgr.get_vol_mgr().set_temp_postfix(self.temp_postfix)
+        if not path_mgr.parse_config(mp.get_path_dict()):
+            log_main.error("path config failed!")
+            return False
+        if not path_mgr.setup():
+            log_main.error("path setup failed!")
+            return False
+
+        # setup scheduler
+        scheduler = Scheduler(machine)
+        self.scheduler = scheduler
+
+        # setup binary cache for segment loader
+        if self.bin_cache is None:
+            loader_cfg = mp.get_loader_dict().loader
+            self.bin_cache = BinImageCache.from_cfg(loader_cfg)
+
+        # remember config while host paths still resolve the same
+        self.key = get_session_key(mp)
+
+        # try to restore bootstrapped libs from snapshot
+        snap_path = machine_cfg.snapshot
+        if snap_path:
+            snap_path = os.path.abspath(os.path.expanduser(snap_path))
+            snap_key = (self.key, self.temp_postfix, get_code_stamp())
+            slm = self._restore_snapshot(snap_path, snap_key)
+            if slm:
+                self.slm = slm
+                main_profiler.setup()
+                return True
+
+        # setup lib mgr
+        lib_cfg = mp.get_libs_dict()
+        slm = SetupLibManager(
+            machine,
+            mem_map,
+            scheduler,
+            path_mgr,
+            main_profiler=main_profiler,
+            bin_cache=self.bin_cache,
+        )
+        if not slm.parse_config(lib_cfg):
+            log_main.error("lib manager setup failed!")
+            return False
+        slm.setup()
+        self.slm = slm
+
+        # setup profiler
+        main_profiler.setup()
+
+        # open base libs
+        slm.open_base_libs()
+
+        if snap_path:
+            self._take_snapshot(snap_path, snap_key)
+        return True
+
+    def _restore_snapshot(self, path, key):
+        """return the SetupLibManager restored from the snapshot file
+        or None if the libs need a bootstrap"""
+        try:
+            snap = SessionSnapshot.load(path, key)
+            if snap is None:
+                log_main.info("no snapshot '%s' for this config", path)
+                return None
+            slm = snap.restore(self)
+        except (OSError, ValueError) as e:
+            log_main.warning("snapshot '%s' not used: %s", path, e)
+            return None
+        log_main.info("restored snapshot '%s'", path)
+        return slm
+
+    def _take_snapshot(self, path, key):
+        try:
+            SessionSnapshot.take(self, key).save(path)
+        except Exception as e:
+            log_main.warning("can't write snapshot '%s': %s", path, e)
+            return
+        log_main.info("wrote snapshot '%s'", path)
+
+    def get_key(self):
+        """return the session key of the config this session was set up with"""
+        return self.key
+
+    def run(self, proc_cfg):
+        """run the main process given by proc_cfg.
+
+        return exit code or None if process setup failed
+        """
+        machine_cfg = self.mp.get_machine_dict().machine
+
+        # setup main proc
+        if not proc_cfg.command.binary:
+            log_main.error("no binary given!")
+            return None
+        main_proc = Process.create_main_proc(proc_cfg, self.path_mgr, self.slm.dos_ctx)
+        if not main_proc:
+            log_main.error("main proc setup failed!")
+            return None
+
+        # main loop
+        task = main_proc.get_task()
+        self.scheduler.add_task(task)
+        self.scheduler.schedule()
+
+        # check proc result
+        ok = False
+        run_state = task.get_run_state()
+        self.run_state = run_state
+        if run_state.done:
+            if run_state.error:
+                log_main.error("vamos failed!")
+                exit_code = 1
+            else:
+                ok = True
+                # return code is limited to 0-255
+                exit_code = run_state.regs[REG_D0] & 0xFF
+                log_main.info("done. exit code=%d", exit_code)
+                log_main.info("total cycles: %d", run_state.cycles)
+        else:
+            log_main.info(
+                "vamos was stopped after %d cycles. ignoring result",
+                machine_cfg.max_cycles,
+            )
+            exit_code = 0
+
+        # shutdown main proc
+        if ok:
+            main_proc.free()
+
+        self.ok = ok
+        return exit_code
+
+    def shutdown(self):
+        """close base libs and shutdown lib manager"""
+        self.slm.close_base_libs()
+        self.main_profiler.shutdown()
+        self.slm.cleanup()
+
+    def shutdown_paths(self):
+        """always shutdown path manager to ensure that
+        external resources are cleaned up properly"""
+        if self.path_mgr:
+            self.path_mgr.shutdown()
+
+    def cleanup(self):
+        """mem_map and machine shutdown"""
+        if self.ok:
+            self.mem_map.cleanup()
+        if self.machine:
+            self.machine.cleanup()
+
+    def run_main(self):
+        """setup the session, run the configured main process and
+        shut the session down again. return the exit code of the process."""
+        try:
+            if not self.setup():
+                return RET_CODE_CONFIG_ERROR
+
+            # run main proc
+            proc_cfg = self.mp.get_proc_dict().process
+            exit_code = self.run(proc_cfg)
+            if exit_code is None:
+                return RET_CODE_CONFIG_ERROR
+
+            # libs shutdown
+            self.shutdown()
+
+        finally:
+            # always shutdown path manager to ensure that
+            # external resources are cleaned up properly
+            self.shutdown_paths()
+
+        # mem_map and machine shutdown
+        self.cleanup()
+
+        # exit
+        log_main.info("vamos is exiting: code=%d", exit_code)
+        return exit_code
+
+    def run_forked(self, mp, temp_postfix):
+        """run the process configured in mp in a forked child of this session.
+
+        The child starts from the bootstrapped state of the session and only
+        needs to run the process. If the session relevant config of mp
+        differs then a full run of a new session is performed instead.
+        Temp volumes get the given postfix to not clash with the parent.
+
+        return (exit code, run state) with run state being None if the
+        process was not run.
+        """
+        # logging of child
+        log_remove_handlers()
+        if not log_setup(mp.get_log_dict().logging):
+            return RET_CODE_CONFIG_ERROR, None
+        if get_session_key(mp) != self.get_key():
+            log_main.info("config differs from session: full run")
+            session = VamosSession(mp, self.bin_cache, temp_postfix)
+            exit_code = session.run_main()
+            return exit_code, session.run_state
+        # run process in pre-initialized session
+        path_mgr = self.path_mgr
+        if not path_mgr.renew_temp_volumes(temp_postfix):
+            return RET_CODE_CONFIG_ERROR, None
+        path_mgr.get_default_env().resolve(force=True)
+        try:
+            proc_cfg = mp.get_proc_dict().process
+            exit_code = self.run(proc_cfg)
+            if exit_code is None:
+                return RET_CODE_CONFIG_ERROR, None
+            self.shutdown()
+        finally:
+            self.shutdown_paths()
+        return exit_code, self.run_state
+
+
+def run_session(mp, bin_cache=None, temp_postfix=None):
+    """setup a vamos session, run the configured main process and
+    shut the session down again. return the exit code of the process."""
+    session = VamosSession(mp, bin_cache, temp_postfix)
+    return session.run_main()
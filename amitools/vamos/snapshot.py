@@ -0,0 +1,266 @@
+import copyreg
+import io
+import operator
+import os
+import pickle
+import stat
+import sys
+import zlib
+
+from .astructs import APTR, BPTR, ARRAY, AmigaStructTypes
+from .astructs.astruct import AmigaStructFieldDefs, FieldDef
+from .astructs.pointer import APTRTypes, BPTRTypes
+from .astructs.array import ARRAYTypes
+from .libcore.stub import LibStub
+from .machine.cpustate import CPUState
+
+
+def _get_dir_stamp(path):
+    stamp = 0
+    with os.scandir(path) as it:
+        for de in it:
+            if de.is_dir(follow_symlinks=False):
+                if de.name != "__pycache__":
+                    stamp = max(stamp, _get_dir_stamp(de.path))
+            elif de.name.endswith(".py"):
+                stamp = max(stamp, de.stat().st_mtime_ns)
+    return stamp
+
+
+def get_code_stamp():
+    """return a stamp that changes if the vamos code is changed.
+
+    Pickled objects of a snapshot are only valid for the code they were
+    created with.
+    """
+    import machine68k
+
+    stamp = os.stat(machine68k.__file__).st_mtime_ns
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return max(stamp, _get_dir_stamp(base_dir))
+
+
+def _set_state(obj, state):
+    obj.__dict__.update(state)
+
+
+class _SnapshotPickler(pickle.Pickler):
+    """pickle the session state but keep the objects of the new session"""
+
+    def __init__(self, fh, shared):
+        pickle.Pickler.__init__(self, fh, pickle.HIGHEST_PROTOCOL)
+        self.shared_ids = {id(obj): name for name, obj in shared.items()}
+
+    def persistent_id(self, obj):
+        name = self.shared_ids.get(id(obj))
+        if name is not None:
+            return name
+        # stubs are closures bound to traps. they are created again on restore
+        if isinstance(obj, LibStub):
+            return "stub"
+        return None
+
+    def reducer_override(self, obj):
+        # pointer and array types are created on demand. create them again
+        if isinstance(obj, type):
+            name = obj.__name__
+            if APTRTypes.get(name) is obj:
+                return APTR, (obj.get_ref_type(),)
+            elif BPTRTypes.get(name) is obj:
+                return BPTR, (obj.get_ref_type(),)
+            elif ARRAYTypes.get(name) is obj:
+                return ARRAY, (obj.get_element_type(), obj.get_array_size())
+        # struct defs are class attributes. refer to the ones of the classes
+        cls = type(obj)
+        if cls is AmigaStructFieldDefs:
+            struct = AmigaStructTypes.find_struct(obj.get_type_name())
+            if struct is not None and struct.sdef is obj:
+                return getattr, (struct, "sdef")
+        elif cls is FieldDef:
+            sdef = getattr(obj.struct, "sdef", None)
+            if sdef is not None and sdef.get_field_def(obj.index) is obj:
+                return operator.getitem, (sdef, obj.index)
+        # the __getattr__ of e.g. astructs fails on objects without state
+        # while unpickling. so set their state directly
+        if hasattr(cls, "__getattr__") and cls.__new__ is object.__new__:
+            state = obj.__dict__
+            return copyreg.__newobj__, (cls,), state, None, None, _set_state
+        return NotImplemented
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    def __init__(self, fh, shared):
+        pickle.Unpickler.__init__(self, fh)
+        self.shared = shared
+
+    def persistent_load(self, pid):
+        if pid == "stub":
+            return None
+        try:
+            return self.shared[pid]
+        except KeyError:
+            raise pickle.UnpicklingError("unknown shared object: %s" % pid)
+
+
+class SessionSnapshot(object):
+    """a snapshot of a vamos session right after bootstrap.
+
+    It contains the RAM contents, the CPU registers, the RAM allocator,
+    the labels and the lib manager with its exec and dos state. A new
+    session with the same config restores it instead of creating all
+    library structures again.
+
+    The session objects that are created from the config before the lib
+    manager (e.g. machine, path manager and scheduler) are not stored. The
+    restored objects are linked to the ones of the new session. Library
+    stubs and their traps are created again.
+
+    The snapshot is unpickled, so it is only loaded if the file is owned
+    by the user and not writable by others.
+    """
+
+    FILE_MAGIC = b"VSNP"
+    FILE_VERSION = 1
+
+    def __init__(self, key, data):
+        self.key = key
+        self.data = data
+
+    @staticmethod
+    def _get_shared(session):
+        machine = session.machine
+        shared = {
+            "machine": machine,
+            "cpu": machine.get_cpu(),
+            "mem": machine.get_mem(),
+            "raw_machine": machine.machine,
+            "raw_mem": machine.machine.mem,
+            "traps": machine.get_traps(),
+            "label_mgr": machine.get_label_mgr(),
+            "sym_index": machine.get_sym_index(),
+            "mem_map": session.mem_map,
+            "hw_access": session.mem_map.get_hw_access(),
+            "trace_mgr": session.trace_mgr,
+            "path_mgr": session.path_mgr,
+            "scheduler": session.scheduler,
+            "main_profiler": session.main_profiler,
+            "bin_cache": session.bin_cache,
+        }
+        # the sub managers of the path manager
+        for attr, obj in vars(session.path_mgr).items():
+            if hasattr(obj, "__dict__"):
+                shared["path_mgr." + attr] = obj
+        # host streams
+        for name in ("stdin", "stdout", "stderr"):
+            obj = getattr(sys, name)
+            buf = getattr(obj, "buffer", None)
+            shared[name] = obj
+            shared[name + ".buffer"] = buf
+            shared[name + ".raw"] = getattr(buf, "raw", None)
+        return {name: obj for name, obj in shared.items() if obj is not None}
+
+    @classmethod
+    def take(cls, session, key):
+        """take a snapshot of a bootstrapped session"""
+        machine = session.machine
+        ram_total = machine.get_ram_total()
+        # the RAM of a new machine is cleared, so skip the unused end
+        ram = bytes(machine.machine.mem.r_block(0, ram_total)).rstrip(b"\0")
+        cpu_state = CPUState()
+        cpu_state.get(machine.get_cpu())
+        label_mgr = machine.get_label_mgr()
+        if label_mgr:
+            labels = label_mgr.get_all_labels()
+        else:
+            labels = None
+        state = (
+            session.mem_map.get_alloc(),
+            labels,
+            dict(vars(machine.get_sym_index())),
+            session.slm,
+        )
+        fh = io.BytesIO()
+        _SnapshotPickler(fh, cls._get_shared(session)).dump(state)
+        tids = machine.get_handler_tids()
+        data = (tids, ram_total, ram, cpu_state, fh.getvalue())
+        return cls(key, data)
+
+    def restore(self, session):
+        """restore the snapshot into a session that was set up up to the lib
+        manager. return the restored SetupLibManager.
+
+        raise ValueError if the snapshot does not fit the session.
+        """
+        machine = session.machine
+        tids, ram_total, ram, cpu_state, state = self.data
+        if tids != machine.get_handler_tids():
+            raise ValueError("snapshot: trap mismatch")
+        if ram_total != machine.get_ram_total():
+            raise ValueError("snapshot: RAM size mismatch")
+        # unpickle before touching the machine
+        fh = io.BytesIO(state)
+        try:
+            unpickler = _SnapshotUnpickler(fh, self._get_shared(session))
+            alloc, labels, sym_state, slm = unpickler.load()
+        except Exception as e:
+            raise ValueError("snapshot: invalid state: %s" % e)
+        label_mgr = machine.get_label_mgr()
+        if (labels is None) != (label_mgr is None):
+            raise ValueError("snapshot: label mismatch")
+        # restore machine
+        machine.machine.mem.w_block(0, ram)
+        cpu_state.set(machine.get_cpu())
+        session.mem_map.set_alloc(alloc)
+        if label_mgr:
+            label_mgr.set_all_labels(labels)
+        vars(machine.get_sym_index()).update(sym_state)
+        # finally create stubs and traps of the libs
+        slm.restore()
+        return slm
+
+    def save(self, path):
+        """write snapshot to a file only accessible by the user"""
+        data = pickle.dumps((self.key, self.data), pickle.HIGHEST_PROTOCOL)
+        blob = self.FILE_MAGIC + bytes([self.FILE_VERSION]) + zlib.compress(data, 1)
+        tmp_path = path + ".%d.tmp" % os.getpid()
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(blob)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, path, key):
+        """read a snapshot from a file.
+
+        return None if the file does not exist or was taken with a different
+        key. raise ValueError if it is invalid.
+        """
+        try:
+            fh = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        with fh:
+            st = os.fstat(fh.fileno())
+            if hasattr(os, "getuid") and st.st_uid != os.getuid():
+                raise ValueError("snapshot: owned by another user")
+            if stat.S_IMODE(st.st_mode) & 0o022:
+                raise ValueError("snapshot: writable by other users")
+            data = fh.read()
+        if data[:4] != cls.FILE_MAGIC:
+            raise ValueError("snapshot: invalid magic")
+        if data[4] != cls.FILE_VERSION:
+            raise ValueError("snapshot: unsupported version %d" % data[4])
+        try:
+            file_key, file_data = pickle.loads(zlib.decompress(data[5:]))
+        except Exception as e:
+            raise ValueError("snapshot: invalid data: %s" % e)
+        if file_key != key:
+            return None
+        return cls(file_key, file_data)
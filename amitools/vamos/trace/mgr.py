@@ -13,6 +13,7 @@ class TraceManager(object):
         self.machine = machine
         self.cpu = machine.get_cpu()
         self.label_mgr = machine.get_label_mgr()
+        self.sym_index = machine.get_sym_index()
         self.disasm = DisAsm(machine)
         # state
         self.mem_tracer = None
@@ -95,17 +96,15 @@ class TraceManager(object):
     # ----- internal -----
 
     def _get_disasm_info(self, addr):
+        sym, src = self._get_segment_info(addr)
         if not self.label_mgr:
-            return "N/A", None, None, ""
+            return "N/A", sym, src, ""
         label = self.label_mgr.get_label(addr)
-        sym = None
-        src = None
         addon = ""
         if label:
             rel_addr = addr - label.addr
             if isinstance(label, LabelSegment):
                 rel_addr = rel_addr - 8  # real start of code in segment
-                sym, src = self._get_segment_info(label.segment, rel_addr)
             mem = "@%06x +%06x %s" % (label.addr, rel_addr, label.name)
             if isinstance(label, LabelLib):
                 delta, fd_name = self._get_lib_short_info(addr, label)
@@ -116,9 +115,9 @@ class TraceManager(object):
             mem = "N/A"
         return mem, sym, src, addon
 
-    def _get_segment_info(self, segment, rel_addr):
-        sym = segment.find_symbol(rel_addr)
-        info = segment.find_debug_line(rel_addr)
+    def _get_segment_info(self, addr):
+        sym = self.sym_index.find_symbol(addr)
+        info = self.sym_index.find_debug_line(addr)
         if info is None:
             src = None
         else:
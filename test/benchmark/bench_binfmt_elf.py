@@ -0,0 +1,132 @@
+import struct
+import pytest
+from amitools.binfmt.elf.BinFmtELF import BinFmtELF
+from amitools.binfmt.elf.ELFReader import ELFReader
+
+NUM_SYMBOLS = 20000
+NUM_RELOCS = 50000
+NUM_LINES = 100000
+
+
+def _strtab(names):
+    data = bytearray(b"\0")
+    offsets = []
+    for name in names:
+        offsets.append(len(data))
+        data += name + b"\0"
+    return bytes(data), offsets
+
+
+def _debug_line(num_lines):
+    """a DWARF 2 line program with one sequence of num_lines rows"""
+    opc_base = 10
+    hdr = struct.pack(">BBbBB", 2, 1, -5, 14, opc_base)
+    hdr += bytes([0, 1, 1, 1, 1, 0, 0, 0, 1])
+    hdr += b"src\0\0" + b"bench.c\0" + bytes([1, 0, 0]) + b"\0"
+    # set address: relocated against .text
+    prog = bytearray(b"\0\x05\x02\0\0\0\0")
+    addr_pos = len(prog) - 4
+    for i in range(num_lines):
+        if i % 64 == 63:
+            # advance_line by -20
+            prog += b"\x03\x6c"
+        # special opcode: address +2, line +1
+        prog += bytes([opc_base + (1 + 5) + 14 * 1])
+    prog += b"\0\x01\x01"
+    header_length = len(hdr)
+    body = struct.pack(">HI", 2, header_length) + hdr + prog
+    addr_pos += 10 + header_length
+    return struct.pack(">I", len(body)) + body, addr_pos
+
+
+def _write_elf(path):
+    text = bytes(NUM_RELOCS * 8)
+    # symbols: null, .text section, file, functions
+    sym_names = [b"bench.c"] + [b"func_%d" % i for i in range(NUM_SYMBOLS)]
+    strtab, str_offs = _strtab(sym_names)
+    symtab = bytes(16)
+    symtab += struct.pack(">IIIBBH", 0, 0, 0, 0x03, 0, 1)
+    symtab += struct.pack(">IIIBBH", str_offs[0], 0, 0, 0x04, 0, 0xFFF1)
+    for i in range(NUM_SYMBOLS):
+        off = i * 8 * NUM_RELOCS // NUM_SYMBOLS
+        symtab += struct.pack(">IIIBBH", str_offs[i + 1], off, 8, 0x12, 0, 1)
+    rela_text = b"".join(
+        struct.pack(">IIi", i * 8 + 2, (1 << 8) | 1, i * 4) for i in range(NUM_RELOCS)
+    )
+    debug_line, addr_pos = _debug_line(NUM_LINES)
+    rela_debug_line = struct.pack(">IIi", addr_pos, (1 << 8) | 1, 0)
+    sect_names = [
+        b".text",
+        b".rela.text",
+        b".debug_line",
+        b".rela.debug_line",
+        b".symtab",
+        b".strtab",
+        b".shstrtab",
+    ]
+    shstrtab, sh_offs = _strtab(sect_names)
+    # (type, flags, data, link, info, entsize)
+    sects = [
+        (1, 6, text, 0, 0, 0),
+        (4, 0, rela_text, 5, 1, 12),
+        (1, 0, debug_line, 0, 0, 0),
+        (4, 0, rela_debug_line, 5, 3, 12),
+        (2, 0, symtab, 6, 3, 16),
+        (3, 0, strtab, 0, 0, 0),
+        (3, 0, shstrtab, 0, 0, 0),
+    ]
+    data = bytearray(52)
+    sh = bytearray(40)
+    for i, (type_, flags, sect_data, link, info, entsize) in enumerate(sects):
+        while len(data) % 4:
+            data.append(0)
+        sh += struct.pack(
+            ">IIIIIIIIII",
+            sh_offs[i],
+            type_,
+            flags,
+            0,
+            len(data),
+            len(sect_data),
+            link,
+            info,
+            4,
+            entsize,
+        )
+        data += sect_data
+    while len(data) % 4:
+        data.append(0)
+    shoff = len(data)
+    data += sh
+    ident = b"\x7fELF" + bytes([1, 2, 1, 0, 0]) + bytes(7)
+    hdr = struct.pack(
+        ">HHIIIIIHHHHHH", 1, 4, 1, 0, 0, shoff, 0, 52, 0, 0, 40, len(sects) + 1, 7
+    )
+    data[0:52] = ident + hdr
+    with open(path, "wb") as fh:
+        fh.write(data)
+
+
+@pytest.fixture(scope="module")
+def large_elf_file(tmp_path_factory):
+    """a m68k ELF object with many symbols, relocations and line infos"""
+    path = tmp_path_factory.mktemp("elf") / "large.o"
+    _write_elf(str(path))
+    return str(path)
+
+
+def binfmt_elf_load_image_benchmark(benchmark, large_elf_file):
+    bfe = BinFmtELF()
+    bi = benchmark(bfe.load_image, large_elf_file)
+    code = bi.get_segments()[0]
+    assert len(code.get_symtab().get_symbols()) == NUM_SYMBOLS
+    assert code.get_debug_line() is not None
+
+
+def binfmt_elf_reader_benchmark(benchmark, large_elf_file):
+    def load():
+        with open(large_elf_file, "rb") as fh:
+            with ELFReader().load(fh) as ef:
+                return len(ef.relas[0].get_relocations())
+
+    assert benchmark(load) == NUM_RELOCS
@@ -0,0 +1,64 @@
+import pytest
+from amitools.binfmt.BinImage import *
+from amitools.binfmt.BinFmt import BinFmt
+from amitools.binfmt.hunk.BinFmtHunk import BinFmtHunk
+from amitools.binfmt.hunk.HunkReader import HunkReader
+
+NUM_RELOCS = 100000
+NUM_SYMBOLS = 20000
+
+
+@pytest.fixture(scope="module")
+def large_hunk_file(tmp_path_factory):
+    """a hunk file with large code, many relocations and symbols"""
+    bi = BinImage(BIN_IMAGE_TYPE_HUNK)
+    code_size = NUM_RELOCS * 4
+    code = Segment(SEGMENT_TYPE_CODE, code_size, bytes(code_size))
+    data = Segment(SEGMENT_TYPE_DATA, 0x20000, bytes(0x20000))
+    bi.add_segment(code)
+    bi.add_segment(data)
+    # long relocs: offsets beyond 64 KiB
+    for to_seg in (code, data):
+        relocs = Relocations(to_seg)
+        for i in range(to_seg.id, NUM_RELOCS, 2):
+            relocs.add_reloc(Reloc(i * 4))
+        code.add_reloc(to_seg, relocs)
+    symtab = SymbolTable()
+    for i in range(NUM_SYMBOLS):
+        symtab.add_symbol(Symbol(i * 4, b"symbol_%d" % i))
+    code.set_symtab(symtab)
+    path = tmp_path_factory.mktemp("hunk") / "large.hunk"
+    BinFmtHunk().save_image(str(path), bi)
+    return str(path)
+
+
+def binfmt_hunk_load_image_buffer_benchmark(benchmark, large_hunk_file):
+    bfh = BinFmtHunk()
+    bi = benchmark(bfh.load_image, large_hunk_file)
+    assert len(bi.get_segments()) == 2
+
+
+def binfmt_hunk_binfmt_load_image_benchmark(benchmark, large_hunk_file):
+    # the entry point used by the vamos loader, romtool and hunktool
+    bf = BinFmt()
+    bi = benchmark(bf.load_image, large_hunk_file)
+    assert len(bi.get_segments()) == 2
+
+
+def binfmt_hunk_load_image_file_benchmark(benchmark, large_hunk_file):
+    bfh = BinFmtHunk()
+
+    def load():
+        with open(large_hunk_file, "rb") as fh:
+            return bfh.load_image_fobj(fh)
+
+    bi = benchmark(load)
+    assert len(bi.get_segments()) == 2
+
+
+def binfmt_hunk_reader_benchmark(benchmark, large_hunk_file):
+    def read():
+        hr = HunkReader()
+        return hr.read_file(large_hunk_file)
+
+    assert benchmark(read) == 0
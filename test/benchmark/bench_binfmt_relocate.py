@@ -0,0 +1,35 @@
+import pytest
+from amitools.binfmt.BinImage import *
+from amitools.binfmt.Relocate import Relocate
+
+NUM_RELOCS = 100000
+
+
+@pytest.fixture(scope="module")
+def reloc_image():
+    """an image with a large code segment full of relocations"""
+    bi = BinImage(BIN_IMAGE_TYPE_HUNK)
+    code_size = NUM_RELOCS * 6
+    code = Segment(SEGMENT_TYPE_CODE, code_size, bytes(code_size))
+    data = Segment(SEGMENT_TYPE_DATA, 0x10000, bytes(0x10000))
+    bi.add_segment(code)
+    bi.add_segment(data)
+    # relocs at word and long aligned offsets like in 68k code
+    for to_seg in (code, data):
+        relocs = Relocations(to_seg)
+        for i in range(to_seg.id, NUM_RELOCS, 2):
+            relocs.add_reloc(Reloc(i * 6))
+        code.add_reloc(to_seg, relocs)
+    return bi
+
+
+def binfmt_relocate_batch_benchmark(benchmark, reloc_image):
+    rel = Relocate(reloc_image)
+    datas = benchmark(rel.relocate, [0x10000, 0x200000])
+    assert len(datas) == 2
+
+
+def binfmt_relocate_scalar_benchmark(benchmark, reloc_image):
+    rel = Relocate(reloc_image, batch=False)
+    datas = benchmark(rel.relocate, [0x10000, 0x200000])
+    assert len(datas) == 2
@@ -0,0 +1,50 @@
+import random
+import pytest
+from amitools.fs.ADFSVolume import ADFSVolume
+from amitools.fs.FSString import FSString
+from amitools.fs.blkdev.BlkDevFactory import BlkDevFactory
+from amitools.fs.validate.Validator import Validator
+
+
+@pytest.fixture(scope="module")
+def raw_hdf(tmp_path_factory):
+    """a 4 MiB HDF that is half filled with files"""
+    path = str(tmp_path_factory.mktemp("chunk") / "disk.hdf")
+    blkdev = BlkDevFactory().create(path, options={"size": "4M"})
+    vol = ADFSVolume(blkdev)
+    vol.create(FSString("Bench"))
+    rnd = random.Random(42)
+    for i in range(8):
+        # half random and half repeated data
+        data = bytes(rnd.getrandbits(8) for _ in range(64 * 1024))
+        vol.write_file(data + b"amiga" * 26214, FSString("file%02d" % i))
+    vol.close()
+    blkdev.close()
+    return path
+
+
+@pytest.fixture(params=[".hdf", ".hdc", ".hdz"], ids=["raw", "chunk", "gzip"])
+def hdf(request, raw_hdf):
+    ext = request.param
+    if ext == ".hdf":
+        return raw_hdf
+    path = raw_hdf[:-4] + ext
+    BlkDevFactory().convert(raw_hdf, path)
+    return path
+
+
+def _scan(path):
+    blkdev = BlkDevFactory().open(path, read_only=True)
+    v = Validator(blkdev, min_level=2)
+    v.scan_boot()
+    v.scan_root()
+    v.scan_dir_tree()
+    v.scan_files()
+    v.scan_bitmap()
+    v.scan_blocks()
+    blkdev.close()
+    return v.get_summary()
+
+
+def fs_chunkfile_scan_benchmark(benchmark, hdf):
+    assert benchmark(_scan, hdf) == (0, 0)
@@ -0,0 +1,58 @@
+import random
+import pytest
+from amitools.fs.ADFSVolume import ADFSVolume
+from amitools.fs.FSString import FSString
+from amitools.fs.Repacker import Repacker
+from amitools.fs.blkdev.BlkDevFactory import BlkDevFactory
+from amitools.fs import DosType
+
+
+def _populate(path, size, dos_type, num_dirs):
+    blkdev = BlkDevFactory().create(path, options={"size": size})
+    vol = ADFSVolume(blkdev)
+    vol.create(FSString("Bench"), dos_type=dos_type)
+    rnd = random.Random(42)
+    root = vol.get_root_dir()
+    for d in range(num_dirs):
+        sub = root.create_dir(FSString("dir%02d" % d))
+        for i in range(32):
+            size = rnd.randint(1, 64) * 1024
+            data = rnd.getrandbits(size * 8).to_bytes(size, "big")
+            sub.create_file(FSString("file%02d" % i), data)
+        sub.flush()
+    vol.close()
+    blkdev.close()
+
+
+@pytest.fixture(
+    scope="module",
+    params=[
+        ("16M", DosType.DOS0, 4),
+        ("16M", DosType.DOS5, 4),
+        pytest.param(("64M", DosType.DOS3, 16), marks=pytest.mark.full),
+    ],
+    ids=["16M-ofs", "16M-dircache", "64M-ffs"],
+)
+def populated_hdf(request, tmp_path_factory):
+    size, dos_type, num_dirs = request.param
+    path = str(tmp_path_factory.mktemp("repack") / "disk.hdf")
+    _populate(path, size, dos_type, num_dirs)
+    return path
+
+
+def _repack(in_path, out_path, fast):
+    rp = Repacker(in_path)
+    rp.create_in()
+    rp.create_out_blkdev(out_path)
+    rp.create_out_volume()
+    copied = rp.repack(fast)
+    rp.out_volume.close()
+    rp.out_blkdev.close()
+    rp.in_blkdev.close()
+    return copied
+
+
+@pytest.mark.parametrize("fast", [True, False], ids=["blocks", "files"])
+def fs_repacker_benchmark(benchmark, populated_hdf, tmp_path, fast):
+    out_path = str(tmp_path / "out.hdf")
+    assert benchmark(_repack, populated_hdf, out_path, fast) == fast
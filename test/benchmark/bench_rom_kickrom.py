@@ -0,0 +1,52 @@
+import struct
+import random
+import pytest
+from amitools.rom import KickRomAccess, ResidentScan
+from amitools.util.HexDump import print_hex_diff
+
+
+def _make_rom(kib):
+    """a random ROM with residents and a valid checksum"""
+    rnd = random.Random(kib)
+    rom = bytearray(rnd.getrandbits(8) for _ in range(kib * 1024))
+    base_addr = 0x1000000 - kib * 1024
+    for off in range(0x100, len(rom) - 0x100, 0x1000):
+        struct.pack_into(">HI", rom, off, 0x4AFC, base_addr + off)
+    kh = KickRomAccess(rom)
+    kh.write_footer()
+    kh.write_rom_size_field()
+    kh.write_check_sum()
+    return bytes(rom), base_addr
+
+
+@pytest.fixture(scope="module", params=[512, 1024], ids=["512k", "1m"])
+def rom(request):
+    return _make_rom(request.param)
+
+
+def rom_check_sum_benchmark(benchmark, rom):
+    kh = KickRomAccess(rom[0])
+    assert benchmark(kh.calc_check_sum) == 0
+
+
+def rom_diff_benchmark(benchmark, rom):
+    a = rom[0]
+    b = bytearray(a)
+    for off in range(0, len(b), 0x8000):
+        b[off] ^= 0xFF
+    b = bytes(b)
+    lines = []
+
+    def diff():
+        lines.clear()
+        print_hex_diff(a, b, out=lines.append)
+
+    benchmark(diff)
+    assert len(lines) == len(a) // 0x8000
+
+
+def rom_resident_scan_benchmark(benchmark, rom):
+    data, base_addr = rom
+    rs = ResidentScan(data, base_addr)
+    offs = benchmark(rs.get_all_resident_pos)
+    assert len(offs) >= len(data) // 0x1000 - 1
@@ -0,0 +1,34 @@
+from amitools.vamos.cfg import VamosMainParser
+from amitools.vamos.session import VamosSession
+
+
+def _create_mp(snap_path=None):
+    mp = VamosMainParser()
+    args = []
+    if snap_path:
+        args += ["--snapshot", snap_path]
+    assert mp.parse(paths=["test.vamosrc"], args=args)
+    return mp
+
+
+def _setup_and_shutdown(mp):
+    session = VamosSession(mp)
+    try:
+        assert session.setup()
+        session.shutdown()
+    finally:
+        session.shutdown_paths()
+    session.cleanup()
+    return session
+
+
+def vamos_snapshot_bootstrap_benchmark(benchmark):
+    mp = _create_mp()
+    benchmark(_setup_and_shutdown, mp)
+
+
+def vamos_snapshot_restore_benchmark(benchmark, tmpdir):
+    mp = _create_mp(str(tmpdir / "vamos.snap"))
+    # write snapshot
+    _setup_and_shutdown(mp)
+    benchmark(_setup_and_shutdown, mp)
@@ -0,0 +1,62 @@
+import re
+import json
+
+
+def _read_index(path):
+    with open(path) as fh:
+        return [json.loads(line) for line in fh]
+
+
+def hunktool_index_test(toolrun, tmpdir):
+    index = str(tmpdir / "index.jsonl")
+    out = toolrun.run_checked("hunktool", "index", "-j", "2", "-o", index, "bin")
+    assert "files: " in out[0]
+    recs = _read_index(index)
+    by_path = {rec["path"]: rec for rec in recs}
+    rec = by_path["bin/dos_examine_sc"]
+    assert rec["type"] == "TYPE_LOADSEG"
+    assert rec["num_hunks"] > 0
+    # not a hunk file
+    assert by_path["bin/dos_examine_agcc"]["type"] is None
+    # second run skips all unchanged files
+    out = toolrun.run_checked("hunktool", "index", "-o", index, "bin")
+    num_files = len(set(rec["file"] for rec in recs))
+    assert out[0].startswith("files: %d, skipped: %d," % (num_files, num_files))
+    assert _read_index(index) == recs
+
+
+def hunktool_index_probe_test(toolrun, tmpdir):
+    index = str(tmpdir / "index.db")
+    toolrun.run_checked("hunktool", "index", "-j", "1", "-p", "-o", index, "bin")
+
+
+def hunktool_disasm_test(toolrun):
+    out = toolrun.run_checked("hunktool", "disasm", "bin/dos_examine_gcc_dbg")
+    assert out[0] == "bin/dos_examine_gcc_dbg"
+    assert out[1] == "#000 CODE"
+    # only a single function
+    func = toolrun.run_checked(
+        "hunktool", "disasm", "-n", "_main", "bin/dos_examine_gcc_dbg"
+    )
+    assert func[2] == "\t\t\t\tb'_main':"
+    assert set(func[2:]) <= set(out)
+
+
+def hunktool_disasm_jobs_test(toolrun):
+    lib = "bin/libs-sc-dbg/testsc.library"
+    out = toolrun.run_checked("hunktool", "disasm", "-j", "1", lib)
+    assert toolrun.run_checked("hunktool", "disasm", "-j", "2", lib) == out
+    # all cpus by default
+    assert toolrun.run_checked("hunktool", "disasm", lib) == out
+
+
+def _strip_times(lines):
+    return [re.sub(r" \(\d+\.\d+s\)", "", line) for line in lines]
+
+
+def hunktool_info_jobs_test(toolrun):
+    out = toolrun.run_checked("hunktool", "info", "-j", "1", "bin")
+    assert "bin/dos_examine_sc" in " ".join(out)
+    # workers report the same output in scan order
+    out_jobs = toolrun.run_checked("hunktool", "info", "-j", "2", "bin")
+    assert _strip_times(out_jobs) == _strip_times(out)
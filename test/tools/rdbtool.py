@@ -1,7 +1,6 @@
 import pytest
 import collections
 
-
 DISK_SIZES = ("1M", "10M", "50M")
 
 IMGSpec = collections.namedtuple(
@@ -179,3 +178,37 @@ def rdbtool_export_import_test(rdbtool, partitions, tmpdir):
     for part in partitions.part_list:
         rdbtool(partitions.file_name, ("export", part[0], part_file))
         rdbtool(partitions.file_name, ("import", part[0], part_file))
+
+
+def rdbtool_export_sparse_test(rdbtool, tmpdir):
+    img = str(tmpdir / "disk.hdf")
+    rdbtool(img, ("create", "size=10M"), ("init",), ("add", "size=100%"))
+    sparse_file = tmpdir / "sparse.img"
+    dense_file = tmpdir / "dense.img"
+    out = rdbtool(img, ("export", "DH0", str(sparse_file)))
+    assert "sparse" in out[-1]
+    out = rdbtool(img, ("export", "DH0", str(dense_file), "dense"))
+    assert "sparse" not in out[-1]
+    assert sparse_file.read_binary() == dense_file.read_binary()
+    # import back with padding of partial block
+    part_file = tmpdir / "part.img"
+    part_file.write_binary(b"hello" * 1000)
+    rdbtool(img, ("import", "DH0", str(part_file), "pad"))
+    rdbtool(img, ("export", "DH0", str(dense_file), "dense"))
+    data = dense_file.read_binary()
+    assert data[:5000] == b"hello" * 1000
+    assert data[5000:6144] == bytes(1144)
+
+
+def rdbtool_stats_test(rdbtool, tmpdir):
+    img = str(tmpdir / "disk.hdf")
+    out = rdbtool(img, ("create", "size=10M"), ("init",), opts=["--stats"])
+    stats = out[out.index("I/O stats:   ops   seq%   blocks        bytes   time ms") :]
+    assert stats[2].split()[0] == "write"
+    assert int(stats[2].split()[1]) > 0
+    out = rdbtool(img, ("info",), opts=["--stats-heatmap", "16"])
+    heatmap = out[out.index("heatmap:      blocks       reads   writes") + 1 :]
+    assert len(heatmap) == 16
+    # only the rdb blocks at the start are read
+    assert int(heatmap[0].split()[1]) > 0
+    assert int(heatmap[-1].split()[1]) == 0
@@ -1,3 +1,4 @@
+import struct
 import pytest
 
 
@@ -173,3 +174,79 @@ def romtool_scan_test(toolrun, rom_file):
 def romtool_copy_test(toolrun, tmpdir, rom_file):
     new_rom = str(tmpdir / "new.rom")
     toolrun.run_checked("romtool", "copy", rom_file, new_rom)
+
+
+def romtool_disasm_test(toolrun):
+    out = toolrun.run_checked(
+        "romtool", "disasm", "-r", "f80000+8", "-r", "f80100:f80106", AROS_ROM
+    )
+    assert out == [
+        "00f80000:  1111                  move.b  (A1), -(A0)",
+        "00f80002:  4ef9 00f8 00f8        jmp     $f800f8.l",
+        "00f80100:  41f9 00f8 0000        lea     $f80000.l, A0",
+    ]
+
+
+def romtool_query_dir_test(toolrun, tmpdir, monkeypatch):
+    from amitools.rom import RomSplitter
+
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir / "cache"))
+    rom = RomSplitter().rfs.get_roms()[0]
+    # a fake image with matching size and checksum
+    data = bytearray(rom.size)
+    struct.pack_into(">I", data, 0, 0xFFFFFFFF - rom.chk_sum)
+    rom_dir = tmpdir / "roms"
+    rom_dir.mkdir()
+    (rom_dir / "a.rom").write_binary(bytes(data))
+    (rom_dir / "b.rom").write_binary(bytes(rom.size))
+    (rom_dir / "readme.txt").write_binary(b"hello")
+    out = toolrun.run_checked("romtool", "query", str(rom_dir))
+    assert out == [
+        "%s: %s" % (rom_dir / "a.rom", rom.name),
+        "%s: not found" % (rom_dir / "b.rom"),
+    ]
+
+
+def romtool_build_incremental_test(toolrun, tmpdir):
+    hdr = tmpdir / "hdr.bin"
+    hdr.write_binary(struct.pack(">II", 0x11144EF9, 0xF80002))
+    modules = [str(hdr), "bin/libs-sc-dbg/testsc.library", "bin/dos_examine_sc"]
+    full_rom = str(tmpdir / "full.rom")
+    inc_rom = str(tmpdir / "inc.rom")
+    cache = str(tmpdir / "modules.cache")
+    toolrun.run_checked("romtool", "build", "-o", full_rom, *modules)
+    # first run fills the cache, second one updates the ROM in place
+    for _ in range(2):
+        toolrun.run_checked(
+            "romtool", "build", "-I", "--module-cache", cache, "-o", inc_rom, *modules
+        )
+        assert (tmpdir / "inc.rom").read_binary() == (tmpdir / "full.rom").read_binary()
+    # change module order
+    modules = [modules[0], modules[2], modules[1]]
+    toolrun.run_checked("romtool", "build", "-o", full_rom, *modules)
+    toolrun.run_checked(
+        "romtool", "build", "-I", "--module-cache", cache, "-o", inc_rom, *modules
+    )
+    assert (tmpdir / "inc.rom").read_binary() == (tmpdir / "full.rom").read_binary()
+    toolrun.run_checked("romtool", "info", inc_rom)
+
+
+def romtool_build_incremental_bad_check_sum_test(toolrun, tmpdir):
+    hdr = tmpdir / "hdr.bin"
+    hdr.write_binary(struct.pack(">II", 0x11144EF9, 0xF80002))
+    modules = [str(hdr), "bin/libs-sc-dbg/testsc.library"]
+    full_rom = str(tmpdir / "full.rom")
+    inc_rom = str(tmpdir / "inc.rom")
+    cache = str(tmpdir / "modules.cache")
+    toolrun.run_checked("romtool", "build", "-o", full_rom, *modules)
+    toolrun.run_checked(
+        "romtool", "build", "-I", "--module-cache", cache, "-o", inc_rom, *modules
+    )
+    # corrupt the check sum of the former output
+    data = bytearray((tmpdir / "inc.rom").read_binary())
+    data[-0x18] ^= 0xFF
+    (tmpdir / "inc.rom").write_binary(bytes(data))
+    toolrun.run_checked(
+        "romtool", "build", "-I", "--module-cache", cache, "-o", inc_rom, *modules
+    )
+    assert (tmpdir / "inc.rom").read_binary() == (tmpdir / "full.rom").read_binary()
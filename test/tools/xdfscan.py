@@ -1,3 +1,5 @@
+import shutil
+import zipfile
 import pytest
 
 
@@ -11,3 +13,83 @@ def xdfscan(toolrun):
 
 def xdfscan_scan_test(xdfscan):
     xdfscan("disks")
+
+
+@pytest.mark.parametrize("mode", ["off", "quick", "deep"])
+def xdfscan_block_scan_test(xdfscan, mode):
+    out = xdfscan("-b", mode, "disks/boot-dd-ffs.adf", "disks/empty-dd-ofs.adf")
+    results = [l.split() for l in out if not l.split()[0] == "scan"]
+    assert len(results) == 2
+    for res in results:
+        assert res[-2] == "ok"
+
+
+def xdfscan_quick_sparse_hdf_test(xdfscan, toolrun, tmpdir):
+    hdf = str(tmpdir / "sparse.hdf")
+    toolrun.run_checked("xdftool", hdf, "create", "size=20M", "+", "format", "Work")
+    toolrun.run_checked(
+        "xdftool", hdf, "makedir", "foo", "+", "write", "disks/boot-dd-ffs.adf"
+    )
+    out = xdfscan("-v", "-l", "1", hdf)
+    results = [l.split() for l in out if l.endswith(hdf + "  ")]
+    assert results[-1][-2] == "ok"
+    # only few blocks are used
+    scanned = [l for l in out if "Scanned" in l and "blocks (quick)" in l]
+    assert len(scanned) == 1
+    num = int(scanned[0].split("Scanned")[1].split()[0])
+    assert 0 < num < 2000
+
+
+def xdfscan_archive_test(xdfscan, tmpdir):
+    arc = str(tmpdir / "disks.zip")
+    with zipfile.ZipFile(arc, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.write("disks/boot-dd-ffs.adf", "a/boot.adf")
+        zf.write("disks/empty-dd-ofs.adf.gz", "empty.adz")
+        zf.writestr("readme.txt", "no image")
+    expect = [arc + ";a/boot.adf", arc + ";empty.adz"]
+    for opts in (["-j", "1"], ["-j", "2", "-r", "0"]):
+        out = xdfscan(*opts, arc)
+        results = [l.split() for l in out if l.split()[0] != "scan"]
+        assert [res[-1] for res in results] == expect
+        for res in results:
+            assert res[-2] == "ok"
+    # archives are skipped
+    out = xdfscan("-A", arc)
+    assert out == []
+
+
+def xdfscan_cache_test(xdfscan, tmpdir):
+    cache = str(tmpdir / "scan.db")
+    img = str(tmpdir / "copy.adf")
+    shutil.copy("disks/boot-dd-ffs.adf", img)
+    args = ["-c", cache, "-S", "disks/boot-dd-ffs.adf", img]
+    out = xdfscan("-j", "1", *args)
+    # the copy is found by its content
+    assert out[-1].startswith("cache: 1 hits, 1 misses")
+    out = xdfscan("-j", "2", *args)
+    assert out[-1].startswith("cache: 2 hits, 0 misses (100.0% hit rate), 2 files")
+    results = [l.split() for l in out[:-1] if l.split()[0] != "scan"]
+    assert [res[-1] for res in results] == ["disks/boot-dd-ffs.adf", img]
+    for res in results:
+        assert res[-2] == "ok"
+    # other options need new results
+    out = xdfscan("-b", "off", *args)
+    assert out[-1].startswith("cache: 1 hits, 1 misses")
+    # prune results
+    out = xdfscan("-c", cache, "-P", "-1")
+    assert out == ["cache: pruned 0 files and 0 results"]
+
+
+def xdfscan_stats_test(xdfscan, tmpdir):
+    cache = str(tmpdir / "scan.db")
+    args = ["--stats", "disks/boot-dd-ffs.adf", "disks/empty-dd-ofs.adf"]
+    for opts in (["-j", "1"], ["-j", "2"]):
+        out = xdfscan(*opts, "-c", cache, *args)
+        results = [l for l in out if l.startswith("I/O stats:")]
+        reads = [l.split() for l in out if l.split()[0] == "read"]
+        # stats of cached results are not shown
+        if opts[1] == "1":
+            assert len(results) == 2
+            assert all(int(r[1]) > 0 for r in reads)
+        else:
+            assert results == []
@@ -1,6 +1,7 @@
 import pytest
 import collections
 import os
+import shutil
 
 
 # tag a parameter for full testing
@@ -485,3 +486,140 @@ def xdftool_rdb_open_format_test(xdftool, rdb_files):
     # list again
     for part in part_list:
         xdftool(rdb_file, ("open", "part=" + part), ("list",))
+
+
+# overlay tests
+
+
+def _read_file(path):
+    with open(path, "rb") as fh:
+        return fh.read()
+
+
+def xdftool_overlay_test(xdftool, test_files, tmpdir):
+    base = str(tmpdir / "base.adf")
+    xdftool(base, ("create",), ("format", "Foo"))
+    base_data = _read_file(base)
+    delta = str(tmpdir / "job.ovl")
+    ovl = "overlay:%s?base=%s" % (delta, base)
+    xdftool(ovl, ("write", test_files.file_path, test_files.file_name))
+    # base is untouched and the delta holds only the changed blocks
+    assert _read_file(base) == base_data
+    delta_size = os.path.getsize(delta)
+    assert delta_size < len(test_files.data) + 16 * 1024
+    assert delta_size < os.path.getsize(base)
+    data = xdftool("overlay:" + delta, ("type", test_files.file_name), raw_output=True)
+    assert data == test_files.data
+    # discard
+    xdftool("overlay:" + delta, ("overlay", "discard"))
+    output = xdftool("overlay:" + delta, ("overlay", "info"))
+    assert output[-1].split() == ["blocks:", "0"]
+    # commit
+    xdftool("overlay:" + delta, ("write", test_files.file_path), ("overlay", "commit"))
+    assert _read_file(base) != base_data
+    data = xdftool(base, ("type", test_files.file_name), raw_output=True)
+    assert data == test_files.data
+
+
+def xdftool_overlay_rdb_test(xdftool, rdbtool, rdb_files):
+    part_list, rdb_file = rdb_files
+    rdb_data = _read_file(rdb_file)
+    delta = rdb_file + ".ovl"
+    ovl = "overlay:%s?base=%s" % (delta, rdb_file)
+    for part in part_list:
+        xdftool(ovl, ("open", "part=" + part), ("format", "foo_" + part))
+    rdbtool(ovl, ("info",))
+    assert _read_file(rdb_file) == rdb_data
+    for part in part_list:
+        xdftool(ovl, ("open", "part=" + part), ("list",))
+
+
+# chunk image tests
+
+
+@pytest.mark.parametrize("ext", [".hdc", ".hdz", ".hdf"])
+def xdftool_convert_test(xdftool, toolrun, test_files, tmpdir, ext):
+    base = str(tmpdir / "base.hdf")
+    xdftool(base, ("create", "size=1M"), ("format", "Foo"))
+    xdftool(base, ("write", test_files.file_path, test_files.file_name))
+    packed = str(tmpdir / "packed.hdc")
+    xdftool(packed, ("convert", base, "codec=lzma"))
+    assert os.path.getsize(packed) < 64 * 1024
+    conv = str(tmpdir / "conv" + ext)
+    xdftool(conv, ("convert", packed))
+    # gzip'ed images are read-only
+    data = toolrun.run_checked(
+        "xdftool", "-r", conv, "type", test_files.file_name, raw_output=True
+    )
+    assert data == test_files.data
+
+
+def _sync_actions(output):
+    return sorted(tuple(l.split()) for l in output if len(l.split()) == 2)
+
+
+def xdftool_sync_test(xdftool, tmpdir):
+    img = str(tmpdir / "sync.adf")
+    tree = tmpdir / "tree"
+    tree.mkdir()
+    (tree / "a.txt").write_binary(b"hello")
+    (tree / "dir").mkdir()
+    (tree / "dir" / "b.bin").write_binary(bytes(range(256)) * 8)
+    (tree / "old.txt").write_binary(b"old")
+    xdftool(img, ("pack", str(tree)))
+    # nothing changed but time: the first sync compares contents
+    out = xdftool(img, ("sync", str(tree), "hash", "dry"))
+    assert _sync_actions(out) == []
+    xdftool(img, ("sync", str(tree), "hash"))
+    assert os.path.exists(str(tree) + ".xdfsync")
+    # change host tree
+    (tree / "a.txt").write_binary(b"hello world")
+    (tree / "old.txt").remove()
+    (tree / "dir" / "c").mkdir()
+    (tree / "dir" / "c" / "new").write_binary(b"new")
+    (tree / "dir" / "b.bin").setmtime((tree / "dir" / "b.bin").mtime() + 10)
+    out = xdftool(img, ("sync", str(tree), "hash", "dry"))
+    expect = [
+        ("delete", "old.txt"),
+        ("makedir", "dir/c"),
+        ("time", "dir/b.bin"),
+        ("update", "a.txt"),
+    ]
+    assert _sync_actions(out) == expect
+    # dry run did not change the image
+    assert xdftool(img, ("type", "a.txt"), raw_output=True) == b"hello"
+    out = xdftool(img, ("sync", str(tree), "hash"), ("list",))
+    assert any(l.split()[:2] == ["new", "3"] for l in out)
+    assert xdftool(img, ("type", "a.txt"), raw_output=True) == b"hello world"
+    assert xdftool(img, ("type", "dir/c/new"), raw_output=True) == b"new"
+    assert not any("old.txt" in l for l in out)
+    # synced: size and time match
+    out = xdftool(img, ("sync", str(tree), "dry"))
+    assert _sync_actions(out) == []
+    # keep entries missing on host
+    xdftool(img, ("write", str(tree / "a.txt"), "extra.txt"))
+    out = xdftool(img, ("sync", str(tree), "keep", "dry"))
+    assert _sync_actions(out) == []
+    out = xdftool(img, ("sync", str(tree), "dry"))
+    assert _sync_actions(out) == [("delete", "extra.txt")]
+
+
+@pytest.mark.parametrize("mode", ["", "files"])
+def xdftool_repack_test(xdftool, xdf_file_tree, tmpdir, mode):
+    xdf_file_tree.create()
+    ext = os.path.splitext(xdf_file_tree.img_file)[1]
+    img = str(tmpdir / "repack" + ext)
+    shutil.copyfile(xdf_file_tree.img_file, img)
+    xdftool(xdf_file_tree.img_file, ("repack", img, mode))
+    xdf_file_tree.check()
+
+
+def xdftool_stats_test(toolrun, tmpdir):
+    img = str(tmpdir / "stats.adf")
+    out = toolrun.run_checked("xdftool", "--stats", img, "create", "+", "format", "Foo")
+    assert out[0] == "I/O stats:   ops   seq%   blocks        bytes   time ms"
+    assert out[2].split()[0] == "write"
+    assert int(out[2].split()[1]) > 0
+    out = toolrun.run_checked("xdftool", "--stats-heatmap", "4", img, "list")
+    assert "heatmap:" in [l.split()[0] for l in out]
+    assert len(out[out.index("heatmap:      blocks       reads   writes") :]) == 5
@@ -0,0 +1,75 @@
+from amitools.binfmt.BinImage import *
+
+
+def _create_segment():
+    seg = Segment(SEGMENT_TYPE_CODE, 64, bytes(64))
+    seg.id = 0
+    other = Segment(SEGMENT_TYPE_DATA, 16, bytes(16))
+    other.id = 1
+    symtab = SymbolTable()
+    seg.set_symtab(symtab)
+    for off, name in ((8, "b"), (0, "a"), (8, "b2"), (20, "c")):
+        symtab.add_symbol(Symbol(off, name))
+    for to_seg, offsets in ((other, (10, 2)), (seg, (12, 30))):
+        relocs = Relocations(to_seg)
+        for off in offsets:
+            relocs.add_reloc(Reloc(off))
+        seg.add_reloc(to_seg, relocs)
+    debug_line = DebugLine()
+    for name, offsets in (("a.c", (0, 4)), ("b.c", (4, 8))):
+        df = DebugLineFile(name)
+        for off in offsets:
+            df.add_entry(DebugLineEntry(off, off + 100))
+        debug_line.add_file(df)
+    seg.set_debug_line(debug_line)
+    return seg, other
+
+
+def binfmt_binimage_find_symbol_test():
+    seg, _ = _create_segment()
+    assert seg.find_symbol(0) == "a"
+    # first symbol of the table wins
+    assert seg.find_symbol(8) == "b"
+    assert seg.find_symbol(4) is None
+    assert [s.get_name() for s in seg.find_symbols(4, 21)] == ["b", "b2", "c"]
+    sym, delta = seg.find_nearest_symbol(11)
+    assert sym.get_name() == "b"
+    assert delta == 3
+    assert seg.find_nearest_symbol(100)[1] == 80
+    # symbols added later are indexed, too
+    seg.get_symtab().add_symbol(Symbol(4, "d"))
+    assert seg.find_symbol(4) == "d"
+
+
+def binfmt_binimage_find_symbol_none_test():
+    seg = Segment(SEGMENT_TYPE_CODE, 16)
+    assert seg.find_symbol(0) is None
+    assert seg.find_symbols(0, 16) == []
+    assert seg.find_nearest_symbol(4) is None
+    assert seg.find_reloc(0, 16) is None
+    assert seg.find_debug_line(0) is None
+
+
+def binfmt_binimage_find_reloc_test():
+    seg, other = _create_segment()
+    # search order of target segments is kept
+    r, to_seg, off = seg.find_reloc(0, 12)
+    assert to_seg is seg
+    assert off == 12
+    r, to_seg, off = seg.find_reloc(0, 11)
+    assert to_seg is other
+    assert off == 10
+    assert seg.find_reloc(14, 4) is None
+    # range query inside an instruction
+    relocs = seg.find_relocs(2, 31)
+    assert [(e[1].id, e[2]) for e in relocs] == [(1, 2), (1, 10), (0, 12), (0, 30)]
+    assert seg.find_relocs(3, 10) == []
+
+
+def binfmt_binimage_find_debug_line_test():
+    seg, _ = _create_segment()
+    e = seg.find_debug_line(4)
+    assert e.get_file().get_src_file() == "a.c"
+    assert e.get_src_line() == 104
+    assert seg.find_debug_line(8).get_file().get_src_file() == "b.c"
+    assert seg.find_debug_line(2) is None
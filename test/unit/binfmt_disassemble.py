@@ -0,0 +1,75 @@
+from amitools.binfmt.BinImage import *
+from amitools.binfmt import Disassemble
+
+# rts, move.b (A4)+,D0, movem.l D2-D7/A2-A6,-(A7), nop
+CODE = b"\x4e\x75" + b"\x10\x1c" + b"\x48\xe7\x3f\x3e" + b"\x4e\x71"
+
+
+def _create_image():
+    bi = BinImage(BIN_IMAGE_TYPE_HUNK)
+    for i in range(3):
+        code = Segment(SEGMENT_TYPE_CODE, len(CODE) * 4, CODE * 4)
+        symtab = SymbolTable()
+        symtab.add_symbol(Symbol(0, b"start%d" % i))
+        symtab.add_symbol(Symbol(10, b"func%d" % i))
+        symtab.add_symbol(Symbol(20, b"end%d" % i))
+        code.set_symtab(symtab)
+        bi.add_segment(code)
+    bi.add_segment(Segment(SEGMENT_TYPE_DATA, 4, b"data"))
+    return bi
+
+
+def binfmt_disassemble_parse_range_test():
+    assert Disassemble.parse_range("10:20") == (0x10, 0x20)
+    assert Disassemble.parse_range("f80000+10") == (0xF80000, 0xF80010)
+    for txt in ("10", "x:20", "10+y"):
+        try:
+            Disassemble.parse_range(txt)
+            assert False
+        except ValueError:
+            pass
+
+
+def binfmt_disassemble_ranges_test():
+    seg = _create_image().get_segments()[0]
+    assert Disassemble.get_segment_ranges(seg) == [(0, 40)]
+    assert Disassemble.get_symbol_ranges(seg, ["func0"]) == [(10, 20)]
+    assert Disassemble.get_symbol_ranges(seg, [b"end0"]) == [(20, 40)]
+    assert Disassemble.get_symbol_ranges(seg, ["foo"]) == []
+    assert Disassemble.get_segment_ranges(seg, [(4, 6), (30, 100)], ["func0"]) == [
+        (4, 6),
+        (10, 20),
+        (30, 40),
+    ]
+    assert Disassemble.get_segment_ranges(seg, [(100, 200)]) == []
+
+
+def binfmt_disassemble_lines_test():
+    bi = _create_image()
+    seg = bi.get_segments()[0]
+    d = Disassemble.Disassemble()
+    lines = d.disassemble(seg, bi)
+    assert lines[0] == "\t\t\t\tb'start0':"
+    assert lines[1].startswith("00000000\t4e75 ")
+    assert d.disassemble(bi.get_segments()[3], bi) is None
+    # a range is a slice of the full listing
+    func = list(d.iter_lines(seg, 10, 20))
+    assert (
+        func
+        == lines[lines.index("\t\t\t\tb'func0':") : lines.index("\t\t\t\tb'end0':")]
+    )
+
+
+def binfmt_disassemble_image_test():
+    bi = _create_image()
+    result = [
+        (seg.id, list(lines))
+        for seg, lines in Disassemble.iter_image(bi, symbols=["func1"])
+    ]
+    assert [r[0] for r in result] == [1]
+    assert result[0][1][0] == "\t\t\t\tb'func1':"
+    # workers give the same output
+    single = [(s.id, list(l)) for s, l in Disassemble.iter_image(bi)]
+    multi = [(s.id, list(l)) for s, l in Disassemble.iter_image(bi, workers=2)]
+    assert [r[0] for r in single] == [0, 1, 2]
+    assert single == multi
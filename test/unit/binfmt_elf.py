@@ -1,4 +1,8 @@
+import io
+import pytest
 from amitools.binfmt.elf.BinFmtELF import BinFmtELF
+from amitools.binfmt.elf.ELFReader import ELFReader
+from amitools.binfmt.elf.ELFFile import ELFSectionHeader, ELFSectionStringTable
 
 
 def binfmt_elf_check_elf_test():
@@ -8,3 +12,66 @@ def binfmt_elf_check_elf_test():
     assert bin_img is not None
     secs = bin_img.get_segments()
     assert len(secs) > 0
+
+
+def binfmt_elf_debug_line_test():
+    bfe = BinFmtELF()
+    bin_img = bfe.load_image("bin/dos_examine_agcc_dbg")
+    code = bin_img.get_segments()[0]
+    dl = code.get_debug_line()
+    assert dl is not None
+    files = {df.get_src_file(): df for df in dl.get_files()}
+    df = files["dos_examine.c"]
+    assert df.get_dir_name() == "src"
+    e = df.get_entries()[0]
+    assert (e.get_offset(), e.get_src_line()) == (742, 7)
+    assert code.find_debug_line(742) is e
+
+
+def binfmt_elf_reader_lazy_test():
+    with open("bin/dos_examine_agcc_dbg", "rb") as fh:
+        data = fh.read()
+        fh.seek(0)
+        ef = ELFReader().load(fh)
+    # sections are read on first access
+    debug_info = ef.get_section_by_name(".debug_info")
+    assert debug_info._data is None
+    off = debug_info.header.offset
+    assert debug_info.data == data[off : off + debug_info.header.size]
+    # tables are decoded right away
+    assert len(ef.symtabs[0].get_table_symbols()) > 0
+    # file objects without a file descriptor work, too
+    ef2 = ELFReader().load(io.BytesIO(data))
+    names = [s.name_str for s in ef2.sections]
+    assert names == [s.name_str for s in ef.sections]
+    text = ef2.get_section_by_name(b".text")
+    assert text.data == ef.get_section_by_name(".text").data
+    ef2.close()
+    # the mapping is released on close
+    source = ef.source
+    ef.close()
+    assert source.closed
+    assert ef.source is None
+    debug_str = ef.get_section_by_name(".debug_str")
+    with pytest.raises(ValueError):
+        debug_str.data
+
+
+def binfmt_elf_load_image_close_test():
+    bin_img = BinFmtELF().load_image("bin/dos_examine_agcc_dbg")
+    # the mapping is not needed after loading
+    assert bin_img.get_file_data().source is None
+    code = bin_img.get_segments()[0]
+    assert len(code.get_data()) == code.get_size()
+
+
+def binfmt_elf_strtab_test():
+    data = b"\0main\0_start\0"
+    hdr = ELFSectionHeader()
+    hdr.size = len(data)
+    strtab = ELFSectionStringTable(hdr, 1, data)
+    strtab.decode()
+    assert strtab.get_string(0) == ""
+    assert strtab.get_string(1) == b"main"
+    assert strtab.get_string(7) == b"start"
+    assert strtab.get_string(6) == b"_start"
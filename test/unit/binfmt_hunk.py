@@ -0,0 +1,162 @@
+import io
+import mmap
+import pytest
+from amitools.binfmt.BinImage import *
+from amitools.binfmt.BinFmt import BinFmt
+from amitools.binfmt.hunk.BinFmtHunk import BinFmtHunk
+from amitools.binfmt.hunk.HunkBuffer import HunkBuffer
+from amitools.binfmt.hunk.HunkBlockFile import HunkBlockFile, HunkParseError
+from amitools.binfmt.hunk.HunkReader import HunkReader
+from amitools.binfmt.hunk.Hunk import RESULT_OK
+
+
+def _create_image(num_relocs=1000, num_symbols=100):
+    bi = BinImage(BIN_IMAGE_TYPE_HUNK)
+    code_size = num_relocs * 4
+    code = Segment(SEGMENT_TYPE_CODE, code_size, bytes(code_size))
+    data = Segment(SEGMENT_TYPE_DATA, 16, b"0123456789abcdef")
+    bss = Segment(SEGMENT_TYPE_BSS, 1024)
+    for seg in (code, data, bss):
+        bi.add_segment(seg)
+    # relocs from code to all segments
+    for to_seg in (code, data, bss):
+        relocs = Relocations(to_seg)
+        for i in range(to_seg.id, num_relocs, 3):
+            relocs.add_reloc(Reloc(i * 4))
+        code.add_reloc(to_seg, relocs)
+    # symbols
+    symtab = SymbolTable()
+    for i in range(num_symbols):
+        symtab.add_symbol(Symbol(i * 4, b"sym%d" % i))
+    code.set_symtab(symtab)
+    return bi
+
+
+def _get_relocs(seg):
+    result = []
+    for to_seg in seg.get_reloc_to_segs():
+        offsets = [r.get_offset() for r in seg.get_reloc(to_seg).get_relocs()]
+        result.append((to_seg.id, offsets))
+    return result
+
+
+def binfmt_hunk_buffer_test():
+    buf = HunkBuffer(b"abcdefgh")
+    assert buf.read(2) == b"ab"
+    view = buf.read_view(3)
+    assert isinstance(view, memoryview)
+    assert view == b"cde"
+    assert buf.tell() == 5
+    assert buf.read() == b"fgh"
+    assert buf.read(4) == b""
+    buf.seek(-2, 2)
+    assert buf.read(4) == b"gh"
+    buf.seek(1)
+    assert buf.read(1) == b"b"
+
+
+def binfmt_hunk_buffer_from_path_test(tmpdir):
+    path = tmpdir / "data.bin"
+    path.write_binary(b"abcdefgh")
+    # files are mapped and not read
+    with HunkBuffer.from_path(str(path)) as buf:
+        assert isinstance(buf.data, mmap.mmap)
+        view = buf.read_view(4)
+        assert view == b"abcd"
+        view.release()
+        assert buf.read() == b"efgh"
+    assert buf.data.closed
+    path.write_binary(b"")
+    with HunkBuffer.from_path(str(path)) as buf:
+        assert buf.read() == b""
+
+
+def binfmt_hunk_load_image_truncated_test(tmpdir, monkeypatch):
+    bi = _create_image()
+    path = str(tmpdir / "test.hunk")
+    BinFmtHunk().save_image(path, bi)
+    with open(path, "rb") as fh:
+        data = fh.read()
+    with open(path, "wb") as fh:
+        fh.write(data[:-47])
+    # the parse error is not hidden by unmapping the file
+    with pytest.raises(HunkParseError):
+        BinFmtHunk().load_image(path)
+    # hunk files are mapped by BinFmt, too
+    from_path = HunkBuffer.from_path
+    paths = []
+
+    def track_from_path(p):
+        paths.append(p)
+        return from_path(p)
+
+    monkeypatch.setattr(HunkBuffer, "from_path", track_from_path)
+    with pytest.raises(HunkParseError):
+        BinFmt().load_image(path)
+    assert paths == [path]
+
+
+def binfmt_hunk_load_image_test(tmpdir):
+    bi = _create_image()
+    path = str(tmpdir / "test.hunk")
+    bfh = BinFmtHunk()
+    bfh.save_image(path, bi)
+    # buffer based load
+    bi_buf = bfh.load_image(path)
+    # file based load
+    with open(path, "rb") as fh:
+        bi_file = bfh.load_image_fobj(fh)
+    for bi2 in (bi_buf, bi_file):
+        segs = bi2.get_segments()
+        assert len(segs) == 3
+        for seg, seg2 in zip(bi.get_segments(), segs):
+            assert seg.get_type() == seg2.get_type()
+            assert seg.get_size() == seg2.get_size()
+            assert _get_relocs(seg) == _get_relocs(seg2)
+        # segment data is always bytes
+        assert type(segs[1].get_data()) is bytes
+        assert segs[1].get_data() == b"0123456789abcdef"
+        symbols = segs[0].get_symtab().get_symbols()
+        assert len(symbols) == 100
+        assert symbols[-1].get_name() == b"sym99"
+        assert symbols[-1].get_offset() == 99 * 4
+
+
+def binfmt_hunk_block_file_buffer_test():
+    bi = _create_image()
+    fobj = io.BytesIO()
+    BinFmtHunk().save_image_fobj(fobj, bi)
+    data = fobj.getvalue()
+    # parse both ways
+    bf_buf = HunkBlockFile()
+    bf_buf.read_buffer(data, isLoadSeg=True)
+    bf_file = HunkBlockFile()
+    bf_file.read(io.BytesIO(data), isLoadSeg=True)
+    assert bf_buf.get_block_type_names() == bf_file.get_block_type_names()
+    for blk_buf, blk_file in zip(bf_buf.get_blocks(), bf_file.get_blocks()):
+        if hasattr(blk_buf, "relocs"):
+            assert blk_buf.relocs == blk_file.relocs
+        if getattr(blk_buf, "data", None) is not None:
+            assert isinstance(blk_buf.data, memoryview)
+            assert blk_buf.data == blk_file.data
+
+
+def binfmt_hunk_reader_test(tmpdir):
+    bi = _create_image()
+    path = str(tmpdir / "test.hunk")
+    BinFmtHunk().save_image(path, bi)
+    hr = HunkReader()
+    assert hr.read_file(path) == RESULT_OK
+    with open(path, "rb") as fh:
+        hr_mem = HunkReader()
+        assert hr_mem.read_mem(path, fh.read()) == RESULT_OK
+    assert hr.hunks == hr_mem.hunks
+    relocs = [h["reloc"] for h in hr.hunks if "reloc" in h]
+    assert relocs[0][1] == [i * 4 for i in range(1, 1000, 3)]
+    # file truncated in reloc offsets
+    with open(path, "rb") as fh:
+        data = fh.read()
+    pos = data.index(b"\x00\x00\x03\xf7", 4 * 1000) + 100
+    hr = HunkReader()
+    assert hr.read_mem(path, data[:pos]) != RESULT_OK
+    assert "truncated" in hr.error_string
@@ -0,0 +1,82 @@
+import struct
+import pytest
+from amitools.binfmt.BinImage import *
+from amitools.binfmt.Relocate import Relocate
+
+
+def _create_image():
+    bi = BinImage(BIN_IMAGE_TYPE_HUNK)
+    code_data = bytearray(64)
+    struct.pack_into(">I", code_data, 0, 0x10)
+    struct.pack_into(">I", code_data, 6, 0x20)
+    struct.pack_into(">I", code_data, 12, 0xFFFFFFFC)
+    struct.pack_into(">I", code_data, 17, 4)
+    struct.pack_into(">i", code_data, 24, -8)
+    code = Segment(SEGMENT_TYPE_CODE, 64, bytes(code_data))
+    data = Segment(SEGMENT_TYPE_DATA, 16, bytes(16))
+    bi.add_segment(code)
+    bi.add_segment(data)
+    # code -> code: aligned, unaligned and odd offsets
+    relocs = Relocations(code)
+    for off in (0, 6, 17):
+        relocs.add_reloc(Reloc(off))
+    code.add_reloc(code, relocs)
+    # code -> data: wrap around, addend and pc relative
+    relocs = Relocations(data)
+    relocs.add_reloc(Reloc(12))
+    relocs.add_reloc(Reloc(24, BIN_IMAGE_RELOC_PC32))
+    relocs.add_reloc(Reloc(32, addend=8))
+    code.add_reloc(data, relocs)
+    return bi
+
+
+def _longs(data, offsets):
+    return [struct.unpack_from(">I", data, off)[0] for off in offsets]
+
+
+@pytest.mark.parametrize("batch", [True, False])
+def binfmt_relocate_test(batch):
+    bi = _create_image()
+    rel = Relocate(bi, batch=batch)
+    code, data = rel.relocate([0x1000, 0x2000])
+    assert _longs(code, (0, 6, 17)) == [0x1010, 0x1020, 0x1004]
+    assert _longs(code, (12, 24, 32)) == [
+        0x1FFC,
+        (0x2000 - 8 - 0x1000 - 24) & 0xFFFFFFFF,
+        0x2008,
+    ]
+    assert data == bytes(16)
+
+
+def binfmt_relocate_batch_same_test():
+    bi = _create_image()
+    addrs = [0x123456, 0xFFFFFFF0]
+    assert Relocate(bi).relocate(addrs) == Relocate(bi, batch=False).relocate(addrs)
+    assert Relocate(bi).relocate_one_block(0x4002, 2) == Relocate(
+        bi, batch=False
+    ).relocate_one_block(0x4002, 2)
+
+
+def binfmt_relocate_overlap_test():
+    bi = BinImage(BIN_IMAGE_TYPE_HUNK)
+    seg = Segment(SEGMENT_TYPE_DATA, 8, bytes(8))
+    bi.add_segment(seg)
+    relocs = Relocations(seg)
+    relocs.add_reloc(Reloc(0))
+    relocs.add_reloc(Reloc(2))
+    seg.add_reloc(seg, relocs)
+    # overlapping longs fall back to patching one by one
+    (data,) = Relocate(bi).relocate([0x10001])
+    assert data == bytes([0, 1, 0, 2, 0, 1, 0, 0])
+
+
+def binfmt_relocate_bad_offset_test():
+    bi = BinImage(BIN_IMAGE_TYPE_HUNK)
+    seg = Segment(SEGMENT_TYPE_DATA, 8, bytes(8))
+    bi.add_segment(seg)
+    relocs = Relocations(seg)
+    relocs.add_reloc(Reloc(0))
+    relocs.add_reloc(Reloc(6))
+    seg.add_reloc(seg, relocs)
+    with pytest.raises(ValueError):
+        Relocate(bi).relocate([0x1000])
@@ -0,0 +1,22 @@
+from amitools.vamos.cfg import BatchParser
+import argparse
+
+
+def cfg_batch_dict_test():
+    bp = BatchParser()
+    input_dict = {"batch": {"file": "jobs.json", "workers": 4, "result": "res.json"}}
+    bp.parse_config(input_dict, "dict")
+    assert bp.get_cfg_dict() == input_dict
+
+
+def cfg_batch_args_test():
+    bp = BatchParser()
+    ap = argparse.ArgumentParser()
+    bp.setup_args(ap)
+    args = ap.parse_args(
+        ["--batch", "jobs.json", "--batch-workers", "4", "--batch-result", "res.json"]
+    )
+    bp.parse_args(args)
+    assert bp.get_cfg_dict() == {
+        "batch": {"file": "jobs.json", "workers": 4, "result": "res.json"}
+    }
@@ -0,0 +1,22 @@
+from amitools.vamos.cfg import DaemonParser
+import argparse
+
+
+def cfg_daemon_dict_test():
+    dp = DaemonParser()
+    input_dict = {"daemon": {"socket": "/tmp/vamos.sock", "max_requests": 3}}
+    dp.parse_config(input_dict, "dict")
+    assert dp.get_cfg_dict() == input_dict
+
+
+def cfg_daemon_args_test():
+    dp = DaemonParser()
+    ap = argparse.ArgumentParser()
+    dp.setup_args(ap)
+    args = ap.parse_args(
+        ["--daemon-serve", "/tmp/vamos.sock", "--daemon-max-requests", "3"]
+    )
+    dp.parse_args(args)
+    assert dp.get_cfg_dict() == {
+        "daemon": {"socket": "/tmp/vamos.sock", "max_requests": 3}
+    }
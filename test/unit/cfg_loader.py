@@ -0,0 +1,46 @@
+from amitools.vamos.cfg import LoaderParser
+import argparse
+
+
+def cfg_loader_dict_test():
+    lp = LoaderParser()
+    input_dict = {
+        "loader": {"cache_entries": 8, "cache_dir": "foo/bar", "cache_dir_size": 16}
+    }
+    lp.parse_config(input_dict, "dict")
+    assert lp.get_cfg_dict() == input_dict
+
+
+def cfg_loader_ini_test():
+    lp = LoaderParser("vamos")
+    ini_dict = {
+        "vamos": {
+            "seg_cache_entries": 8,
+            "seg_cache_dir": "foo/bar",
+            "seg_cache_dir_size": 16,
+        }
+    }
+    lp.parse_config(ini_dict, "ini")
+    assert lp.get_cfg_dict() == {
+        "loader": {"cache_entries": 8, "cache_dir": "foo/bar", "cache_dir_size": 16}
+    }
+
+
+def cfg_loader_args_test():
+    lp = LoaderParser()
+    ap = argparse.ArgumentParser()
+    lp.setup_args(ap)
+    args = ap.parse_args(
+        [
+            "--seg-cache-entries",
+            "8",
+            "--seg-cache-dir",
+            "foo/bar",
+            "--seg-cache-dir-size",
+            "16",
+        ]
+    )
+    lp.parse_args(args)
+    assert lp.get_cfg_dict() == {
+        "loader": {"cache_entries": 8, "cache_dir": "foo/bar", "cache_dir_size": 16}
+    }
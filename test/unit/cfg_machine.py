@@ -10,6 +10,7 @@ def cfg_machine_dict_test():
             "max_cycles": 23,
             "cycles_per_run": 42,
             "ram_size": 512,
+            "snapshot": "vamos.snap",
         },
         "memmap": {"hw_access": "abort", "old_dos_guard": True},
     }
@@ -25,6 +26,7 @@ def cfg_machine_ini_test():
             "max_cycles": 23,
             "cycles_per_run": 42,
             "ram_size": 512,
+            "snapshot": "vamos.snap",
             "hw_access": "abort",
             "old_dos_guard": True,
         }
@@ -36,6 +38,7 @@ def cfg_machine_ini_test():
             "max_cycles": 23,
             "cycles_per_run": 42,
             "ram_size": 512,
+            "snapshot": "vamos.snap",
         },
         "memmap": {"hw_access": "abort", "old_dos_guard": True},
     }
@@ -58,6 +61,8 @@ def cfg_machine_args_test():
             "512",
             "-H",
             "abort",
+            "--snapshot",
+            "vamos.snap",
         ]
     )
     lp.parse_args(args)
@@ -67,6 +72,7 @@ def cfg_machine_args_test():
             "max_cycles": 23,
             "cycles_per_run": 42,
             "ram_size": 512,
+            "snapshot": "vamos.snap",
         },
         "memmap": {"hw_access": "abort", "old_dos_guard": True},
     }
@@ -0,0 +1,41 @@
+import os
+import socket
+import pytest
+from amitools.vamos.daemon import (
+    send_request,
+    recv_request,
+    send_result,
+    recv_result,
+    DaemonProtocolError,
+)
+
+
+def daemon_proto_request_test(tmpdir):
+    a, b = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    path = str(tmpdir.join("out"))
+    with open(path, "wb") as fh:
+        req = {"args": ["foo", "bar"], "env": {"HOME": "x" * 10000}}
+        send_request(a, req, (fh.fileno(),))
+        got_req, fds = recv_request(b)
+    assert got_req == req
+    assert len(fds) == 1
+    # the passed fd still works
+    os.write(fds[0], b"hello")
+    os.close(fds[0])
+    with open(path, "rb") as fh:
+        assert fh.read() == b"hello"
+    # result
+    send_result(b, -23)
+    assert recv_result(a) == -23
+    a.close()
+    b.close()
+
+
+def daemon_proto_closed_test():
+    a, b = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    a.close()
+    with pytest.raises(DaemonProtocolError):
+        recv_request(b)
+    with pytest.raises(DaemonProtocolError):
+        recv_result(b)
+    b.close()
@@ -0,0 +1,113 @@
+import os
+import errno
+import stat
+import socket
+import subprocess
+import time
+from amitools.vamos.daemon.server import VamosDaemon
+from amitools.vamos.daemon.client import RET_CODE_DAEMON_ERROR
+from amitools.vamos.daemon.proto import send_request, recv_result
+
+VAMOS_BIN = "../bin/vamos"
+VAMOS_ARGS = ["-c", "test.vamosrc"]
+
+
+def _start_daemon(sock_path, num):
+    args = [VAMOS_BIN] + VAMOS_ARGS
+    args += ["--daemon-serve", sock_path, "--daemon-max-requests", str(num)]
+    proc = subprocess.Popen(args)
+    # wait for socket
+    for i in range(100):
+        if os.path.exists(sock_path):
+            break
+        time.sleep(0.1)
+    return proc
+
+
+def _run_client(sock_path, *args):
+    env = dict(os.environ)
+    env["VAMOS_DAEMON"] = sock_path
+    p = subprocess.run(
+        [VAMOS_BIN] + VAMOS_ARGS + list(args), env=env, capture_output=True
+    )
+    stdout = p.stdout.decode("latin-1").splitlines()
+    return p.returncode, stdout
+
+
+def daemon_server_run_test(tmpdir):
+    sock_path = str(tmpdir.join("vamos.sock"))
+    proc = _start_daemon(sock_path, 3)
+    try:
+        # same config as daemon
+        ret, out = _run_client(sock_path, "curdir:bin/test_hello_gcc")
+        assert ret == 0
+        assert out == ["VamosTest: PrintHello()"]
+        # different config triggers a full run
+        ret, out = _run_client(sock_path, "-m", "4096", "curdir:bin/test_hello_gcc")
+        assert ret == 0
+        assert out == ["VamosTest: PrintHello()"]
+        # failing program
+        ret, out = _run_client(sock_path, "curdir:bin/test_raise_gcc")
+        assert ret == 1
+    finally:
+        assert proc.wait(timeout=10) == 0
+    assert not os.path.exists(sock_path)
+
+
+def daemon_server_no_daemon_test(tmpdir):
+    # fall back to local run if no daemon is found
+    sock_path = str(tmpdir.join("vamos.sock"))
+    ret, out = _run_client(sock_path, "curdir:bin/test_hello_gcc")
+    assert ret == 0
+    assert out == ["VamosTest: PrintHello()"]
+
+
+def daemon_server_fork_error_test(tmpdir, monkeypatch):
+    def fork():
+        raise OSError(errno.EAGAIN, "Resource temporarily unavailable")
+
+    monkeypatch.setattr(os, "fork", fork)
+    daemon = VamosDaemon(None, str(tmpdir.join("vamos.sock")))
+    client, conn = socket.socketpair()
+    err_r, err_w = os.pipe()
+    try:
+        req = {"args": [], "cfg_files": None, "cwd": str(tmpdir), "env": {}}
+        send_request(client, req, (err_w, err_w, err_w))
+        # the failed request is reported and the daemon keeps running
+        daemon._handle_conn(None, conn)
+        assert recv_result(client) == RET_CODE_DAEMON_ERROR
+        assert os.read(err_r, 1024).startswith(b"vamos daemon: can't run command")
+        assert daemon.num_requests == 1
+    finally:
+        client.close()
+        conn.close()
+        os.close(err_r)
+        os.close(err_w)
+
+
+def daemon_server_socket_test(tmpdir):
+    sock_path = str(tmpdir.join("vamos.sock"))
+    # a regular file is never removed
+    with open(sock_path, "w") as fh:
+        fh.write("data")
+    daemon = VamosDaemon(None, sock_path)
+    assert daemon._open_socket() is None
+    assert os.path.isfile(sock_path)
+    os.remove(sock_path)
+    # the socket is only accessible by the user
+    sock = daemon._open_socket()
+    assert stat.S_IMODE(os.stat(sock_path).st_mode) == 0o600
+    sock.listen()
+    try:
+        # a running daemon is not replaced
+        assert daemon._open_socket() is None
+        assert os.path.exists(sock_path)
+    finally:
+        sock.close()
+    # a stale socket is replaced
+    sock = daemon._open_socket()
+    assert sock is not None
+    daemon._close_socket(sock)
+    assert not os.path.exists(sock_path)
+    # closing twice does not fail
+    daemon._close_socket(sock)
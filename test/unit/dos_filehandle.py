@@ -0,0 +1,51 @@
+import io
+from amitools.vamos.machine import MockMemory
+from amitools.vamos.lib.dos.FileHandle import FileHandle, XFER_CHUNK_SIZE
+
+
+def _create_fh(data=b""):
+    obj = io.BufferedRandom(io.BytesIO(data))
+    return FileHandle(obj, "ram:foo", "/tmp/foo", need_close=False)
+
+
+def _pattern(size):
+    return bytes(i & 0xFF for i in range(size))
+
+
+def dos_filehandle_read_mem_test():
+    size = XFER_CHUNK_SIZE * 2 + 100
+    data = _pattern(size)
+    mem = MockMemory(size_kib=256)
+    fh = _create_fh(data)
+    assert fh.read_mem(mem, 0x100, size) == size
+    assert mem.r_block(0x100, size) == data
+    # at EOF
+    assert fh.read_mem(mem, 0x100, 10) == 0
+
+
+def dos_filehandle_read_mem_short_test():
+    data = _pattern(1000)
+    mem = MockMemory(size_kib=256)
+    fh = _create_fh(data)
+    # request more than available
+    assert fh.read_mem(mem, 0x100, XFER_CHUNK_SIZE * 3) == 1000
+    assert mem.r_block(0x100, 1000) == data
+    assert mem.r8(0x100 + 1000) == 0
+
+
+def dos_filehandle_write_mem_test():
+    size = XFER_CHUNK_SIZE + 17
+    data = _pattern(size)
+    mem = MockMemory(size_kib=256)
+    mem.w_block(0x200, data)
+    fh = _create_fh()
+    assert fh.write_mem(mem, 0x200, size) == size
+    fh.obj.seek(0)
+    assert fh.obj.read() == data
+
+
+def dos_filehandle_read_mem_error_test():
+    mem = MockMemory(size_kib=16)
+    obj = io.BufferedWriter(io.BytesIO())
+    fh = FileHandle(obj, "ram:foo", "/tmp/foo", need_close=False)
+    assert fh.read_mem(mem, 0x100, 10) == -1
@@ -0,0 +1,49 @@
+from amitools.fs.blkdev.ADFBlockDevice import ADFBlockDevice
+from amitools.fs.ADFSVolume import ADFSVolume
+
+
+def _open_volume(path):
+    blkdev = ADFBlockDevice(path, read_only=True)
+    blkdev.open()
+    vol = ADFSVolume(blkdev)
+    vol.open()
+    return vol
+
+
+def _ref_used_blocks(bitmap):
+    blkdev = bitmap.blkdev
+    return [
+        blk
+        for blk in range(blkdev.reserved, blkdev.num_blocks)
+        if not bitmap.get_bit(blk)
+    ]
+
+
+def fs_bitmap_num_free_test():
+    for name in ("boot-dd-ffs.adf", "boot-dd-ofs.adf"):
+        vol = _open_volume("disks/" + name)
+        bitmap = vol.bitmap
+        used = _ref_used_blocks(bitmap)
+        assert bitmap.get_num_used() == len(used)
+        assert bitmap.get_num_free() == bitmap.bitmap_bits - len(used)
+
+
+def fs_bitmap_used_ranges_test():
+    for name in ("boot-dd-ffs.adf", "empty-dd-ofs.adf"):
+        vol = _open_volume("disks/" + name)
+        bitmap = vol.bitmap
+        used = []
+        for first, end in bitmap.get_used_ranges():
+            assert first < end
+            used += list(range(first, end))
+        assert used == _ref_used_blocks(bitmap)
+        # modify bitmap
+        bitmap.bitmap_data = bytearray(bitmap.bitmap_data)
+        bitmap.clr_bit(2)
+        bitmap.clr_bit(1000)
+        bitmap.set_bit(vol.root.blk_num)
+        ranges = bitmap.get_used_ranges()
+        assert ranges[0] == (2, 3)
+        assert (vol.root.blk_num, vol.root.blk_num + 1) not in ranges
+        used = [b for first, end in ranges for b in range(first, end)]
+        assert used == _ref_used_blocks(bitmap)
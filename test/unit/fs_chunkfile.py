@@ -0,0 +1,116 @@
+import os
+import io
+import pytest
+from amitools.fs.blkdev.ChunkFile import ChunkFile
+from amitools.fs.blkdev.BlkDevFactory import BlkDevFactory
+
+CHUNK = 4096
+
+
+def _make_image(size):
+    data = bytearray(size)
+    for off in range(0, size, 3 * CHUNK):
+        data[off : off + 100] = bytes(range(100))
+    return data
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+def fs_chunkfile_create_from_test(tmpdir, codec):
+    path = str(tmpdir / "img.hdc")
+    data = _make_image(10 * CHUNK + 512)
+    cf = ChunkFile.create_from(
+        path, "hdf", io.BytesIO(data), codec=codec, chunk_size=CHUNK
+    )
+    assert cf.size == len(data)
+    assert cf.img_type == "hdf"
+    assert cf.read() == data
+    cf.seek(CHUNK - 10)
+    assert cf.read(20) == data[CHUNK - 10 : CHUNK + 10]
+    # zero chunks are not stored
+    assert cf.get_data_ranges()[:2] == [(0, CHUNK), (3 * CHUNK, 4 * CHUNK)]
+    cf.close()
+    assert ChunkFile.get_image_type(path) == "hdf"
+    # back to raw
+    out = io.BytesIO()
+    cf = ChunkFile(path, True)
+    assert cf.write_raw(out) == len(data)
+    assert out.getvalue() == data
+
+
+def fs_chunkfile_write_test(tmpdir):
+    path = str(tmpdir / "img.hdc")
+    cf = ChunkFile.create(path, "hdf", 8 * CHUNK, chunk_size=CHUNK)
+    assert cf.read() == bytes(8 * CHUNK)
+    cf.seek(CHUNK - 2)
+    cf.write(b"abcd")
+    cf.seek(5 * CHUNK)
+    cf.write(b"x" * CHUNK)
+    cf.close()
+    cf = ChunkFile(path)
+    cf.seek(CHUNK - 2)
+    assert cf.read(4) == b"abcd"
+    cf.seek(5 * CHUNK)
+    assert cf.read(CHUNK) == b"x" * CHUNK
+    # overwrite with zeros drops the chunk
+    cf.seek(5 * CHUNK)
+    cf.write(bytes(CHUNK))
+    cf.flush()
+    assert cf.get_data_ranges() == [(0, 2 * CHUNK)]
+    cf.close()
+
+
+def fs_chunkfile_lru_test(tmpdir, monkeypatch):
+    monkeypatch.setattr(ChunkFile, "CACHE_CHUNKS", 2)
+    path = str(tmpdir / "img.hdc")
+    cf = ChunkFile.create(path, "hdf", 8 * CHUNK, chunk_size=CHUNK)
+    # dirty chunks are stored when dropped from the cache
+    for num in range(8):
+        cf.seek(num * CHUNK)
+        cf.write(bytes([num + 1]) * 10)
+    assert len(cf.cache) == 2
+    cf.close()
+    cf = ChunkFile(path, True)
+    for num in range(8):
+        cf.seek(num * CHUNK)
+        assert cf.read(11) == bytes([num + 1]) * 10 + b"\0"
+    cf.close()
+
+
+def fs_chunkfile_truncate_test(tmpdir):
+    path = str(tmpdir / "img.hdc")
+    cf = ChunkFile.create(path, "adf", chunk_size=CHUNK)
+    cf.write(b"y" * (CHUNK + 100))
+    assert cf.size == CHUNK + 100
+    cf.truncate(3 * CHUNK)
+    cf.truncate(CHUNK + 50)
+    cf.close()
+    cf = ChunkFile(path, True)
+    assert cf.read() == b"y" * (CHUNK + 50)
+    cf.close()
+
+
+def fs_chunkfile_factory_test(tmpdir):
+    f = BlkDevFactory()
+    raw = str(tmpdir / "disk.hdf")
+    blkdev = f.create(raw, options={"size": "1M"})
+    blkdev.write_block(7, b"z" * 512)
+    blkdev.close()
+    packed = str(tmpdir / "disk.hdc")
+    size = f.convert(raw, packed, {"codec": "lzma", "chunk": "16Ki"})
+    assert size == os.path.getsize(raw)
+    blkdev = f.open(packed)
+    assert blkdev.read_block(7) == b"z" * 512
+    assert blkdev.get_data_ranges() == [(0, 32)]
+    blkdev.write_block(1000, b"w" * 512)
+    blkdev.close()
+    # gzip and back
+    gz = str(tmpdir / "disk.hdz")
+    f.convert(packed, gz)
+    blkdev = f.open(gz, read_only=True)
+    assert blkdev.read_block(1000) == b"w" * 512
+    blkdev.close()
+    raw2 = str(tmpdir / "disk2.hdf")
+    f.convert(gz, raw2)
+    with open(raw2, "rb") as fh:
+        fh.seek(7 * 512)
+        assert fh.read(512) == b"z" * 512
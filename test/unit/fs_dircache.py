@@ -0,0 +1,101 @@
+from amitools.fs.blkdev.BlkDevFactory import BlkDevFactory
+from amitools.fs.ADFSVolume import ADFSVolume
+from amitools.fs.FSString import FSString
+from amitools.fs import DosType
+from amitools.scan.FileScanner import FileScanner
+from amitools.scan.ADFSScanner import ADFSScanner
+
+NUM_FILES = 60
+
+
+def _create_image(path):
+    blkdev = BlkDevFactory().create(path)
+    vol = ADFSVolume(blkdev)
+    vol.create(FSString("Foo"), dos_type=DosType.DOS5)
+    root = vol.get_root_dir()
+    big = root.create_dir(FSString("big"))
+    for i in range(NUM_FILES):
+        big.create_file(FSString("file%02d.txt" % i), b"x" * i)
+    sub = big.create_dir(FSString("sub"))
+    sub.create_file(FSString("data.bin"), bytes(3000))
+    vol.close()
+    blkdev.close()
+
+
+def _open_volume(path):
+    blkdev = BlkDevFactory().open(path, read_only=True)
+    vol = ADFSVolume(blkdev)
+    vol.open()
+    # count block reads
+    reads = []
+    read_block = blkdev.read_block
+
+    def counting_read_block(blk_num):
+        reads.append(blk_num)
+        return read_block(blk_num)
+
+    blkdev.read_block = counting_read_block
+    return vol, reads
+
+
+def fs_dircache_records_test(tmpdir):
+    path = str(tmpdir / "dc.adf")
+    _create_image(path)
+    vol, reads = _open_volume(path)
+    big = vol.get_path_name(FSString("big"))
+    del reads[:]
+    records = big.get_dircache_records()
+    # only a few dircache blocks were read
+    assert 0 < len(reads) < 10
+    assert len(records) == NUM_FILES + 1
+    recs = {r.name.get_unicode(): r for r in records}
+    assert recs["sub"].is_dir()
+    for i in range(NUM_FILES):
+        r = recs["file%02d.txt" % i]
+        assert r.is_file()
+        assert r.size == i
+    # header read on demand
+    node = big.get_dircache_node(recs["file07.txt"])
+    assert node.is_file()
+    assert node.get_file_data() == b"x" * 7
+    # fast listing is the same as listing the nodes
+    usage = big.get_block_usage(all=True)
+    file_bytes = big.get_file_bytes(all=True)
+    big.get_entries()
+    assert big.get_block_usage(all=True) == usage
+    assert big.get_file_bytes(all=True) == file_bytes
+    vol.close()
+
+
+def fs_dircache_list_test(tmpdir, capsys):
+    path = str(tmpdir / "dc.adf")
+    _create_image(path)
+    vol, reads = _open_volume(path)
+    vol.get_root_dir().list(all=True)
+    fast = capsys.readouterr().out
+    num_reads = len(reads)
+    # read all headers
+    vol.get_root_dir().flush()
+    root = vol.get_root_dir()
+    for e in root.get_entries():
+        if e.is_dir():
+            e.get_entries()
+    del reads[:]
+    root.list(all=True)
+    assert capsys.readouterr().out == fast
+    assert num_reads < NUM_FILES // 2
+    vol.close()
+
+
+def fs_dircache_scanner_test(tmpdir):
+    path = str(tmpdir / "dc.adf")
+    _create_image(path)
+    found = []
+
+    def handler(scan_file):
+        found.append(scan_file.get_local_path())
+        return True
+
+    scanner = FileScanner(handler, ignore_filters=["*.txt"], scanners=[ADFSScanner()])
+    assert scanner.scan(path)
+    assert found == ["big/sub/data.bin"]
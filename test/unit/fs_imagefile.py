@@ -0,0 +1,72 @@
+import os
+import gzip
+from amitools.fs.blkdev.ImageFile import ImageFile
+from amitools.fs.blkdev.BlockDevice import BlockDevice
+
+
+def _supports_holes(path, size):
+    if not hasattr(os, "SEEK_DATA"):
+        return False
+    with open(path, "rb") as fh:
+        try:
+            return os.lseek(fh.fileno(), 0, os.SEEK_HOLE) < size
+        except OSError:
+            return False
+
+
+def fs_imagefile_data_ranges_test(tmpdir):
+    path = str(tmpdir / "sparse.img")
+    size = 64 * 1024 * 1024
+    with open(path, "wb") as fh:
+        fh.truncate(size)
+        fh.seek(10 * 1024 * 1024)
+        fh.write(b"data" * 100)
+    img = ImageFile(path, read_only=True)
+    img.open()
+    img.read_blk(1)
+    ranges = img.get_data_ranges()
+    blk_ranges = img.get_data_blk_ranges()
+    # file position is kept
+    assert img.fobj.tell() == 1024
+    img.close()
+    if not _supports_holes(path, size):
+        assert ranges == [(0, size)]
+        return
+    assert len(ranges) == 1
+    start, end = ranges[0]
+    assert start <= 10 * 1024 * 1024 < 10 * 1024 * 1024 + 400 <= end
+    assert blk_ranges == [(start // 512, (end + 511) // 512)]
+
+
+def fs_imagefile_data_ranges_empty_test(tmpdir):
+    path = str(tmpdir / "empty.img")
+    size = 1024 * 1024
+    with open(path, "wb") as fh:
+        fh.truncate(size)
+    img = ImageFile(path, read_only=True)
+    img.open()
+    ranges = img.get_data_ranges()
+    img.close()
+    if _supports_holes(path, size):
+        assert ranges == []
+    else:
+        assert ranges == [(0, size)]
+
+
+def fs_imagefile_blkdev_default_ranges_test():
+    blkdev = BlockDevice()
+    blkdev._set_geometry()
+    assert blkdev.get_data_ranges() == [(0, 1760)]
+
+
+def fs_imagefile_data_ranges_gzip_test(tmpdir):
+    path = str(tmpdir / "packed.img.gz")
+    size = 1024 * 1024
+    with gzip.open(path, "wb") as fh:
+        fh.write(bytes(size))
+    # the packed file is small but all of the image is data
+    img = ImageFile(path, read_only=True, fobj=gzip.open(path, "rb"))
+    img.open()
+    ranges = img.get_data_ranges()
+    img.close()
+    assert ranges == [(0, size)]
@@ -0,0 +1,14 @@
+from amitools.fs.MetaDB import MetaDB
+
+
+def fs_metadb_host_infos_test(tmpdir):
+    path = str(tmpdir / "tree.xdfsync")
+    db = MetaDB()
+    db.set_host_info("a.txt", 5, 1234567890123456789, "abcd")
+    db.set_host_info("dir/b c", 0, 42)
+    db.save_host_infos(path)
+    db2 = MetaDB()
+    db2.load_host_infos(path)
+    assert db2.get_host_info("a.txt") == (5, 1234567890123456789, "abcd")
+    assert db2.get_host_info("dir/b c") == (0, 42, None)
+    assert db2.get_host_info("foo") is None
@@ -0,0 +1,103 @@
+import pytest
+from amitools.fs.blkdev.RawBlockDevice import RawBlockDevice
+from amitools.fs.blkdev.OverlayBlockDevice import OverlayBlockDevice
+from amitools.fs.blkdev.BlkDevFactory import BlkDevFactory
+
+
+def _create_base(tmpdir, num_blocks=64):
+    path = str(tmpdir / "base.img")
+    with open(path, "wb") as fh:
+        for i in range(num_blocks):
+            fh.write(bytes([i]) * 512)
+    return path
+
+
+def _open_overlay(base, delta, read_only=False):
+    raw = RawBlockDevice(base, read_only=True)
+    raw.open()
+    ovl = OverlayBlockDevice(raw, delta, read_only, base)
+    ovl.open()
+    return ovl
+
+
+def fs_overlay_read_write_test(tmpdir):
+    base = _create_base(tmpdir)
+    delta = str(tmpdir / "delta.ovl")
+    ovl = _open_overlay(base, delta)
+    assert ovl.num_blocks == 64
+    assert ovl.read_block(3) == bytes([3]) * 512
+    ovl.write_block(3, b"a" * 512)
+    ovl.write_blocks(10, b"b" * 1024)
+    ovl.write_block(3, b"c" * 512)
+    assert ovl.read_block(3) == b"c" * 512
+    data = ovl.read_blocks(9, 3)
+    assert data == bytes([9]) * 512 + b"b" * 1024
+    assert ovl.get_delta_blocks() == [3, 10, 11]
+    ovl.close()
+    # base is untouched
+    with open(base, "rb") as fh:
+        assert fh.read(4 * 512)[3 * 512 :] == bytes([3]) * 512
+    # index is restored on open
+    ovl = _open_overlay(base, delta, read_only=True)
+    assert ovl.base_file == base
+    assert ovl.get_delta_blocks() == [3, 10, 11]
+    assert ovl.read_block(11) == b"b" * 512
+    with pytest.raises(IOError):
+        ovl.write_block(0, bytes(512))
+    ovl.close()
+
+
+def fs_overlay_partial_record_test(tmpdir):
+    base = _create_base(tmpdir)
+    delta = str(tmpdir / "delta.ovl")
+    ovl = _open_overlay(base, delta)
+    ovl.write_block(1, b"x" * 512)
+    ovl.close()
+    # an interrupted write leaves a partial record
+    with open(delta, "ab") as fh:
+        fh.write(b"\0" * 100)
+    ovl = _open_overlay(base, delta)
+    assert ovl.get_delta_blocks() == [1]
+    ovl.write_block(2, b"y" * 512)
+    ovl.close()
+    ovl = _open_overlay(base, delta)
+    assert ovl.read_blocks(1, 2) == b"x" * 512 + b"y" * 512
+    ovl.close()
+
+
+def fs_overlay_commit_discard_test(tmpdir):
+    base = _create_base(tmpdir)
+    delta = str(tmpdir / "delta.ovl")
+    ovl = _open_overlay(base, delta)
+    ovl.write_block(5, b"d" * 512)
+    assert ovl.discard() == 1
+    assert ovl.read_block(5) == bytes([5]) * 512
+    ovl.write_block(6, b"e" * 512)
+    assert BlkDevFactory().commit_overlay(ovl) == 1
+    assert ovl.get_num_delta_blocks() == 0
+    assert ovl.read_block(6) == b"e" * 512
+    ovl.close()
+    with open(base, "rb") as fh:
+        fh.seek(6 * 512)
+        assert fh.read(512) == b"e" * 512
+
+
+def fs_overlay_factory_test(tmpdir):
+    f = BlkDevFactory()
+    base = str(tmpdir / "disk.hdf")
+    blkdev = f.create(base, options={"size": "1M"})
+    blkdev.write_block(7, b"z" * 512)
+    blkdev.close()
+    delta = str(tmpdir / "job.ovl")
+    assert f.parse_overlay("overlay:" + delta) == (delta, None)
+    with pytest.raises(IOError):
+        f.open("overlay:" + delta)
+    ovl = f.open("overlay:%s?base=%s" % (delta, base))
+    assert ovl.get_geometry().get_num_blocks() == ovl.num_blocks
+    assert ovl.read_block(7) == b"z" * 512
+    ovl.write_block(7, bytes(512))
+    ovl.close()
+    # base is taken from the delta file
+    ovl = f.open("overlay:" + delta, read_only=True)
+    assert ovl.read_block(7) == bytes(512)
+    ovl.close()
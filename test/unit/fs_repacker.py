@@ -0,0 +1,155 @@
+import pytest
+from amitools.fs.blkdev.BlkDevFactory import BlkDevFactory
+from amitools.fs.ADFSVolume import ADFSVolume
+from amitools.fs.FSString import FSString
+from amitools.fs.MetaInfo import MetaInfo
+from amitools.fs.TimeStamp import TimeStamp
+from amitools.fs.Repacker import Repacker
+from amitools.fs.block.FileHeaderBlock import FileHeaderBlock
+from amitools.fs.validate.Validator import Validator
+from amitools.fs import DosType
+
+DOS_TYPES = (DosType.DOS0, DosType.DOS1, DosType.DOS5, DosType.DOS7)
+MOD_TS = TimeStamp(12000, 600, 50)
+LONG_NAME = "a_file_with_a_really_long_name_%d"
+
+
+def _create_image(path, dos_type):
+    blkdev = BlkDevFactory().create(path)
+    vol = ADFSVolume(blkdev)
+    vol.create(FSString("Foo"), dos_type=dos_type)
+    root = vol.get_root_dir()
+    root.create_file(FSString("hello"), b"hello, world!")
+    # needs file list blocks
+    root.create_file(FSString("big"), bytes(x % 251 for x in range(60 * 1024)))
+    sub = root.create_dir(FSString("sub"), MetaInfo(0, MOD_TS, FSString("a dir")))
+    for i in range(20):
+        sub.create_file(FSString("file%02d" % i), b"x" * i * 100)
+    sub.create_dir(FSString("empty"))
+    # a comment block on long name volumes
+    if vol.is_longname:
+        name = FSString(LONG_NAME % 1)
+        sub.create_file(name, b"long", MetaInfo(0, MOD_TS, FSString("c" * 79)))
+    # leave a hole
+    vol.delete(FSString("sub/file03"))
+    vol.close()
+    blkdev.close()
+
+
+def _get_tree(node):
+    result = []
+    for e in node.get_entries():
+        mi = e.get_meta_info()
+        name = e.get_file_name().get_name().get_unicode()
+        info = (
+            name,
+            mi.get_protect(),
+            mi.get_mod_time_str(),
+            mi.get_comment_unicode_str(),
+        )
+        if e.is_dir():
+            result.append((info, _get_tree(e)))
+        else:
+            result.append((info, bytes(e.get_file_data())))
+    return sorted(result)
+
+
+def _repack(tmpdir, dos_type, fast):
+    in_path = str(tmpdir / "in.adf")
+    out_path = str(tmpdir / "out.adf")
+    _create_image(in_path, dos_type)
+    rp = Repacker(in_path)
+    assert rp.create_in()
+    rp.create_out_blkdev(out_path)
+    rp.create_out_volume()
+    copied = rp.repack(fast)
+    rp.out_volume.close()
+    rp.out_blkdev.close()
+    return rp, copied, out_path
+
+
+def _validate(blkdev, dos_type):
+    v = Validator(blkdev, min_level=2)
+    v.scan_boot()
+    v.scan_root()
+    v.scan_dir_tree()
+    v.scan_files()
+    # the validator does not know dircache blocks in the bitmap
+    if not DosType.is_dircache(dos_type):
+        v.scan_bitmap()
+    v.scan_blocks()
+    return v.get_summary()
+
+
+def _check(rp, out_path):
+    blkdev = BlkDevFactory().open(out_path, read_only=True)
+    assert _validate(blkdev, rp.in_volume.get_dos_type()) == (0, 0)
+    vol = ADFSVolume(blkdev)
+    vol.open()
+    assert _get_tree(vol.get_root_dir()) == _get_tree(rp.in_volume.get_root_dir())
+    used = vol.get_used_blocks()
+    blkdev.close()
+    return used
+
+
+@pytest.mark.parametrize("dos_type", DOS_TYPES, ids=DosType.get_dos_type_str)
+def fs_repacker_blocks_test(tmpdir, dos_type):
+    rp, copied, out_path = _repack(tmpdir, dos_type, True)
+    assert copied
+    assert rp.num_blks > 0
+    used = _check(rp, out_path)
+    # same blocks without the dircache of the file level repack
+    assert used == rp.in_volume.get_used_blocks()
+
+
+@pytest.mark.parametrize("dos_type", DOS_TYPES, ids=DosType.get_dos_type_str)
+def fs_repacker_files_test(tmpdir, dos_type):
+    rp, copied, out_path = _repack(tmpdir, dos_type, False)
+    assert not copied
+    _check(rp, out_path)
+
+
+def fs_repacker_fallback_test(tmpdir):
+    in_path = str(tmpdir / "in.adf")
+    out_path = str(tmpdir / "out.adf")
+    _create_image(in_path, DosType.DOS0)
+    rp = Repacker(in_path)
+    assert rp.create_in()
+    # a different dos type needs a file level repack
+    blkdev = rp.create_out_blkdev(out_path)
+    vol = ADFSVolume(blkdev)
+    vol.create(FSString("Foo"), dos_type=DosType.DOS3)
+    rp.out_volume = vol
+    assert not rp.can_repack_blocks()
+    assert not rp.repack()
+    vol.close()
+    blkdev.close()
+    _check(rp, out_path)
+
+
+@pytest.mark.parametrize("dos_type", DOS_TYPES, ids=DosType.get_dos_type_str)
+def fs_repacker_unknown_block_test(tmpdir, dos_type):
+    in_path = str(tmpdir / "in.adf")
+    out_path = str(tmpdir / "out.adf")
+    _create_image(in_path, dos_type)
+    # let the parent of a file point to a free block
+    blkdev = BlkDevFactory().open(in_path)
+    vol = ADFSVolume(blkdev)
+    vol.open()
+    node = vol.get_path_name(FSString("hello"))
+    fhb = FileHeaderBlock(blkdev, node.block.blk_num, vol.is_longname)
+    fhb.read()
+    fhb.parent = vol.bitmap.find_free()
+    fhb.write()
+    vol.close()
+    blkdev.close()
+    # the blocks can't be remapped: fall back to a file level repack
+    rp = Repacker(in_path)
+    assert rp.create_in()
+    rp.create_out_blkdev(out_path)
+    rp.create_out_volume()
+    assert rp.get_repack_blocks() is not None
+    assert not rp.repack()
+    rp.out_volume.close()
+    rp.out_blkdev.close()
+    _check(rp, out_path)
@@ -0,0 +1,97 @@
+from amitools.fs.blkdev.RawBlockDevice import RawBlockDevice
+from amitools.fs.blkdev.StatsBlockDevice import StatsBlockDevice
+from amitools.fs.blkdev.BlkDevFactory import BlkDevFactory
+from amitools.fs.ADFSVolume import ADFSVolume
+from amitools.fs.FSString import FSString
+
+
+def _open_raw(tmpdir, num_blocks=64):
+    path = str(tmpdir / "raw.img")
+    with open(path, "wb") as fh:
+        for i in range(num_blocks):
+            fh.write(bytes([i]) * 512)
+    raw = RawBlockDevice(path)
+    raw.open()
+    return raw
+
+
+def fs_statsblkdev_counts_test(tmpdir):
+    blkdev = StatsBlockDevice(_open_raw(tmpdir))
+    assert blkdev.num_blocks == 64
+    assert blkdev.block_bytes == 512
+    assert blkdev.read_block(3) == bytes([3]) * 512
+    assert blkdev.read_blocks(4, 2) == bytes([4]) * 512 + bytes([5]) * 512
+    assert blkdev.read_block(6, num_blks=2) == bytes([6]) * 512 + bytes([7]) * 512
+    blkdev.write_block(20, b"a" * 512)
+    blkdev.write_blocks(21, b"b" * 1024)
+    blkdev.read_block(10)
+    blkdev.flush()
+    s = blkdev.get_stats()
+    assert s["reads"] == 4
+    assert s["read_blocks"] == 6
+    assert s["read_bytes"] == 6 * 512
+    assert s["read_seq"] == 2
+    assert s["writes"] == 2
+    assert s["write_blocks"] == 3
+    assert s["write_bytes"] == 3 * 512
+    assert s["write_seq"] == 1
+    assert s["flushes"] == 1
+    assert s["seeks"] == 3
+    assert s["seq_ratio"] == 0.5
+    hist = blkdev.get_latency_histogram()
+    assert sum(r for _, r, _ in hist) == 4
+    assert sum(w for _, _, w in hist) == 2
+    # no heatmap by default
+    assert blkdev.get_heatmap() is None
+    blkdev.reset_stats()
+    assert blkdev.get_stats()["reads"] == 0
+    assert blkdev.get_latency_histogram() == []
+    blkdev.close()
+    # data was written to the raw device
+    with open(str(tmpdir / "raw.img"), "rb") as fh:
+        fh.seek(20 * 512)
+        assert fh.read(3 * 512) == b"a" * 512 + b"b" * 1024
+
+
+def fs_statsblkdev_heatmap_test(tmpdir):
+    blkdev = StatsBlockDevice(_open_raw(tmpdir), heatmap=True)
+    blkdev.read_blocks(0, 4)
+    blkdev.read_block(0)
+    blkdev.write_block(63, b"x" * 512)
+    assert blkdev.get_heatmap(4) == [
+        (0, 16, 5, 0),
+        (16, 32, 0, 0),
+        (32, 48, 0, 0),
+        (48, 64, 0, 1),
+    ]
+    lines = []
+    blkdev.dump_stats(write=lines.append, num_regions=4)
+    assert lines[0].startswith("I/O stats:")
+    assert "heatmap:" in [l.split()[0] for l in lines]
+    assert lines[-1].endswith("#" * 6)
+    blkdev.close()
+
+
+def fs_statsblkdev_volume_test(tmpdir):
+    path = str(tmpdir / "disk.adf")
+    f = BlkDevFactory()
+    blkdev = StatsBlockDevice(f.create(path))
+    # geometry is taken from the wrapped device
+    assert blkdev.get_chs_str() == "chs=80,2,11"
+    vol = ADFSVolume(blkdev)
+    vol.create(FSString("Foo"))
+    vol.get_root_dir().create_file(FSString("bar"), b"hello" * 1000)
+    vol.close()
+    blkdev.close()
+    s = blkdev.get_stats()
+    assert s["writes"] > 0
+    blkdev = StatsBlockDevice(f.open(path, read_only=True))
+    vol = ADFSVolume(blkdev)
+    vol.open()
+    data = vol.read_file(FSString("bar"))
+    assert data == b"hello" * 1000
+    vol.close()
+    blkdev.close()
+    s = blkdev.get_stats()
+    assert s["read_bytes"] >= 5000
+    assert s["writes"] == 0
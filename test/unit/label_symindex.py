@@ -0,0 +1,84 @@
+from amitools.binfmt.BinImage import (
+    Segment,
+    SymbolTable,
+    Symbol,
+    DebugLine,
+    DebugLineFile,
+    DebugLineEntry,
+    SEGMENT_TYPE_CODE,
+)
+from amitools.vamos.label import SymbolIndex
+
+
+def _create_bin_seg():
+    seg = Segment(SEGMENT_TYPE_CODE, 0x100, bytes(0x100))
+    symtab = SymbolTable()
+    symtab.add_symbol(Symbol(0x10, b"main"))
+    symtab.add_symbol(Symbol(0x80, b"helper"))
+    seg.set_symtab(symtab)
+    debug_line = DebugLine()
+    df = DebugLineFile("main.c")
+    df.add_entry(DebugLineEntry(0x10, 3))
+    df.add_entry(DebugLineEntry(0x20, 4))
+    debug_line.add_file(df)
+    seg.set_debug_line(debug_line)
+    return seg
+
+
+def label_symindex_find_segment_test():
+    idx = SymbolIndex()
+    idx.add_seglist(0x100, "foo", [0x1000, 0x3000], [0x100, 0x20])
+    idx.add_seglist(0x200, "bar", [0x2000], [0x40])
+    assert idx.get_num_seglists() == 2
+    assert [s.addr for s in idx.get_segments()] == [0x1000, 0x2000, 0x3000]
+    assert idx.find_segment(0xFFF) is None
+    seg = idx.find_segment(0x1000)
+    assert seg.name == "foo"
+    assert seg.seg_num == 0
+    assert idx.find_segment(0x10FF) is seg
+    assert idx.find_segment(0x1100) is None
+    assert idx.find_segment(0x2010).name == "bar"
+    seg = idx.find_segment(0x301F)
+    assert (seg.name, seg.seg_num) == ("foo", 1)
+    # no bin segments: no symbols
+    info = idx.lookup(0x1010)
+    assert info.offset == 0x10
+    assert info.symbol is None
+    assert str(info) == "foo_0+000010"
+    # remove
+    assert idx.remove_seglist(0x100)
+    assert not idx.remove_seglist(0x100)
+    assert idx.find_segment(0x1000) is None
+    assert idx.find_segment(0x3000) is None
+    assert idx.find_segment(0x2000).name == "bar"
+    idx.clear()
+    assert idx.get_segments() == []
+
+
+def label_symindex_lookup_test():
+    idx = SymbolIndex()
+    bin_seg = _create_bin_seg()
+    idx.add_seglist(0x100, "prog", [0x1000], [0x100], [bin_seg])
+    assert idx.lookup(0x2000) is None
+    # exact matches
+    assert idx.find_symbol(0x1010) == b"main"
+    assert idx.find_symbol(0x1012) is None
+    assert idx.find_debug_line(0x1020).get_src_line() == 4
+    assert idx.find_debug_line(0x1022) is None
+    # nearest symbol and line
+    info = idx.lookup(0x1024)
+    assert info.get_symbol_name() == "main"
+    assert info.sym_delta == 0x14
+    assert info.get_src() == ("main.c", 4)
+    assert str(info) == "prog_0+000024 main+20 [main.c:4]"
+    info = idx.lookup(0x1084)
+    assert info.get_symbol_name() == "helper"
+    assert info.sym_delta == 4
+    # before first symbol
+    info = idx.lookup(0x1004)
+    assert info.symbol is None
+    assert info.get_src() is None
+    # reload at same baddr replaces the old segments
+    idx.add_seglist(0x100, "prog", [0x4000], [0x100], [bin_seg])
+    assert idx.lookup(0x1010) is None
+    assert idx.lookup(0x4010).get_symbol_name() == "main"
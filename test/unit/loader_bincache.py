@@ -0,0 +1,104 @@
+import os
+import stat
+from amitools.vamos.loader import BinImageCache, SegmentLoader
+
+BIN_FILE = os.path.join(os.path.dirname(__file__), "..", "bin", "test_hello_gcc")
+
+
+def _check_same_img(a, b):
+    assert str(a) == str(b)
+    for sa, sb in zip(a.get_segments(), b.get_segments()):
+        assert sa.data == sb.data
+        for ta, tb in zip(sa.get_reloc_to_segs(), sb.get_reloc_to_segs()):
+            ra = [(r.offset, r.type) for r in sa.get_reloc(ta).get_relocs()]
+            rb = [(r.offset, r.type) for r in sb.get_reloc(tb).get_relocs()]
+            assert ra == rb
+
+
+def loader_bincache_mem_test(buildlibnix):
+    lib_file = buildlibnix.make_lib("testnix")
+    cache = BinImageCache()
+    entry = cache.load(lib_file)
+    assert entry
+    assert cache.get_stats() == (0, 0, 1)
+    assert cache.load(lib_file) is entry
+    assert cache.get_stats() == (1, 0, 1)
+    # no mem cache
+    cache = BinImageCache(max_entries=0)
+    assert cache.load(lib_file) is not cache.load(lib_file)
+    assert cache.get_stats() == (0, 0, 2)
+
+
+def loader_bincache_invalid_test(tmpdir):
+    cache = BinImageCache()
+    assert cache.load(str(tmpdir.join("missing"))) is None
+    no_bin = str(tmpdir.join("no_bin"))
+    with open(no_bin, "wb") as fh:
+        fh.write(b"hello, world!")
+    assert cache.load(no_bin) is None
+
+
+def loader_bincache_disk_test(buildlibnix, tmpdir):
+    lib_file = buildlibnix.make_lib("testnix")
+    cache_dir = str(tmpdir.join("cache"))
+    cache = BinImageCache(cache_dir=cache_dir)
+    entry = cache.load(lib_file)
+    assert len(os.listdir(cache_dir)) == 1
+    # a fresh cache reads from disk
+    cache2 = BinImageCache(cache_dir=cache_dir)
+    entry2 = cache2.load(lib_file)
+    assert cache2.get_stats() == (0, 1, 0)
+    _check_same_img(entry.bin_img, entry2.bin_img)
+    assert entry.sizes == entry2.sizes
+    addrs = entry.relocator.get_seq_addrs(0x1000)
+    assert entry.relocator.relocate(addrs) == entry2.relocator.relocate(addrs)
+
+
+def loader_bincache_disk_evict_test(buildlibnix, tmpdir):
+    lib_file = buildlibnix.make_lib("testnix")
+    cache_dir = str(tmpdir.join("cache"))
+    # too small for any entry
+    cache = BinImageCache(cache_dir=cache_dir, max_disk_size=16)
+    assert cache.load(lib_file)
+    assert not os.path.exists(cache_dir) or os.listdir(cache_dir) == []
+
+
+def loader_bincache_segload_test(buildlibnix, mem_alloc):
+    mem, alloc = mem_alloc
+    lib_file = buildlibnix.make_lib("testnix")
+    cache = BinImageCache()
+    loader = SegmentLoader(alloc, bin_cache=cache)
+    info = loader.int_load_sys_seglist(lib_file)
+    info2 = loader.int_load_sys_seglist(lib_file)
+    assert info.bin_img is info2.bin_img
+    assert cache.get_stats() == (1, 0, 1)
+    info.seglist.free()
+    info2.seglist.free()
+    assert alloc.is_all_free()
+
+
+def loader_bincache_disk_dir_test(tmpdir):
+    cache_dir = str(tmpdir.join("cache"))
+    cache = BinImageCache(cache_dir=cache_dir)
+    assert cache.load(BIN_FILE)
+    # only the user may access the cache files
+    assert stat.S_IMODE(os.stat(cache_dir).st_mode) == 0o700
+    assert len(os.listdir(cache_dir)) == 1
+    # a dir writable by others is not used
+    os.chmod(cache_dir, 0o777)
+    cache = BinImageCache(cache_dir=cache_dir)
+    assert cache.load(BIN_FILE)
+    assert cache.get_stats() == (0, 0, 1)
+
+
+def loader_bincache_disk_write_error_test(tmpdir, monkeypatch):
+    cache_dir = str(tmpdir.join("cache"))
+    cache = BinImageCache(cache_dir=cache_dir)
+
+    def replace(src, dst):
+        raise OSError("no space left")
+
+    monkeypatch.setattr(os, "replace", replace)
+    assert cache.load(BIN_FILE)
+    # the temp file is removed again
+    assert os.listdir(cache_dir) == []
@@ -1,6 +1,7 @@
 from amitools.vamos.loader import SegmentLoader
 from amitools.vamos.machine import MockMemory
 from amitools.vamos.mem import MemoryAlloc
+from amitools.vamos.label import SymbolIndex
 
 
 def loader_segload_sys_int_test(buildlibnix, mem_alloc):
@@ -98,3 +99,29 @@ def loader_segload_unregister(mem_alloc):
     assert not loader.unload_seglist(baddr)
     assert loader.shutdown() == 0
     assert alloc.is_all_free()
+
+
+def loader_segload_sym_index_test():
+    mem = MockMemory(size_kib=64)
+    alloc = MemoryAlloc(mem, 0x800, 0x8000)
+    sym_index = SymbolIndex()
+    loader = SegmentLoader(alloc, sym_index=sym_index)
+    baddr = loader.load_sys_seglist("bin/dos_examine_agcc_dbg")
+    assert baddr > 0
+    info = loader.get_info(baddr)
+    code = info.bin_img.get_segments()[0]
+    addr = info.seglist.get_all_addrs()[0]
+    # symbol and source line at runtime address
+    sym = code.get_symtab().get_symbols()[1]
+    sym_addr = addr + sym.get_offset()
+    assert sym_index.find_symbol(sym_addr) == sym.get_name()
+    addr_info = sym_index.lookup(sym_addr + 2)
+    assert addr_info.segment.name == "dos_examine_agcc_dbg"
+    assert addr_info.symbol is sym
+    assert addr_info.sym_delta == 2
+    # unload removes seglist from index
+    assert loader.unload_seglist(baddr)
+    assert sym_index.lookup(sym_addr) is None
+    assert sym_index.get_num_seglists() == 0
+    assert loader.shutdown() == 0
+    assert alloc.is_all_free()
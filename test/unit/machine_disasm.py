@@ -89,3 +89,14 @@ def machine_disasm_create_test():
     disasm = DisAsm.create("68020")
     buf = b"\x60\xff\x11\x22\x33\x44"
     assert disasm.disassemble_raw(0, buf) == (6, "bra     $11223346; (2+)")
+
+
+def machine_disasm_iter_block_test():
+    disasm = DisAsm.create()
+    buf = b"\x4e\x75" + b"\x10\x1c" + b"\x48\xe7\x3f\x3e" + b"\x48\xe7"
+    lines = disasm.iter_block(memoryview(buf)[2:], 0x102)
+    assert next(lines) == (0x102, [0x101C], "move.b  (A4)+, D0")
+    assert list(lines) == [(0x104, [0x48E7, 0x3F3E], "movem.l D2-D7/A2-A6, -(A7)")]
+    # a large block gives the same result as line by line
+    buf = buf[:8] * 1000
+    assert list(disasm.iter_block(buf)) == disasm.disassemble_block(buf)
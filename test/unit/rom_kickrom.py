@@ -0,0 +1,105 @@
+import os
+import struct
+import random
+from amitools.rom import KickRomAccess, ResidentScan
+from amitools.util.HexDump import get_diff_line_offsets, print_hex_diff
+
+AROS_ROM = os.path.join(os.path.dirname(__file__), "..", "roms", "aros-20130502.rom")
+
+
+def _ref_check_sum(data, skip_off=None):
+    """the plain long by long checksum loop"""
+    chk_sum = 0
+    for off in range(0, len(data) // 4 * 4, 4):
+        if off != skip_off:
+            chk_sum += struct.unpack_from(">I", data, off)[0]
+        if chk_sum > 0xFFFFFFFF:
+            chk_sum = (chk_sum & 0xFFFFFFFF) + 1
+    return 0xFFFFFFFF - chk_sum
+
+
+def rom_kickrom_check_sum_test():
+    rnd = random.Random(42)
+    datas = [
+        bytes(64),
+        b"\xff" * 64,
+        b"\xff\xff\xff\xff" + bytes(60),
+        bytes(rnd.getrandbits(8) for _ in range(4099)),
+    ]
+    for data in datas:
+        kh = KickRomAccess(data)
+        assert kh.calc_check_sum() == _ref_check_sum(data)
+        for skip_off in (0, 4, 6, 40, len(data)):
+            assert kh.calc_check_sum(skip_off) == _ref_check_sum(data, skip_off)
+
+
+def rom_kickrom_write_check_sum_test():
+    rom = bytearray(512 * 1024)
+    rnd = random.Random(23)
+    rom[:4096] = bytes(rnd.getrandbits(8) for _ in range(4096))
+    kh = KickRomAccess(rom)
+    kh.write_footer()
+    kh.write_rom_size_field()
+    kh.write_header(0xF80002)
+    cs = kh.write_check_sum()
+    assert cs == _ref_check_sum(rom, len(rom) - 0x18)
+    assert kh.read_check_sum() == cs
+    assert kh.verify_check_sum()
+    assert kh.is_kick_rom()
+
+
+def rom_kickrom_aros_test():
+    if not os.path.exists(AROS_ROM):
+        return
+    with open(AROS_ROM, "rb") as fh:
+        data = fh.read()
+    kh = KickRomAccess(data)
+    assert kh.verify_check_sum()
+    assert kh.recalc_check_sum() == kh.read_check_sum()
+
+
+def rom_kickrom_diff_offsets_test():
+    a = bytes(10000)
+    b = bytearray(a)
+    for off in (0, 17, 4095, 4096, 9999):
+        b[off] = 1
+    assert get_diff_line_offsets(a, b) == [0, 16, 4080, 4096, 9984]
+    assert get_diff_line_offsets(a, b, num=8, block_size=100) == [
+        0,
+        16,
+        4088,
+        4096,
+        9992,
+    ]
+    assert get_diff_line_offsets(a, a) == []
+    # different sizes
+    assert get_diff_line_offsets(a[:40], a[:64]) == [32, 48]
+
+
+def rom_kickrom_print_hex_diff_test():
+    a = bytes(range(256)) * 4
+    b = bytearray(a)
+    b[300] = 0
+    lines = []
+    print_hex_diff(a, b, out=lines.append, base_addr=0xF80000)
+    assert len(lines) == 1
+    assert lines[0].startswith("00f80120: -- -- -- -- -- -- -- -- -- -- -- -- 2c --")
+    lines = []
+    print_hex_diff(a, b, out=lines.append, show_same=True)
+    assert len(lines) == 64
+
+
+def rom_kickrom_resident_pos_test():
+    base_addr = 0xF80000
+    rom = bytearray(0x20000)
+    # valid residents, a matchword with a wrong tag and one at the end
+    for off in (0x100, 0x1234, 0x10002):
+        struct.pack_into(">HI", rom, off, 0x4AFC, base_addr + off)
+    struct.pack_into(">HI", rom, 0x2000, 0x4AFC, base_addr)
+    struct.pack_into(">H", rom, len(rom) - 4, 0x4AFC)
+    rs = ResidentScan(bytes(rom), base_addr)
+    assert rs.get_all_matchwords() == [0x100, 0x1234, 0x2000, 0x10002, len(rom) - 4]
+    assert rs.get_all_resident_pos() == [0x100, 0x1234, 0x10002]
+    assert rs.guess_base_addr() == base_addr
+    assert rs.is_resident_at(0x1234)
+    assert not rs.is_resident_at(0x2000)
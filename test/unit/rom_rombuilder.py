@@ -0,0 +1,81 @@
+import struct
+import random
+from amitools.rom import KickRomAccess, KickRomBuilder, RomModuleCache
+from amitools.binfmt.BinFmt import BinFmt
+
+LIB_PATH = "bin/libs-sc-dbg/testsc.library"
+
+
+def _make_hdr():
+    return struct.pack(">II", KickRomAccess.ROMHDR_512K, 0xF80002)
+
+
+def rom_rombuilder_update_check_sum_test():
+    rnd = random.Random(7)
+    old = bytearray(rnd.getrandbits(8) for _ in range(64 * 1024))
+    kh = KickRomAccess(old)
+    kh.write_check_sum()
+    old = bytes(old)
+    new = bytearray(old)
+    for off in (0, 5000, 40000, len(new) - 0x20):
+        new[off] ^= 0x5A
+    kh = KickRomAccess(new)
+    assert kh.update_check_sum(old) == kh.recalc_check_sum()
+    assert kh.write_check_sum(old) == kh.recalc_check_sum()
+    assert kh.verify_check_sum()
+    # no change
+    kh = KickRomAccess(bytearray(old))
+    assert kh.update_check_sum(old) == kh.read_check_sum()
+
+
+def rom_rombuilder_module_cache_test(tmpdir):
+    path = str(tmpdir / "modules.cache")
+    cache = RomModuleCache(path)
+    assert not cache.load()
+    digest = RomModuleCache.get_digest(b"module")
+    assert cache.get_size(digest) is None
+    cache.put_data(digest, 0xF80000, b"abcd")
+    assert cache.save()
+    cache = RomModuleCache(path)
+    assert cache.load()
+    assert cache.get_size(digest) == 4
+    assert cache.get_data(digest, 0xF80000) == b"abcd"
+    assert cache.get_data(digest, 0xF80004) is None
+    assert (cache.num_hits, cache.num_misses) == (1, 1)
+    # invalid file
+    with open(path, "wb") as fh:
+        fh.write(b"junk")
+    assert not RomModuleCache(path).load()
+
+
+def _build(cache, old_rom=None):
+    bin_img = BinFmt().load_image(LIB_PATH)
+    digest = RomModuleCache.get_digest(open(LIB_PATH, "rb").read())
+    rb = KickRomBuilder(512)
+    rb.add_module("hdr", _make_hdr())
+    size = cache.get_size(digest)
+    if size is None:
+        rb.add_bin_img("lib", bin_img, cache, digest)
+    else:
+        rb.add_cached_bin_img("lib", cache, digest, size, lambda: bin_img)
+    return rb.build_rom(old_rom)
+
+
+def rom_rombuilder_cached_build_test(tmpdir):
+    rb = KickRomBuilder(512)
+    rb.add_module("hdr", _make_hdr())
+    rb.add_bin_img("lib", BinFmt().load_image(LIB_PATH))
+    full_rom = rb.build_rom()
+    cache = RomModuleCache(str(tmpdir / "modules.cache"))
+    # first build fills the cache
+    rom1 = _build(cache)
+    assert rom1 == full_rom
+    assert cache.num_misses == 1
+    # second build takes data from cache and updates the check sum
+    old_rom = bytearray(rom1)
+    old_rom[0x100] ^= 0xFF
+    KickRomAccess(old_rom).write_check_sum()
+    rom2 = _build(cache, bytes(old_rom))
+    assert rom2 == full_rom
+    assert cache.num_hits == 1
+    assert KickRomAccess(rom2).verify_check_sum()
@@ -0,0 +1,69 @@
+import os
+import struct
+from amitools.rom import RomIndex, RemusFileSet, RomSplitter
+import amitools.util.DataDir as DataDir
+
+
+def _rom_values(rom):
+    mods = []
+    for m in rom.modules:
+        e = m.extra
+        mods.append((m.name, m.offset, m.size, e.relocs, e.patches, e.fixes))
+    return (rom.name, rom.size, rom.chk_sum, rom.base_addr, mods)
+
+
+def _fake_rom(rom):
+    """create zero filled image that has the checksum of the given rom"""
+    data = bytearray(rom.size)
+    struct.pack_into(">I", data, 0, 0xFFFFFFFF - rom.chk_sum)
+    return bytes(data)
+
+
+def rom_romindex_build_test():
+    data_dir = DataDir.ensure_data_sub_dir("splitdata")
+    rfs = RemusFileSet()
+    rfs.load(data_dir)
+    index = RomIndex.build(data_dir)
+    roms = rfs.get_roms()
+    assert [_rom_values(r) for r in index.get_roms()] == [_rom_values(r) for r in roms]
+    for r in roms:
+        assert index.find_rom(bytes(r.size), r.chk_sum).name == r.name
+    assert index.find_rom(bytes(16), 0) is None
+    assert roms[0].size in index.get_sizes()
+
+
+def rom_romindex_cache_test(tmpdir, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir / "cache"))
+    data_dir = DataDir.ensure_data_sub_dir("splitdata")
+    index = RomIndex.open(data_dir)
+    assert index.path is not None
+    assert index.path.startswith(str(tmpdir / "cache"))
+    # second open reads the cache
+    index2 = RomIndex.open(data_dir)
+    assert index2.path == index.path
+    assert [_rom_values(r) for r in index2.get_roms()] == [
+        _rom_values(r) for r in index.get_roms()
+    ]
+    # a changed data dir invalidates the cache
+    assert RomIndex.load(index.path, ()) is None
+    # invalid cache file
+    with open(index.path, "wb") as fh:
+        fh.write(b"RMIX\x01garbage")
+    assert RomIndex.load(index.path) is None
+    index3 = RomIndex.open(data_dir)
+    assert len(index3.get_roms()) == len(index.get_roms())
+
+
+def rom_romindex_splitter_test(tmpdir, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir / "cache"))
+    rs = RomSplitter()
+    rom = rs.rfs.get_roms()[0]
+    rom_path = str(tmpdir / "fake.rom")
+    with open(rom_path, "wb") as fh:
+        fh.write(_fake_rom(rom))
+    assert rs.is_rom_size(rom.size)
+    assert rs.is_rom_size(rom.size + 11)
+    assert not rs.is_rom_size(rom.size + 1)
+    found = rs.find_rom(rom_path)
+    assert found.name == rom.name
+    assert rs.get_all_entries() == found.modules
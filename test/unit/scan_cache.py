@@ -0,0 +1,75 @@
+import io
+import os
+import time
+from amitools.scan.ScanCache import ScanCache
+from amitools.scan.ScanFile import ScanFile
+
+
+def _host_file(path, data):
+    with open(path, "wb") as fh:
+        fh.write(data)
+    return ScanFile(path, open(path, "rb"), len(data), True, True)
+
+
+def scan_cache_digest_test(tmpdir):
+    path = str(tmpdir / "a.bin")
+    with ScanCache(str(tmpdir / "cache.db")) as cache:
+        sf = _host_file(path, b"hello" * 100)
+        sf.get_fobj().read(3)
+        digest = cache.get_digest(sf)
+        # position is kept
+        assert sf.get_fobj().tell() == 3
+        sf.close()
+        assert cache.get_stats()["hashed"] == 1
+        # same content in an archive member
+        sf = ScanFile(["x.zip", "a.bin"], io.BytesIO(b"hello" * 100), 500)
+        assert cache.get_digest(sf) == digest
+        assert cache.get_stats()["hashed"] == 2
+    with ScanCache(str(tmpdir / "cache.db")) as cache:
+        # unchanged host file is not hashed again
+        sf = ScanFile(path, None, 500, True, True)
+        assert cache.get_digest(sf) == digest
+        stats = cache.get_stats()
+        assert stats["file_hits"] == 1
+        assert stats["hashed"] == 0
+        assert stats["files"] == 1
+        # changed host file
+        sf = _host_file(path, b"world" * 101)
+        assert cache.get_digest(sf) != digest
+        sf.close()
+
+
+def scan_cache_result_test(tmpdir):
+    cache_path = str(tmpdir / "cache.db")
+    with ScanCache(cache_path) as cache:
+        assert cache.get_result("abc", "kind") is None
+        cache.put_result("abc", "kind", ["ok", [1, 2]])
+        assert cache.get_result("abc", "kind") == ["ok", [1, 2]]
+        assert cache.get_result("abc", "other") is None
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+        assert stats["hit_rate"] == 1 / 3
+    with ScanCache(cache_path) as cache:
+        assert cache.get_result("abc", "kind") == ["ok", [1, 2]]
+
+
+def scan_cache_prune_test(tmpdir):
+    cache_path = str(tmpdir / "cache.db")
+    path = str(tmpdir / "a.bin")
+    with ScanCache(cache_path) as cache:
+        sf = _host_file(path, b"data")
+        digest = cache.get_digest(sf)
+        sf.close()
+        cache.put_result(digest, "kind", "ok")
+        cache.put_result("old", "kind", "ok")
+        cache.db.execute(
+            "UPDATE results SET used = ? WHERE digest = 'old'",
+            (int(time.time()) - 3600,),
+        )
+        assert cache.prune(60) == (0, 1)
+        os.remove(path)
+        assert cache.prune() == (1, 0)
+        stats = cache.get_stats()
+        assert stats["files"] == 0
+        assert stats["results"] == 1
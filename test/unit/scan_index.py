@@ -0,0 +1,55 @@
+import pytest
+from amitools.scan.ScanIndex import ScanIndex
+
+
+@pytest.fixture(params=["jsonl", "db"])
+def index_path(request, tmpdir):
+    return str(tmpdir / ("index." + request.param))
+
+
+def scan_index_roundtrip_test(index_path):
+    recs_a = [{"path": "a", "type": "x", "error": None, "num": 1}]
+    recs_b = [
+        {"path": "b;one", "type": "y", "error": None},
+        {"path": "b;two", "type": None, "error": "bad"},
+    ]
+    with ScanIndex(index_path) as idx:
+        assert idx.get_num_files() == 0
+        idx.set_records("a", 10, 100, recs_a)
+        idx.set_records("b", 20, 200, recs_b)
+        assert idx.is_current("a", 10, 100)
+    with ScanIndex(index_path) as idx:
+        assert idx.get_num_files() == 2
+        assert idx.is_current("a", 10, 100)
+        assert not idx.is_current("a", 10, 101)
+        assert not idx.is_current("c", 10, 100)
+        assert idx.get_records("a") == recs_a
+        assert idx.get_records("b") == recs_b
+        assert idx.get_records("c") is None
+        assert idx.get_all_records() == recs_a + recs_b
+
+
+def scan_index_replace_test(index_path):
+    with ScanIndex(index_path) as idx:
+        idx.set_records("a", 10, 100, [{"path": "a", "n": 1}])
+    with ScanIndex(index_path) as idx:
+        idx.set_records("a", 11, 101, [{"path": "a", "n": 2}])
+        idx.set_records("a", 12, 102, [{"path": "a", "n": 3}])
+    with ScanIndex(index_path) as idx:
+        assert idx.get_num_files() == 1
+        assert idx.is_current("a", 12, 102)
+        assert idx.get_records("a") == [{"path": "a", "n": 3}]
+
+
+def scan_index_jsonl_interrupted_test(tmpdir):
+    path = str(tmpdir / "index.jsonl")
+    idx = ScanIndex(path)
+    idx.open()
+    idx.set_records("a", 10, 100, [{"path": "a"}])
+    # simulate an interrupted run: no close() and a partial line
+    idx.fobj.write('{"file": "b", "si')
+    idx.fobj.flush()
+    with ScanIndex(path) as idx2:
+        assert idx2.get_num_files() == 1
+        assert idx2.is_current("a", 10, 100)
+    idx.fobj.close()
@@ -0,0 +1,121 @@
+import io
+import os
+import zipfile
+import pytest
+from amitools.scan.FileScanner import FileScanner
+from amitools.scan.ScanFile import ScanFile
+from amitools.scan.ScanPool import ScanPool
+from amitools.scan.ArchiveScanner import ZipScanner
+
+
+def _scan_data(scan_file):
+    fobj = scan_file.get_fobj()
+    fobj.seek(0)
+    return scan_file.get_basename(), fobj.read()
+
+
+def _fail(scan_file):
+    raise ValueError("bad " + scan_file.get_basename())
+
+
+def _create_tree(tmpdir):
+    files = {}
+    for i in range(5):
+        data = bytes([i]) * (1000 * (i + 1))
+        files["f%d.bin" % i] = data
+        with open(str(tmpdir / ("f%d.bin" % i)), "wb") as fh:
+            fh.write(data)
+    # archive with a nested archive
+    inner = io.BytesIO()
+    with zipfile.ZipFile(inner, "w") as zf:
+        zf.writestr("inner.bin", b"inner" * 3000)
+    tmpdir.mkdir("sub")
+    with zipfile.ZipFile(str(tmpdir / "sub" / "a.zip"), "w") as zf:
+        zf.writestr("m/member.bin", b"member" * 1000)
+        zf.writestr("nested.zip", inner.getvalue())
+    files["member.bin"] = b"member" * 1000
+    files["inner.bin"] = b"inner" * 3000
+    return files
+
+
+def _run(tmpdir, num_workers, mem_bytes=1024 * 1024, ram_bytes=4096):
+    results = []
+
+    def result_handler(path, result):
+        results.append((path, result))
+        return True
+
+    pool = ScanPool(
+        _scan_data,
+        result_handler,
+        num_workers=num_workers,
+        mem_bytes=mem_bytes,
+        ram_bytes=ram_bytes,
+    )
+    scanner = FileScanner(pool.submit, scanners=[ZipScanner()], ram_bytes=ram_bytes)
+    with pool:
+        assert scanner.scan(str(tmpdir))
+    return results
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def scan_pool_results_test(tmpdir, num_workers):
+    files = _create_tree(tmpdir)
+    results = _run(tmpdir, num_workers)
+    # results keep the scan order
+    paths = [os.path.relpath(p, str(tmpdir)) for p, _ in results]
+    assert paths == [
+        "f0.bin",
+        "f1.bin",
+        "f2.bin",
+        "f3.bin",
+        "f4.bin",
+        os.path.join("sub", "a.zip;m/member.bin"),
+        os.path.join("sub", "a.zip;nested.zip;inner.bin"),
+    ]
+    for path, (name, data) in results:
+        assert files[name] == data
+
+
+def scan_pool_budget_test(tmpdir):
+    files = _create_tree(tmpdir)
+    # tiny budget: members spill to temp files and jobs are serialized
+    results = _run(tmpdir, 2, mem_bytes=100, ram_bytes=100)
+    assert len(results) == 7
+    for path, (name, data) in results:
+        assert files[name] == data
+
+
+def scan_pool_error_test():
+    errors = []
+
+    def error_handler(path, error):
+        errors.append((path, str(error)))
+        return False
+
+    pool = ScanPool(_fail, lambda p, r: True, 2, error_handler=error_handler)
+    with pool:
+        sf = ScanFile(["a.zip", "x.bin"], io.BytesIO(b"abc"), 3, False, False)
+        pool.submit(sf)
+    assert errors == [("a.zip;x.bin", "bad x.bin")]
+    assert not pool.ok
+    sf = ScanFile(["a.zip", "y.bin"], io.BytesIO(b"abc"), 3, False, False)
+    assert not pool.submit(sf)
+
+
+def scan_pool_promote_test():
+    scanner = FileScanner(ram_bytes=4)
+    # streamed data stays untouched if no seeking is needed
+    sf = ScanFile(["a.zip", "x"], io.BytesIO(b"abcdef"), 6, False, False)
+    assert scanner.promote_scan_file(sf) is sf
+    # seekable clone spills to disk beyond ram_bytes
+    sf2 = scanner.promote_scan_file(sf, seekable=True)
+    assert sf2.is_seekable()
+    assert sf2.is_file_based()
+    assert sf2.get_fobj().read() == b"abcdef"
+    sf2.close()
+    sf = ScanFile(["a.zip", "y"], io.BytesIO(b"ab"), 2, False, False)
+    sf3 = scanner.promote_scan_file(sf, seekable=True)
+    assert not sf3.is_file_based()
+    assert sf3.get_fobj().read() == b"ab"
+    sf3.close()
@@ -0,0 +1,81 @@
+import os
+import stat
+from amitools.vamos.cfg import VamosMainParser
+from amitools.vamos.session import VamosSession
+from amitools.vamos.libmgr import SetupLibManager
+
+
+def _create_session(snap_path, *args):
+    mp = VamosMainParser()
+    args = ["--snapshot", snap_path] + list(args) + ["curdir:bin/test_hello_gcc"]
+    assert mp.parse(paths=["test.vamosrc"], args=args)
+    return VamosSession(mp)
+
+
+def _no_setup(self):
+    raise AssertionError("libs were bootstrapped")
+
+
+def session_snapshot_restore_test(tmpdir, capsys, monkeypatch):
+    snap_path = str(tmpdir / "vamos.snap")
+    # first run writes the snapshot
+    session = _create_session(snap_path)
+    assert session.run_main() == 0
+    st = os.stat(snap_path)
+    assert stat.S_IMODE(st.st_mode) == 0o600
+    assert capsys.readouterr().out == "VamosTest: PrintHello()\n"
+    # second run restores it
+    monkeypatch.setattr(SetupLibManager, "setup", _no_setup)
+    session = _create_session(snap_path)
+    assert session.run_main() == 0
+    assert capsys.readouterr().out == "VamosTest: PrintHello()\n"
+    # and again
+    session = _create_session(snap_path)
+    assert session.run_main() == 0
+    assert capsys.readouterr().out == "VamosTest: PrintHello()\n"
+    assert os.stat(snap_path).st_mtime_ns == st.st_mtime_ns
+
+
+def session_snapshot_config_test(tmpdir, capsys):
+    snap_path = str(tmpdir / "vamos.snap")
+    session = _create_session(snap_path)
+    assert session.run_main() == 0
+    data = open(snap_path, "rb").read()
+    # other config does not use the snapshot but replaces it
+    session = _create_session(snap_path, "-m", "4096")
+    assert session.run_main() == 0
+    assert open(snap_path, "rb").read() != data
+    assert capsys.readouterr().out == "VamosTest: PrintHello()\n" * 2
+
+
+def session_snapshot_invalid_test(tmpdir, capsys):
+    snap_path = str(tmpdir / "vamos.snap")
+    with open(snap_path, "wb") as fh:
+        fh.write(b"VSNP\x01garbage")
+    os.chmod(snap_path, 0o600)
+    session = _create_session(snap_path)
+    assert session.run_main() == 0
+    # is replaced by a valid one
+    data = open(snap_path, "rb").read()
+    assert len(data) > 1000
+    assert capsys.readouterr().out == "VamosTest: PrintHello()\n"
+
+
+def session_snapshot_insecure_test(tmpdir, capsys, monkeypatch):
+    snap_path = str(tmpdir / "vamos.snap")
+    session = _create_session(snap_path)
+    assert session.run_main() == 0
+    os.chmod(snap_path, 0o622)
+    # writable by others: do not restore
+    setup_calls = []
+    orig_setup = SetupLibManager.setup
+
+    def setup(self):
+        setup_calls.append(self)
+        return orig_setup(self)
+
+    monkeypatch.setattr(SetupLibManager, "setup", setup)
+    session = _create_session(snap_path)
+    assert session.run_main() == 0
+    assert len(setup_calls) == 1
+    assert capsys.readouterr().out == "VamosTest: PrintHello()\n" * 2
@@ -0,0 +1,64 @@
+import json
+import subprocess
+import pytest
+from amitools.vamos.batch import strip_batch_args, read_jobs
+
+VAMOS_BIN = "../bin/vamos"
+VAMOS_ARGS = ["-c", "test.vamosrc"]
+
+
+def vamos_batch_strip_args_test():
+    args = ["-V", "a:b", "--batch", "jobs.json", "--batch-workers=2", "-m", "4096"]
+    assert strip_batch_args(args) == ["-V", "a:b", "-m", "4096"]
+    args = ["--batch-result", "res.json", "--batch-workers", "3"]
+    assert strip_batch_args(args) == []
+
+
+def vamos_batch_read_jobs_test(tmpdir):
+    path = str(tmpdir / "jobs.json")
+    with open(path, "w") as fh:
+        json.dump({"jobs": [["a", "b"], {"id": "x", "args": ["c"], "cwd": "/"}]}, fh)
+    jobs = read_jobs(path)
+    assert len(jobs) == 2
+    assert jobs[0].job_id == 0
+    assert jobs[0].args == ["a", "b"]
+    assert jobs[1].job_id == "x"
+    assert jobs[1].cwd == "/"
+    # invalid jobs
+    with open(path, "w") as fh:
+        json.dump([{"args": "bla"}], fh)
+    with pytest.raises(ValueError):
+        read_jobs(path)
+    with open(path, "w") as fh:
+        json.dump({"foo": 1}, fh)
+    with pytest.raises(ValueError):
+        read_jobs(path)
+
+
+def vamos_batch_run_test(tmpdir):
+    jobs_path = str(tmpdir / "jobs.json")
+    result_path = str(tmpdir / "result.json")
+    jobs = [
+        ["curdir:bin/test_hello_gcc"],
+        {"id": "raise", "args": ["curdir:bin/test_raise_gcc"]},
+        # different config triggers a full run
+        {"id": "mem", "args": ["-m", "4096", "curdir:bin/test_hello_gcc"]},
+    ]
+    with open(jobs_path, "w") as fh:
+        json.dump(jobs, fh)
+    args = [VAMOS_BIN] + VAMOS_ARGS
+    args += ["--batch", jobs_path, "--batch-workers", "2"]
+    args += ["--batch-result", result_path]
+    p = subprocess.run(args)
+    assert p.returncode == 0
+    with open(result_path) as fh:
+        results = json.load(fh)["jobs"]
+    assert [r["id"] for r in results] == [0, "raise", "mem"]
+    hello, fail, mem = results
+    assert hello["return_code"] == 0
+    assert hello["stdout"] == "VamosTest: PrintHello()\n"
+    assert hello["cycles"] > 0
+    assert hello["wall_time"] > 0
+    assert fail["return_code"] == 1
+    assert mem["return_code"] == 0
+    assert mem["stdout"] == "VamosTest: PrintHello()\n"